@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+Teste de Carga - INDE MCP Server
+Clientes MCP simultâneos contra o servidor FastMCP real e GeoServers locais
+
+Funcionalidades:
+- N clientes MCP simulados chamando uma mistura de ferramentas
+- GeoServers substitutos com latência e falhas configuráveis
+- Vazão, percentis de latência por ferramenta, atraso do event loop e RSS
+
+Uso:
+    python benchmarks/load_test.py --clients 50 --duration 60 --latency 0.2 --failure-rate 0.05
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from ogc_fixtures import FixtureStore, MockOGCServer  # noqa: E402
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+
+DEFAULT_MIX = "list_inde_services=0.4,discover_service_layers=0.4,extract_geospatial_data=0.2"
+
+
+# ================================
+# UTILITÁRIOS
+# ================================
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Percentil por interpolação linear de uma lista já ordenada."""
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * q
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    """Resumo estatístico (valores em milissegundos)."""
+    values = sorted(values)
+    return {
+        "count": len(values),
+        "p50_ms": percentile(values, 0.50) * 1000,
+        "p95_ms": percentile(values, 0.95) * 1000,
+        "p99_ms": percentile(values, 0.99) * 1000,
+        "max_ms": (values[-1] if values else 0.0) * 1000
+    }
+
+
+def current_rss_mb() -> float:
+    """RSS atual do processo em MB."""
+    if PSUTIL_AVAILABLE:
+        return psutil.Process().memory_info().rss / 1024 / 1024
+    # ru_maxrss é o pico (KB no Linux)
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def parse_mix(mix: str) -> List[Tuple[str, float]]:
+    """Converte ``ferramenta=peso,...`` em lista de pesos."""
+    weights = []
+    for item in mix.split(","):
+        name, _, weight = item.partition("=")
+        weights.append((name.strip(), float(weight or 1)))
+    return weights
+
+
+# ================================
+# AMBIENTE SIMULADO
+# ================================
+
+def write_catalog(servers: List[MockOGCServer], path: Path) -> List[str]:
+    """Grava um catálogo apontando para os GeoServers locais. Retorna os órgãos."""
+    orgaos = []
+    lines = []
+    for i, server in enumerate(servers):
+        orgao = f"CARGA{i}"
+        orgaos.append(orgao)
+        lines.append(f"- descricao: {orgao} - GeoServer de teste {i}")
+        lines.append(f"  url: {server.service_url(f'geoserver-{i}')}")
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return orgaos
+
+
+class LoopLagMonitor:
+    """Mede o atraso do event loop agendando ``sleep(interval)`` repetidamente."""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.samples: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - expected))
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+
+class RSSMonitor:
+    """Amostra o RSS do processo uma vez por segundo."""
+
+    def __init__(self, interval: float = 1.0):
+        self.interval = interval
+        self.samples: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        while True:
+            self.samples.append(current_rss_mb())
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+
+# ================================
+# CLIENTES SIMULADOS
+# ================================
+
+class LoadStats:
+    """Latências e erros agregados por ferramenta."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    def record(self, tool: str, duration: float, ok: bool):
+        self.latencies[tool].append(duration)
+        if not ok:
+            self.errors[tool] += 1
+
+
+def build_arguments(tool: str, orgaos: List[str], rng: random.Random, max_features: int) -> Dict[str, Any]:
+    """Argumentos aleatórios para uma chamada de ferramenta."""
+    orgao = rng.choice(orgaos)
+    if tool == "list_inde_services":
+        return {"orgao": orgao} if rng.random() < 0.5 else {}
+    if tool == "discover_service_layers":
+        return {"orgao": orgao, "service_name": "GeoServer"}
+    return {
+        "orgao": orgao,
+        "service_name": "GeoServer",
+        "layer": f"bench:camada_{rng.randrange(20)}",
+        "max_features": max_features
+    }
+
+
+async def simulated_client(client_id: int, mcp, orgaos: List[str], mix: List[Tuple[str, float]],
+                           deadline: float, stats: LoadStats, think_time: float, max_features: int):
+    """Um cliente MCP que chama ferramentas até ``deadline``."""
+    from fastmcp import Client
+
+    rng = random.Random(client_id)
+    tools = [name for name, _ in mix]
+    weights = [weight for _, weight in mix]
+
+    async with Client(mcp) as client:
+        while time.perf_counter() < deadline:
+            tool = rng.choices(tools, weights)[0]
+            arguments = build_arguments(tool, orgaos, rng, max_features)
+
+            start_time = time.perf_counter()
+            ok = True
+            try:
+                result = await client.call_tool(tool, arguments, raise_on_error=False)
+                data = getattr(result, "data", None)
+                if getattr(result, "is_error", False) or (isinstance(data, dict) and "error" in data):
+                    ok = False
+            except Exception:
+                ok = False
+            stats.record(tool, time.perf_counter() - start_time, ok)
+
+            if think_time:
+                await asyncio.sleep(rng.uniform(0, think_time))
+
+
+async def run_load_test(args) -> Dict[str, Any]:
+    """Sobe o ambiente simulado, executa a carga e consolida o relatório."""
+    store = FixtureStore()
+    servers = [
+        MockOGCServer(store, latency=args.latency, jitter=args.jitter,
+                      failure_rate=args.failure_rate, seed=i).start()
+        for i in range(args.upstreams)
+    ]
+
+    catalog = Path(tempfile.mkdtemp()) / "catalogo_carga.yaml"
+    orgaos = write_catalog(servers, catalog)
+
+    # O servidor lê CATALOG_PATH ao ser importado
+    os.environ["CATALOG_PATH"] = str(catalog)
+    import mcp_inde_server_main as server_main
+
+    stats = LoadStats()
+    lag = LoopLagMonitor()
+    rss = RSSMonitor()
+    mix = parse_mix(args.mix)
+
+    print(
+        f"🚀 {args.clients} clientes, {args.duration}s, {args.upstreams} GeoServers "
+        f"(latência {args.latency}s ± {args.jitter}s, falhas {args.failure_rate:.0%})"
+    )
+
+    lag.start()
+    rss.start()
+    started = time.perf_counter()
+    deadline = started + args.duration
+    await asyncio.gather(*(
+        simulated_client(i, server_main.mcp, orgaos, mix, deadline, stats, args.think_time, args.max_features)
+        for i in range(args.clients)
+    ))
+    elapsed = time.perf_counter() - started
+    await lag.stop()
+    await rss.stop()
+
+    for server in servers:
+        server.stop()
+
+    total_calls = sum(len(v) for v in stats.latencies.values())
+    return {
+        "config": vars(args),
+        "elapsed_seconds": elapsed,
+        "total_calls": total_calls,
+        "throughput_rps": total_calls / elapsed if elapsed else 0.0,
+        "tools": {
+            tool: {**summarize(latencies), "errors": stats.errors.get(tool, 0)}
+            for tool, latencies in sorted(stats.latencies.items())
+        },
+        "event_loop_lag": summarize(lag.samples),
+        "rss_mb": {
+            "start": rss.samples[0] if rss.samples else 0.0,
+            "peak": max(rss.samples) if rss.samples else 0.0,
+            "end": current_rss_mb()
+        },
+        "upstreams": {
+            "requests": sum(s.requests_served for s in servers),
+            "failures_injected": sum(s.failures_injected for s in servers)
+        }
+    }
+
+
+def print_report(report: Dict[str, Any]):
+    """Exibe o relatório no console."""
+    print("\n" + "=" * 78)
+    print(f"📊 {report['total_calls']} chamadas em {report['elapsed_seconds']:.1f}s "
+          f"→ {report['throughput_rps']:.1f} chamadas/s")
+    print("=" * 78)
+    print(f"{'Ferramenta':<28}{'n':>7}{'erros':>7}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}  (ms)")
+    for tool, s in report["tools"].items():
+        print(f"{tool:<28}{s['count']:>7}{s['errors']:>7}{s['p50_ms']:>9.1f}{s['p95_ms']:>9.1f}"
+              f"{s['p99_ms']:>9.1f}{s['max_ms']:>9.1f}")
+    lag = report["event_loop_lag"]
+    print(f"\n⏱️  Atraso do event loop: p50 {lag['p50_ms']:.1f} ms, p99 {lag['p99_ms']:.1f} ms, "
+          f"máx {lag['max_ms']:.1f} ms")
+    rss = report["rss_mb"]
+    print(f"💾 RSS: início {rss['start']:.1f} MB, pico {rss['peak']:.1f} MB, fim {rss['end']:.1f} MB")
+    up = report["upstreams"]
+    print(f"🌐 Upstream: {up['requests']} requisições, {up['failures_injected']} falhas injetadas")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga das ferramentas MCP do INDE")
+    parser.add_argument("--clients", type=int, default=20, help="Clientes MCP simultâneos")
+    parser.add_argument("--duration", type=float, default=30.0, help="Duração em segundos")
+    parser.add_argument("--upstreams", type=int, default=3, help="GeoServers substitutos")
+    parser.add_argument("--latency", type=float, default=0.1, help="Latência fixa do upstream (s)")
+    parser.add_argument("--jitter", type=float, default=0.05, help="Latência aleatória adicional (s)")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fração de respostas HTTP 503")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Pesos das ferramentas (nome=peso,...)")
+    parser.add_argument("--think-time", type=float, default=0.0, help="Pausa máxima entre chamadas (s)")
+    parser.add_argument("--max-features", type=int, default=100)
+    parser.add_argument("--output", default=None, help="Grava o relatório em JSON")
+    args = parser.parse_args()
+
+    report = asyncio.run(run_load_test(args))
+    print_report(report)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"💾 Relatório salvo em: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+"""
+Fixtures OGC para Benchmarks - INDE MCP Server
+Geração de documentos sintéticos e servidor WFS/WMS local
+
+Funcionalidades:
+- Documentos GetCapabilities WFS/WMS de tamanho configurável
+- FeatureCollections GeoJSON com N feições (gravadas em streaming)
+- Servidor OGC local que serve as fixtures (latência e falhas configuráveis)
+
+Uso: python ogc_fixtures.py --caps 10mb --features 1k
+"""
+
+import argparse
+import json
+import random
+import re
+import shutil
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Optional
+
+# Diretório padrão onde as fixtures geradas ficam armazenadas
+DEFAULT_FIXTURE_DIR = Path(__file__).parent / ".fixtures"
+
+# Tamanhos nomeados de documentos GetCapabilities
+CAPABILITIES_SIZES = {
+    "small": 64 * 1024,
+    "10mb": 10 * 1024 * 1024,
+    "100mb": 100 * 1024 * 1024,
+}
+
+
+# ================================
+# PARSING DE TAMANHOS
+# ================================
+
+def parse_size(value: str) -> int:
+    """Converte um tamanho ("small", "10mb", "512kb") em bytes."""
+    value = value.strip().lower()
+    if value in CAPABILITIES_SIZES:
+        return CAPABILITIES_SIZES[value]
+
+    match = re.fullmatch(r"(\d+)(kb|mb|gb)?", value)
+    if not match:
+        raise ValueError(f"Tamanho inválido: {value}")
+
+    multiplier = {None: 1, "kb": 1024, "mb": 1024 ** 2, "gb": 1024 ** 3}[match.group(2)]
+    return int(match.group(1)) * multiplier
+
+
+def parse_count(value: str) -> int:
+    """Converte uma contagem ("1k", "1m", "2500") em inteiro."""
+    value = value.strip().lower()
+    match = re.fullmatch(r"(\d+)(k|m)?", value)
+    if not match:
+        raise ValueError(f"Contagem inválida: {value}")
+
+    multiplier = {None: 1, "k": 1000, "m": 1000000}[match.group(2)]
+    return int(match.group(1)) * multiplier
+
+
+# ================================
+# GERADORES DE DOCUMENTOS
+# ================================
+
+WFS_HEADER = """<?xml version="1.0" encoding="UTF-8"?>
+<wfs:WFS_Capabilities version="2.0.0" xmlns:wfs="http://www.opengis.net/wfs/2.0" xmlns:ows="http://www.opengis.net/ows/1.1">
+<wfs:FeatureTypeList>
+"""
+
+WFS_LAYER = """<wfs:FeatureType>
+  <wfs:Name>bench:camada_{i}</wfs:Name>
+  <wfs:Title>Camada sintética {i}</wfs:Title>
+  <wfs:Abstract>Camada gerada para benchmark de parsing de capabilities ({i}).</wfs:Abstract>
+  <ows:Keywords><ows:Keyword>benchmark</ows:Keyword><ows:Keyword>inde</ows:Keyword></ows:Keywords>
+  <wfs:DefaultCRS>urn:ogc:def:crs:EPSG::4674</wfs:DefaultCRS>
+  <ows:WGS84BoundingBox><ows:LowerCorner>-73.99 -33.75</ows:LowerCorner><ows:UpperCorner>-28.84 5.27</ows:UpperCorner></ows:WGS84BoundingBox>
+</wfs:FeatureType>
+"""
+
+WFS_FOOTER = "</wfs:FeatureTypeList>\n</wfs:WFS_Capabilities>\n"
+
+WMS_HEADER = """<?xml version="1.0" encoding="UTF-8"?>
+<WMS_Capabilities version="1.3.0" xmlns="http://www.opengis.net/wms">
+<Capability>
+<Layer>
+<Title>Raiz</Title>
+"""
+
+WMS_LAYER = """<Layer queryable="1">
+  <Name>bench:camada_{i}</Name>
+  <Title>Camada sintética {i}</Title>
+  <Abstract>Camada gerada para benchmark de parsing de capabilities ({i}).</Abstract>
+  <CRS>EPSG:4674</CRS>
+  <EX_GeographicBoundingBox><westBoundLongitude>-73.99</westBoundLongitude><eastBoundLongitude>-28.84</eastBoundLongitude><southBoundLatitude>-33.75</southBoundLatitude><northBoundLatitude>5.27</northBoundLatitude></EX_GeographicBoundingBox>
+</Layer>
+"""
+
+WMS_FOOTER = "</Layer>\n</Capability>\n</WMS_Capabilities>\n"
+
+
+def _write_capabilities(path: Path, target_bytes: int, header: str, layer: str, footer: str) -> int:
+    """Grava um documento de capabilities com aproximadamente ``target_bytes``."""
+    layer_size = len(layer.format(i=0).encode("utf-8"))
+    total_layers = max(1, (target_bytes - len(header) - len(footer)) // layer_size)
+
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(header)
+        for i in range(total_layers):
+            f.write(layer.format(i=i))
+        f.write(footer)
+
+    return total_layers
+
+
+def write_wfs_capabilities(path: Path, target_bytes: int) -> int:
+    """Gera um WFS 2.0 GetCapabilities. Retorna o número de camadas."""
+    return _write_capabilities(path, target_bytes, WFS_HEADER, WFS_LAYER, WFS_FOOTER)
+
+
+def write_wms_capabilities(path: Path, target_bytes: int) -> int:
+    """Gera um WMS 1.3.0 GetCapabilities. Retorna o número de camadas."""
+    return _write_capabilities(path, target_bytes, WMS_HEADER, WMS_LAYER, WMS_FOOTER)
+
+
+def make_feature(i: int, rng: random.Random) -> Dict:
+    """Cria uma feição pontual sintética dentro do território brasileiro."""
+    return {
+        "type": "Feature",
+        "id": f"bench.{i}",
+        "geometry": {
+            "type": "Point",
+            "coordinates": [round(rng.uniform(-73.9, -34.8), 6), round(rng.uniform(-33.7, 5.2), 6)]
+        },
+        "properties": {
+            "id": i,
+            "nome": f"Estação {i}",
+            "cod_mun": f"{rng.randint(1100015, 5300108)}",
+            "operadora": rng.choice(["A", "B", "C", "D"]),
+            "potencia_w": round(rng.uniform(1, 500), 2),
+            "ativa": rng.random() > 0.1,
+        }
+    }
+
+
+def write_geojson(path: Path, total_features: int, seed: int = 42) -> int:
+    """Grava uma FeatureCollection em streaming (memória constante)."""
+    rng = random.Random(seed)
+
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('{"type": "FeatureCollection", "bbox": [-73.99, -33.75, -28.84, 5.27], "features": [\n')
+        for i in range(total_features):
+            if i:
+                f.write(",\n")
+            f.write(json.dumps(make_feature(i, rng), ensure_ascii=False))
+        f.write("\n]}\n")
+
+    return total_features
+
+
+def feature_collection(total_features: int, start_index: int = 0, seed: int = 42) -> bytes:
+    """Gera em memória uma FeatureCollection pequena (usada pelo servidor local)."""
+    rng = random.Random(seed + start_index)
+    features = [make_feature(start_index + i, rng) for i in range(total_features)]
+    return json.dumps({"type": "FeatureCollection", "features": features}, ensure_ascii=False).encode("utf-8")
+
+
+# ================================
+# GERENCIADOR DE FIXTURES
+# ================================
+
+class FixtureStore:
+    """Gera e reaproveita fixtures em disco.
+
+    Cada conjunto ("dataset") é servido em ``/<dataset>/ows`` pelo servidor local:
+    ``<dataset>.wfs.xml``, ``<dataset>.wms.xml`` e ``<dataset>.geojson``.
+    """
+
+    def __init__(self, fixture_dir: Path = DEFAULT_FIXTURE_DIR):
+        self.fixture_dir = Path(fixture_dir)
+        self.fixture_dir.mkdir(parents=True, exist_ok=True)
+
+    def path(self, dataset: str, suffix: str) -> Path:
+        """Caminho de um arquivo de fixture."""
+        return self.fixture_dir / f"{dataset}.{suffix}"
+
+    def ensure_capabilities(self, size: str) -> str:
+        """Garante as capabilities WFS e WMS de um tamanho. Retorna o nome do dataset."""
+        dataset = f"caps-{size.lower()}"
+        target_bytes = parse_size(size)
+
+        for suffix, writer in (("wfs.xml", write_wfs_capabilities), ("wms.xml", write_wms_capabilities)):
+            path = self.path(dataset, suffix)
+            if not path.exists() or abs(path.stat().st_size - target_bytes) > target_bytes * 0.1:
+                writer(path, target_bytes)
+
+        return dataset
+
+    def ensure_geojson(self, count: str) -> str:
+        """Garante uma FeatureCollection com ``count`` feições. Retorna o nome do dataset."""
+        dataset = f"geojson-{count.lower()}"
+        path = self.path(dataset, "geojson")
+        meta = self.path(dataset, "count")
+        total = parse_count(count)
+
+        if not path.exists() or not meta.exists() or meta.read_text().strip() != str(total):
+            write_geojson(path, total)
+            meta.write_text(str(total))
+
+        return dataset
+
+    def feature_count(self, dataset: str) -> Optional[int]:
+        """Número de feições de um dataset GeoJSON, se conhecido."""
+        meta = self.path(dataset, "count")
+        return int(meta.read_text().strip()) if meta.exists() else None
+
+
+# ================================
+# SERVIDOR OGC LOCAL
+# ================================
+
+DESCRIBE_FEATURE_TYPE = b"""<?xml version="1.0" encoding="UTF-8"?>
+<xsd:schema xmlns:xsd="http://www.w3.org/2001/XMLSchema" xmlns:gml="http://www.opengis.net/gml/3.2">
+<xsd:complexType name="BenchType"><xsd:complexContent><xsd:extension base="gml:AbstractFeatureType"><xsd:sequence>
+<xsd:element name="id" type="xsd:int"/>
+<xsd:element name="nome" type="xsd:string"/>
+<xsd:element name="cod_mun" type="xsd:string"/>
+<xsd:element name="operadora" type="xsd:string"/>
+<xsd:element name="potencia_w" type="xsd:double"/>
+<xsd:element name="ativa" type="xsd:boolean"/>
+<xsd:element name="geom" type="gml:PointPropertyType"/>
+</xsd:sequence></xsd:extension></xsd:complexContent></xsd:complexType>
+<xsd:element name="bench" type="BenchType" substitutionGroup="gml:AbstractFeature"/>
+</xsd:schema>
+"""
+
+
+class MockOGCServer:
+    """Servidor WFS/WMS local que responde com as fixtures geradas.
+
+    Rotas: ``/<dataset>/ows?service=WFS|WMS&request=...``. Datasets sem
+    arquivo em disco recebem respostas pequenas geradas na hora, o que permite
+    usar o servidor como GeoServer substituto em testes de carga.
+
+    Args:
+        store: Fixtures em disco
+        latency: Atraso fixo por requisição (segundos)
+        jitter: Atraso adicional aleatório máximo (segundos)
+        failure_rate: Fração de requisições respondidas com HTTP 503
+    """
+
+    def __init__(self, store: Optional[FixtureStore] = None, host: str = "127.0.0.1", port: int = 0,
+                 latency: float = 0.0, jitter: float = 0.0, failure_rate: float = 0.0,
+                 layers_per_service: int = 20, seed: int = 42):
+        self.store = store or FixtureStore()
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.layers_per_service = layers_per_service
+        self.requests_served = 0
+        self.failures_injected = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        """URL base do servidor."""
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def service_url(self, dataset: str) -> str:
+        """URL OWS de um dataset."""
+        return f"{self.base_url}/{dataset}/ows"
+
+    def start(self) -> "MockOGCServer":
+        """Inicia o servidor em uma thread de fundo."""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Encerra o servidor."""
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "MockOGCServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _should_fail(self) -> bool:
+        with self._lock:
+            self.requests_served += 1
+            if self.failure_rate and self._rng.random() < self.failure_rate:
+                self.failures_injected += 1
+                return True
+            return False
+
+    def _delay(self) -> float:
+        with self._lock:
+            return self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0.0)
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                parsed = urllib.parse.urlparse(self.path)
+                query = {k.lower(): v[0] for k, v in urllib.parse.parse_qs(parsed.query).items()}
+                dataset = parsed.path.strip("/").split("/")[0] or "default"
+
+                delay = server._delay()
+                if delay:
+                    time.sleep(delay)
+
+                if server._should_fail():
+                    self._send_bytes(503, b"Service Unavailable (falha injetada)", "text/plain")
+                    return
+
+                service = query.get("service", "").upper()
+                request = query.get("request", "")
+
+                if request == "GetCapabilities":
+                    suffix = "wms.xml" if service == "WMS" else "wfs.xml"
+                    path = server.store.path(dataset, suffix)
+                    if path.exists():
+                        self._send_file(path, "text/xml")
+                    else:
+                        self._send_bytes(200, self._small_capabilities(service), "text/xml")
+                elif request == "DescribeFeatureType":
+                    self._send_bytes(200, DESCRIBE_FEATURE_TYPE, "text/xml")
+                elif request == "GetFeature" and query.get("resulttype") == "hits":
+                    total = server.store.feature_count(dataset) or 1000
+                    body = (
+                        '<wfs:FeatureCollection xmlns:wfs="http://www.opengis.net/wfs/2.0" '
+                        f'numberMatched="{total}" numberReturned="0"/>'
+                    ).encode("utf-8")
+                    self._send_bytes(200, body, "text/xml")
+                elif request == "GetFeature":
+                    path = server.store.path(dataset, "geojson")
+                    if path.exists():
+                        self._send_file(path, "application/json")
+                    else:
+                        count = int(query.get("count") or query.get("maxfeatures") or 100)
+                        start = int(query.get("startindex") or 0)
+                        self._send_bytes(200, feature_collection(min(count, 1000), start), "application/json")
+                else:
+                    self._send_bytes(400, b"Requisicao OGC nao suportada", "text/plain")
+
+            def _small_capabilities(self, service: str) -> bytes:
+                if service == "WMS":
+                    header, layer, footer = WMS_HEADER, WMS_LAYER, WMS_FOOTER
+                else:
+                    header, layer, footer = WFS_HEADER, WFS_LAYER, WFS_FOOTER
+                body = header + "".join(layer.format(i=i) for i in range(server.layers_per_service)) + footer
+                return body.encode("utf-8")
+
+            def _send_bytes(self, status: int, body: bytes, content_type: str):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _send_file(self, path: Path, content_type: str):
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(path.stat().st_size))
+                self.end_headers()
+                with open(path, "rb") as f:
+                    shutil.copyfileobj(f, self.wfile, 1024 * 1024)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    """Gera fixtures e, opcionalmente, mantém o servidor local no ar."""
+    parser = argparse.ArgumentParser(description="Fixtures OGC para benchmarks do INDE MCP")
+    parser.add_argument("--caps", default="small", help="Tamanhos de capabilities (ex: small,10mb,100mb)")
+    parser.add_argument("--features", default="1k", help="Tamanhos de GeoJSON (ex: 1k,1m)")
+    parser.add_argument("--serve", action="store_true", help="Mantém o servidor local em execução")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    store = FixtureStore()
+    datasets = [store.ensure_capabilities(size) for size in args.caps.split(",") if size]
+    datasets += [store.ensure_geojson(count) for count in args.features.split(",") if count]
+    print(f"✅ Fixtures em: {store.fixture_dir}")
+
+    if args.serve:
+        server = MockOGCServer(store, port=args.port).start()
+        for dataset in datasets:
+            print(f"🌐 {server.service_url(dataset)}")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Microbenchmarks - INDE MCP Server
+Mede os caminhos críticos do servidor contra fixtures OGC locais
+
+Benchmarks:
+- Carga do catálogo e busca no índice de serviços
+- Parsing de GetCapabilities WFS/WMS (small, 10mb, 100mb)
+- Perfil de GeoJSON extraído via WFS (1k e 1m feições)
+- Serialização das respostas das ferramentas
+
+Uso:
+    python benchmarks/run_benchmarks.py --output resultados.json
+    python benchmarks/run_benchmarks.py --compare baseline.json --threshold 0.15
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, asdict, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from ogc_fixtures import FixtureStore, MockOGCServer, parse_count  # noqa: E402
+
+
+# ================================
+# MODELOS DE RESULTADO
+# ================================
+
+@dataclass
+class BenchmarkResult:
+    """Resultado de um benchmark (tempos em segundos)."""
+    name: str
+    iterations: int
+    min: float
+    median: float
+    mean: float
+    p95: float
+    stddev: float
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class Comparison:
+    """Comparação de um benchmark com a baseline."""
+    name: str
+    baseline: float
+    current: float
+    ratio: float
+    regression: bool
+
+
+# ================================
+# EXECUÇÃO
+# ================================
+
+async def measure(name: str, func: Callable[[], Awaitable[Any]], repeat: int = 5,
+                  min_repeat: int = 3, time_budget: float = 30.0,
+                  extra: Optional[Dict[str, Any]] = None) -> BenchmarkResult:
+    """Executa ``func`` repetidamente e resume os tempos observados.
+
+    Uma execução de aquecimento é descartada. Após ``min_repeat`` execuções,
+    o benchmark para quando ``time_budget`` é excedido.
+    """
+    await func()
+
+    timings = []
+    started = time.perf_counter()
+    for i in range(repeat):
+        t0 = time.perf_counter()
+        await func()
+        timings.append(time.perf_counter() - t0)
+        if i + 1 >= min_repeat and time.perf_counter() - started > time_budget:
+            break
+
+    timings.sort()
+    result = BenchmarkResult(
+        name=name,
+        iterations=len(timings),
+        min=timings[0],
+        median=statistics.median(timings),
+        mean=statistics.fmean(timings),
+        p95=timings[min(len(timings) - 1, int(round(0.95 * (len(timings) - 1))))],
+        stddev=statistics.pstdev(timings),
+        extra=extra or {}
+    )
+    print(f"  {name:<45} mediana {result.median * 1000:10.3f} ms  ({result.iterations} execuções)")
+    return result
+
+
+def _run_sync(func: Callable[[], Any]) -> Callable[[], Awaitable[Any]]:
+    """Adapta uma função síncrona para ``measure``."""
+    async def wrapper():
+        return func()
+    return wrapper
+
+
+async def run_suite(args) -> List[BenchmarkResult]:
+    """Executa todos os benchmarks selecionados."""
+    import mcp_inde_server_main as server_main
+
+    store = FixtureStore(Path(args.fixture_dir)) if args.fixture_dir else FixtureStore()
+    results = []
+
+    # Catálogo e índice
+    print("📚 Catálogo")
+    extractor = server_main.INDEDataExtractor(args.catalog)
+    services = await extractor.load_catalog()
+    results.append(await measure(
+        "catalog_load", extractor.load_catalog, repeat=args.repeat,
+        extra={"services": len(services)}
+    ))
+
+    tools = server_main.INDETools(args.catalog)
+    await tools._ensure_catalog()
+    targets = [(s.orgao, s.descricao) for s in services]
+
+    async def lookup_all():
+        for orgao, descricao in targets:
+            await tools.find_service(orgao, descricao)
+
+    results.append(await measure(
+        "index_lookup", lookup_all, repeat=args.repeat,
+        extra={"lookups": len(targets)}
+    ))
+
+    with MockOGCServer(store) as mock:
+        # Capabilities
+        print("🗺️  Capabilities")
+        for size in args.caps.split(","):
+            dataset = store.ensure_capabilities(size)
+            url = mock.service_url(dataset)
+            for kind, parse, fetch in (
+                ("wfs", extractor._parse_wfs_layers, extractor._get_wfs_layers),
+                ("wms", extractor._parse_wms_layers, extractor._get_wms_layers),
+            ):
+                content = store.path(dataset, f"{kind}.xml").read_bytes()
+                layers = parse(content)
+                extra = {"bytes": len(content), "layers": len(layers)}
+                results.append(await measure(
+                    f"capabilities_parse[{kind},{size}]", _run_sync(lambda: parse(content)),
+                    repeat=args.repeat, extra=extra
+                ))
+                results.append(await measure(
+                    f"capabilities_fetch[{kind},{size}]", lambda: fetch(url),
+                    repeat=args.repeat, extra=extra
+                ))
+                del content
+
+        # GeoJSON
+        print("📦 GeoJSON")
+        for count in args.features.split(","):
+            dataset = store.ensure_geojson(count)
+            total = parse_count(count)
+            service = server_main.GeoService(
+                orgao="BENCH", tipo="WFS", descricao=f"BENCH - {dataset}", url=mock.service_url(dataset)
+            )
+            extra = {"features": total, "bytes": store.path(dataset, "geojson").stat().st_size}
+
+            results.append(await measure(
+                f"geojson_extract[{count}]",
+                lambda: extractor.extract_data(service, "bench:camada", max_features=total),
+                repeat=args.repeat, extra=extra
+            ))
+
+            with open(store.path(dataset, "geojson"), "r", encoding="utf-8") as f:
+                collection = json.load(f)
+
+            results.append(await measure(
+                f"geojson_profile[{count}]",
+                _run_sync(lambda: extractor._profile_geojson(service, "bench:camada", collection)),
+                repeat=args.repeat, extra=extra
+            ))
+
+            dataset_info = extractor._profile_geojson(service, "bench:camada", collection)
+            response = {"success": True, "dataset": asdict(dataset_info)}
+            results.append(await measure(
+                f"serialize_dataset_info[{count}]",
+                _run_sync(lambda: json.dumps(response, ensure_ascii=False)),
+                repeat=args.repeat, extra=extra
+            ))
+            results.append(await measure(
+                f"serialize_features[{count}]",
+                _run_sync(lambda: json.dumps(collection, ensure_ascii=False)),
+                repeat=args.repeat, extra=extra
+            ))
+            del collection
+
+    return results
+
+
+# ================================
+# PERSISTÊNCIA E COMPARAÇÃO
+# ================================
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def save_results(results: List[BenchmarkResult], path: Path):
+    """Grava os resultados em JSON."""
+    payload = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "git_revision": _git_revision()
+        },
+        "results": [asdict(r) for r in results]
+    }
+    path.write_text(json.dumps(payload, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"💾 Resultados salvos em: {path}")
+
+
+def compare_results(results: List[BenchmarkResult], baseline_path: Path, threshold: float) -> List[Comparison]:
+    """Compara medianas com a baseline; ``ratio > 1 + threshold`` é regressão."""
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+    baseline_by_name = {r["name"]: r for r in baseline.get("results", [])}
+
+    comparisons = []
+    for result in results:
+        reference = baseline_by_name.get(result.name)
+        if not reference or reference["median"] <= 0:
+            continue
+        ratio = result.median / reference["median"]
+        comparisons.append(Comparison(
+            name=result.name,
+            baseline=reference["median"],
+            current=result.median,
+            ratio=ratio,
+            regression=ratio > 1 + threshold
+        ))
+
+    print(f"\n📊 Comparação com {baseline_path} (limite: +{threshold:.0%})")
+    for c in comparisons:
+        flag = "❌ REGRESSÃO" if c.regression else ("✅ melhora" if c.ratio < 1 - threshold else "  estável")
+        print(
+            f"  {c.name:<45} {c.baseline * 1000:10.3f} ms -> {c.current * 1000:10.3f} ms "
+            f"({c.ratio:5.2f}x) {flag}"
+        )
+
+    return comparisons
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmarks do INDE MCP Server")
+    parser.add_argument("--catalog", default=str(ROOT_DIR / "catalogo_inde.yaml"))
+    parser.add_argument("--caps", default="small,10mb", help="Tamanhos de capabilities (small,10mb,100mb)")
+    parser.add_argument("--features", default="1k", help="Tamanhos de GeoJSON (1k,1m)")
+    parser.add_argument("--repeat", type=int, default=5, help="Execuções por benchmark")
+    parser.add_argument("--fixture-dir", default=None, help="Diretório das fixtures geradas")
+    parser.add_argument("--output", default="bench_results.json", help="Arquivo JSON de saída")
+    parser.add_argument("--compare", default=None, help="Baseline JSON para comparação")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Tolerância de regressão (fração)")
+    args = parser.parse_args()
+
+    print("🚀 INDE MCP - Microbenchmarks")
+    results = asyncio.run(run_suite(args))
+    save_results(results, Path(args.output))
+
+    if args.compare:
+        comparisons = compare_results(results, Path(args.compare), args.threshold)
+        if any(c.regression for c in comparisons):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
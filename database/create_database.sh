@@ -39,6 +39,14 @@ echo "  Infraestrutura Nacional de Dados Espaciais"
 echo "============================================================"
 echo ""
 
+# Modo PostGIS opcional (--postgis ou WITH_POSTGIS=true)
+WITH_POSTGIS="${WITH_POSTGIS:-false}"
+for arg in "$@"; do
+    case "$arg" in
+        --postgis) WITH_POSTGIS="true" ;;
+    esac
+done
+
 # Verificar se as variáveis de ambiente estão definidas
 if [ -z "$DB_HOST" ]; then
     DB_HOST="localhost"
@@ -52,7 +60,7 @@ fi
 
 if [ -z "$DB_NAME" ]; then
     print_error "DB_NAME environment variable is not set!"
-    echo "Usage: DB_NAME=mydb DB_USER=myuser DB_PASSWORD=mypass ./create_database.sh"
+    echo "Usage: DB_NAME=mydb DB_USER=myuser DB_PASSWORD=mypass ./create_database.sh [--postgis]"
     exit 1
 fi
 
@@ -126,6 +134,13 @@ if [[ $REPLY =~ ^[Yy]$ ]]; then
     print_warning "Dropping existing tables..."
     psql -h "$DB_HOST" -p "$DB_PORT" -U "$DB_USER" -d "$DB_NAME" << EOF
 -- Drop tables in reverse order (respecting foreign keys)
+DROP TABLE IF EXISTS t_resumo_atualizacao_log CASCADE;
+DROP TABLE IF EXISTS t_resumo_atualizacao CASCADE;
+DROP TABLE IF EXISTS t_resumo_publicacoes_ano CASCADE;
+DROP TABLE IF EXISTS t_resumo_publicacoes_classe CASCADE;
+DROP TABLE IF EXISTS t_resumo_publicacoes_municipio CASCADE;
+DROP TABLE IF EXISTS t_resumo_publicacoes_membros CASCADE;
+DROP TABLE IF EXISTS t_resumo_municipios_uf CASCADE;
 DROP TABLE IF EXISTS t_publicacao_municipios CASCADE;
 DROP TABLE IF EXISTS t_municipios CASCADE;
 DROP TABLE IF EXISTS t_anos CASCADE;
@@ -137,6 +152,20 @@ DROP FUNCTION IF EXISTS atualizar_data_modificacao() CASCADE;
 DROP FUNCTION IF EXISTS calcular_densidade_demografica() CASCADE;
 DROP FUNCTION IF EXISTS atualizar_data_ultima_atualizacao() CASCADE;
 DROP FUNCTION IF EXISTS obter_estatisticas_municipio(VARCHAR) CASCADE;
+DROP FUNCTION IF EXISTS obter_estatisticas_municipios(VARCHAR[]) CASCADE;
+DROP FUNCTION IF EXISTS atualizar_data_modificacao_publicacao() CASCADE;
+DROP FUNCTION IF EXISTS registrar_atualizacao_resumo(VARCHAR, VARCHAR) CASCADE;
+DROP FUNCTION IF EXISTS podar_resumo_atualizacao_log() CASCADE;
+DROP FUNCTION IF EXISTS aplicar_delta_resumos_publicacoes() CASCADE;
+DROP FUNCTION IF EXISTS aplicar_delta_resumos_municipios() CASCADE;
+DROP FUNCTION IF EXISTS recalcular_resumos_trigger() CASCADE;
+DROP FUNCTION IF EXISTS recalcular_resumos() CASCADE;
+DROP FUNCTION IF EXISTS atualizar_geom_ponto_municipio() CASCADE;
+DROP FUNCTION IF EXISTS geometria_consulta(TEXT) CASCADE;
+DROP FUNCTION IF EXISTS municipios_no_bbox(FLOAT8, FLOAT8, FLOAT8, FLOAT8) CASCADE;
+DROP FUNCTION IF EXISTS municipios_intersectando(TEXT) CASCADE;
+DROP FUNCTION IF EXISTS municipios_a_distancia(FLOAT8, FLOAT8, FLOAT8) CASCADE;
+DROP FUNCTION IF EXISTS publicacoes_na_area(TEXT, INTEGER, VARCHAR) CASCADE;
 EOF
     print_success "Existing tables dropped!"
     echo ""
@@ -174,6 +203,27 @@ else
 fi
 echo ""
 
+# 4. Resumos materializados das views de estatísticas
+if execute_sql "$SCHEMA_DIR/04_create_resumos.sql" "Creating incremental summary tables"; then
+    ((SUCCESS_COUNT++))
+else
+    ((ERROR_COUNT++))
+fi
+echo ""
+
+# 5. Geometrias e consultas espaciais (opcional, requer PostGIS)
+if [ "$WITH_POSTGIS" = "true" ]; then
+    if execute_sql "$SCHEMA_DIR/05_create_postgis.sql" "Creating PostGIS geometry columns and spatial functions"; then
+        ((SUCCESS_COUNT++))
+    else
+        ((ERROR_COUNT++))
+    fi
+    echo ""
+else
+    print_info "Skipping PostGIS mode (run with --postgis to enable)"
+    echo ""
+fi
+
 # Resumo
 echo "============================================================"
 echo "  Execution Summary"
@@ -191,9 +241,9 @@ if [ $ERROR_COUNT -eq 0 ]; then
     print_success "Database schema created successfully!"
     echo ""
     print_info "Next steps:"
-    echo "  1. Populate t_municipios with IBGE data"
-    echo "  2. Import initial publications data"
-    echo "  3. Verify data integrity"
+    echo "  1. Load municipalities and publications:"
+    echo "     python database/load_inde_data.py --municipios-wfs <url> --layer <layer> --publicacoes <file>"
+    echo "  2. Verify data integrity"
     echo ""
     print_info "Useful queries:"
     echo "  - List all tables: \\dt"
@@ -0,0 +1,794 @@
+#!/usr/bin/env python3
+"""
+Carga de Dados no PostgreSQL - INDE MCP
+Preenche t_municipios e t_publicacao_municipios a partir de extrações INDE
+
+Funcionalidades:
+- Leitura em streaming das feições (WFS paginado, GeoJSON, CSV ou NDJSON do gateway /api/extract)
+- COPY binário em tabelas de staging, sem inserções linha a linha
+- Merge com upsert em cod_mun (e na chave única das publicações)
+- Índices secundários removidos durante cargas grandes e recriados ao final
+- Limites municipais gravados em geom_limite quando o modo PostGIS está instalado (05_create_postgis.sql)
+- Dados sintéticos para testar a carga completa contra um Postgres local
+
+Uso:
+    python database/load_inde_data.py --municipios-wfs https://geoservicos.ibge.gov.br/geoserver/wfs --layer CCAR:BC250_Municipio_A
+    python database/load_inde_data.py --municipios municipios.geojson --publicacoes publicacoes.csv --full-refresh
+    python database/load_inde_data.py --synthetic 5570 --publicacoes-por-municipio 4
+"""
+
+import argparse
+import csv
+import json
+import logging
+import os
+import random
+import sys
+import time
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict, field
+from datetime import date
+from functools import partial
+from decimal import Decimal, InvalidOperation
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import requests
+
+# psycopg 3 é opcional para o restante do projeto
+try:
+    import psycopg
+    PSYCOPG_AVAILABLE = True
+except ImportError:
+    PSYCOPG_AVAILABLE = False
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# ================================
+# REFERÊNCIAS IBGE
+# ================================
+
+# Código IBGE da UF -> (sigla, nome, região)
+UFS: Dict[str, Tuple[str, str, str]] = {
+    "11": ("RO", "Rondônia", "Norte"),
+    "12": ("AC", "Acre", "Norte"),
+    "13": ("AM", "Amazonas", "Norte"),
+    "14": ("RR", "Roraima", "Norte"),
+    "15": ("PA", "Pará", "Norte"),
+    "16": ("AP", "Amapá", "Norte"),
+    "17": ("TO", "Tocantins", "Norte"),
+    "21": ("MA", "Maranhão", "Nordeste"),
+    "22": ("PI", "Piauí", "Nordeste"),
+    "23": ("CE", "Ceará", "Nordeste"),
+    "24": ("RN", "Rio Grande do Norte", "Nordeste"),
+    "25": ("PB", "Paraíba", "Nordeste"),
+    "26": ("PE", "Pernambuco", "Nordeste"),
+    "27": ("AL", "Alagoas", "Nordeste"),
+    "28": ("SE", "Sergipe", "Nordeste"),
+    "29": ("BA", "Bahia", "Nordeste"),
+    "31": ("MG", "Minas Gerais", "Sudeste"),
+    "32": ("ES", "Espírito Santo", "Sudeste"),
+    "33": ("RJ", "Rio de Janeiro", "Sudeste"),
+    "35": ("SP", "São Paulo", "Sudeste"),
+    "41": ("PR", "Paraná", "Sul"),
+    "42": ("SC", "Santa Catarina", "Sul"),
+    "43": ("RS", "Rio Grande do Sul", "Sul"),
+    "50": ("MS", "Mato Grosso do Sul", "Centro-Oeste"),
+    "51": ("MT", "Mato Grosso", "Centro-Oeste"),
+    "52": ("GO", "Goiás", "Centro-Oeste"),
+    "53": ("DF", "Distrito Federal", "Centro-Oeste"),
+}
+
+# Nomes de atributos usados pelas camadas municipais (comparação sem maiúsculas)
+MUNICIPIO_ALIASES: Dict[str, Tuple[str, ...]] = {
+    "cod_mun": ("cod_mun", "cd_mun", "geocodigo", "cd_geocmu", "cod_ibge", "codigo_ibge", "geocod"),
+    "nom_mun": ("nom_mun", "nm_mun", "nome", "nm_municip", "nome_municipio", "municipio"),
+    "sigla_uf": ("sigla_uf", "sg_uf", "uf", "sigla"),
+    "populacao": ("populacao", "pop", "pop_est", "populacao_estimada"),
+    "area_km2": ("area_km2", "area", "ar_km2", "area_km"),
+    "capital": ("capital", "is_capital"),
+    "latitude": ("latitude", "lat"),
+    "longitude": ("longitude", "lon", "long"),
+}
+
+# Colunas das tabelas de staging e tipos usados no COPY binário
+MUNICIPIO_COLUMNS: List[Tuple[str, str]] = [
+    ("cod_mun", "text"), ("nom_mun", "text"), ("cod_uf", "text"), ("nom_uf", "text"),
+    ("sigla_uf", "text"), ("regiao", "text"), ("populacao", "int4"), ("area_km2", "numeric"),
+    ("capital", "bool"), ("latitude", "numeric"), ("longitude", "numeric"), ("limite", "text"),
+]
+
+PUBLICACAO_COLUMNS: List[Tuple[str, str]] = [
+    ("cod_mun", "text"), ("nom_mun", "text"), ("id_classe_mapa", "text"), ("id_tipo_mapa", "text"),
+    ("id_ano", "text"), ("ano", "int4"), ("titulo_publicacao", "text"), ("descricao", "text"),
+    ("url_publicacao", "text"), ("escala", "text"), ("datum", "text"), ("sistema_projecao", "text"),
+    ("formato_arquivo", "text"), ("tamanho_arquivo_mb", "numeric"), ("status", "text"),
+    ("data_publicacao", "date"),
+]
+
+# Tipos SQL das colunas de staging
+SQL_TYPES = {"text": "TEXT", "int4": "INTEGER", "numeric": "NUMERIC", "bool": "BOOLEAN", "date": "DATE"}
+
+# Fração de linhas novas (em relação à tabela) a partir da qual os índices são recriados
+DEFER_INDEX_RATIO = 0.2
+
+
+# ================================
+# FONTES DE FEIÇÕES
+# ================================
+
+def _number_matched(collection: Dict[str, Any]) -> Optional[int]:
+    """Total de feições informado pelo servidor (WFS 2.0 ou ``totalFeatures`` do GeoServer)."""
+    for key in ("numberMatched", "totalFeatures"):
+        value = collection.get(key)
+        if isinstance(value, int) or (isinstance(value, str) and value.isdigit()):
+            return int(value)
+    return None
+
+
+class WFSFeatureSource:
+    """Feições de uma camada WFS, página a página (GetFeature 2.0 com startIndex/count).
+
+    O avanço usa o número de feições realmente devolvidas: servidores que
+    limitam a página abaixo de ``count`` (maxFeatures do GeoServer) não
+    encerram a leitura. Para quando ``numberMatched`` é atingido ou chega uma
+    página vazia. Ao final, ``complete`` indica se todas as feições
+    anunciadas foram lidas (a carga não desativa registros se não foram).
+    """
+
+    def __init__(self, url: str, layer: str, page_size: int = 1000,
+                 session: Optional[requests.Session] = None):
+        self.url = url
+        self.layer = layer
+        self.page_size = page_size
+        self.session = session or requests.Session()
+        self.number_matched: Optional[int] = None
+        self.read = 0
+        self.complete = False
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        self.read = 0
+        self.complete = False
+        while True:
+            params = {
+                "service": "WFS",
+                "request": "GetFeature",
+                "version": "2.0.0",
+                "typeNames": self.layer,
+                "outputFormat": "application/json",
+                "count": self.page_size,
+                "startIndex": self.read
+            }
+            response = self.session.get(self.url, params=params, timeout=120)
+            response.raise_for_status()
+            collection = response.json()
+            features = collection.get("features") or []
+            self.number_matched = _number_matched(collection) or self.number_matched
+            self.read += len(features)
+            logger.info(f"📥 {self.layer}: {self.read}/{self.number_matched or '?'} feições lidas")
+            yield from features
+
+            if not features or (self.number_matched is not None and self.read >= self.number_matched):
+                break
+            # Servidores que ignoram a paginação devolvem tudo na primeira página
+            if self.number_matched is None and len(features) > self.page_size:
+                break
+
+        self.complete = self.number_matched is None or self.read >= self.number_matched
+        if not self.complete:
+            logger.warning(
+                f"⚠️ {self.layer}: leitura interrompida em {self.read} de {self.number_matched} feições"
+            )
+
+
+def iter_file_records(path: Path) -> Iterator[Dict[str, Any]]:
+    """Registros de um arquivo CSV, GeoJSON/JSON ou NDJSON.
+
+    No NDJSON cada linha pode ser uma feição, um registro simples ou um
+    evento ``features`` do gateway da interface (``/api/extract``).
+    """
+    suffix = path.suffix.lower()
+    if suffix == ".csv":
+        with open(path, newline="", encoding="utf-8") as f:
+            yield from csv.DictReader(f)
+    elif suffix in (".ndjson", ".jsonl"):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                item = json.loads(line)
+                if item.get("type") == "features":
+                    yield from item["features"]
+                elif item.get("type") not in ("start", "end", "error"):
+                    yield item
+    else:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        yield from data.get("features", []) if isinstance(data, dict) else data
+
+
+def feature_parts(item: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+    """Atributos e geometria de uma feição GeoJSON (ou de um registro simples)."""
+    if item.get("type") == "Feature":
+        return item.get("properties") or {}, item.get("geometry")
+    return item, None
+
+
+def representative_point(geometry: Optional[Dict[str, Any]]) -> Tuple[Optional[float], Optional[float]]:
+    """(longitude, latitude) de um ponto ou o centro do retângulo envolvente."""
+    if not geometry or not geometry.get("coordinates"):
+        return None, None
+    if geometry.get("type") == "Point":
+        return float(geometry["coordinates"][0]), float(geometry["coordinates"][1])
+
+    min_x = min_y = float("inf")
+    max_x = max_y = float("-inf")
+    stack = [geometry["coordinates"]]
+    while stack:
+        item = stack.pop()
+        if item and isinstance(item[0], (int, float)):
+            min_x, max_x = min(min_x, item[0]), max(max_x, item[0])
+            min_y, max_y = min(min_y, item[1]), max(max_y, item[1])
+        else:
+            stack.extend(item)
+    if min_x == float("inf"):
+        return None, None
+    return (min_x + max_x) / 2, (min_y + max_y) / 2
+
+
+# ================================
+# CONVERSÃO EM LINHAS
+# ================================
+
+def _lookup(properties: Dict[str, Any], aliases: Tuple[str, ...]) -> Any:
+    lowered = {str(key).lower(): value for key, value in properties.items()}
+    for alias in aliases:
+        value = lowered.get(alias)
+        if value not in (None, ""):
+            return value
+    return None
+
+
+def _to_int(value: Any) -> Optional[int]:
+    try:
+        return int(float(value)) if value not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_decimal(value: Any, places: int) -> Optional[Decimal]:
+    try:
+        if value in (None, ""):
+            return None
+        return round(Decimal(str(value).replace(",", ".")), places)
+    except (InvalidOperation, ValueError):
+        return None
+
+
+def _to_bool(value: Any) -> Optional[bool]:
+    if value in (None, ""):
+        return None
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ("1", "s", "sim", "true", "t", "y", "yes")
+
+
+def _to_date(value: Any) -> Optional[date]:
+    if value in (None, ""):
+        return None
+    if isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat(str(value)[:10])
+    except ValueError:
+        return None
+
+
+def municipio_rows(items: Iterable[Dict[str, Any]], rejected: Counter,
+                   with_boundaries: bool = False) -> Iterator[Tuple]:
+    """Linhas de staging de municípios (na ordem de MUNICIPIO_COLUMNS).
+
+    Com ``with_boundaries``, polígonos da feição seguem como GeoJSON na
+    coluna ``limite`` (modo PostGIS); caso contrário ela fica nula.
+    """
+    for item in items:
+        properties, geometry = feature_parts(item)
+        cod_mun = str(_lookup(properties, MUNICIPIO_ALIASES["cod_mun"]) or "").strip()
+        if cod_mun.endswith(".0"):
+            cod_mun = cod_mun[:-2]
+        if len(cod_mun) != 7 or not cod_mun.isdigit() or cod_mun[:2] not in UFS:
+            rejected["cod_mun inválido"] += 1
+            continue
+
+        nom_mun = _lookup(properties, MUNICIPIO_ALIASES["nom_mun"])
+        if not nom_mun:
+            rejected["nom_mun ausente"] += 1
+            continue
+
+        sigla_uf, nom_uf, regiao = UFS[cod_mun[:2]]
+        longitude = _to_decimal(_lookup(properties, MUNICIPIO_ALIASES["longitude"]), 7)
+        latitude = _to_decimal(_lookup(properties, MUNICIPIO_ALIASES["latitude"]), 7)
+        if latitude is None or longitude is None:
+            x, y = representative_point(geometry)
+            longitude = _to_decimal(x, 7) if x is not None else None
+            latitude = _to_decimal(y, 7) if y is not None else None
+
+        limite = None
+        if with_boundaries and geometry and geometry.get("type") in ("Polygon", "MultiPolygon") \
+                and geometry.get("coordinates"):
+            limite = json.dumps(geometry, separators=(",", ":"))
+
+        area = _to_decimal(_lookup(properties, MUNICIPIO_ALIASES["area_km2"]), 2)
+        yield (
+            cod_mun, str(nom_mun).strip()[:100], cod_mun[:2], nom_uf, sigla_uf, regiao,
+            _to_int(_lookup(properties, MUNICIPIO_ALIASES["populacao"])),
+            area if area and area > 0 else None,
+            _to_bool(_lookup(properties, MUNICIPIO_ALIASES["capital"])),
+            latitude, longitude, limite,
+        )
+
+
+def publicacao_rows(items: Iterable[Dict[str, Any]], rejected: Counter) -> Iterator[Tuple]:
+    """Linhas de staging de publicações (na ordem de PUBLICACAO_COLUMNS).
+
+    ``id_ano`` pode ser substituído por ``ano`` (resolvido via t_anos) e
+    ``nom_mun`` é completado a partir de t_municipios quando ausente.
+    """
+    for item in items:
+        record = {str(key).lower(): value for key, value in feature_parts(item)[0].items()}
+        cod_mun = str(record.get("cod_mun") or "").strip()
+        if len(cod_mun) != 7 or not cod_mun.isdigit():
+            rejected["cod_mun inválido"] += 1
+            continue
+
+        def text(name: str, size: Optional[int] = None) -> Optional[str]:
+            value = record.get(name)
+            if value in (None, ""):
+                return None
+            value = str(value).strip()
+            return value[:size] if size else value
+
+        def code(name: str) -> Optional[str]:
+            value = text(name)
+            return value.zfill(2) if value else None
+
+        yield (
+            cod_mun, text("nom_mun", 100), code("id_classe_mapa"), code("id_tipo_mapa"),
+            code("id_ano"), _to_int(record.get("ano")), text("titulo_publicacao", 255),
+            text("descricao"), text("url_publicacao", 500), text("escala", 50), text("datum", 50),
+            text("sistema_projecao", 100), text("formato_arquivo", 50),
+            _to_decimal(record.get("tamanho_arquivo_mb"), 2),
+            (text("status") or "ATIVO").upper(), _to_date(record.get("data_publicacao")),
+        )
+
+
+# ================================
+# DADOS SINTÉTICOS
+# ================================
+
+def synthetic_municipios(total: int = 5570, seed: int = 42) -> Iterator[Dict[str, Any]]:
+    """Feições de municípios com códigos IBGE válidos, para testes de carga."""
+    rng = random.Random(seed)
+    uf_codes = list(UFS)
+    for index in range(total):
+        cod_uf = uf_codes[index % len(uf_codes)]
+        lon, lat = rng.uniform(-73.9, -34.8), rng.uniform(-33.7, 5.2)
+        yield {
+            "type": "Feature",
+            "properties": {
+                "CD_MUN": f"{cod_uf}{index // len(uf_codes):05d}",
+                "NM_MUN": f"Município {index}",
+                "AREA_KM2": round(rng.uniform(3, 150000), 2),
+                "populacao": rng.randint(800, 12_000_000),
+            },
+            "geometry": {"type": "Point", "coordinates": [lon, lat]},
+        }
+
+
+def synthetic_publicacoes(cod_muns: Iterable[str], per_municipio: int = 4, seed: int = 42) -> Iterator[Dict[str, Any]]:
+    """Publicações com combinações distintas de classe, tipo e ano por município."""
+    rng = random.Random(seed)
+    for cod_mun in cod_muns:
+        for index in range(per_municipio):
+            yield {
+                "cod_mun": cod_mun,
+                "id_classe_mapa": f"{index % 5 + 1:02d}",
+                "id_tipo_mapa": "01",
+                "ano": 2015 + (index // 5) % 11,
+                "titulo_publicacao": f"Mapa {index + 1} de {cod_mun}",
+                "formato_arquivo": "PDF",
+                "tamanho_arquivo_mb": round(rng.uniform(0.5, 80), 2),
+                "data_publicacao": f"{2015 + (index // 5) % 11}-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}",
+            }
+
+
+# ================================
+# CARGA
+# ================================
+
+@dataclass
+class TableLoadReport:
+    """Resultado da carga de uma tabela."""
+    table: str
+    staged: int = 0
+    rejected: Dict[str, int] = field(default_factory=dict)
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    deactivated: int = 0
+    source_complete: bool = True
+    boundaries_updated: int = 0
+    indexes_rebuilt: List[str] = field(default_factory=list)
+    seconds: Dict[str, float] = field(default_factory=dict)
+
+
+@dataclass
+class LoadReport:
+    """Resultado de uma execução do carregador."""
+    tables: List[TableLoadReport]
+    total_seconds: float
+
+
+MERGE_MUNICIPIOS = """
+WITH fonte AS (
+    SELECT DISTINCT ON (cod_mun) *
+    FROM stg_municipios
+    ORDER BY cod_mun, ordem DESC
+), merged AS (
+    INSERT INTO t_municipios AS t (
+        cod_mun, nom_mun, cod_uf, nom_uf, sigla_uf, regiao,
+        populacao, area_km2, capital, latitude, longitude
+    )
+    SELECT cod_mun, nom_mun, cod_uf, nom_uf, sigla_uf, regiao,
+           populacao, area_km2, COALESCE(capital, FALSE), latitude, longitude
+    FROM fonte
+    ON CONFLICT (cod_mun) DO UPDATE SET
+        nom_mun = EXCLUDED.nom_mun,
+        cod_uf = EXCLUDED.cod_uf,
+        nom_uf = EXCLUDED.nom_uf,
+        sigla_uf = EXCLUDED.sigla_uf,
+        regiao = EXCLUDED.regiao,
+        populacao = COALESCE(EXCLUDED.populacao, t.populacao),
+        area_km2 = COALESCE(EXCLUDED.area_km2, t.area_km2),
+        capital = EXCLUDED.capital OR t.capital,
+        latitude = COALESCE(EXCLUDED.latitude, t.latitude),
+        longitude = COALESCE(EXCLUDED.longitude, t.longitude),
+        ativo = TRUE
+    -- Linhas idênticas não são reescritas (sem tuplas mortas nem gatilhos)
+    WHERE NOT t.ativo
+       OR (t.nom_mun, t.cod_uf, t.nom_uf, t.sigla_uf, t.regiao)
+          IS DISTINCT FROM (EXCLUDED.nom_mun, EXCLUDED.cod_uf, EXCLUDED.nom_uf, EXCLUDED.sigla_uf, EXCLUDED.regiao)
+       OR (EXCLUDED.populacao IS NOT NULL AND EXCLUDED.populacao IS DISTINCT FROM t.populacao)
+       OR (EXCLUDED.area_km2 IS NOT NULL AND EXCLUDED.area_km2 IS DISTINCT FROM t.area_km2)
+       OR (EXCLUDED.capital AND NOT t.capital)
+       OR (EXCLUDED.latitude IS NOT NULL AND EXCLUDED.latitude IS DISTINCT FROM t.latitude)
+       OR (EXCLUDED.longitude IS NOT NULL AND EXCLUDED.longitude IS DISTINCT FROM t.longitude)
+    RETURNING (xmax = 0) AS inserido
+)
+SELECT count(*) FILTER (WHERE inserido), count(*) FILTER (WHERE NOT inserido),
+       (SELECT count(*) FROM fonte)
+FROM merged
+"""
+
+# Modo PostGIS: t_municipios tem a coluna geom_limite (05_create_postgis.sql)
+HAS_BOUNDARY_COLUMN = """
+SELECT EXISTS (
+    SELECT 1 FROM pg_attribute
+    WHERE attrelid = 't_municipios'::regclass AND attname = 'geom_limite' AND NOT attisdropped
+)
+"""
+
+# Limites corrigidos com ST_MakeValid (polígonos inválidos quebram ST_Intersects)
+MERGE_LIMITES = """
+WITH fonte AS (
+    SELECT DISTINCT ON (cod_mun) cod_mun,
+           ST_Multi(ST_CollectionExtract(ST_MakeValid(ST_SetSRID(ST_GeomFromGeoJSON(limite), 4674)), 3)) AS geom
+    FROM stg_municipios
+    WHERE limite IS NOT NULL
+    ORDER BY cod_mun, ordem DESC
+)
+UPDATE t_municipios t SET geom_limite = f.geom
+FROM fonte f
+WHERE t.cod_mun = f.cod_mun
+  AND NOT ST_IsEmpty(f.geom)
+  AND t.geom_limite IS DISTINCT FROM f.geom
+"""
+
+# Completa ano e nome do município e descarta referências inexistentes
+PREPARE_PUBLICACOES = [
+    """UPDATE stg_publicacao_municipios s SET id_ano = a.id_ano
+       FROM t_anos a WHERE s.id_ano IS NULL AND a.ano = s.ano""",
+    """UPDATE stg_publicacao_municipios s SET nom_mun = m.nom_mun
+       FROM t_municipios m WHERE s.nom_mun IS NULL AND m.cod_mun = s.cod_mun""",
+]
+
+REJECT_PUBLICACOES = """
+DELETE FROM stg_publicacao_municipios s
+WHERE s.nom_mun IS NULL
+   OR NOT EXISTS (SELECT 1 FROM t_classe_mapa c WHERE c.id_classe_mapa = s.id_classe_mapa)
+   OR NOT EXISTS (SELECT 1 FROM t_tipo_mapa t WHERE t.id_tipo_mapa = s.id_tipo_mapa)
+   OR NOT EXISTS (SELECT 1 FROM t_anos a WHERE a.id_ano = s.id_ano)
+   OR s.status NOT IN ('ATIVO', 'INATIVO', 'ARQUIVADO', 'EM_REVISAO')
+"""
+
+MERGE_PUBLICACOES = """
+WITH fonte AS (
+    SELECT DISTINCT ON (cod_mun, id_classe_mapa, id_tipo_mapa, id_ano) *
+    FROM stg_publicacao_municipios
+    ORDER BY cod_mun, id_classe_mapa, id_tipo_mapa, id_ano, ordem DESC
+), merged AS (
+    INSERT INTO t_publicacao_municipios AS t (
+        cod_mun, nom_mun, id_classe_mapa, id_tipo_mapa, id_ano, titulo_publicacao, descricao,
+        url_publicacao, escala, datum, sistema_projecao, formato_arquivo, tamanho_arquivo_mb,
+        status, data_publicacao
+    )
+    SELECT cod_mun, nom_mun, id_classe_mapa, id_tipo_mapa, id_ano, titulo_publicacao, descricao,
+           url_publicacao, escala, datum, sistema_projecao, formato_arquivo, tamanho_arquivo_mb,
+           status, data_publicacao
+    FROM fonte
+    ON CONFLICT (cod_mun, id_classe_mapa, id_tipo_mapa, id_ano) DO UPDATE SET
+        nom_mun = EXCLUDED.nom_mun,
+        titulo_publicacao = EXCLUDED.titulo_publicacao,
+        descricao = EXCLUDED.descricao,
+        url_publicacao = EXCLUDED.url_publicacao,
+        escala = EXCLUDED.escala,
+        datum = EXCLUDED.datum,
+        sistema_projecao = EXCLUDED.sistema_projecao,
+        formato_arquivo = EXCLUDED.formato_arquivo,
+        tamanho_arquivo_mb = EXCLUDED.tamanho_arquivo_mb,
+        status = EXCLUDED.status,
+        data_publicacao = EXCLUDED.data_publicacao,
+        ativo = TRUE
+    WHERE NOT t.ativo
+       OR (t.nom_mun, t.titulo_publicacao, t.descricao, t.url_publicacao, t.escala, t.datum,
+           t.sistema_projecao, t.formato_arquivo, t.tamanho_arquivo_mb, t.status, t.data_publicacao)
+          IS DISTINCT FROM
+          (EXCLUDED.nom_mun, EXCLUDED.titulo_publicacao, EXCLUDED.descricao, EXCLUDED.url_publicacao,
+           EXCLUDED.escala, EXCLUDED.datum, EXCLUDED.sistema_projecao, EXCLUDED.formato_arquivo,
+           EXCLUDED.tamanho_arquivo_mb, EXCLUDED.status, EXCLUDED.data_publicacao)
+    RETURNING (xmax = 0) AS inserido
+)
+SELECT count(*) FILTER (WHERE inserido), count(*) FILTER (WHERE NOT inserido),
+       (SELECT count(*) FROM fonte)
+FROM merged
+"""
+
+DEACTIVATE_MISSING = {
+    "t_municipios": """
+        UPDATE t_municipios t SET ativo = FALSE
+        WHERE t.ativo AND NOT EXISTS (SELECT 1 FROM stg_municipios s WHERE s.cod_mun = t.cod_mun)
+    """,
+    "t_publicacao_municipios": """
+        UPDATE t_publicacao_municipios t SET ativo = FALSE
+        WHERE t.ativo AND NOT EXISTS (
+            SELECT 1 FROM stg_publicacao_municipios s
+            WHERE s.cod_mun = t.cod_mun AND s.id_classe_mapa = t.id_classe_mapa
+              AND s.id_tipo_mapa = t.id_tipo_mapa AND s.id_ano = t.id_ano
+        )
+    """,
+}
+
+# Índices secundários não únicos (os únicos sustentam o ON CONFLICT e ficam)
+SECONDARY_INDEXES = """
+SELECT i.indexrelid::regclass::text, pg_get_indexdef(i.indexrelid)
+FROM pg_index i
+WHERE i.indrelid = %s::regclass
+  AND NOT i.indisprimary
+  AND NOT i.indisunique
+  AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = i.indexrelid)
+"""
+
+
+def build_dsn() -> str:
+    """DSN a partir de DATABASE_URL ou das variáveis DB_* do create_database.sh."""
+    if os.getenv("DATABASE_URL"):
+        return os.environ["DATABASE_URL"]
+    parts = {
+        "host": os.getenv("DB_HOST", "localhost"),
+        "port": os.getenv("DB_PORT", "5432"),
+        "dbname": os.getenv("DB_NAME"),
+        "user": os.getenv("DB_USER"),
+        "password": os.getenv("DB_PASSWORD"),
+    }
+    return " ".join(f"{key}={value}" for key, value in parts.items() if value)
+
+
+class INDEDataLoader:
+    """Carrega municípios e publicações com COPY binário e merge em staging.
+
+    Tudo roda em uma única transação: as tabelas de staging são temporárias
+    (``ON COMMIT DROP``), o merge é feito com ``INSERT ... ON CONFLICT`` e,
+    em cargas grandes, os índices secundários não únicos são removidos antes
+    do merge e recriados depois (uma ordenação por índice em vez de uma
+    inserção por linha em cada um). Durante a carga as tabelas ficam
+    bloqueadas para escrita e leitura.
+    """
+
+    def __init__(self, dsn: Optional[str] = None, defer_indexes: str = "auto", full_refresh: bool = False,
+                 maintenance_work_mem: str = "256MB"):
+        if not PSYCOPG_AVAILABLE:
+            raise RuntimeError("psycopg não instalado. Instale com: pip install 'psycopg[binary]'")
+        if defer_indexes not in ("auto", "always", "never"):
+            raise ValueError(f"defer_indexes inválido: {defer_indexes}")
+        self.dsn = dsn or build_dsn()
+        self.defer_indexes = defer_indexes
+        self.full_refresh = full_refresh
+        self.maintenance_work_mem = maintenance_work_mem
+
+    def load(self, municipios: Optional[Iterable[Dict[str, Any]]] = None,
+             publicacoes: Optional[Iterable[Dict[str, Any]]] = None) -> LoadReport:
+        """Carrega as feições de municípios e os registros de publicações."""
+        start_time = time.perf_counter()
+        reports = []
+
+        with psycopg.connect(self.dsn) as conn:
+            with conn.cursor() as cur:
+                cur.execute(f"SET LOCAL maintenance_work_mem = '{self.maintenance_work_mem}'")
+                if municipios is not None:
+                    cur.execute(HAS_BOUNDARY_COLUMN)
+                    with_boundaries = cur.fetchone()[0]
+                    reports.append(self._load_table(
+                        cur, "t_municipios", "stg_municipios", MUNICIPIO_COLUMNS,
+                        partial(municipio_rows, with_boundaries=with_boundaries), municipios, MERGE_MUNICIPIOS,
+                        MERGE_LIMITES if with_boundaries else None
+                    ))
+                if publicacoes is not None:
+                    reports.append(self._load_table(
+                        cur, "t_publicacao_municipios", "stg_publicacao_municipios", PUBLICACAO_COLUMNS,
+                        publicacao_rows, publicacoes, MERGE_PUBLICACOES
+                    ))
+                for report in reports:
+                    phase_start = time.perf_counter()
+                    cur.execute(f"ANALYZE {report.table}")
+                    report.seconds["analyze"] = round(time.perf_counter() - phase_start, 3)
+
+        return LoadReport(tables=reports, total_seconds=round(time.perf_counter() - start_time, 3))
+
+    def _load_table(self, cur, table: str, staging: str, columns: List[Tuple[str, str]],
+                    to_rows, items: Iterable[Dict[str, Any]], merge_sql: str,
+                    boundaries_sql: Optional[str] = None) -> TableLoadReport:
+        report = TableLoadReport(table=table)
+        rejected: Counter = Counter()
+
+        # 1. Staging + COPY binário (as linhas vão sendo enviadas à medida que as feições chegam)
+        phase_start = time.perf_counter()
+        column_defs = ", ".join(f"{name} {SQL_TYPES[kind]}" for name, kind in columns)
+        cur.execute(
+            f"CREATE TEMP TABLE {staging} (ordem BIGINT GENERATED ALWAYS AS IDENTITY, {column_defs}) "
+            f"ON COMMIT DROP"
+        )
+        names = ", ".join(name for name, _ in columns)
+        with cur.copy(f"COPY {staging} ({names}) FROM STDIN (FORMAT BINARY)") as copy:
+            copy.set_types([kind for _, kind in columns])
+            for row in to_rows(items, rejected):
+                copy.write_row(row)
+                report.staged += 1
+        report.seconds["copy"] = round(time.perf_counter() - phase_start, 3)
+
+        if table == "t_publicacao_municipios":
+            for statement in PREPARE_PUBLICACOES:
+                cur.execute(statement)
+            cur.execute(REJECT_PUBLICACOES)
+            if cur.rowcount:
+                rejected["referência inexistente"] += cur.rowcount
+        report.rejected = dict(rejected)
+        if rejected:
+            logger.warning(f"⚠️ {table}: {sum(rejected.values())} registros rejeitados {dict(rejected)}")
+
+        # 2. Merge, com os índices secundários recriados ao final quando compensa
+        phase_start = time.perf_counter()
+        with self._deferred_indexes(cur, table, report):
+            cur.execute(merge_sql)
+            report.inserted, report.updated, distinct = cur.fetchone()
+            report.unchanged = distinct - report.inserted - report.updated
+            if boundaries_sql:
+                cur.execute(boundaries_sql)
+                report.boundaries_updated = cur.rowcount
+            # Fontes interrompidas (ex: WFS que parou antes de numberMatched) não desativam nada
+            report.source_complete = getattr(items, "complete", True)
+            if self.full_refresh and not report.source_complete:
+                logger.warning(f"⚠️ {table}: fonte incompleta, desativação do --full-refresh ignorada")
+            elif self.full_refresh:
+                cur.execute(DEACTIVATE_MISSING[table])
+                report.deactivated = cur.rowcount
+        report.seconds["merge"] = round(time.perf_counter() - phase_start, 3)
+
+        logger.info(
+            f"✅ {table}: {report.staged} em staging, {report.inserted} inseridos, "
+            f"{report.updated} atualizados, {report.unchanged} sem mudança"
+            + (f", {report.deactivated} desativados" if report.deactivated else "")
+            + (f", {report.boundaries_updated} limites gravados" if report.boundaries_updated else "")
+        )
+        return report
+
+    @contextmanager
+    def _deferred_indexes(self, cur, table: str, report: TableLoadReport):
+        """Remove os índices secundários durante o merge e os recria ao final."""
+        if self.defer_indexes == "never":
+            yield
+            return
+        if self.defer_indexes == "auto":
+            cur.execute("SELECT GREATEST(reltuples, 0) FROM pg_class WHERE oid = %s::regclass", (table,))
+            existing = cur.fetchone()[0]
+            if report.staged < DEFER_INDEX_RATIO * existing:
+                yield
+                return
+
+        cur.execute(SECONDARY_INDEXES, (table,))
+        indexes = cur.fetchall()
+        for name, _ in indexes:
+            cur.execute(f"DROP INDEX {name}")
+
+        yield
+
+        phase_start = time.perf_counter()
+        for name, definition in indexes:
+            cur.execute(definition)
+            report.indexes_rebuilt.append(name)
+        report.seconds["index_rebuild"] = round(time.perf_counter() - phase_start, 3)
+
+
+# ================================
+# LINHA DE COMANDO
+# ================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Carga de municípios e publicações INDE no PostgreSQL")
+    parser.add_argument("--dsn", default=None, help="Conexão (padrão: DATABASE_URL ou DB_HOST/DB_NAME/...)")
+    parser.add_argument("--municipios", default=None, help="Arquivo de municípios (GeoJSON, NDJSON ou CSV)")
+    parser.add_argument("--municipios-wfs", default=None, help="URL do serviço WFS com a camada de municípios")
+    parser.add_argument("--layer", default=None, help="Camada WFS de municípios (ex: CCAR:BC250_Municipio_A)")
+    parser.add_argument("--page-size", type=int, default=1000, help="Feições por página WFS")
+    parser.add_argument("--publicacoes", default=None, help="Arquivo de publicações (CSV, NDJSON ou JSON)")
+    parser.add_argument("--synthetic", type=int, default=0, help="Gera N municípios sintéticos (testes)")
+    parser.add_argument("--publicacoes-por-municipio", type=int, default=4, help="Publicações sintéticas por município")
+    parser.add_argument("--full-refresh", action="store_true", help="Desativa registros ausentes da carga")
+    parser.add_argument("--defer-indexes", choices=["auto", "always", "never"], default="auto",
+                        help="Recriação dos índices secundários após o merge")
+    parser.add_argument("--output", default=None, help="Grava o relatório em JSON")
+    args = parser.parse_args()
+
+    municipios = publicacoes = None
+    if args.synthetic:
+        features = list(synthetic_municipios(args.synthetic))
+        municipios = features
+        publicacoes = synthetic_publicacoes(
+            (feature["properties"]["CD_MUN"] for feature in features), args.publicacoes_por_municipio
+        )
+    elif args.municipios_wfs:
+        if not args.layer:
+            parser.error("--municipios-wfs exige --layer")
+        municipios = WFSFeatureSource(args.municipios_wfs, args.layer, args.page_size)
+    elif args.municipios:
+        municipios = iter_file_records(Path(args.municipios))
+
+    if args.publicacoes:
+        publicacoes = iter_file_records(Path(args.publicacoes))
+
+    if municipios is None and publicacoes is None:
+        parser.error("Informe --municipios, --municipios-wfs, --publicacoes ou --synthetic")
+
+    print("🚀 INDE MCP - Carga no PostgreSQL")
+    try:
+        loader = INDEDataLoader(args.dsn, defer_indexes=args.defer_indexes, full_refresh=args.full_refresh)
+        report = loader.load(municipios=municipios, publicacoes=publicacoes)
+    except Exception as e:
+        print(f"❌ Erro na carga: {e}")
+        sys.exit(1)
+
+    for table in report.tables:
+        print(
+            f"📊 {table.table}: {table.staged} lidos, {table.inserted} inseridos, {table.updated} atualizados, "
+            f"{table.unchanged} sem mudança, {sum(table.rejected.values())} rejeitados | {table.seconds}"
+        )
+    print(f"⏱️ Tempo total: {report.total_seconds:.2f}s")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(asdict(report), indent=2, ensure_ascii=False), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
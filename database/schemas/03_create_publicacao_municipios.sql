@@ -218,11 +218,20 @@ ORDER BY pm.data_publicacao DESC;
 -- TRIGGERS PARA AUTOMAÇÃO
 -- ============================================================
 
+-- Função para atualizar data_modificacao (a tabela não tem data_atualizacao)
+CREATE OR REPLACE FUNCTION atualizar_data_modificacao_publicacao()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.data_modificacao = CURRENT_TIMESTAMP;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
 -- Trigger para atualizar data_modificacao automaticamente
 CREATE TRIGGER trigger_atualizar_publicacao_municipios
     BEFORE UPDATE ON t_publicacao_municipios
     FOR EACH ROW
-    EXECUTE FUNCTION atualizar_data_modificacao();
+    EXECUTE FUNCTION atualizar_data_modificacao_publicacao();
 
 -- Função para atualizar data_ultima_atualizacao
 CREATE OR REPLACE FUNCTION atualizar_data_ultima_atualizacao()
@@ -294,3 +303,38 @@ END;
 $$ LANGUAGE plpgsql;
 
 COMMENT ON FUNCTION obter_estatisticas_municipio IS 'Retorna estatísticas resumidas de publicações para um município específico';
+
+-- Função para obter estatísticas de vários municípios em uma única consulta
+CREATE OR REPLACE FUNCTION obter_estatisticas_municipios(p_cod_muns VARCHAR[])
+RETURNS TABLE (
+    codigo_municipio VARCHAR,
+    nome_municipio VARCHAR,
+    total_publicacoes BIGINT,
+    total_classes BIGINT,
+    total_tipos BIGINT,
+    total_anos BIGINT,
+    primeira_publicacao DATE,
+    ultima_publicacao DATE,
+    tamanho_total_mb NUMERIC
+) AS $$
+BEGIN
+    RETURN QUERY
+    SELECT
+        pm.cod_mun,
+        pm.nom_mun,
+        COUNT(*)::BIGINT,
+        COUNT(DISTINCT pm.id_classe_mapa)::BIGINT,
+        COUNT(DISTINCT pm.id_tipo_mapa)::BIGINT,
+        COUNT(DISTINCT pm.id_ano)::BIGINT,
+        MIN(pm.data_publicacao),
+        MAX(pm.data_publicacao),
+        SUM(pm.tamanho_arquivo_mb)
+    FROM t_publicacao_municipios pm
+    WHERE pm.cod_mun = ANY(p_cod_muns)
+        AND pm.ativo = TRUE
+        AND pm.status = 'ATIVO'
+    GROUP BY pm.cod_mun, pm.nom_mun;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON FUNCTION obter_estatisticas_municipios IS 'Versão em conjunto de obter_estatisticas_municipio (um array de códigos IBGE)';
@@ -0,0 +1,644 @@
+-- ============================================================
+-- RESUMOS MATERIALIZADOS (PAINÉIS)
+-- ============================================================
+-- Descrição: Tabelas de resumo das views de estatísticas, mantidas
+--            incrementalmente por triggers de instrução
+-- Autor: Sistema INDE MCP
+-- Data: 2026-10-18
+-- ============================================================
+--
+-- As views vw_publicacoes_por_ano, vw_publicacoes_por_classe,
+-- vw_resumo_publicacoes_municipio e vw_municipios_por_uf passam a ler
+-- estas tabelas em vez de reagregar as tabelas base a cada consulta.
+--
+-- Manutenção: triggers AFTER ... FOR EACH STATEMENT com transition tables
+-- aplicam, uma vez por instrução, o delta das linhas inseridas, alteradas
+-- ou removidas:
+--   - contagens e somas: soma do delta (+1 / -1 por linha ativa)
+--   - contagens distintas: multiplicidades em t_resumo_publicacoes_membros
+--     (um valor distinto entra quando a multiplicidade sai de 0 e sai
+--     quando volta a 0)
+--   - resumo por município (inclui datas mínima e máxima): recalculado
+--     apenas para os municípios afetados
+-- recalcular_resumos() reconstrói tudo a partir das tabelas base.
+-- Escritas concorrentes que tocam o mesmo ano, classe ou UF aguardam o
+-- commit umas das outras (as linhas de resumo são compartilhadas);
+-- escritas em anos, classes e UFs diferentes seguem em paralelo. A
+-- atualização de cada resumo é registrada em t_resumo_atualizacao_log,
+-- uma linha nova por transação, sem linha única disputada por todas
+-- as escritas.
+
+-- ============================================================
+-- TABELAS DE RESUMO
+-- ============================================================
+
+-- Tabela: t_resumo_atualizacao
+-- Descrição: Resumos mantidos e data do último recálculo completo
+CREATE TABLE t_resumo_atualizacao (
+    resumo VARCHAR(50) PRIMARY KEY,
+    ultimo_recalculo TIMESTAMP
+);
+
+-- Tabela: t_resumo_atualizacao_log
+-- Descrição: Atualizações dos resumos (uma linha por transação e resumo)
+-- Só recebe INSERTs de transações distintas, que não bloqueiam umas às
+-- outras. A cada 1000 registros a poda mantém só a linha
+-- mais recente de cada resumo; o recálculo completo descarta o log todo
+CREATE TABLE t_resumo_atualizacao_log (
+    id_registro BIGSERIAL PRIMARY KEY,
+    resumo VARCHAR(50) NOT NULL REFERENCES t_resumo_atualizacao(resumo),
+    atualizado_em TIMESTAMP NOT NULL DEFAULT clock_timestamp(),
+    operacao VARCHAR(10) NOT NULL
+);
+
+CREATE INDEX idx_resumo_atualizacao_log ON t_resumo_atualizacao_log(resumo, atualizado_em DESC);
+
+-- Tabela: t_resumo_publicacoes_ano
+-- Descrição: Publicações ativas por ano
+CREATE TABLE t_resumo_publicacoes_ano (
+    id_ano VARCHAR(2) PRIMARY KEY,
+    total_publicacoes BIGINT NOT NULL DEFAULT 0,
+    total_municipios BIGINT NOT NULL DEFAULT 0,
+    total_classes BIGINT NOT NULL DEFAULT 0,
+    total_tipos BIGINT NOT NULL DEFAULT 0,
+    tamanho_total_mb NUMERIC NOT NULL DEFAULT 0,
+    tamanho_quantidade BIGINT NOT NULL DEFAULT 0
+);
+
+-- Tabela: t_resumo_publicacoes_classe
+-- Descrição: Publicações ativas por classe de mapa
+CREATE TABLE t_resumo_publicacoes_classe (
+    id_classe_mapa VARCHAR(2) PRIMARY KEY,
+    total_publicacoes BIGINT NOT NULL DEFAULT 0,
+    total_municipios BIGINT NOT NULL DEFAULT 0,
+    total_anos BIGINT NOT NULL DEFAULT 0,
+    tamanho_total_mb NUMERIC NOT NULL DEFAULT 0,
+    tamanho_quantidade BIGINT NOT NULL DEFAULT 0
+);
+
+-- Tabela: t_resumo_publicacoes_municipio
+-- Descrição: Publicações ativas por município
+CREATE TABLE t_resumo_publicacoes_municipio (
+    cod_mun VARCHAR(7) PRIMARY KEY,
+    nom_mun VARCHAR(100) NOT NULL,
+    total_publicacoes BIGINT NOT NULL,
+    total_classes BIGINT NOT NULL,
+    total_tipos BIGINT NOT NULL,
+    total_anos BIGINT NOT NULL,
+    primeira_publicacao DATE,
+    ultima_publicacao DATE,
+    tamanho_total_mb NUMERIC
+);
+
+-- Tabela: t_resumo_publicacoes_membros
+-- Descrição: Multiplicidade de cada valor distinto por ano e por classe
+-- Dimensões: ano_municipio, ano_classe, ano_tipo, classe_municipio, classe_ano
+CREATE TABLE t_resumo_publicacoes_membros (
+    dimensao VARCHAR(20) NOT NULL,
+    chave VARCHAR(7) NOT NULL,
+    membro VARCHAR(7) NOT NULL,
+    quantidade BIGINT NOT NULL,
+    PRIMARY KEY (dimensao, chave, membro)
+);
+
+-- Tabela: t_resumo_municipios_uf
+-- Descrição: Municípios ativos por UF
+CREATE TABLE t_resumo_municipios_uf (
+    sigla_uf CHAR(2) PRIMARY KEY,
+    nom_uf VARCHAR(50),
+    regiao VARCHAR(20),
+    total_municipios BIGINT NOT NULL DEFAULT 0,
+    populacao_total BIGINT NOT NULL DEFAULT 0,
+    populacao_quantidade BIGINT NOT NULL DEFAULT 0,
+    area_total_km2 NUMERIC NOT NULL DEFAULT 0,
+    area_quantidade BIGINT NOT NULL DEFAULT 0,
+    densidade_soma NUMERIC NOT NULL DEFAULT 0,
+    densidade_quantidade BIGINT NOT NULL DEFAULT 0
+);
+
+INSERT INTO t_resumo_atualizacao (resumo) VALUES ('publicacoes'), ('municipios_uf');
+
+-- ============================================================
+-- MANUTENÇÃO INCREMENTAL
+-- ============================================================
+
+-- Função: poda o log, mantendo a linha mais recente de cada resumo
+-- Linhas travadas por outra poda em andamento são puladas (SKIP LOCKED):
+-- podas concorrentes nunca aguardam umas às outras
+CREATE OR REPLACE FUNCTION podar_resumo_atualizacao_log()
+RETURNS INTEGER AS $$
+    WITH ultimos AS (
+        SELECT DISTINCT ON (resumo) id_registro
+        FROM t_resumo_atualizacao_log
+        ORDER BY resumo, atualizado_em DESC
+    ),
+    removidos AS (
+        DELETE FROM t_resumo_atualizacao_log
+        WHERE id_registro IN (
+            SELECT g.id_registro
+            FROM t_resumo_atualizacao_log g
+            WHERE g.id_registro NOT IN (SELECT id_registro FROM ultimos)
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING 1
+    )
+    SELECT COUNT(*)::INTEGER FROM removidos;
+$$ LANGUAGE sql;
+
+-- Função: registra a atualização de um resumo na transação corrente
+-- A primeira instrução da transação insere a linha do log e guarda o id
+-- em uma configuração local à transação; as seguintes atualizam essa
+-- mesma linha, ainda invisível (e sem disputa) para as demais transações
+CREATE OR REPLACE FUNCTION registrar_atualizacao_resumo(p_resumo VARCHAR, p_operacao VARCHAR)
+RETURNS VOID AS $$
+DECLARE
+    v_chave CONSTANT TEXT := 'inde_resumos.registro_' || p_resumo;
+    v_id BIGINT := NULLIF(current_setting(v_chave, TRUE), '')::BIGINT;
+BEGIN
+    IF v_id IS NOT NULL THEN
+        UPDATE t_resumo_atualizacao_log
+        SET atualizado_em = clock_timestamp(), operacao = p_operacao
+        WHERE id_registro = v_id;
+        IF FOUND THEN
+            RETURN;
+        END IF;
+    END IF;
+
+    INSERT INTO t_resumo_atualizacao_log (resumo, operacao)
+    VALUES (p_resumo, p_operacao)
+    RETURNING id_registro INTO v_id;
+    PERFORM set_config(v_chave, v_id::TEXT, TRUE);
+
+    -- Poda periódica a cada 1000 registros: o log fica limitado
+    IF v_id % 1000 = 0 THEN
+        PERFORM podar_resumo_atualizacao_log();
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Função: aplica o delta de uma instrução em t_publicacao_municipios
+CREATE OR REPLACE FUNCTION aplicar_delta_resumos_publicacoes()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_colunas CONSTANT TEXT := 'cod_mun, nom_mun, id_classe_mapa, id_tipo_mapa, id_ano, tamanho_arquivo_mb';
+    v_filtro CONSTANT TEXT := 'WHERE ativo = TRUE AND status = ''ATIVO''';
+    v_delta TEXT;
+BEGIN
+    -- Publicações ativas que entram (+1) ou saem (-1) dos resumos
+    v_delta := CASE TG_OP
+        WHEN 'INSERT' THEN format('SELECT %s, 1 AS sinal FROM novas %s', v_colunas, v_filtro)
+        WHEN 'DELETE' THEN format('SELECT %s, -1 AS sinal FROM velhas %s', v_colunas, v_filtro)
+        ELSE format('SELECT %s, -1 AS sinal FROM velhas %s UNION ALL SELECT %s, 1 FROM novas %s',
+                    v_colunas, v_filtro, v_colunas, v_filtro)
+    END;
+
+    -- 1. Contagens e somas por ano e por classe
+    EXECUTE format($q$
+        WITH delta AS (%s)
+        INSERT INTO t_resumo_publicacoes_ano AS r (id_ano, total_publicacoes, tamanho_total_mb, tamanho_quantidade)
+        SELECT id_ano, SUM(sinal), COALESCE(SUM(sinal * tamanho_arquivo_mb), 0),
+               COALESCE(SUM(sinal) FILTER (WHERE tamanho_arquivo_mb IS NOT NULL), 0)
+        FROM delta
+        GROUP BY id_ano
+        HAVING SUM(sinal) <> 0 OR COALESCE(SUM(sinal * tamanho_arquivo_mb), 0) <> 0
+            OR COALESCE(SUM(sinal) FILTER (WHERE tamanho_arquivo_mb IS NOT NULL), 0) <> 0
+        ON CONFLICT (id_ano) DO UPDATE SET
+            total_publicacoes = r.total_publicacoes + EXCLUDED.total_publicacoes,
+            tamanho_total_mb = r.tamanho_total_mb + EXCLUDED.tamanho_total_mb,
+            tamanho_quantidade = r.tamanho_quantidade + EXCLUDED.tamanho_quantidade
+    $q$, v_delta);
+
+    EXECUTE format($q$
+        WITH delta AS (%s)
+        INSERT INTO t_resumo_publicacoes_classe AS r (id_classe_mapa, total_publicacoes, tamanho_total_mb, tamanho_quantidade)
+        SELECT id_classe_mapa, SUM(sinal), COALESCE(SUM(sinal * tamanho_arquivo_mb), 0),
+               COALESCE(SUM(sinal) FILTER (WHERE tamanho_arquivo_mb IS NOT NULL), 0)
+        FROM delta
+        GROUP BY id_classe_mapa
+        HAVING SUM(sinal) <> 0 OR COALESCE(SUM(sinal * tamanho_arquivo_mb), 0) <> 0
+            OR COALESCE(SUM(sinal) FILTER (WHERE tamanho_arquivo_mb IS NOT NULL), 0) <> 0
+        ON CONFLICT (id_classe_mapa) DO UPDATE SET
+            total_publicacoes = r.total_publicacoes + EXCLUDED.total_publicacoes,
+            tamanho_total_mb = r.tamanho_total_mb + EXCLUDED.tamanho_total_mb,
+            tamanho_quantidade = r.tamanho_quantidade + EXCLUDED.tamanho_quantidade
+    $q$, v_delta);
+
+    -- 2. Multiplicidades e contagens distintas por ano e por classe
+    EXECUTE format($q$
+        WITH delta AS (%s),
+        pares AS (
+            SELECT p.dimensao, p.chave, p.membro, SUM(d.sinal) AS variacao
+            FROM delta d
+            CROSS JOIN LATERAL (VALUES
+                ('ano_municipio', d.id_ano, d.cod_mun),
+                ('ano_classe', d.id_ano, d.id_classe_mapa),
+                ('ano_tipo', d.id_ano, d.id_tipo_mapa),
+                ('classe_municipio', d.id_classe_mapa, d.cod_mun),
+                ('classe_ano', d.id_classe_mapa, d.id_ano)
+            ) AS p(dimensao, chave, membro)
+            GROUP BY p.dimensao, p.chave, p.membro
+            HAVING SUM(d.sinal) <> 0
+        ),
+        membros AS (
+            INSERT INTO t_resumo_publicacoes_membros AS m (dimensao, chave, membro, quantidade)
+            SELECT dimensao, chave, membro, variacao FROM pares
+            ON CONFLICT (dimensao, chave, membro) DO UPDATE SET quantidade = m.quantidade + EXCLUDED.quantidade
+            RETURNING m.dimensao, m.chave, m.membro, m.quantidade
+        ),
+        distintos AS (
+            SELECT m.dimensao, m.chave,
+                   SUM(CASE
+                       WHEN m.quantidade > 0 AND m.quantidade - p.variacao <= 0 THEN 1
+                       WHEN m.quantidade <= 0 AND m.quantidade - p.variacao > 0 THEN -1
+                       ELSE 0
+                   END) AS variacao
+            FROM membros m
+            JOIN pares p USING (dimensao, chave, membro)
+            GROUP BY m.dimensao, m.chave
+        ),
+        por_ano AS (
+            UPDATE t_resumo_publicacoes_ano r SET
+                total_municipios = r.total_municipios + d.municipios,
+                total_classes = r.total_classes + d.classes,
+                total_tipos = r.total_tipos + d.tipos
+            FROM (
+                SELECT chave,
+                       COALESCE(SUM(variacao) FILTER (WHERE dimensao = 'ano_municipio'), 0) AS municipios,
+                       COALESCE(SUM(variacao) FILTER (WHERE dimensao = 'ano_classe'), 0) AS classes,
+                       COALESCE(SUM(variacao) FILTER (WHERE dimensao = 'ano_tipo'), 0) AS tipos
+                FROM distintos
+                WHERE dimensao IN ('ano_municipio', 'ano_classe', 'ano_tipo')
+                GROUP BY chave
+                HAVING SUM(ABS(variacao)) > 0
+            ) d
+            WHERE r.id_ano = d.chave
+        )
+        UPDATE t_resumo_publicacoes_classe r SET
+            total_municipios = r.total_municipios + d.municipios,
+            total_anos = r.total_anos + d.anos
+        FROM (
+            SELECT chave,
+                   COALESCE(SUM(variacao) FILTER (WHERE dimensao = 'classe_municipio'), 0) AS municipios,
+                   COALESCE(SUM(variacao) FILTER (WHERE dimensao = 'classe_ano'), 0) AS anos
+            FROM distintos
+            WHERE dimensao IN ('classe_municipio', 'classe_ano')
+            GROUP BY chave
+            HAVING SUM(ABS(variacao)) > 0
+        ) d
+        WHERE r.id_classe_mapa = d.chave
+    $q$, v_delta);
+
+    -- 3. Resumo dos municípios afetados, recalculado a partir da tabela base
+    EXECUTE format($q$
+        WITH afetados AS (
+            SELECT DISTINCT cod_mun FROM (%s) delta
+        ),
+        recalculo AS (
+            SELECT
+                pm.cod_mun,
+                MAX(pm.nom_mun) AS nom_mun,
+                COUNT(*) AS total_publicacoes,
+                COUNT(DISTINCT pm.id_classe_mapa) AS total_classes,
+                COUNT(DISTINCT pm.id_tipo_mapa) AS total_tipos,
+                COUNT(DISTINCT pm.id_ano) AS total_anos,
+                MIN(pm.data_publicacao) AS primeira_publicacao,
+                MAX(pm.data_publicacao) AS ultima_publicacao,
+                SUM(pm.tamanho_arquivo_mb) AS tamanho_total_mb
+            FROM t_publicacao_municipios pm
+            WHERE pm.cod_mun IN (SELECT cod_mun FROM afetados)
+                AND pm.ativo = TRUE
+                AND pm.status = 'ATIVO'
+            GROUP BY pm.cod_mun
+        ),
+        removidos AS (
+            DELETE FROM t_resumo_publicacoes_municipio r
+            WHERE r.cod_mun IN (SELECT cod_mun FROM afetados)
+                AND NOT EXISTS (SELECT 1 FROM recalculo c WHERE c.cod_mun = r.cod_mun)
+        )
+        INSERT INTO t_resumo_publicacoes_municipio AS r
+        SELECT * FROM recalculo
+        ON CONFLICT (cod_mun) DO UPDATE SET
+            nom_mun = EXCLUDED.nom_mun,
+            total_publicacoes = EXCLUDED.total_publicacoes,
+            total_classes = EXCLUDED.total_classes,
+            total_tipos = EXCLUDED.total_tipos,
+            total_anos = EXCLUDED.total_anos,
+            primeira_publicacao = EXCLUDED.primeira_publicacao,
+            ultima_publicacao = EXCLUDED.ultima_publicacao,
+            tamanho_total_mb = EXCLUDED.tamanho_total_mb
+    $q$, v_delta);
+
+    PERFORM registrar_atualizacao_resumo('publicacoes', TG_OP);
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Função: aplica o delta de uma instrução em t_municipios
+CREATE OR REPLACE FUNCTION aplicar_delta_resumos_municipios()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_colunas CONSTANT TEXT := 'sigla_uf, nom_uf, regiao, populacao, area_km2, densidade_demografica';
+    v_delta TEXT;
+BEGIN
+    -- Municípios ativos que entram (+1) ou saem (-1) do resumo por UF
+    v_delta := CASE TG_OP
+        WHEN 'INSERT' THEN format('SELECT %s, 1 AS sinal FROM novas WHERE ativo = TRUE', v_colunas)
+        WHEN 'DELETE' THEN format('SELECT %s, -1 AS sinal FROM velhas WHERE ativo = TRUE', v_colunas)
+        ELSE format('SELECT %s, -1 AS sinal FROM velhas WHERE ativo = TRUE UNION ALL SELECT %s, 1 FROM novas WHERE ativo = TRUE',
+                    v_colunas, v_colunas)
+    END;
+
+    EXECUTE format($q$
+        WITH delta AS (%s)
+        INSERT INTO t_resumo_municipios_uf AS r (
+            sigla_uf, nom_uf, regiao, total_municipios,
+            populacao_total, populacao_quantidade, area_total_km2, area_quantidade,
+            densidade_soma, densidade_quantidade
+        )
+        SELECT
+            sigla_uf,
+            MAX(nom_uf) FILTER (WHERE sinal > 0),
+            MAX(regiao) FILTER (WHERE sinal > 0),
+            SUM(sinal),
+            COALESCE(SUM(sinal * populacao), 0),
+            COALESCE(SUM(sinal) FILTER (WHERE populacao IS NOT NULL), 0),
+            COALESCE(SUM(sinal * area_km2), 0),
+            COALESCE(SUM(sinal) FILTER (WHERE area_km2 IS NOT NULL), 0),
+            COALESCE(SUM(sinal * densidade_demografica), 0),
+            COALESCE(SUM(sinal) FILTER (WHERE densidade_demografica IS NOT NULL), 0)
+        FROM delta
+        GROUP BY sigla_uf
+        HAVING SUM(sinal) <> 0
+            OR COALESCE(SUM(sinal * populacao), 0) <> 0
+            OR COALESCE(SUM(sinal * area_km2), 0) <> 0
+            OR COALESCE(SUM(sinal * densidade_demografica), 0) <> 0
+            OR COALESCE(SUM(sinal) FILTER (WHERE populacao IS NOT NULL), 0) <> 0
+            OR COALESCE(SUM(sinal) FILTER (WHERE area_km2 IS NOT NULL), 0) <> 0
+            OR COALESCE(SUM(sinal) FILTER (WHERE densidade_demografica IS NOT NULL), 0) <> 0
+            OR MAX(nom_uf) FILTER (WHERE sinal > 0) IS DISTINCT FROM MAX(nom_uf) FILTER (WHERE sinal < 0)
+            OR MAX(regiao) FILTER (WHERE sinal > 0) IS DISTINCT FROM MAX(regiao) FILTER (WHERE sinal < 0)
+        ON CONFLICT (sigla_uf) DO UPDATE SET
+            nom_uf = COALESCE(EXCLUDED.nom_uf, r.nom_uf),
+            regiao = COALESCE(EXCLUDED.regiao, r.regiao),
+            total_municipios = r.total_municipios + EXCLUDED.total_municipios,
+            populacao_total = r.populacao_total + EXCLUDED.populacao_total,
+            populacao_quantidade = r.populacao_quantidade + EXCLUDED.populacao_quantidade,
+            area_total_km2 = r.area_total_km2 + EXCLUDED.area_total_km2,
+            area_quantidade = r.area_quantidade + EXCLUDED.area_quantidade,
+            densidade_soma = r.densidade_soma + EXCLUDED.densidade_soma,
+            densidade_quantidade = r.densidade_quantidade + EXCLUDED.densidade_quantidade
+    $q$, v_delta);
+
+    PERFORM registrar_atualizacao_resumo('municipios_uf', TG_OP);
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ============================================================
+-- RECÁLCULO COMPLETO
+-- ============================================================
+
+-- Função: reconstrói todos os resumos a partir das tabelas base
+-- Uso: carga inicial, após TRUNCATE ou para conferência periódica
+--      (ex: agendada com pg_cron)
+CREATE OR REPLACE FUNCTION recalcular_resumos()
+RETURNS VOID AS $$
+BEGIN
+    -- Escritas concorrentes aguardam o fim do recálculo
+    LOCK TABLE t_publicacao_municipios, t_municipios IN SHARE MODE;
+
+    TRUNCATE t_resumo_publicacoes_ano, t_resumo_publicacoes_classe, t_resumo_publicacoes_municipio,
+             t_resumo_publicacoes_membros, t_resumo_municipios_uf;
+
+    INSERT INTO t_resumo_publicacoes_membros (dimensao, chave, membro, quantidade)
+    SELECT p.dimensao, p.chave, p.membro, COUNT(*)
+    FROM t_publicacao_municipios pm
+    CROSS JOIN LATERAL (VALUES
+        ('ano_municipio', pm.id_ano, pm.cod_mun),
+        ('ano_classe', pm.id_ano, pm.id_classe_mapa),
+        ('ano_tipo', pm.id_ano, pm.id_tipo_mapa),
+        ('classe_municipio', pm.id_classe_mapa, pm.cod_mun),
+        ('classe_ano', pm.id_classe_mapa, pm.id_ano)
+    ) AS p(dimensao, chave, membro)
+    WHERE pm.ativo = TRUE AND pm.status = 'ATIVO'
+    GROUP BY p.dimensao, p.chave, p.membro;
+
+    INSERT INTO t_resumo_publicacoes_ano
+    SELECT
+        id_ano,
+        COUNT(*),
+        COUNT(DISTINCT cod_mun),
+        COUNT(DISTINCT id_classe_mapa),
+        COUNT(DISTINCT id_tipo_mapa),
+        COALESCE(SUM(tamanho_arquivo_mb), 0),
+        COUNT(tamanho_arquivo_mb)
+    FROM t_publicacao_municipios
+    WHERE ativo = TRUE AND status = 'ATIVO'
+    GROUP BY id_ano;
+
+    INSERT INTO t_resumo_publicacoes_classe
+    SELECT
+        id_classe_mapa,
+        COUNT(*),
+        COUNT(DISTINCT cod_mun),
+        COUNT(DISTINCT id_ano),
+        COALESCE(SUM(tamanho_arquivo_mb), 0),
+        COUNT(tamanho_arquivo_mb)
+    FROM t_publicacao_municipios
+    WHERE ativo = TRUE AND status = 'ATIVO'
+    GROUP BY id_classe_mapa;
+
+    INSERT INTO t_resumo_publicacoes_municipio
+    SELECT
+        cod_mun,
+        MAX(nom_mun),
+        COUNT(*),
+        COUNT(DISTINCT id_classe_mapa),
+        COUNT(DISTINCT id_tipo_mapa),
+        COUNT(DISTINCT id_ano),
+        MIN(data_publicacao),
+        MAX(data_publicacao),
+        SUM(tamanho_arquivo_mb)
+    FROM t_publicacao_municipios
+    WHERE ativo = TRUE AND status = 'ATIVO'
+    GROUP BY cod_mun;
+
+    INSERT INTO t_resumo_municipios_uf
+    SELECT
+        sigla_uf,
+        MAX(nom_uf),
+        MAX(regiao),
+        COUNT(*),
+        COALESCE(SUM(populacao), 0),
+        COUNT(populacao),
+        COALESCE(SUM(area_km2), 0),
+        COUNT(area_km2),
+        COALESCE(SUM(densidade_demografica), 0),
+        COUNT(densidade_demografica)
+    FROM t_municipios
+    WHERE ativo = TRUE
+    GROUP BY sigla_uf;
+
+    -- Com as escritas bloqueadas, o log anterior ao recálculo pode ser descartado
+    DELETE FROM t_resumo_atualizacao_log;
+    UPDATE t_resumo_atualizacao SET ultimo_recalculo = clock_timestamp();
+    PERFORM registrar_atualizacao_resumo(resumo, 'RECALCULO') FROM t_resumo_atualizacao;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Função: recálculo após TRUNCATE das tabelas base
+CREATE OR REPLACE FUNCTION recalcular_resumos_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM recalcular_resumos();
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ============================================================
+-- TRIGGERS
+-- ============================================================
+
+CREATE TRIGGER trigger_resumos_publicacoes_insert
+    AFTER INSERT ON t_publicacao_municipios
+    REFERENCING NEW TABLE AS novas
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION aplicar_delta_resumos_publicacoes();
+
+CREATE TRIGGER trigger_resumos_publicacoes_update
+    AFTER UPDATE ON t_publicacao_municipios
+    REFERENCING OLD TABLE AS velhas NEW TABLE AS novas
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION aplicar_delta_resumos_publicacoes();
+
+CREATE TRIGGER trigger_resumos_publicacoes_delete
+    AFTER DELETE ON t_publicacao_municipios
+    REFERENCING OLD TABLE AS velhas
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION aplicar_delta_resumos_publicacoes();
+
+CREATE TRIGGER trigger_resumos_publicacoes_truncate
+    AFTER TRUNCATE ON t_publicacao_municipios
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION recalcular_resumos_trigger();
+
+CREATE TRIGGER trigger_resumos_municipios_insert
+    AFTER INSERT ON t_municipios
+    REFERENCING NEW TABLE AS novas
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION aplicar_delta_resumos_municipios();
+
+CREATE TRIGGER trigger_resumos_municipios_update
+    AFTER UPDATE ON t_municipios
+    REFERENCING OLD TABLE AS velhas NEW TABLE AS novas
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION aplicar_delta_resumos_municipios();
+
+CREATE TRIGGER trigger_resumos_municipios_delete
+    AFTER DELETE ON t_municipios
+    REFERENCING OLD TABLE AS velhas
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION aplicar_delta_resumos_municipios();
+
+CREATE TRIGGER trigger_resumos_municipios_truncate
+    AFTER TRUNCATE ON t_municipios
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION recalcular_resumos_trigger();
+
+-- ============================================================
+-- VIEWS SOBRE OS RESUMOS
+-- ============================================================
+
+-- Mesmas colunas das views originais (02 e 03), lidas dos resumos
+DROP VIEW IF EXISTS vw_resumo_publicacoes_municipio;
+CREATE VIEW vw_resumo_publicacoes_municipio AS
+SELECT
+    cod_mun,
+    nom_mun,
+    total_publicacoes,
+    total_classes,
+    total_tipos,
+    total_anos,
+    ultima_publicacao,
+    tamanho_total_mb
+FROM t_resumo_publicacoes_municipio
+ORDER BY total_publicacoes DESC;
+
+DROP VIEW IF EXISTS vw_publicacoes_por_ano;
+CREATE VIEW vw_publicacoes_por_ano AS
+SELECT
+    a.ano,
+    r.total_publicacoes,
+    r.total_municipios,
+    r.total_classes,
+    r.total_tipos,
+    CASE WHEN r.tamanho_quantidade > 0 THEN r.tamanho_total_mb END AS tamanho_total_mb
+FROM t_resumo_publicacoes_ano r
+JOIN t_anos a ON r.id_ano = a.id_ano
+WHERE r.total_publicacoes > 0
+ORDER BY a.ano DESC;
+
+DROP VIEW IF EXISTS vw_publicacoes_por_classe;
+CREATE VIEW vw_publicacoes_por_classe AS
+SELECT
+    cm.id_classe_mapa,
+    cm.nome_classe_mapa,
+    r.total_publicacoes,
+    r.total_municipios,
+    r.total_anos,
+    r.tamanho_total_mb / NULLIF(r.tamanho_quantidade, 0) AS tamanho_medio_mb
+FROM t_resumo_publicacoes_classe r
+JOIN t_classe_mapa cm ON r.id_classe_mapa = cm.id_classe_mapa
+WHERE r.total_publicacoes > 0
+ORDER BY r.total_publicacoes DESC;
+
+DROP VIEW IF EXISTS vw_municipios_por_uf;
+CREATE VIEW vw_municipios_por_uf AS
+SELECT
+    sigla_uf,
+    nom_uf,
+    regiao,
+    total_municipios,
+    CASE WHEN populacao_quantidade > 0 THEN populacao_total END AS populacao_total,
+    CASE WHEN area_quantidade > 0 THEN area_total_km2 END AS area_total_km2,
+    densidade_soma / NULLIF(densidade_quantidade, 0) AS densidade_media
+FROM t_resumo_municipios_uf
+WHERE total_municipios > 0
+ORDER BY sigla_uf;
+
+-- View: Atualização dos resumos (registro mais recente do log)
+CREATE VIEW vw_resumo_atualizacao AS
+SELECT
+    r.resumo,
+    l.atualizado_em,
+    l.operacao AS ultima_operacao,
+    r.ultimo_recalculo,
+    CURRENT_TIMESTAMP - l.atualizado_em AS idade
+FROM t_resumo_atualizacao r
+LEFT JOIN LATERAL (
+    SELECT g.atualizado_em, g.operacao
+    FROM t_resumo_atualizacao_log g
+    WHERE g.resumo = r.resumo
+    ORDER BY g.atualizado_em DESC
+    LIMIT 1
+) l ON TRUE
+ORDER BY r.resumo;
+
+-- ============================================================
+-- COMENTÁRIOS
+-- ============================================================
+
+COMMENT ON TABLE t_resumo_atualizacao IS 'Resumos mantidos e último recálculo completo de cada um';
+COMMENT ON TABLE t_resumo_atualizacao_log IS 'Atualizações dos resumos, uma linha por transação (sem linha única disputada), podado a cada 1000 registros';
+COMMENT ON FUNCTION podar_resumo_atualizacao_log IS 'Remove do log de atualização todas as linhas exceto a mais recente de cada resumo';
+COMMENT ON TABLE t_resumo_publicacoes_ano IS 'Resumo de publicações ativas por ano, mantido por triggers de instrução';
+COMMENT ON TABLE t_resumo_publicacoes_classe IS 'Resumo de publicações ativas por classe de mapa, mantido por triggers de instrução';
+COMMENT ON TABLE t_resumo_publicacoes_municipio IS 'Resumo de publicações ativas por município, recalculado para os municípios afetados';
+COMMENT ON TABLE t_resumo_publicacoes_membros IS 'Multiplicidades para as contagens distintas dos resumos por ano e por classe';
+COMMENT ON TABLE t_resumo_municipios_uf IS 'Resumo de municípios ativos por UF, mantido por triggers de instrução';
+COMMENT ON FUNCTION recalcular_resumos IS 'Reconstrói todos os resumos a partir das tabelas base';
+
+-- Carga inicial a partir dos dados existentes
+SELECT recalcular_resumos();
@@ -0,0 +1,228 @@
+-- ============================================================
+-- MODO POSTGIS: GEOMETRIAS E CONSULTAS ESPACIAIS (OPCIONAL)
+-- ============================================================
+-- Descrição: Colunas geométricas em SIRGAS 2000 (EPSG:4674) com
+--            índices GiST e funções de consulta espacial (retângulo,
+--            interseção e distância) para municípios e publicações
+-- Requisito: extensão PostGIS (3.x) instalada no servidor
+-- Autor: Sistema INDE MCP
+-- Data: 2025-11-17
+-- ============================================================
+-- Pode ser executado em um banco já populado: o ponto de cada
+-- município é preenchido a partir de latitude/longitude. Os limites
+-- municipais (polígonos) são gravados pelo database/load_inde_data.py
+-- quando a fonte de municípios traz a geometria dos polígonos.
+-- ============================================================
+
+CREATE EXTENSION IF NOT EXISTS postgis;
+
+-- ============================================================
+-- COLUNAS GEOMÉTRICAS
+-- ============================================================
+
+ALTER TABLE t_municipios
+    -- Ponto representativo (centroide), derivado de latitude/longitude
+    ADD COLUMN IF NOT EXISTS geom_ponto geometry(Point, 4674),
+    -- Limite municipal
+    ADD COLUMN IF NOT EXISTS geom_limite geometry(MultiPolygon, 4674);
+
+COMMENT ON COLUMN t_municipios.geom_ponto IS 'Ponto representativo do município (SIRGAS 2000), mantido a partir de latitude/longitude';
+COMMENT ON COLUMN t_municipios.geom_limite IS 'Limite municipal (SIRGAS 2000), preenchido pela carga de dados';
+
+-- ============================================================
+-- ÍNDICES ESPACIAIS
+-- ============================================================
+
+-- Filtros por retângulo e interseção (ST_Intersects usa o índice via &&)
+CREATE INDEX IF NOT EXISTS idx_municipios_geom_ponto ON t_municipios USING GIST (geom_ponto);
+CREATE INDEX IF NOT EXISTS idx_municipios_geom_limite ON t_municipios USING GIST (geom_limite);
+
+-- Distâncias em metros (ST_DWithin sobre geography)
+CREATE INDEX IF NOT EXISTS idx_municipios_geog_ponto ON t_municipios USING GIST ((geom_ponto::geography));
+CREATE INDEX IF NOT EXISTS idx_municipios_geog_limite ON t_municipios USING GIST ((geom_limite::geography));
+
+-- ============================================================
+-- TRIGGERS PARA ATUALIZAÇÃO AUTOMÁTICA
+-- ============================================================
+
+-- Função para manter geom_ponto a partir de latitude/longitude
+CREATE OR REPLACE FUNCTION atualizar_geom_ponto_municipio()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW.latitude IS NULL OR NEW.longitude IS NULL THEN
+        NEW.geom_ponto = NULL;
+    ELSE
+        NEW.geom_ponto = ST_SetSRID(ST_MakePoint(NEW.longitude::FLOAT8, NEW.latitude::FLOAT8), 4674);
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_geom_ponto_municipios ON t_municipios;
+CREATE TRIGGER trigger_geom_ponto_municipios
+    BEFORE INSERT OR UPDATE OF latitude, longitude ON t_municipios
+    FOR EACH ROW
+    EXECUTE FUNCTION atualizar_geom_ponto_municipio();
+
+-- Pontos dos municípios já cadastrados
+UPDATE t_municipios
+SET geom_ponto = ST_SetSRID(ST_MakePoint(longitude::FLOAT8, latitude::FLOAT8), 4674)
+WHERE latitude IS NOT NULL
+    AND longitude IS NOT NULL
+    AND geom_ponto IS NULL;
+
+-- ============================================================
+-- FUNÇÕES DE CONSULTA ESPACIAL
+-- ============================================================
+-- Municípios sem limite cadastrado são avaliados pelo ponto. Cada
+-- ramo do OR usa o seu índice GiST (BitmapOr no plano de execução);
+-- ST_Intersects descarta os candidatos cujo retângulo envolvente toca
+-- a área consultada mas o polígono não (municípios côncavos ou
+-- costeiros).
+-- Geometrias GeoJSON de entrada são lidas como SIRGAS 2000 (a
+-- diferença para WGS 84 é inferior a um metro).
+
+-- Função para converter GeoJSON em geometria de consulta
+CREATE OR REPLACE FUNCTION geometria_consulta(p_geojson TEXT)
+RETURNS geometry AS $$
+    SELECT ST_SetSRID(ST_GeomFromGeoJSON(p_geojson), 4674);
+$$ LANGUAGE sql IMMUTABLE STRICT;
+
+COMMENT ON FUNCTION geometria_consulta IS 'Converte uma geometria GeoJSON em geometria SIRGAS 2000 (EPSG:4674)';
+
+-- Função para listar municípios que tocam um retângulo envolvente
+CREATE OR REPLACE FUNCTION municipios_no_bbox(
+    p_min_lon FLOAT8,
+    p_min_lat FLOAT8,
+    p_max_lon FLOAT8,
+    p_max_lat FLOAT8
+)
+RETURNS TABLE (
+    cod_mun VARCHAR,
+    nom_mun VARCHAR,
+    sigla_uf CHAR(2),
+    latitude NUMERIC,
+    longitude NUMERIC
+) AS $$
+    SELECT m.cod_mun, m.nom_mun, m.sigla_uf, m.latitude, m.longitude
+    FROM t_municipios m
+    WHERE m.ativo = TRUE
+        AND (
+            ST_Intersects(m.geom_limite, ST_MakeEnvelope(p_min_lon, p_min_lat, p_max_lon, p_max_lat, 4674))
+            OR (m.geom_limite IS NULL
+                AND ST_Intersects(m.geom_ponto, ST_MakeEnvelope(p_min_lon, p_min_lat, p_max_lon, p_max_lat, 4674)))
+        )
+    ORDER BY m.cod_mun;
+$$ LANGUAGE sql STABLE;
+
+COMMENT ON FUNCTION municipios_no_bbox IS 'Municípios cujo limite (ou ponto) intersecta o retângulo lon/lat informado';
+
+-- Função para listar municípios que intersectam uma geometria GeoJSON
+CREATE OR REPLACE FUNCTION municipios_intersectando(p_geojson TEXT)
+RETURNS TABLE (
+    cod_mun VARCHAR,
+    nom_mun VARCHAR,
+    sigla_uf CHAR(2),
+    latitude NUMERIC,
+    longitude NUMERIC
+) AS $$
+    SELECT m.cod_mun, m.nom_mun, m.sigla_uf, m.latitude, m.longitude
+    FROM t_municipios m
+    WHERE m.ativo = TRUE
+        AND (
+            ST_Intersects(m.geom_limite, geometria_consulta(p_geojson))
+            OR (m.geom_limite IS NULL
+                AND ST_Intersects(m.geom_ponto, geometria_consulta(p_geojson)))
+        )
+    ORDER BY m.cod_mun;
+$$ LANGUAGE sql STABLE;
+
+COMMENT ON FUNCTION municipios_intersectando IS 'Municípios cujo limite (ou ponto) intersecta a geometria GeoJSON informada';
+
+-- Função para listar municípios até uma distância de um ponto
+CREATE OR REPLACE FUNCTION municipios_a_distancia(
+    p_lon FLOAT8,
+    p_lat FLOAT8,
+    p_raio_km FLOAT8
+)
+RETURNS TABLE (
+    cod_mun VARCHAR,
+    nom_mun VARCHAR,
+    sigla_uf CHAR(2),
+    latitude NUMERIC,
+    longitude NUMERIC,
+    distancia_km FLOAT8
+) AS $$
+    SELECT
+        m.cod_mun, m.nom_mun, m.sigla_uf, m.latitude, m.longitude,
+        ST_Distance(
+            COALESCE(m.geom_limite, m.geom_ponto)::geography,
+            ST_SetSRID(ST_MakePoint(p_lon, p_lat), 4674)::geography
+        ) / 1000.0
+    FROM t_municipios m
+    WHERE m.ativo = TRUE
+        AND (
+            ST_DWithin(m.geom_limite::geography,
+                       ST_SetSRID(ST_MakePoint(p_lon, p_lat), 4674)::geography, p_raio_km * 1000.0)
+            OR (m.geom_limite IS NULL
+                AND ST_DWithin(m.geom_ponto::geography,
+                               ST_SetSRID(ST_MakePoint(p_lon, p_lat), 4674)::geography, p_raio_km * 1000.0))
+        )
+    ORDER BY 6, 1;
+$$ LANGUAGE sql STABLE;
+
+COMMENT ON FUNCTION municipios_a_distancia IS 'Municípios a até p_raio_km do ponto (distância ao limite ou, sem limite, ao ponto; zero quando o ponto está dentro)';
+
+-- Função para listar publicações dos municípios que intersectam uma geometria
+CREATE OR REPLACE FUNCTION publicacoes_na_area(
+    p_geojson TEXT,
+    p_ano INTEGER DEFAULT NULL,
+    p_id_classe_mapa VARCHAR DEFAULT NULL
+)
+RETURNS TABLE (
+    id_publicacao_municipio INTEGER,
+    cod_mun VARCHAR,
+    nom_mun VARCHAR,
+    sigla_uf CHAR(2),
+    id_classe_mapa VARCHAR,
+    id_tipo_mapa VARCHAR,
+    ano INTEGER,
+    titulo_publicacao VARCHAR,
+    url_publicacao VARCHAR,
+    data_publicacao DATE
+) AS $$
+    SELECT
+        pm.id_publicacao_municipio, m.cod_mun, m.nom_mun, m.sigla_uf,
+        pm.id_classe_mapa, pm.id_tipo_mapa, a.ano,
+        pm.titulo_publicacao, pm.url_publicacao, pm.data_publicacao
+    FROM municipios_intersectando(p_geojson) m
+    JOIN t_publicacao_municipios pm ON pm.cod_mun = m.cod_mun
+    JOIN t_anos a ON a.id_ano = pm.id_ano
+    WHERE pm.ativo = TRUE
+        AND pm.status = 'ATIVO'
+        AND (p_ano IS NULL OR a.ano = p_ano)
+        AND (p_id_classe_mapa IS NULL OR pm.id_classe_mapa = p_id_classe_mapa)
+    ORDER BY m.cod_mun, a.ano DESC, pm.id_classe_mapa, pm.id_tipo_mapa;
+$$ LANGUAGE sql STABLE;
+
+COMMENT ON FUNCTION publicacoes_na_area IS 'Publicações ativas dos municípios que intersectam a geometria GeoJSON informada';
+
+-- ============================================================
+-- VIEWS ÚTEIS
+-- ============================================================
+
+-- View: Municípios com geometria (para clientes GIS, ex: QGIS)
+CREATE OR REPLACE VIEW vw_municipios_geo AS
+SELECT
+    id_municipio,
+    cod_mun,
+    nom_mun,
+    sigla_uf,
+    regiao,
+    populacao,
+    area_km2,
+    capital,
+    geom_ponto,
+    geom_limite
+FROM t_municipios
+WHERE ativo = TRUE;
@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+Acesso ao Banco de Dados - INDE MCP Server
+Consultas assíncronas a municípios e publicações no PostgreSQL
+
+Funcionalidades:
+- Pool de conexões asyncpg criado no primeiro uso
+- Instruções preparadas (cache de statements por conexão do asyncpg)
+- Consultas em conjunto: vários municípios em uma única ida ao banco (= ANY($1))
+- Estatísticas lidas dos resumos materializados quando existem (04_create_resumos.sql)
+- Consultas espaciais com índices GiST no modo PostGIS (05_create_postgis.sql)
+"""
+
+import asyncio
+import json
+import logging
+import os
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+
+from tracing import tracer
+
+# asyncpg é opcional para o restante do servidor
+try:
+    import asyncpg
+    ASYNCPG_AVAILABLE = True
+except ImportError:
+    ASYNCPG_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Limite de códigos por consulta em conjunto (o Brasil tem 5.570 municípios)
+MAX_COD_MUNS = 6000
+
+# ================================
+# CONSULTAS
+# ================================
+
+# Filtro comum: municípios por lista de códigos e/ou UF (parâmetros nulos não filtram)
+_FILTRO_MUNICIPIOS = "($1::varchar[] IS NULL OR m.cod_mun = ANY($1::varchar[])) AND ($2::char(2) IS NULL OR m.sigla_uf = $2)"
+
+MUNICIPIOS_SQL = f"""
+SELECT m.cod_mun, m.nom_mun, m.cod_uf, m.nom_uf, m.sigla_uf, m.regiao, m.populacao, m.area_km2,
+       m.densidade_demografica, m.capital, m.latitude, m.longitude
+FROM t_municipios m
+WHERE m.ativo = TRUE AND {_FILTRO_MUNICIPIOS}
+ORDER BY m.cod_mun
+"""
+
+# Estatísticas a partir do resumo por município (mantido por triggers)
+ESTATISTICAS_RESUMO_SQL = f"""
+SELECT m.cod_mun, m.nom_mun, m.sigla_uf,
+       COALESCE(r.total_publicacoes, 0) AS total_publicacoes,
+       COALESCE(r.total_classes, 0) AS total_classes,
+       COALESCE(r.total_tipos, 0) AS total_tipos,
+       COALESCE(r.total_anos, 0) AS total_anos,
+       r.primeira_publicacao, r.ultima_publicacao, r.tamanho_total_mb
+FROM t_municipios m
+LEFT JOIN t_resumo_publicacoes_municipio r ON r.cod_mun = m.cod_mun
+WHERE m.ativo = TRUE AND {_FILTRO_MUNICIPIOS}
+ORDER BY m.cod_mun
+"""
+
+# Mesmas estatísticas de obter_estatisticas_municipio(), para todos os municípios de uma vez
+ESTATISTICAS_BASE_SQL = f"""
+SELECT m.cod_mun, m.nom_mun, m.sigla_uf,
+       COUNT(pm.id_publicacao_municipio) AS total_publicacoes,
+       COUNT(DISTINCT pm.id_classe_mapa) AS total_classes,
+       COUNT(DISTINCT pm.id_tipo_mapa) AS total_tipos,
+       COUNT(DISTINCT pm.id_ano) AS total_anos,
+       MIN(pm.data_publicacao) AS primeira_publicacao,
+       MAX(pm.data_publicacao) AS ultima_publicacao,
+       SUM(pm.tamanho_arquivo_mb) AS tamanho_total_mb
+FROM t_municipios m
+LEFT JOIN t_publicacao_municipios pm
+       ON pm.cod_mun = m.cod_mun AND pm.ativo = TRUE AND pm.status = 'ATIVO'
+WHERE m.ativo = TRUE AND {_FILTRO_MUNICIPIOS}
+GROUP BY m.cod_mun, m.nom_mun, m.sigla_uf
+ORDER BY m.cod_mun
+"""
+
+PUBLICACOES_SQL = """
+SELECT pm.id_publicacao_municipio, pm.cod_mun, pm.nom_mun,
+       pm.id_classe_mapa, cm.nome_classe_mapa, pm.id_tipo_mapa, tm.nome_tipo_mapa, a.ano,
+       pm.titulo_publicacao, pm.url_publicacao, pm.escala, pm.formato_arquivo,
+       pm.tamanho_arquivo_mb, pm.data_publicacao
+FROM t_publicacao_municipios pm
+JOIN t_classe_mapa cm ON cm.id_classe_mapa = pm.id_classe_mapa
+JOIN t_tipo_mapa tm ON tm.id_tipo_mapa = pm.id_tipo_mapa
+JOIN t_anos a ON a.id_ano = pm.id_ano
+WHERE pm.cod_mun = ANY($1::varchar[])
+  AND pm.ativo = TRUE AND pm.status = 'ATIVO'
+  AND ($2::integer IS NULL OR a.ano = $2)
+  AND ($3::varchar IS NULL OR pm.id_classe_mapa = $3)
+ORDER BY pm.cod_mun, a.ano DESC, pm.id_classe_mapa, pm.id_tipo_mapa
+LIMIT $4
+"""
+
+# Consultas espaciais (funções de 05_create_postgis.sql)
+MUNICIPIOS_BBOX_SQL = "SELECT * FROM municipios_no_bbox($1, $2, $3, $4) LIMIT $5"
+MUNICIPIOS_INTERSECAO_SQL = "SELECT * FROM municipios_intersectando($1) LIMIT $2"
+MUNICIPIOS_DISTANCIA_SQL = "SELECT * FROM municipios_a_distancia($1, $2, $3) LIMIT $4"
+PUBLICACOES_AREA_SQL = "SELECT * FROM publicacoes_na_area($1, $2, $3) LIMIT $4"
+
+
+def connection_settings() -> Dict[str, Any]:
+    """Parâmetros de conexão: DATABASE_URL ou variáveis DB_* (as mesmas do create_database.sh)."""
+    if os.getenv("DATABASE_URL"):
+        return {"dsn": os.environ["DATABASE_URL"]}
+    if not os.getenv("DB_NAME"):
+        return {}
+    return {
+        "host": os.getenv("DB_HOST", "localhost"),
+        "port": int(os.getenv("DB_PORT", "5432")),
+        "database": os.getenv("DB_NAME"),
+        "user": os.getenv("DB_USER"),
+        "password": os.getenv("DB_PASSWORD")
+    }
+
+
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def _rows(records) -> List[Dict[str, Any]]:
+    return [{key: _jsonable(value) for key, value in record.items()} for record in records]
+
+
+def bbox_geometry(bbox: List[float]) -> Dict[str, Any]:
+    """Polígono GeoJSON de um retângulo [min_lon, min_lat, max_lon, max_lat]."""
+    min_lon, min_lat, max_lon, max_lat = _validate_bbox(bbox)
+    return {"type": "Polygon", "coordinates": [[
+        [min_lon, min_lat], [max_lon, min_lat], [max_lon, max_lat], [min_lon, max_lat], [min_lon, min_lat]
+    ]]}
+
+
+def _validate_bbox(bbox: List[float]) -> List[float]:
+    if not bbox or len(bbox) != 4:
+        raise ValueError("bbox deve ter 4 valores: [min_lon, min_lat, max_lon, max_lat]")
+    min_lon, min_lat, max_lon, max_lat = (float(value) for value in bbox)
+    if min_lon > max_lon or min_lat > max_lat:
+        raise ValueError("bbox inválido: mínimos maiores que máximos")
+    return [min_lon, min_lat, max_lon, max_lat]
+
+
+def _geojson_text(geometry: Dict[str, Any]) -> str:
+    if not isinstance(geometry, dict) or "type" not in geometry or "coordinates" not in geometry:
+        raise ValueError("geometry deve ser uma geometria GeoJSON com type e coordinates")
+    return json.dumps(geometry, separators=(",", ":"))
+
+
+def _normalize_codes(cod_muns: Optional[List[str]]) -> Optional[List[str]]:
+    if cod_muns is None:
+        return None
+    codes = list(dict.fromkeys(str(code).strip() for code in cod_muns if str(code).strip()))
+    if len(codes) > MAX_COD_MUNS:
+        raise ValueError(f"Máximo de {MAX_COD_MUNS} municípios por consulta")
+    return codes
+
+
+# ================================
+# ACESSO AO BANCO
+# ================================
+
+class INDEDatabase:
+    """Pool asyncpg com as consultas de municípios e publicações.
+
+    O asyncpg prepara cada consulta na primeira execução em uma conexão e
+    reaproveita a instrução preparada nas seguintes (``statement_cache_size``;
+    use 0 atrás de um pgbouncer em modo transação).
+    """
+
+    def __init__(self, settings: Optional[Dict[str, Any]] = None,
+                 min_size: Optional[int] = None, max_size: Optional[int] = None):
+        self.settings = connection_settings() if settings is None else settings
+        self.min_size = min_size or int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+        self.max_size = max_size or int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+        self.statement_cache_size = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
+        self.command_timeout = float(os.getenv("DB_COMMAND_TIMEOUT", "30"))
+        self._pool_future: Optional[asyncio.Future] = None
+        self._has_summaries: Optional[bool] = None
+        self._has_postgis: Optional[bool] = None
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.settings)
+
+    async def pool(self):
+        """Pool de conexões, criado uma única vez no primeiro uso."""
+        if not ASYNCPG_AVAILABLE:
+            raise RuntimeError("asyncpg não instalado. Instale com: pip install asyncpg")
+        if not self.configured:
+            raise RuntimeError("banco não configurado (defina DATABASE_URL ou DB_NAME/DB_USER/DB_PASSWORD)")
+        if self._pool_future is None:
+            self._pool_future = asyncio.ensure_future(asyncpg.create_pool(
+                min_size=self.min_size,
+                max_size=self.max_size,
+                statement_cache_size=self.statement_cache_size,
+                command_timeout=self.command_timeout,
+                **self.settings
+            ))
+        try:
+            return await asyncio.shield(self._pool_future)
+        except Exception:
+            # Nova tentativa na próxima chamada
+            self._pool_future = None
+            raise
+
+    async def close(self):
+        """Fecha o pool (se chegou a ser criado)."""
+        if self._pool_future is not None and self._pool_future.done() and not self._pool_future.exception():
+            await self._pool_future.result().close()
+        self._pool_future = None
+
+    async def _fetch(self, operation: str, sql: str, *args) -> List[Dict[str, Any]]:
+        pool = await self.pool()
+        with tracer.start_span(f"db.query {operation}", {"db.system": "postgresql", "db.operation": operation},
+                               kind="client"):
+            return _rows(await pool.fetch(sql, *args))
+
+    async def _summaries_available(self) -> bool:
+        if self._has_summaries is None:
+            pool = await self.pool()
+            self._has_summaries = await pool.fetchval(
+                "SELECT to_regclass('t_resumo_publicacoes_municipio') IS NOT NULL"
+            )
+        return self._has_summaries
+
+    async def _require_postgis(self):
+        if self._has_postgis is None:
+            pool = await self.pool()
+            self._has_postgis = await pool.fetchval("SELECT to_regproc('municipios_intersectando') IS NOT NULL")
+        if not self._has_postgis:
+            raise RuntimeError("modo PostGIS não instalado no banco (execute database/schemas/05_create_postgis.sql)")
+
+    async def get_municipalities(self, cod_muns: Optional[List[str]] = None,
+                                 sigla_uf: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Cadastro dos municípios pedidos (por códigos e/ou UF), em uma consulta."""
+        return await self._fetch("municipios", MUNICIPIOS_SQL, _normalize_codes(cod_muns),
+                                 sigla_uf.upper() if sigla_uf else None)
+
+    async def municipality_statistics(self, cod_muns: Optional[List[str]] = None,
+                                      sigla_uf: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Estatísticas de publicações de vários municípios em uma consulta.
+
+        Equivale a chamar ``obter_estatisticas_municipio`` para cada um,
+        incluindo os municípios sem publicações (totais zerados).
+        """
+        sql = ESTATISTICAS_RESUMO_SQL if await self._summaries_available() else ESTATISTICAS_BASE_SQL
+        return await self._fetch("estatisticas_municipios", sql, _normalize_codes(cod_muns),
+                                 sigla_uf.upper() if sigla_uf else None)
+
+    async def list_publications(self, cod_muns: List[str], ano: Optional[int] = None,
+                                id_classe_mapa: Optional[str] = None, limit: int = 500) -> List[Dict[str, Any]]:
+        """Publicações ativas de vários municípios, com classe, tipo e ano."""
+        return await self._fetch("publicacoes", PUBLICACOES_SQL, _normalize_codes(cod_muns), ano,
+                                 id_classe_mapa, limit)
+
+    async def municipalities_in_bbox(self, bbox: List[float], limit: int = 500) -> List[Dict[str, Any]]:
+        """Municípios cujo limite (ou ponto) toca o retângulo [min_lon, min_lat, max_lon, max_lat]."""
+        min_lon, min_lat, max_lon, max_lat = _validate_bbox(bbox)
+        await self._require_postgis()
+        return await self._fetch("municipios_bbox", MUNICIPIOS_BBOX_SQL, min_lon, min_lat, max_lon, max_lat, limit)
+
+    async def municipalities_intersecting(self, geometry: Dict[str, Any], limit: int = 500) -> List[Dict[str, Any]]:
+        """Municípios que intersectam uma geometria GeoJSON (SIRGAS 2000 / WGS 84)."""
+        geojson = _geojson_text(geometry)
+        await self._require_postgis()
+        return await self._fetch("municipios_intersecao", MUNICIPIOS_INTERSECAO_SQL, geojson, limit)
+
+    async def municipalities_within_distance(self, latitude: float, longitude: float, radius_km: float,
+                                             limit: int = 500) -> List[Dict[str, Any]]:
+        """Municípios a até ``radius_km`` do ponto, ordenados pela distância ao limite."""
+        if radius_km <= 0:
+            raise ValueError("radius_km deve ser positivo")
+        await self._require_postgis()
+        return await self._fetch("municipios_distancia", MUNICIPIOS_DISTANCIA_SQL,
+                                 float(longitude), float(latitude), float(radius_km), limit)
+
+    async def publications_in_area(self, geometry: Dict[str, Any], ano: Optional[int] = None,
+                                   id_classe_mapa: Optional[str] = None, limit: int = 500) -> List[Dict[str, Any]]:
+        """Publicações ativas dos municípios que intersectam a geometria."""
+        geojson = _geojson_text(geometry)
+        await self._require_postgis()
+        return await self._fetch("publicacoes_area", PUBLICACOES_AREA_SQL, geojson, ano, id_classe_mapa, limit)
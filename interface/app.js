@@ -1,7 +1,11 @@
 // INDE MCP Interface - Main Application
 class MCPInterface {
     constructor() {
-        this.mcpEndpoint = 'http://localhost:3000/mcp'; // Endpoint do servidor MCP
+        // Gateway HTTP/JSON das ferramentas MCP (servido pelo interface/server.py)
+        this.apiBase = window.location.protocol.startsWith('http')
+            ? `${window.location.origin}/api`
+            : 'http://localhost:8000/api';
+        this.maxRenderedRows = 500; // Linhas exibidas na tabela da extração
         this.init();
     }
 
@@ -87,11 +91,82 @@ class MCPInterface {
     // Connection Check
     async checkConnection() {
         const statusElement = document.getElementById('connectionStatus');
-
-        // Simular verificação de conexão (em ambiente real, faria ping ao servidor)
-        statusElement.innerHTML = '<i class="fas fa-circle"></i> <span>Modo Demonstração</span>';
         statusElement.classList.remove('connected', 'disconnected');
-        statusElement.classList.add('connected');
+
+        try {
+            const status = await this.callTool('status');
+            statusElement.innerHTML = `<i class="fas fa-circle"></i> <span>Conectado (${status.tools.length} ferramentas)</span>`;
+            statusElement.classList.add('connected');
+        } catch (error) {
+            statusElement.innerHTML = '<i class="fas fa-circle"></i> <span>Desconectado</span>';
+            statusElement.title = error.message;
+            statusElement.classList.add('disconnected');
+        }
+    }
+
+    // Gateway Calls
+    apiUrl(route, params = {}) {
+        const query = new URLSearchParams();
+        Object.entries(params).forEach(([key, value]) => {
+            if (value !== undefined && value !== null && value !== '') {
+                query.append(key, value);
+            }
+        });
+        const queryString = query.toString();
+        return `${this.apiBase}/${route}${queryString ? '?' + queryString : ''}`;
+    }
+
+    async callTool(route, params = {}) {
+        const response = await fetch(this.apiUrl(route, params));
+        const data = await response.json().catch(() => ({ error: `Resposta inválida (HTTP ${response.status})` }));
+
+        if (!response.ok || (data && data.error)) {
+            throw new Error(data.error || `HTTP ${response.status}`);
+        }
+        return data;
+    }
+
+    // Lê uma resposta NDJSON linha a linha, chamando onEvent para cada evento
+    async streamTool(route, params, onEvent) {
+        const response = await fetch(this.apiUrl(route, params));
+        if (!response.ok) {
+            const data = await response.json().catch(() => ({}));
+            throw new Error(data.error || `HTTP ${response.status}`);
+        }
+
+        const reader = response.body.getReader();
+        try {
+            await this.readLines(reader, onEvent);
+        } catch (error) {
+            reader.cancel(); // Interrompe a extração no servidor
+            throw error;
+        }
+    }
+
+    async readLines(reader, onEvent) {
+        const decoder = new TextDecoder();
+        let buffer = '';
+
+        while (true) {
+            const { done, value } = await reader.read();
+            buffer += decoder.decode(value || new Uint8Array(), { stream: !done });
+
+            let newline;
+            while ((newline = buffer.indexOf('\n')) >= 0) {
+                const line = buffer.slice(0, newline).trim();
+                buffer = buffer.slice(newline + 1);
+                if (line) {
+                    onEvent(JSON.parse(line));
+                }
+            }
+
+            if (done) {
+                if (buffer.trim()) {
+                    onEvent(JSON.parse(buffer));
+                }
+                return;
+            }
+        }
     }
 
     // MCP Tool Functions
@@ -102,9 +177,8 @@ class MCPInterface {
         this.showLoading(true);
 
         try {
-            // Simular chamada ao MCP (em ambiente real, usaria fetch/axios)
-            const mockData = await this.simulateListServices(orgao);
-            this.displayListServicesResult(mockData, resultDiv);
+            const data = await this.callTool('services', { orgao });
+            this.displayListServicesResult(data, resultDiv);
         } catch (error) {
             this.displayError(resultDiv, error.message);
         } finally {
@@ -120,8 +194,8 @@ class MCPInterface {
         this.showLoading(true);
 
         try {
-            const mockData = await this.simulateDiscoverLayers(orgao, serviceName);
-            this.displayDiscoverLayersResult(mockData, resultDiv);
+            const data = await this.callTool('layers', { orgao, service_name: serviceName });
+            this.displayDiscoverLayersResult(data, resultDiv);
         } catch (error) {
             this.displayError(resultDiv, error.message);
         } finally {
@@ -139,8 +213,20 @@ class MCPInterface {
         this.showLoading(true);
 
         try {
-            const mockData = await this.simulateExtractData(orgao, serviceName, layer, maxFeatures);
-            this.displayExtractDataResult(mockData, resultDiv);
+            // Registros são exibidos à medida que as páginas chegam
+            let table = null;
+            await this.streamTool('extract', { orgao, service_name: serviceName, layer, max_features: maxFeatures }, event => {
+                if (event.type === 'start') {
+                    this.showLoading(false);
+                    table = this.startExtractStream(event, resultDiv);
+                } else if (event.type === 'features') {
+                    this.appendExtractFeatures(table, event.features);
+                } else if (event.type === 'end') {
+                    this.displayExtractDataResult(event, resultDiv, table);
+                } else if (event.type === 'error') {
+                    throw new Error(event.error);
+                }
+            });
         } catch (error) {
             this.displayError(resultDiv, error.message);
         } finally {
@@ -155,8 +241,8 @@ class MCPInterface {
         this.showLoading(true);
 
         try {
-            const mockData = await this.simulateAnalyzeCapabilities(orgao);
-            this.displayAnalyzeCapabilitiesResult(mockData, resultDiv);
+            const data = await this.callTool('capabilities', { orgao });
+            this.displayAnalyzeCapabilitiesResult(data, resultDiv);
         } catch (error) {
             this.displayError(resultDiv, error.message);
         } finally {
@@ -172,8 +258,8 @@ class MCPInterface {
         this.showLoading(true);
 
         try {
-            const mockData = await this.simulateIntelligentAnalysis(orgao, objetivo);
-            this.displayIntelligentAnalysisResult(mockData, resultDiv);
+            const data = await this.callTool('analysis', { orgao, objetivo });
+            this.displayIntelligentAnalysisResult(data, resultDiv);
         } catch (error) {
             this.displayError(resultDiv, error.message);
         } finally {
@@ -189,8 +275,8 @@ class MCPInterface {
         this.showLoading(true);
 
         try {
-            const mockData = await this.simulateGenerateReport(orgao, format);
-            this.displayGenerateReportResult(mockData, resultDiv, format);
+            const data = await this.callTool('report', { orgao, format });
+            this.displayGenerateReportResult(data.report, resultDiv, format);
         } catch (error) {
             this.displayError(resultDiv, error.message);
         } finally {
@@ -207,7 +293,7 @@ class MCPInterface {
             <div class="result-content">
                 <div class="stat-grid">
                     <div class="stat-item">
-                        <span class="stat-value">${data.total_services}</span>
+                        <span class="stat-value">${this.escapeHTML(data.total_services)}</span>
                         <span class="stat-label">Total de Serviços</span>
                     </div>
                     <div class="stat-item">
@@ -221,7 +307,7 @@ class MCPInterface {
                 </h4>
                 <div style="display: flex; flex-wrap: wrap; gap: 0.5rem; margin-bottom: 1.5rem;">
                     ${data.orgaos_disponiveis.map(org =>
-                        `<span style="background: var(--primary-color); color: white; padding: 0.5rem 1rem; border-radius: 20px; font-size: 0.9rem;">${org}</span>`
+                        `<span style="background: var(--primary-color); color: white; padding: 0.5rem 1rem; border-radius: 20px; font-size: 0.9rem;">${this.escapeHTML(org)}</span>`
                     ).join('')}
                 </div>
 
@@ -240,10 +326,10 @@ class MCPInterface {
                     <tbody>
                         ${data.services.map(service => `
                             <tr>
-                                <td><strong>${service.orgao}</strong></td>
-                                <td><span style="background: var(--info-color); color: white; padding: 0.25rem 0.75rem; border-radius: 12px; font-size: 0.85rem;">${service.tipo}</span></td>
-                                <td>${service.descricao}</td>
-                                <td style="font-size: 0.8rem; max-width: 300px; overflow: hidden; text-overflow: ellipsis;">${service.url}</td>
+                                <td><strong>${this.escapeHTML(service.orgao)}</strong></td>
+                                <td><span style="background: var(--info-color); color: white; padding: 0.25rem 0.75rem; border-radius: 12px; font-size: 0.85rem;">${this.escapeHTML(service.tipo)}</span></td>
+                                <td>${this.escapeHTML(service.descricao)}</td>
+                                <td style="font-size: 0.8rem; max-width: 300px; overflow: hidden; text-overflow: ellipsis;">${this.escapeHTML(service.url)}</td>
                             </tr>
                         `).join('')}
                     </tbody>
@@ -261,11 +347,11 @@ class MCPInterface {
             <div class="result-content">
                 <div class="stat-grid">
                     <div class="stat-item">
-                        <span class="stat-value">${data.total_layers}</span>
+                        <span class="stat-value">${this.escapeHTML(data.total_layers)}</span>
                         <span class="stat-label">Total de Camadas</span>
                     </div>
                     <div class="stat-item">
-                        <span class="stat-value">${data.service.tipo}</span>
+                        <span class="stat-value">${this.escapeHTML(data.service.tipo)}</span>
                         <span class="stat-label">Tipo de Serviço</span>
                     </div>
                 </div>
@@ -274,9 +360,9 @@ class MCPInterface {
                     <i class="fas fa-server"></i> Informações do Serviço:
                 </h4>
                 <div style="background: var(--light-bg); padding: 1rem; border-radius: 8px; margin-bottom: 1.5rem;">
-                    <p><strong>Órgão:</strong> ${data.service.orgao}</p>
-                    <p><strong>Descrição:</strong> ${data.service.descricao}</p>
-                    <p><strong>URL:</strong> <code style="font-size: 0.85rem;">${data.service.url}</code></p>
+                    <p><strong>Órgão:</strong> ${this.escapeHTML(data.service.orgao)}</p>
+                    <p><strong>Descrição:</strong> ${this.escapeHTML(data.service.descricao)}</p>
+                    <p><strong>URL:</strong> <code style="font-size: 0.85rem;">${this.escapeHTML(data.service.url)}</code></p>
                 </div>
 
                 <h4 style="margin-bottom: 1rem; color: var(--text-primary);">
@@ -286,7 +372,7 @@ class MCPInterface {
                     ${data.layers.map((layer, index) =>
                         `<div style="background: var(--light-bg); padding: 0.75rem 1rem; border-radius: 8px; display: flex; align-items: center; gap: 0.75rem;">
                             <span style="background: var(--primary-color); color: white; width: 30px; height: 30px; border-radius: 50%; display: flex; align-items: center; justify-content: center; font-size: 0.85rem; font-weight: bold;">${index + 1}</span>
-                            <code style="flex: 1;">${layer}</code>
+                            <code style="flex: 1;">${this.escapeHTML(layer)}</code>
                         </div>`
                     ).join('')}
                 </div>
@@ -295,16 +381,59 @@ class MCPInterface {
         container.classList.add('show');
     }
 
-    displayExtractDataResult(data, container) {
-        const dataset = data.dataset;
+    startExtractStream(event, container) {
         container.innerHTML = `
             <div class="result-header">
-                <h3><i class="fas fa-check-circle" style="color: var(--success-color);"></i> Dados Extraídos com Sucesso</h3>
+                <h3><i class="fas fa-spinner fa-spin" style="color: var(--info-color);"></i> Extraindo ${this.escapeHTML(event.layer)}...</h3>
             </div>
             <div class="result-content">
+                <div class="extract-summary"></div>
+                <h4 style="margin-bottom: 1rem; color: var(--text-primary);">
+                    <i class="fas fa-table"></i> Registros recebidos: <span class="extract-count">0</span>
+                </h4>
+                <div style="max-height: 400px; overflow: auto;">
+                    <table class="data-table">
+                        <thead><tr></tr></thead>
+                        <tbody></tbody>
+                    </table>
+                </div>
+            </div>
+        `;
+        container.classList.add('show');
+        return { container, columns: null, count: 0 };
+    }
+
+    appendExtractFeatures(table, features) {
+        if (!table || features.length === 0) {
+            return;
+        }
+
+        const head = table.container.querySelector('thead tr');
+        const body = table.container.querySelector('tbody');
+        if (!table.columns) {
+            table.columns = Object.keys(features[0].properties || {});
+            head.innerHTML = table.columns.map(col => `<th>${this.escapeHTML(col)}</th>`).join('');
+        }
+
+        const visible = features.slice(0, Math.max(this.maxRenderedRows - table.count, 0));
+        body.insertAdjacentHTML('beforeend', visible.map(feature => `
+            <tr>${table.columns.map(col => `<td>${this.escapeHTML((feature.properties || {})[col])}</td>`).join('')}</tr>
+        `).join(''));
+
+        table.count += features.length;
+        table.container.querySelector('.extract-count').textContent = table.count;
+    }
+
+    displayExtractDataResult(data, container, table) {
+        const dataset = data.dataset;
+        const header = container.querySelector('.result-header h3');
+        header.innerHTML = '<i class="fas fa-check-circle" style="color: var(--success-color);"></i> Dados Extraídos com Sucesso';
+
+        const shown = Math.min(dataset.total_registros, this.maxRenderedRows);
+        container.querySelector('.extract-summary').innerHTML = `
                 <div class="stat-grid">
                     <div class="stat-item">
-                        <span class="stat-value">${dataset.total_registros}</span>
+                        <span class="stat-value">${this.escapeHTML(dataset.total_registros)}</span>
                         <span class="stat-label">Registros Extraídos</span>
                     </div>
                     <div class="stat-item">
@@ -312,40 +441,20 @@ class MCPInterface {
                         <span class="stat-label">Colunas</span>
                     </div>
                     <div class="stat-item">
-                        <span class="stat-value">${dataset.geometria_tipo}</span>
+                        <span class="stat-value">${this.escapeHTML(dataset.geometria_tipo)}</span>
                         <span class="stat-label">Tipo de Geometria</span>
                     </div>
                 </div>
-
-                <h4 style="margin-top: 1.5rem; margin-bottom: 1rem; color: var(--text-primary);">
-                    <i class="fas fa-columns"></i> Colunas do Dataset:
-                </h4>
-                <div style="display: flex; flex-wrap: wrap; gap: 0.5rem; margin-bottom: 1.5rem;">
-                    ${dataset.colunas.map(col =>
-                        `<span style="background: var(--success-color); color: white; padding: 0.5rem 1rem; border-radius: 20px; font-size: 0.85rem;">${col}</span>`
-                    ).join('')}
-                </div>
-
-                <h4 style="margin-bottom: 1rem; color: var(--text-primary);">
-                    <i class="fas fa-eye"></i> Amostra de Dados (primeiro registro):
-                </h4>
-                <pre style="background: var(--light-bg); padding: 1rem; border-radius: 8px; overflow-x: auto;">${JSON.stringify(dataset.amostra_dados, null, 2)}</pre>
-
-                <div style="margin-top: 1.5rem; padding: 1rem; background: #dbeafe; border-radius: 8px; border-left: 4px solid var(--info-color);">
-                    <strong style="color: var(--info-color);"><i class="fas fa-download"></i> Download:</strong>
-                    <p style="margin-top: 0.5rem; color: #1e40af;">Use as ferramentas MCP para baixar os dados completos em GeoJSON ou CSV.</p>
-                </div>
-            </div>
+                ${table && table.count > shown ? `<p style="margin: 1rem 0; color: var(--text-secondary);">Exibindo os primeiros ${shown} registros.</p>` : ''}
         `;
-        container.classList.add('show');
     }
 
     displayAnalyzeCapabilitiesResult(data, container) {
         const serviceTypesHTML = Object.entries(data.service_types)
             .map(([type, count]) =>
                 `<div style="display: flex; justify-content: space-between; align-items: center; padding: 0.75rem; background: var(--light-bg); border-radius: 8px;">
-                    <span><strong>${type}</strong></span>
-                    <span style="background: var(--primary-color); color: white; padding: 0.25rem 0.75rem; border-radius: 12px; font-weight: bold;">${count}</span>
+                    <span><strong>${this.escapeHTML(type)}</strong></span>
+                    <span style="background: var(--primary-color); color: white; padding: 0.25rem 0.75rem; border-radius: 12px; font-weight: bold;">${this.escapeHTML(count)}</span>
                 </div>`
             ).join('');
 
@@ -356,7 +465,7 @@ class MCPInterface {
             <div class="result-content">
                 <div class="stat-grid">
                     <div class="stat-item">
-                        <span class="stat-value">${data.total_services}</span>
+                        <span class="stat-value">${this.escapeHTML(data.total_services)}</span>
                         <span class="stat-label">Total de Serviços</span>
                     </div>
                     <div class="stat-item">
@@ -377,12 +486,12 @@ class MCPInterface {
                 </h4>
                 ${data.services_with_layers.map(item => `
                     <div style="background: var(--light-bg); padding: 1rem; border-radius: 8px; margin-bottom: 1rem;">
-                        <h5 style="color: var(--primary-color); margin-bottom: 0.5rem;">${item.service.descricao}</h5>
-                        <p><strong>Tipo:</strong> ${item.service.tipo} | <strong>Total de Camadas:</strong> ${item.total_layers}</p>
+                        <h5 style="color: var(--primary-color); margin-bottom: 0.5rem;">${this.escapeHTML(item.service.descricao)}</h5>
+                        <p><strong>Tipo:</strong> ${this.escapeHTML(item.service.tipo)} | <strong>Total de Camadas:</strong> ${this.escapeHTML(item.total_layers)}</p>
                         <p style="margin-top: 0.5rem;"><strong>Camadas de exemplo:</strong></p>
                         <div style="display: flex; flex-wrap: wrap; gap: 0.5rem; margin-top: 0.5rem;">
                             ${item.sample_layers.map(layer =>
-                                `<code style="background: white; padding: 0.25rem 0.75rem; border-radius: 4px; font-size: 0.85rem;">${layer}</code>`
+                                `<code style="background: white; padding: 0.25rem 0.75rem; border-radius: 4px; font-size: 0.85rem;">${this.escapeHTML(layer)}</code>`
                             ).join('')}
                         </div>
                     </div>
@@ -401,8 +510,8 @@ class MCPInterface {
                 <div class="alert alert-info">
                     <i class="fas fa-brain"></i>
                     <div>
-                        <strong>Órgão Analisado:</strong> ${data.orgao}<br>
-                        <strong>Objetivo:</strong> ${data.objetivo}
+                        <strong>Órgão Analisado:</strong> ${this.escapeHTML(data.orgao)}<br>
+                        <strong>Objetivo:</strong> ${this.escapeHTML(data.objetivo)}
                     </div>
                 </div>
 
@@ -412,7 +521,7 @@ class MCPInterface {
                 <ul style="list-style: none; padding: 0;">
                     ${data.insights.map(insight =>
                         `<li style="padding: 0.75rem; background: var(--light-bg); border-radius: 8px; margin-bottom: 0.5rem;">
-                            <i class="fas fa-check" style="color: var(--success-color);"></i> ${insight}
+                            <i class="fas fa-check" style="color: var(--success-color);"></i> ${this.escapeHTML(insight)}
                         </li>`
                     ).join('')}
                 </ul>
@@ -423,7 +532,7 @@ class MCPInterface {
                 <ul style="list-style: none; padding: 0;">
                     ${data.recomendacoes.map(rec =>
                         `<li style="padding: 0.75rem; background: #dbeafe; border-radius: 8px; margin-bottom: 0.5rem; border-left: 4px solid var(--info-color);">
-                            <i class="fas fa-arrow-right" style="color: var(--info-color);"></i> ${rec}
+                            <i class="fas fa-arrow-right" style="color: var(--info-color);"></i> ${this.escapeHTML(rec)}
                         </li>`
                     ).join('')}
                 </ul>
@@ -432,7 +541,7 @@ class MCPInterface {
                     <i class="fas fa-file-alt"></i> Relatório Completo:
                 </h4>
                 <div style="background: var(--light-bg); padding: 1rem; border-radius: 8px; max-height: 400px; overflow-y: auto;">
-                    <pre style="white-space: pre-wrap; margin: 0;">${data.relatorio_completo}</pre>
+                    <pre style="white-space: pre-wrap; margin: 0;">${this.escapeHTML(data.relatorio_completo)}</pre>
                 </div>
             </div>
         `;
@@ -442,12 +551,16 @@ class MCPInterface {
     displayGenerateReportResult(data, container, format) {
         let contentHTML = '';
 
-        if (format === 'markdown') {
-            contentHTML = `<pre style="white-space: pre-wrap; line-height: 1.6;">${data}</pre>`;
-        } else if (format === 'json') {
-            contentHTML = `<pre>${JSON.stringify(JSON.parse(data), null, 2)}</pre>`;
+        if (format === 'json') {
+            try {
+                contentHTML = `<pre>${this.escapeHTML(JSON.stringify(JSON.parse(data), null, 2))}</pre>`;
+            } catch (error) {
+                contentHTML = `<pre style="white-space: pre-wrap; line-height: 1.6;">${this.escapeHTML(data)}</pre>`;
+            }
         } else {
-            contentHTML = data;
+            // Texto do servidor sempre escapado (o formato html não gera marcação;
+            // relatórios em HTML, se existirem, devem ir para um <iframe sandbox srcdoc>)
+            contentHTML = `<pre style="white-space: pre-wrap; line-height: 1.6;">${this.escapeHTML(data)}</pre>`;
         }
 
         container.innerHTML = `
@@ -472,7 +585,7 @@ class MCPInterface {
                 <i class="fas fa-exclamation-triangle"></i>
                 <div>
                     <strong>Erro ao processar requisição:</strong><br>
-                    ${message}
+                    ${this.escapeHTML(message)}
                 </div>
             </div>
         `;
@@ -493,163 +606,13 @@ class MCPInterface {
         alert(`Funcionalidade de download em desenvolvimento.\nFormato: ${format}`);
     }
 
-    // Mock Data Simulators (substituir por chamadas reais ao MCP)
-    async simulateListServices(orgao) {
-        await this.delay(1000);
-        return {
-            total_services: 45,
-            orgaos_disponiveis: ["ANATEL", "ANA", "IBGE", "INCRA", "INPE", "DNIT", "ICMBio", "ANM", "ANP"],
-            services: [
-                { orgao: "ANATEL", tipo: "OWS", descricao: "ANATEL - Agência Nacional de Telecomunicações", url: "https://sistemas.anatel.gov.br/geoserver/ows" },
-                { orgao: "ANA", tipo: "WMS", descricao: "ANA - Agência Nacional de Águas", url: "https://www.snirh.gov.br/arcgis/services/INDE/Camadas/MapServer/WMSServer" },
-                { orgao: "IBGE", tipo: "WFS", descricao: "IBGE - Instituto Brasileiro de Geografia e Estatística", url: "https://geoservicos.ibge.gov.br/geoserver/wfs" },
-                { orgao: "INCRA", tipo: "OWS", descricao: "INCRA - Instituto Nacional de Colonização e Reforma Agrária", url: "https://geoservicos.incra.gov.br/geoserver/ows" },
-                { orgao: "INPE", tipo: "WMS", descricao: "INPE - Instituto Nacional de Pesquisas Espaciais", url: "http://www.dpi.inpe.br/terrabrasilis/geoserver/wms" }
-            ]
-        };
-    }
-
-    async simulateDiscoverLayers(orgao, serviceName) {
-        await this.delay(1500);
-        return {
-            service: {
-                orgao: orgao,
-                tipo: "OWS",
-                descricao: `${orgao} - ${serviceName}`,
-                url: `https://sistemas.${orgao.toLowerCase()}.gov.br/geoserver/ows`
-            },
-            total_layers: 12,
-            layers: [
-                `${orgao.toLowerCase()}:estacoes`,
-                `${orgao.toLowerCase()}:municipios`,
-                `${orgao.toLowerCase()}:estados`,
-                `${orgao.toLowerCase()}:infraestrutura`,
-                `${orgao.toLowerCase()}:cobertura`,
-                `${orgao.toLowerCase()}:analise_2024`
-            ]
-        };
-    }
-
-    async simulateExtractData(orgao, serviceName, layer, maxFeatures) {
-        await this.delay(2000);
-        return {
-            success: true,
-            dataset: {
-                servico: { orgao, tipo: "WFS", descricao: serviceName, url: "https://example.com" },
-                camada: layer,
-                total_registros: parseInt(maxFeatures),
-                colunas: ["id", "nome", "tipo", "status", "municipio", "uf", "latitude", "longitude"],
-                amostra_dados: {
-                    id: "001",
-                    nome: "Estação Central",
-                    tipo: "Principal",
-                    status: "Ativo",
-                    municipio: "São Paulo",
-                    uf: "SP",
-                    latitude: -23.5505,
-                    longitude: -46.6333
-                },
-                geometria_tipo: "Point"
-            }
-        };
-    }
-
-    async simulateAnalyzeCapabilities(orgao) {
-        await this.delay(1500);
-        return {
-            orgao: orgao,
-            total_services: 8,
-            service_types: {
-                "WFS": 3,
-                "WMS": 2,
-                "OWS": 3
-            },
-            services_with_layers: [
-                {
-                    service: {
-                        orgao: orgao,
-                        tipo: "OWS",
-                        descricao: `${orgao} - Serviço Principal`,
-                        url: `https://geoservicos.${orgao.toLowerCase()}.gov.br/geoserver/ows`
-                    },
-                    total_layers: 24,
-                    sample_layers: [`${orgao}:layer1`, `${orgao}:layer2`, `${orgao}:layer3`]
-                }
-            ]
-        };
-    }
-
-    async simulateIntelligentAnalysis(orgao, objetivo) {
-        await this.delay(3000);
-        return {
-            orgao: orgao,
-            objetivo: objetivo,
-            datasets_analisados: [`${orgao}:dados_principais`, `${orgao}:historico`],
-            insights: [
-                `Identificados ${Math.floor(Math.random() * 100 + 50)} datasets relevantes para ${objetivo}`,
-                `Cobertura geográfica abrange ${Math.floor(Math.random() * 27)} estados brasileiros`,
-                `Dados atualizados com frequência mensal em 78% dos datasets`,
-                `Qualidade dos dados classificada como "Alta" em 85% das camadas analisadas`
-            ],
-            recomendacoes: [
-                `Utilizar camadas WFS para extração detalhada de dados`,
-                `Aplicar filtros espaciais para otimizar consultas em áreas específicas`,
-                `Considerar integração com outras fontes de dados governamentais`,
-                `Implementar cache local para datasets frequentemente acessados`
-            ],
-            relatorio_completo: `Relatório de Análise Inteligente - ${orgao}\n\nObjetivo: ${objetivo}\n\nResumo Executivo:\nA análise automatizada identificou padrões relevantes nos dados do ${orgao}. Os datasets apresentam boa qualidade e cobertura nacional, sendo adequados para análises em larga escala.\n\nPrincipais Descobertas:\n- Alta disponibilidade de serviços (uptime > 95%)\n- Metadados bem documentados\n- Suporte a múltiplos formatos de saída\n\nPróximos Passos:\n1. Validação manual de dados críticos\n2. Integração com pipeline de análise\n3. Configuração de alertas automáticos`
-        };
-    }
-
-    async simulateGenerateReport(orgao, format) {
-        await this.delay(2000);
-
-        if (format === 'markdown') {
-            return `# Relatório de Dados Geoespaciais - ${orgao}
-
-## Resumo Executivo
-- **Total de Serviços**: 8
-- **Tipos de Serviços**: WFS, WMS, OWS
-- **Data da Análise**: ${new Date().toLocaleDateString('pt-BR')}
-
-## Distribuição por Tipo de Serviço
-- **WFS**: 3 serviços
-- **WMS**: 2 serviços
-- **OWS**: 3 serviços
-
-## Serviços com Camadas Identificadas
-
-### ${orgao} - Serviço Principal
-- **Tipo**: OWS
-- **URL**: https://geoservicos.${orgao.toLowerCase()}.gov.br/geoserver/ows
-- **Total de Camadas**: 24
-- **Camadas de Exemplo**: layer1, layer2, layer3
-
-## Recomendações
-1. Para análise detalhada, use serviços WFS que permitem extração de dados
-2. Para visualização rápida, utilize serviços WMS
-3. Verifique regularmente a disponibilidade dos serviços
-4. Considere limitações de performance para datasets grandes
-
----
-*Relatório gerado automaticamente pelo Sistema INDE MCP*`;
-        } else if (format === 'json') {
-            return JSON.stringify({
-                orgao: orgao,
-                total_servicos: 8,
-                tipos: ["WFS", "WMS", "OWS"],
-                data_analise: new Date().toISOString(),
-                servicos: [
-                    { tipo: "OWS", camadas: 24 }
-                ]
-            });
-        } else {
-            return `<h1>Relatório HTML - ${orgao}</h1><p>Relatório em HTML gerado com sucesso!</p>`;
-        }
-    }
-
-    delay(ms) {
-        return new Promise(resolve => setTimeout(resolve, ms));
+    escapeHTML(value) {
+        return String(value ?? '')
+            .replace(/&/g, '&amp;')
+            .replace(/</g, '&lt;')
+            .replace(/>/g, '&gt;')
+            .replace(/"/g, '&quot;')
+            .replace(/'/g, '&#39;');
     }
 }
 
@@ -2,39 +2,498 @@
 """
 Servidor HTTP simples para hospedar a interface web do INDE MCP
 
+Atende várias conexões em paralelo (uma thread por conexão, HTTP/1.1 com
+keep-alive) e mantém os arquivos da interface em memória, com variantes
+gzip/brotli pré-comprimidas, ETag e Cache-Control.
+
+Também expõe as ferramentas do INDE MCP em /api (gateway HTTP/JSON). As
+extrações são transmitidas em NDJSON, página a página, à medida que chegam
+do serviço WFS.
+
 Uso:
     python3 server.py [porta]
 
 Exemplo:
     python3 server.py 8080
+
+Por padrão escuta só em 127.0.0.1 (INDE_INTERFACE_HOST=0.0.0.0 expõe na
+rede) e /api recusa chamadas de outras origens (INDE_INTERFACE_CORS_ORIGIN
+autoriza uma origem específica).
 """
 
+import asyncio
+import concurrent.futures
+import gzip
+import hashlib
 import http.server
-import socketserver
-import sys
+import json
+import mimetypes
 import os
+import sys
+import threading
+import time
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qsl, urlsplit
+
+# Brotli é opcional
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
 
 # Configurações
 DEFAULT_PORT = 8000
+# Só a máquina local por padrão: /api dispara extrações e análises sem autenticação
+DEFAULT_HOST = os.getenv("INDE_INTERFACE_HOST", "127.0.0.1")
+# Origem extra autorizada a chamar /api (a interface é servida pela mesma origem)
+CORS_ORIGIN = os.getenv("INDE_INTERFACE_CORS_ORIGIN", "")
 INTERFACE_DIR = Path(__file__).parent
 
-class CustomHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
-    """Handler customizado para servir arquivos da interface"""
+# Extensões servidas e as que valem a pena comprimir
+STATIC_EXTENSIONS = {".html", ".js", ".css", ".json", ".svg", ".png", ".ico", ".jpg", ".webp"}
+COMPRESSIBLE_EXTENSIONS = {".html", ".js", ".css", ".json", ".svg"}
+
+# index.html é sempre revalidado; demais arquivos podem ficar em cache por 1h
+CACHE_CONTROL_HTML = "no-cache"
+CACHE_CONTROL_ASSETS = "public, max-age=3600"
+
+# Intervalo mínimo entre verificações de alteração em disco (segundos)
+RELOAD_CHECK_INTERVAL = 1.0
+
+# Gateway: tempo máximo por chamada/página (segundos) e tamanho das páginas WFS
+GATEWAY_TIMEOUT = float(os.getenv("INTERFACE_GATEWAY_TIMEOUT", "300"))
+STREAM_PAGE_SIZE = int(os.getenv("INTERFACE_STREAM_PAGE_SIZE", "200"))
+
+# Respostas JSON maiores que isso são comprimidas com gzip
+MIN_COMPRESS_SIZE = 1024
+
+
+@dataclass
+class StaticAsset:
+    """Arquivo da interface em memória, com variantes comprimidas."""
+    path: Path
+    mtime_ns: int
+    content_type: str
+    etag: str
+    cache_control: str
+    body: bytes
+    gzip_body: Optional[bytes] = None
+    brotli_body: Optional[bytes] = None
+    checked_at: float = 0.0
+
+
+def load_asset(path: Path) -> StaticAsset:
+    """Lê um arquivo e prepara ETag e variantes comprimidas."""
+    body = path.read_bytes()
+    content_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+    if content_type.startswith("text/") or content_type in ("application/javascript", "application/json"):
+        content_type += "; charset=utf-8"
+
+    asset = StaticAsset(
+        path=path,
+        mtime_ns=path.stat().st_mtime_ns,
+        content_type=content_type,
+        etag='"' + hashlib.sha1(body).hexdigest()[:20] + '"',
+        cache_control=CACHE_CONTROL_HTML if path.suffix == ".html" else CACHE_CONTROL_ASSETS,
+        body=body,
+        checked_at=time.monotonic()
+    )
+
+    if path.suffix in COMPRESSIBLE_EXTENSIONS and len(body) > 512:
+        asset.gzip_body = gzip.compress(body, compresslevel=9)
+        if BROTLI_AVAILABLE:
+            asset.brotli_body = brotli.compress(body, quality=11)
+
+    return asset
+
+
+class AssetCache:
+    """Arquivos da interface carregados uma vez e recarregados se mudarem em disco."""
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.assets: Dict[str, StaticAsset] = {}
+        self._lock = threading.Lock()
+
+        for path in sorted(directory.iterdir()):
+            if path.is_file() and path.suffix in STATIC_EXTENSIONS:
+                self.assets["/" + path.name] = load_asset(path)
+
+    def get(self, url_path: str) -> Optional[StaticAsset]:
+        if url_path == "/":
+            url_path = "/index.html"
+
+        asset = self.assets.get(url_path)
+        if asset is None:
+            return None
+
+        now = time.monotonic()
+        if now - asset.checked_at >= RELOAD_CHECK_INTERVAL:
+            asset.checked_at = now
+            try:
+                if asset.path.stat().st_mtime_ns != asset.mtime_ns:
+                    with self._lock:
+                        asset = self.assets[url_path] = load_asset(asset.path)
+            except FileNotFoundError:
+                return None
+
+        return asset
+
+
+def accepted_encodings(header: str) -> set:
+    """Codificações aceitas pelo cliente (ignorando as com q=0)."""
+    encodings = set()
+    for item in header.split(","):
+        name, _, params = item.strip().partition(";")
+        if params.replace(" ", "") in ("q=0", "q=0.0"):
+            continue
+        if name:
+            encodings.add(name.strip().lower())
+    return encodings
+
+
+class GatewayError(Exception):
+    """Erro do gateway com o status HTTP correspondente."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+# Rota -> (ferramenta MCP, parâmetros: nome -> (tipo, obrigatório))
+API_TOOLS = {
+    "/api/services": ("list_inde_services", {"orgao": (str, False)}),
+    "/api/layers": ("discover_service_layers", {"orgao": (str, True), "service_name": (str, True)}),
+    "/api/capabilities": ("analyze_organization_capabilities", {
+        "orgao": (str, True), "deadline_seconds": (float, False)
+    }),
+    "/api/analysis": ("intelligent_data_analysis", {
+        "orgao": (str, True), "objetivo": (str, True), "bypass_cache": (bool, False),
+        "deadline_seconds": (float, False)
+    }),
+    "/api/report": ("generate_data_report", {"orgao": (str, True), "format": (str, False)}),
+    "/api/municipios": ("find_nearest_municipalities", {
+        "latitude": (float, True), "longitude": (float, True), "k": (int, False),
+        "max_distance_km": (float, False)
+    }),
+}
+
+# Parâmetros da extração transmitida (/api/extract)
+EXTRACT_PARAMS = {
+    "orgao": (str, True), "service_name": (str, True), "layer": (str, True),
+    "max_features": (int, False), "page_size": (int, False), "municipios": (bool, False)
+}
+
+
+def parse_params(spec: Dict[str, tuple], values: Dict[str, Any]) -> Dict[str, Any]:
+    """Valida e converte os parâmetros de uma rota da API."""
+    params = {}
+    for name, (kind, required) in spec.items():
+        value = values.get(name)
+        if value is None or value == "":
+            if required:
+                raise GatewayError(400, f"Parâmetro obrigatório ausente: {name}")
+            continue
+        try:
+            if kind is bool and isinstance(value, str):
+                value = value.lower() in ("1", "true", "on", "sim")
+            else:
+                value = kind(value)
+        except (TypeError, ValueError):
+            raise GatewayError(400, f"Valor inválido para {name}: {value!r}")
+        params[name] = value
+    return params
+
+
+class ToolGateway:
+    """Executa as ferramentas do INDE MCP a partir das threads do servidor HTTP.
+
+    O módulo do servidor MCP só é importado na primeira chamada. Todas as
+    chamadas rodam em um único event loop, compartilhando catálogo, caches e
+    pool de conexões; quando embutido no servidor MCP, usa o loop dele.
+    """
+
+    def __init__(self, module=None, loop: Optional[asyncio.AbstractEventLoop] = None,
+                 timeout: float = GATEWAY_TIMEOUT):
+        self.module = module
+        self.loop = loop
+        self.timeout = timeout
+        self._lock = threading.Lock()
+
+    def _ensure(self):
+        with self._lock:
+            if self.module is None:
+                if str(INTERFACE_DIR.parent) not in sys.path:
+                    sys.path.insert(0, str(INTERFACE_DIR.parent))
+                try:
+                    import mcp_inde_server_main
+                except ImportError as e:
+                    raise GatewayError(503, f"Servidor INDE MCP indisponível: {e}")
+                self.module = mcp_inde_server_main
+
+            if self.loop is None:
+                self.loop = asyncio.new_event_loop()
+                threading.Thread(target=self.loop.run_forever, name="interface-gateway", daemon=True).start()
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, directory=str(INTERFACE_DIR), **kwargs)
+        return self.module
+
+    def run(self, coro):
+        """Executa uma corrotina no loop do gateway e aguarda o resultado."""
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        try:
+            return future.result(self.timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise GatewayError(504, f"Tempo limite de {self.timeout:.0f}s excedido")
+
+    def tools(self) -> list:
+        return sorted(self._ensure().TOOL_FUNCTIONS)
+
+    def call_tool(self, name: str, params: Dict[str, Any]):
+        """Chama uma ferramenta MCP (com as mesmas métricas e spans do MCP)."""
+        tool = self._ensure().TOOL_FUNCTIONS[name]
+        return self.run(tool(**params))
+
+    def stream_dataset(self, params: Dict[str, Any]):
+        """Eventos da extração paginada, entregues à medida que são produzidos.
+
+        Cada evento é pedido ao loop só depois que o anterior foi enviado ao
+        cliente, então um cliente lento não acumula páginas em memória.
+        """
+        module = self._ensure()
+        params.setdefault("page_size", STREAM_PAGE_SIZE)
+        if params.pop("municipios", False):
+            # Carregado antes do início da resposta, para falhar com status próprio
+            try:
+                params["municipios"] = self.run(module.get_municipios_index())
+            except GatewayError:
+                raise
+            except Exception as e:
+                raise GatewayError(503, f"Índice de municípios indisponível: {e}")
+        return self._relay(module, module.inde_tools.stream_dataset(**params), params["orgao"])
+
+    def _relay(self, module, events, orgao: str):
+        done = object()
+
+        async def next_event():
+            try:
+                return await events.__anext__()
+            except StopAsyncIteration:
+                return done
+
+        status = "error"
+        start_time = time.perf_counter()
+        try:
+            while True:
+                event = self.run(next_event())
+                if event is done:
+                    return
+                if event["type"] == "end":
+                    status = "success"
+                yield event
+        finally:
+            self.run(events.aclose())
+            module.metrics_collector.record_request(
+                orgao, "stream_geospatial_data", time.perf_counter() - start_time, status
+            )
+
+
+class CustomHTTPRequestHandler(http.server.BaseHTTPRequestHandler):
+    """Handler que serve a interface a partir do cache em memória"""
+
+    protocol_version = "HTTP/1.1"  # Keep-alive
+    disable_nagle_algorithm = True  # Cabeçalhos e corpo saem em escritas separadas
+    assets: AssetCache = None
+    gateway: ToolGateway = None
+    log_file = None  # Padrão: stdout (stderr quando embutido no servidor MCP)
 
     def end_headers(self):
-        # Adicionar headers CORS para permitir chamadas da interface
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        # CORS apenas para a origem configurada (a interface usa a mesma origem)
+        if CORS_ORIGIN and self.headers.get("Origin") == CORS_ORIGIN:
+            self.send_header('Access-Control-Allow-Origin', CORS_ORIGIN)
+            self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
+            self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+            self.send_header('Vary', 'Origin')
         super().end_headers()
 
+    def is_cross_origin(self) -> bool:
+        """Requisição disparada por outra página no navegador (CORS não impede o envio)."""
+        origin = self.headers.get("Origin")
+        if origin:
+            return origin not in (f"http://{self.headers.get('Host', '')}", CORS_ORIGIN)
+        return self.headers.get("Sec-Fetch-Site") in ("cross-site", "same-site")
+
     def log_message(self, format, *args):
         # Log customizado mais legível
-        print(f"[{self.log_date_time_string()}] {format % args}")
+        print(f"[{self.log_date_time_string()}] {format % args}", file=self.log_file or sys.stdout)
+
+    def send_body(self, status: int, body: bytes, content_type: str, headers: Optional[Dict[str, str]] = None):
+        """Envia uma resposta completa (com Content-Length, para keep-alive)."""
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def send_json(self, status: int, data: Any):
+        """Envia JSON (comprimido com gzip quando o cliente aceita e compensa)."""
+        body = json.dumps(data, ensure_ascii=False, default=str).encode("utf-8")
+        headers = {"Cache-Control": "no-store", "Vary": "Accept-Encoding"}
+        if len(body) > MIN_COMPRESS_SIZE and "gzip" in accepted_encodings(self.headers.get("Accept-Encoding", "")):
+            body = gzip.compress(body, compresslevel=6)
+            headers["Content-Encoding"] = "gzip"
+        self.send_body(status, body, "application/json; charset=utf-8", headers)
+
+    def send_ndjson_stream(self, events):
+        """Transmite eventos como NDJSON (uma linha por chunk HTTP)."""
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson; charset=utf-8")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.send_header("Cache-Control", "no-store")
+        self.send_header("X-Accel-Buffering", "no")
+        self.end_headers()
+
+        def write_chunk(data: bytes):
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+
+        try:
+            try:
+                for event in events:
+                    write_chunk(json.dumps(event, ensure_ascii=False, default=str).encode("utf-8") + b"\n")
+            except (BrokenPipeError, ConnectionResetError):
+                raise
+            except Exception as e:
+                # Cabeçalhos já enviados: o erro vira o último evento do stream
+                write_chunk(json.dumps({"type": "error", "error": str(e)}, ensure_ascii=False).encode("utf-8") + b"\n")
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # Cliente desistiu: o gerador é fechado e a extração interrompida
+            self.close_connection = True
+        finally:
+            events.close()
+
+    def read_params(self) -> Dict[str, Any]:
+        """Parâmetros da query string e, em POST, do corpo JSON."""
+        params: Dict[str, Any] = dict(parse_qsl(urlsplit(self.path).query))
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            try:
+                body = json.loads(self.rfile.read(length))
+            except ValueError:
+                raise GatewayError(400, "Corpo JSON inválido")
+            if not isinstance(body, dict):
+                raise GatewayError(400, "O corpo deve ser um objeto JSON")
+            params.update(body)
+        return params
+
+    def handle_api(self, path: str):
+        """Rotas do gateway HTTP/JSON para as ferramentas do INDE MCP."""
+        if self.is_cross_origin():
+            self.send_json(403, {"error": "Origem não autorizada"})
+            return
+        try:
+            values = self.read_params()
+            if path == "/api/status":
+                self.send_json(200, {"status": "ok", "tools": self.gateway.tools()})
+            elif path == "/api/extract":
+                params = parse_params(EXTRACT_PARAMS, values)
+                events = self.gateway.stream_dataset(params)
+                self.send_ndjson_stream(events)
+            elif path in API_TOOLS:
+                tool, spec = API_TOOLS[path]
+                result = self.gateway.call_tool(tool, parse_params(spec, values))
+                if isinstance(result, str):
+                    result = {"format": values.get("format", "markdown"), "report": result}
+                self.send_json(200, result)
+            else:
+                self.send_json(404, {"error": f"Rota desconhecida: {path}"})
+        except GatewayError as e:
+            self.send_json(e.status, {"error": str(e)})
+        except Exception as e:
+            self.send_json(500, {"error": f"Erro interno: {e}"})
+
+    def do_OPTIONS(self):
+        self.send_response(204)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def do_POST(self):
+        path = self.path.split("?", 1)[0]
+        if path.startswith("/api/"):
+            self.handle_api(path)
+        else:
+            self.send_body(405, b"Method Not Allowed", "text/plain; charset=utf-8")
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        if path.startswith("/api/"):
+            if self.command == "HEAD":
+                self.send_body(405, b"Method Not Allowed", "text/plain; charset=utf-8")
+            else:
+                self.handle_api(path)
+            return
+
+        asset = self.assets.get(path)
+        if asset is None:
+            self.send_body(404, b"Not Found", "text/plain; charset=utf-8")
+            return
+
+        headers = {
+            "ETag": asset.etag,
+            "Cache-Control": asset.cache_control,
+            "Vary": "Accept-Encoding"
+        }
+
+        if_none_match = self.headers.get("If-None-Match", "")
+        if asset.etag in [tag.strip() for tag in if_none_match.split(",")]:
+            self.send_response(304)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        body = asset.body
+        encodings = accepted_encodings(self.headers.get("Accept-Encoding", ""))
+        if asset.brotli_body is not None and "br" in encodings:
+            body = asset.brotli_body
+            headers["Content-Encoding"] = "br"
+        elif asset.gzip_body is not None and "gzip" in encodings:
+            body = asset.gzip_body
+            headers["Content-Encoding"] = "gzip"
+
+        self.send_body(200, body, asset.content_type, headers)
+
+
+class InterfaceHTTPServer(http.server.ThreadingHTTPServer):
+    """Servidor com uma thread por conexão."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def start_interface_server(port: int, host: str = DEFAULT_HOST,
+                           gateway: Optional[ToolGateway] = None) -> InterfaceHTTPServer:
+    """Inicia o servidor da interface em segundo plano (uso embutido no servidor MCP).
+
+    O log de acesso vai para stderr, já que stdout é o canal do protocolo MCP.
+    """
+    CustomHTTPRequestHandler.assets = AssetCache(INTERFACE_DIR)
+    CustomHTTPRequestHandler.gateway = gateway or ToolGateway()
+    CustomHTTPRequestHandler.log_file = sys.stderr
+
+    httpd = InterfaceHTTPServer((host, port), CustomHTTPRequestHandler)
+    threading.Thread(target=httpd.serve_forever, name="interface-http", daemon=True).start()
+    return httpd
 
 
 def main():
@@ -47,19 +506,20 @@ def main():
             print(f"Porta inválida '{sys.argv[1]}'. Usando porta padrão {DEFAULT_PORT}")
             port = DEFAULT_PORT
 
-    # Mudar para o diretório da interface
-    os.chdir(INTERFACE_DIR)
-
-    # Configurar servidor
+    # Carregar arquivos da interface em memória
+    CustomHTTPRequestHandler.assets = AssetCache(INTERFACE_DIR)
+    CustomHTTPRequestHandler.gateway = ToolGateway()
     Handler = CustomHTTPRequestHandler
 
     try:
-        with socketserver.TCPServer(("", port), Handler) as httpd:
+        with InterfaceHTTPServer((DEFAULT_HOST, port), Handler) as httpd:
             print("=" * 70)
             print("🌐 INDE MCP - Servidor de Interface Web")
             print("=" * 70)
-            print(f"\n✅ Servidor rodando em: http://localhost:{port}")
+            print(f"\n✅ Servidor rodando em: http://localhost:{port} (escutando em {DEFAULT_HOST})")
             print(f"📁 Diretório: {INTERFACE_DIR}")
+            print(f"🗜️  Compressão: gzip{' + brotli' if BROTLI_AVAILABLE else ''}")
+            print(f"🔌 Gateway das ferramentas MCP: http://localhost:{port}/api")
             print(f"\n📖 Para acessar a interface:")
             print(f"   Abra seu navegador e acesse: http://localhost:{port}")
             print(f"\n⚠️  Para parar o servidor, pressione Ctrl+C")
@@ -14,8 +14,16 @@ Uso: python mcp_inde_server.py
 """
 
 import asyncio
+import contextvars
+import functools
+import hashlib
 import json
 import logging
+import os
+import re
+import sys
+import time
+import unicodedata
 import yaml
 import pandas as pd
 import requests
@@ -24,18 +32,137 @@ from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Any, Optional, Tuple
 from dataclasses import dataclass, asdict
+from collections import Counter, OrderedDict
+from urllib.parse import urlparse
 
 # MCP e CrewAI
-from fastmcp import FastMCP
+from fastmcp import Context, FastMCP
 from pydantic import BaseModel
 from crewai import Agent, Task, Crew, Process
 from crewai.tools import BaseTool
 
+from inde_database import INDEDatabase, bbox_geometry
+from monitoring_system import MetricsCollector
+from municipios_index import MunicipioIndex
+from tracing import TracingHTTPAdapter, traced_get, tracer
+from runtime_profiler import SamplingProfiler, SlowCallbackWatchdog, register_tool_wrapper, run_labelled
+
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+# ================================
+# INSTRUMENTAÇÃO
+# ================================
+
+# Coletor compartilhado por ferramentas MCP e chamadas upstream
+metrics_collector = MetricsCollector()
+
+# Ferramenta e órgão da chamada em andamento, como ``(ferramenta, órgão)``
+# (propagados para threads e tarefas filhas)
+current_call: contextvars.ContextVar[Optional[Tuple[str, str]]] = contextvars.ContextVar(
+    "current_call", default=None
+)
+
+
+def instrument_tool(func):
+    """Mede duração e status de uma ferramenta MCP assíncrona.
+    
+    O resultado é marcado como erro quando a ferramenta levanta exceção ou
+    retorna um dicionário com a chave ``error``.
+    """
+    tool_name = func.__name__
+    
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        orgao = kwargs.get("orgao") or "-"
+        token = current_call.set((tool_name, orgao))
+        status = "error"
+        start_time = time.perf_counter()
+        try:
+            with tracer.start_span(f"mcp.tool {tool_name}", {"mcp.tool": tool_name, "inde.orgao": orgao},
+                                   kind="server") as span:
+                result = await func(*args, **kwargs)
+                if not (isinstance(result, dict) and "error" in result):
+                    status = "success"
+                else:
+                    span.set_error(str(result["error"]))
+            return result
+        finally:
+            metrics_collector.record_request(orgao, tool_name, time.perf_counter() - start_time, status)
+            current_call.reset(token)
+    
+    # Código próprio por ferramenta para atribuição no profiler e no watchdog
+    return register_tool_wrapper(wrapper, tool_name)
+
+
+def current_tool() -> Optional[str]:
+    """Ferramenta MCP da chamada em andamento (rótulo para threads de trabalho)."""
+    call = current_call.get()
+    return call[0] if call else None
+
+
+class ToolProgress:
+    """Progresso e prazo de uma chamada de ferramenta MCP.
+    
+    As notificações de progresso só são enviadas quando há um ``Context`` do
+    FastMCP (no gateway HTTP, por exemplo, são ignoradas); falhas no envio
+    nunca interrompem a ferramenta. ``partial`` guarda o que já foi obtido,
+    para ser devolvido se o prazo acabar.
+    """
+    
+    def __init__(self, ctx: Optional[Context] = None, deadline_seconds: Optional[float] = None):
+        self.ctx = ctx
+        self.deadline = time.monotonic() + deadline_seconds if deadline_seconds is not None else None
+        self.partial: Dict[str, Any] = {}
+        try:
+            self._loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._loop = None
+    
+    def remaining(self) -> Optional[float]:
+        """Segundos até o prazo (``None`` quando não há prazo)."""
+        if self.deadline is None:
+            return None
+        return max(self.deadline - time.monotonic(), 0.0)
+    
+    async def wait(self, awaitable):
+        """Aguarda respeitando o prazo (``asyncio.TimeoutError`` ao esgotar)."""
+        return await asyncio.wait_for(awaitable, self.remaining())
+    
+    async def report(self, progress: float, total: Optional[float] = None, message: Optional[str] = None):
+        """Envia uma notificação de progresso MCP."""
+        if self.ctx is None:
+            return
+        try:
+            try:
+                await self.ctx.report_progress(progress, total, message)
+            except TypeError:
+                # Versões do FastMCP sem o parâmetro ``message``
+                await self.ctx.report_progress(progress, total)
+        except Exception as e:
+            logger.debug(f"Falha ao enviar progresso: {e}")
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """Cópia de ``partial`` (listas copiadas, pois podem crescer em outra thread)."""
+        return {key: list(value) if isinstance(value, list) else value for key, value in self.partial.items()}
+    
+    def report_threadsafe(self, progress: float, total: Optional[float] = None, message: Optional[str] = None):
+        """``report`` a partir de threads de trabalho (ex.: callbacks do CrewAI)."""
+        if self.ctx is not None and self._loop is not None:
+            asyncio.run_coroutine_threadsafe(self.report(progress, total, message), self._loop)
+
+
+# Diagnóstico do event loop: bloqueios acima do limite e profiler sob demanda
+slow_callback_watchdog = SlowCallbackWatchdog(
+    threshold=float(os.getenv("SLOW_CALLBACK_MS", "100")) / 1000
+)
+sampling_profiler = SamplingProfiler(
+    interval=float(os.getenv("PROFILER_INTERVAL_MS", "10")) / 1000
+)
+
+
 # ================================
 # MODELOS DE DADOS
 # ================================
@@ -71,6 +198,20 @@ class AnalysisRequest(BaseModel):
     formato_saida: str = "relatorio"
 
 
+class ServiceTarget(BaseModel):
+    """Serviço alvo de uma operação em lote."""
+    orgao: str
+    service_name: str
+
+
+class LayerTarget(BaseModel):
+    """Camada alvo de uma extração em lote."""
+    orgao: str
+    service_name: str
+    layer: str
+    max_features: int = 1000
+
+
 class AnalysisResult(BaseModel):
     """Resultado de análise."""
     orgao: str
@@ -89,9 +230,51 @@ class AnalysisResult(BaseModel):
 class INDEDataExtractor:
     """Extrator de dados da INDE baseado na aplicação original."""
     
-    def __init__(self, catalog_path: str = "catalogo_inde.yaml"):
+    def __init__(self, catalog_path: str = "catalogo_inde.yaml", max_concurrent: Optional[int] = None):
         self.catalog_path = Path(catalog_path)
         self.services_cache = {}
+        self.max_concurrent = max_concurrent or int(os.getenv("MAX_CONCURRENT", "5"))
+        
+        # Sessão HTTP compartilhada (reaproveita conexões entre requisições)
+        self.session = requests.Session()
+        adapter = TracingHTTPAdapter(
+            pool_connections=self.max_concurrent,
+            pool_maxsize=self.max_concurrent * 2
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._semaphore: Optional[asyncio.Semaphore] = None
+    
+    async def _http_get(self, url: str, params: Optional[Dict[str, Any]] = None, timeout: float = 15) -> requests.Response:
+        """Executa GET em thread separada, sem bloquear o event loop.
+        
+        O número de requisições simultâneas é limitado por ``max_concurrent``.
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        
+        host = urlparse(url).netloc
+        with tracer.start_span("http.get", {"http.url": url, "server.address": host}, kind="client") as span:
+            queued_at = time.perf_counter()
+            async with self._semaphore:
+                span.set_attribute("inde.queue_wait_ms", (time.perf_counter() - queued_at) * 1000)
+                status = "error"
+                metrics_collector.connection_opened()
+                start_time = time.perf_counter()
+                try:
+                    # Fases (DNS, conexão, TLS, TTFB, download) viram spans filhos
+                    response = await asyncio.to_thread(
+                        run_labelled, current_tool(), traced_get, self.session, url, params=params, timeout=timeout
+                    )
+                    span.set_attribute("http.status_code", response.status_code)
+                    if response.status_code < 400:
+                        status = "success"
+                    else:
+                        span.set_error(f"HTTP {response.status_code}")
+                    return response
+                finally:
+                    metrics_collector.connection_closed()
+                    metrics_collector.record_upstream(host, time.perf_counter() - start_time, status)
     
     async def load_catalog(self) -> List[GeoService]:
         """Carrega catálogo de serviços."""
@@ -121,6 +304,14 @@ class INDEDataExtractor:
             logger.error(f"Erro ao carregar catálogo: {e}")
             return []
     
+    def catalog_version(self) -> str:
+        """Identificador da versão do catálogo (muda quando o arquivo é alterado)."""
+        try:
+            stat = self.catalog_path.stat()
+            return f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+        except OSError:
+            return "indisponivel"
+    
     def _extract_service_type(self, url: str) -> str:
         """Extrai tipo de serviço da URL."""
         url_lower = url.lower()
@@ -163,42 +354,47 @@ class INDEDataExtractor:
                 "version": "2.0.0"
             }
             
-            response = requests.get(url, params=params, timeout=15)
+            response = await self._http_get(url, params=params, timeout=15)
             response.raise_for_status()
             
-            tree = ET.fromstring(response.content)
-            
-            # Tentar diferentes namespaces
-            namespaces = [
-                {"wfs": "http://www.opengis.net/wfs/2.0"},
-                {"wfs": "http://www.opengis.net/wfs"},
-                {}
-            ]
-            
-            layers = []
-            for ns in namespaces:
-                try:
-                    if ns:
-                        features = tree.findall(".//wfs:FeatureType/wfs:Name", ns)
-                        if not features:
-                            features = tree.findall(".//FeatureType/Name", ns)
-                    else:
-                        features = tree.findall(".//FeatureType/Name")
-                    
-                    for feature in features:
-                        if feature is not None and feature.text:
-                            layers.append(feature.text)
-                    
-                    if layers:
-                        break
-                except:
-                    continue
-            
-            return list(set(layers))
+            with tracer.start_span("ogc.parse_capabilities", {"ogc.service": "WFS"}):
+                return self._parse_wfs_layers(response.content)
         except Exception as e:
             logger.error(f"Erro ao obter camadas WFS: {e}")
             return []
     
+    def _parse_wfs_layers(self, content: bytes) -> List[str]:
+        """Extrai os nomes das camadas de um documento WFS GetCapabilities."""
+        tree = ET.fromstring(content)
+        
+        # Tentar diferentes namespaces
+        namespaces = [
+            {"wfs": "http://www.opengis.net/wfs/2.0"},
+            {"wfs": "http://www.opengis.net/wfs"},
+            {}
+        ]
+        
+        layers = []
+        for ns in namespaces:
+            try:
+                if ns:
+                    features = tree.findall(".//wfs:FeatureType/wfs:Name", ns)
+                    if not features:
+                        features = tree.findall(".//FeatureType/Name", ns)
+                else:
+                    features = tree.findall(".//FeatureType/Name")
+                
+                for feature in features:
+                    if feature is not None and feature.text:
+                        layers.append(feature.text)
+                
+                if layers:
+                    break
+            except:
+                continue
+        
+        return list(set(layers))
+    
     async def _get_wms_layers(self, url: str) -> List[str]:
         """Obtém camadas WMS."""
         try:
@@ -208,42 +404,47 @@ class INDEDataExtractor:
                 "version": "1.3.0"
             }
             
-            response = requests.get(url, params=params, timeout=15)
+            response = await self._http_get(url, params=params, timeout=15)
             response.raise_for_status()
             
-            tree = ET.fromstring(response.content)
-            
-            # Tentar diferentes namespaces
-            namespaces = [
-                {"wms": "http://www.opengis.net/wms"},
-                {"": "http://www.opengis.net/wms"},
-                {}
-            ]
-            
-            layers = []
-            for ns in namespaces:
-                try:
-                    if ns:
-                        layer_elements = tree.findall(".//wms:Layer/wms:Name", ns)
-                        if not layer_elements:
-                            layer_elements = tree.findall(".//Layer/Name", ns)
-                    else:
-                        layer_elements = tree.findall(".//Layer/Name")
-                    
-                    for layer in layer_elements:
-                        if layer is not None and layer.text:
-                            layers.append(layer.text)
-                    
-                    if layers:
-                        break
-                except:
-                    continue
-            
-            return list(set(layers))
+            with tracer.start_span("ogc.parse_capabilities", {"ogc.service": "WMS"}):
+                return self._parse_wms_layers(response.content)
         except Exception as e:
             logger.error(f"Erro ao obter camadas WMS: {e}")
             return []
     
+    def _parse_wms_layers(self, content: bytes) -> List[str]:
+        """Extrai os nomes das camadas de um documento WMS GetCapabilities."""
+        tree = ET.fromstring(content)
+        
+        # Tentar diferentes namespaces
+        namespaces = [
+            {"wms": "http://www.opengis.net/wms"},
+            {"": "http://www.opengis.net/wms"},
+            {}
+        ]
+        
+        layers = []
+        for ns in namespaces:
+            try:
+                if ns:
+                    layer_elements = tree.findall(".//wms:Layer/wms:Name", ns)
+                    if not layer_elements:
+                        layer_elements = tree.findall(".//Layer/Name", ns)
+                else:
+                    layer_elements = tree.findall(".//Layer/Name")
+                
+                for layer in layer_elements:
+                    if layer is not None and layer.text:
+                        layers.append(layer.text)
+                
+                if layers:
+                    break
+            except:
+                continue
+        
+        return list(set(layers))
+    
     async def extract_data(self, service: GeoService, layer: str, max_features: int = 1000) -> Optional[DatasetInfo]:
         """Extrai dados de uma camada WFS."""
         try:
@@ -257,58 +458,198 @@ class INDEDataExtractor:
             else:
                 wfs_url = f"{service.url}?service=WFS&request=GetFeature&typeName={layer}&outputFormat=application/json&maxFeatures={max_features}"
             
-            response = requests.get(wfs_url, timeout=30)
+            response = await self._http_get(wfs_url, timeout=30)
             response.raise_for_status()
             
             if response.status_code == 200 and response.content:
-                geojson_data = response.json()
-                
-                if 'features' in geojson_data and len(geojson_data['features']) > 0:
-                    # Extrair informações do dataset
-                    features = geojson_data['features']
-                    first_feature = features[0]
-                    
-                    properties = first_feature.get('properties', {})
-                    geometry = first_feature.get('geometry', {})
-                    
-                    dataset_info = DatasetInfo(
-                        servico=service,
-                        camada=layer,
-                        total_registros=len(features),
-                        colunas=list(properties.keys()),
-                        amostra_dados=properties,
-                        geometria_tipo=geometry.get('type', 'Unknown')
-                    )
-                    
-                    # Calcular bbox se disponível
-                    if 'bbox' in geojson_data:
-                        dataset_info.bbox = geojson_data['bbox']
-                    
-                    return dataset_info
+                with tracer.start_span("geojson.parse", {"http.response.body.size": len(response.content)}):
+                    geojson = response.json()
+                with tracer.start_span("geojson.profile"):
+                    return self._profile_geojson(service, layer, geojson)
                 
             return None
         except Exception as e:
             logger.error(f"Erro ao extrair dados: {e}")
             return None
+    
+    async def iter_features(self, service: GeoService, layer: str, max_features: int = 1000,
+                            page_size: int = 200):
+        """Percorre as feições de uma camada WFS em páginas (startIndex/count).
+
+        Cada página (FeatureCollection) é devolvida assim que chega, para que
+        as primeiras feições possam ser usadas enquanto o restante é baixado.
+        Servidores que ignoram a paginação têm a primeira resposta truncada
+        em ``max_features`` e a iteração termina nela.
+        """
+        if service.tipo not in ["WFS", "OWS"]:
+            raise ValueError(f"Extração de dados não suportada para {service.tipo}")
+
+        offset = 0
+        while offset < max_features:
+            count = min(page_size, max_features - offset)
+            params = {
+                "service": "WFS",
+                "request": "GetFeature",
+                "version": "2.0.0",
+                "typeNames": layer,
+                "outputFormat": "application/json",
+                "count": count,
+                "startIndex": offset
+            }
+
+            response = await self._http_get(service.url, params=params, timeout=30)
+            response.raise_for_status()
+            with tracer.start_span("geojson.parse", {"http.response.body.size": len(response.content)}):
+                page = response.json()
+
+            features = page.get("features") or []
+            paged = len(features) <= count
+            page["features"] = features[:max_features - offset]
+            if page["features"]:
+                yield page
+
+            offset += len(page["features"])
+            if not paged or len(features) < count:
+                break
+
+    def _profile_geojson(self, service: GeoService, layer: str, geojson_data: Dict[str, Any]) -> Optional[DatasetInfo]:
+        """Resume uma FeatureCollection GeoJSON em um DatasetInfo."""
+        if 'features' in geojson_data and len(geojson_data['features']) > 0:
+            # Extrair informações do dataset
+            features = geojson_data['features']
+            first_feature = features[0]
+            
+            properties = first_feature.get('properties', {})
+            geometry = first_feature.get('geometry', {})
+            
+            dataset_info = DatasetInfo(
+                servico=service,
+                camada=layer,
+                total_registros=len(features),
+                colunas=list(properties.keys()),
+                amostra_dados=properties,
+                geometria_tipo=geometry.get('type', 'Unknown')
+            )
+            
+            # Calcular bbox se disponível
+            if 'bbox' in geojson_data:
+                dataset_info.bbox = geojson_data['bbox']
+            
+            return dataset_info
+        
+        return None
+    
+    async def describe_layer_schema(self, service: GeoService, layer: str) -> Dict[str, str]:
+        """Obtém o esquema (atributo -> tipo) de uma camada via DescribeFeatureType."""
+        try:
+            if service.tipo not in ["WFS", "OWS"]:
+                return {}
+            
+            params = {
+                "service": "WFS",
+                "request": "DescribeFeatureType",
+                "version": "2.0.0",
+                "typeName": layer
+            }
+            
+            response = await self._http_get(service.url, params=params, timeout=15)
+            response.raise_for_status()
+            
+            tree = ET.fromstring(response.content)
+            xsd = "{http://www.w3.org/2001/XMLSchema}"
+            
+            schema = {}
+            for element in tree.iter(f"{xsd}element"):
+                name = element.get("name")
+                # Elementos de topo descrevem o próprio FeatureType, não atributos
+                if name and element.get("type") and element.get("substitutionGroup") is None:
+                    schema[name] = element.get("type").split(":")[-1]
+            
+            return schema
+        except Exception as e:
+            logger.error(f"Erro ao descrever camada {layer}: {e}")
+            return {}
+    
+    async def count_features(self, service: GeoService, layer: str) -> Optional[int]:
+        """Conta registros de uma camada com GetFeature resultType=hits."""
+        try:
+            if service.tipo not in ["WFS", "OWS"]:
+                return None
+            
+            params = {
+                "service": "WFS",
+                "request": "GetFeature",
+                "version": "2.0.0",
+                "typeNames": layer,
+                "resultType": "hits"
+            }
+            
+            response = await self._http_get(service.url, params=params, timeout=15)
+            response.raise_for_status()
+            
+            tree = ET.fromstring(response.content)
+            
+            # WFS 2.0 usa numberMatched; WFS 1.x usa numberOfFeatures
+            for attribute in ("numberMatched", "numberOfFeatures"):
+                value = tree.get(attribute)
+                if value is not None and value.isdigit():
+                    return int(value)
+            
+            return None
+        except Exception as e:
+            logger.error(f"Erro ao contar registros de {layer}: {e}")
+            return None
 
 
 # ================================
 # FERRAMENTAS MCP
 # ================================
 
+# Registros por página WFS nas extrações (uma notificação de progresso por página)
+EXTRACT_PAGE_SIZE = int(os.getenv("EXTRACT_PAGE_SIZE", "500"))
+
+# Itens por chamada das ferramentas em lote
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "20"))
+BATCH_DEADLINE_GRACE = 1.0
+
 class INDETools:
     """Ferramentas MCP para interação com INDE."""
     
-    def __init__(self):
-        self.extractor = INDEDataExtractor()
+    def __init__(self, catalog_path: Optional[str] = None):
+        self.extractor = INDEDataExtractor(catalog_path or os.getenv("CATALOG_PATH", "catalogo_inde.yaml"))
         self.services_cache = None
+        self._orgao_index: Dict[str, List[GeoService]] = {}
     
-    async def list_services(self, orgao: Optional[str] = None) -> Dict[str, Any]:
-        """Lista serviços disponíveis, opcionalmente filtrados por órgão."""
+    async def _ensure_catalog(self) -> List[GeoService]:
+        """Carrega o catálogo uma única vez e indexa os serviços por órgão."""
+        metrics_collector.record_cache("catalog", bool(self.services_cache))
         if not self.services_cache:
-            self.services_cache = await self.extractor.load_catalog()
+            with tracer.start_span("catalog.load"):
+                self.services_cache = await self.extractor.load_catalog()
+                self._orgao_index = {}
+                for service in self.services_cache:
+                    self._orgao_index.setdefault(service.orgao.lower(), []).append(service)
         
-        services = self.services_cache
+        return self.services_cache
+    
+    async def get_organization_services(self, orgao: str) -> List[GeoService]:
+        """Retorna os serviços do catálogo pertencentes exatamente a um órgão."""
+        await self._ensure_catalog()
+        return list(self._orgao_index.get(orgao.lower(), []))
+    
+    async def find_service(self, orgao: str, service_name: str) -> Optional[GeoService]:
+        """Localiza o primeiro serviço do órgão cuja descrição contém ``service_name``."""
+        await self._ensure_catalog()
+        with tracer.start_span("catalog.lookup", {"inde.orgao": orgao, "inde.service_name": service_name}):
+            service_name = service_name.lower()
+            for service in self._orgao_index.get(orgao.lower(), []):
+                if service_name in service.descricao.lower():
+                    return service
+            return None
+    
+    async def list_services(self, orgao: Optional[str] = None) -> Dict[str, Any]:
+        """Lista serviços disponíveis, opcionalmente filtrados por órgão."""
+        services = await self._ensure_catalog()
         
         if orgao:
             services = [s for s in services if orgao.lower() in s.orgao.lower()]
@@ -323,15 +664,7 @@ class INDETools:
     
     async def discover_service_layers(self, orgao: str, service_name: str) -> Dict[str, Any]:
         """Descobre camadas disponíveis em um serviço específico."""
-        if not self.services_cache:
-            self.services_cache = await self.extractor.load_catalog()
-        
-        # Encontrar serviço
-        service = None
-        for s in self.services_cache:
-            if s.orgao.lower() == orgao.lower() and service_name.lower() in s.descricao.lower():
-                service = s
-                break
+        service = await self.find_service(orgao, service_name)
         
         if not service:
             return {"error": f"Serviço não encontrado: {orgao} - {service_name}"}
@@ -344,47 +677,175 @@ class INDETools:
             "layers": layers
         }
     
-    async def extract_dataset(self, orgao: str, service_name: str, layer: str, max_features: int = 1000) -> Dict[str, Any]:
-        """Extrai dados de uma camada específica."""
-        if not self.services_cache:
-            self.services_cache = await self.extractor.load_catalog()
+    async def extract_dataset(self, orgao: str, service_name: str, layer: str, max_features: int = 1000,
+                              progress: Optional[ToolProgress] = None) -> Dict[str, Any]:
+        """Extrai dados de uma camada específica.
         
-        # Encontrar serviço
-        service = None
-        for s in self.services_cache:
-            if s.orgao.lower() == orgao.lower() and service_name.lower() in s.descricao.lower():
-                service = s
-                break
+        A camada é lida em páginas WFS, com uma notificação de progresso por
+        página. Se o prazo acabar, devolve o resumo do que já foi lido,
+        marcado como parcial.
+        """
+        service = await self.find_service(orgao, service_name)
         
         if not service:
             return {"error": f"Serviço não encontrado: {orgao} - {service_name}"}
         
-        dataset_info = await self.extractor.extract_data(service, layer, max_features)
+        progress = progress or ToolProgress()
+        dataset_info = None
+        total = 0
+        pages = self.extractor.iter_features(service, layer, max_features, EXTRACT_PAGE_SIZE)
+        try:
+            while True:
+                try:
+                    page = await progress.wait(pages.__anext__())
+                except StopAsyncIteration:
+                    break
+                if dataset_info is None:
+                    dataset_info = self.extractor._profile_geojson(service, layer, page)
+                total += len(page["features"])
+                await progress.report(total, max_features, f"{total} registros lidos")
+        except asyncio.TimeoutError:
+            if dataset_info is None:
+                return {"error": "Prazo esgotado antes do primeiro lote de registros", "deadline_exceeded": True}
+            dataset_info.total_registros = total
+            return {"success": True, "partial": True, "deadline_exceeded": True, "dataset": asdict(dataset_info)}
+        except Exception as e:
+            if dataset_info is None:
+                # Servidores sem paginação WFS 2.0: uma única requisição
+                logger.warning(f"Paginação WFS falhou para {layer} ({e}); tentando requisição única")
+                dataset_info = await self.extractor.extract_data(service, layer, max_features)
+                total = dataset_info.total_registros if dataset_info else 0
+            else:
+                logger.warning(f"Extração de {layer} interrompida após {total} registros: {e}")
+                dataset_info.total_registros = total
+                return {"success": True, "partial": True, "warning": str(e), "dataset": asdict(dataset_info)}
+        finally:
+            await pages.aclose()
         
         if dataset_info:
+            dataset_info.total_registros = total
             return {
                 "success": True,
                 "dataset": asdict(dataset_info)
             }
         else:
             return {"error": "Não foi possível extrair dados da camada"}
-    
-    async def analyze_service_capabilities(self, orgao: str) -> Dict[str, Any]:
-        """Analisa capacidades de todos os serviços de um órgão."""
-        if not self.services_cache:
-            self.services_cache = await self.extractor.load_catalog()
+
+    async def stream_dataset(self, orgao: str, service_name: str, layer: str, max_features: int = 1000,
+                             page_size: int = 200, municipios: Optional[MunicipioIndex] = None):
+        """Extrai uma camada em páginas, como uma sequência de eventos.
+
+        Eventos: ``start`` (serviço e camada), ``features`` (uma página, com o
+        deslocamento da primeira feição), ``end`` (resumo no formato de
+        ``extract_dataset``) ou ``error``. Com ``municipios``, cada feição
+        recebe o município mais próximo.
+        """
+        service = await self.find_service(orgao, service_name)
+        if not service:
+            yield {"type": "error", "error": f"Serviço não encontrado: {orgao} - {service_name}"}
+            return
+
+        yield {"type": "start", "service": asdict(service), "layer": layer, "max_features": max_features}
+
+        dataset_info = None
+        total = 0
+        try:
+            async for page in self.extractor.iter_features(service, layer, max_features, page_size):
+                if dataset_info is None:
+                    dataset_info = self.extractor._profile_geojson(service, layer, page)
+                if municipios is not None:
+                    municipios.annotate_features(page["features"])
+                yield {"type": "features", "offset": total, "features": page["features"]}
+                total += len(page["features"])
+        except Exception as e:
+            logger.error(f"Erro ao extrair dados: {e}")
+            yield {"type": "error", "error": f"Erro ao extrair dados: {e}", "total_registros": total}
+            return
+
+        if dataset_info is None:
+            yield {"type": "error", "error": "Não foi possível extrair dados da camada"}
+            return
+
+        dataset_info.total_registros = total
+        yield {"type": "end", "success": True, "dataset": asdict(dataset_info)}
+
+    async def count_by_municipality(self, orgao: str, service_name: str, layer: str, municipios: MunicipioIndex,
+                                    max_features: int = 1000, max_distance_km: Optional[float] = None,
+                                    progress: Optional[ToolProgress] = None) -> Dict[str, Any]:
+        """Conta as feições de uma camada por município.
+
+        Cada feição é atribuída ao município de centroide mais próximo (ou
+        ao ``cod_mun`` que já traz), página a página, sem consultar o banco.
+        """
+        service = await self.find_service(orgao, service_name)
+        if not service:
+            return {"error": f"Serviço não encontrado: {orgao} - {service_name}"}
+
+        progress = progress or ToolProgress()
+        counts: Counter = Counter()
+        total = 0
+        result: Dict[str, Any] = {"success": True}
+        pages = self.extractor.iter_features(service, layer, max_features, EXTRACT_PAGE_SIZE)
+        try:
+            while True:
+                try:
+                    page = await progress.wait(pages.__anext__())
+                except StopAsyncIteration:
+                    break
+                municipios.annotate_features(page["features"], max_distance_km)
+                counts.update(
+                    feature["properties"]["cod_mun"] for feature in page["features"]
+                    if (feature.get("properties") or {}).get("cod_mun")
+                )
+                total += len(page["features"])
+                await progress.report(total, max_features, f"{total} registros localizados")
+        except asyncio.TimeoutError:
+            if not total:
+                return {"error": "Prazo esgotado antes do primeiro lote de registros", "deadline_exceeded": True}
+            result.update({"partial": True, "deadline_exceeded": True})
+        except Exception as e:
+            if not total:
+                return {"error": f"Erro ao extrair dados: {e}"}
+            logger.warning(f"Extração de {layer} interrompida após {total} registros: {e}")
+            result.update({"partial": True, "warning": str(e)})
+        finally:
+            await pages.aclose()
+
+        result.update({
+            "layer": layer,
+            "total_registros": total,
+            "sem_municipio": total - sum(counts.values()),
+            "municipios": [
+                {
+                    "cod_mun": cod_mun,
+                    "nom_mun": (municipios.get(cod_mun) or {}).get("nom_mun"),
+                    "sigla_uf": (municipios.get(cod_mun) or {}).get("sigla_uf"),
+                    "registros": count
+                }
+                for cod_mun, count in counts.most_common()
+            ]
+        })
+        return result
+
+    async def analyze_service_capabilities(self, orgao: str, progress: Optional[ToolProgress] = None) -> Dict[str, Any]:
+        """Analisa capacidades de todos os serviços de um órgão.
         
-        services = [s for s in self.services_cache if s.orgao.lower() == orgao.lower()]
+        Cada serviço sondado gera uma notificação de progresso; se o prazo
+        acabar, os serviços restantes são apenas contados.
+        """
+        services = await self.get_organization_services(orgao)
         
         if not services:
             return {"error": f"Nenhum serviço encontrado para o órgão: {orgao}"}
         
+        progress = progress or ToolProgress()
         analysis = {
             "orgao": orgao,
             "total_services": len(services),
             "service_types": {},
             "services_with_layers": []
         }
+        to_probe = min(len(services), 3)  # Limitar para não demorar muito
         
         for service in services:
             # Contar tipos de serviços
@@ -393,15 +854,273 @@ class INDETools:
             analysis["service_types"][service.tipo] += 1
             
             # Descobrir camadas para alguns serviços
-            if len(analysis["services_with_layers"]) < 3:  # Limitar para não demorar muito
-                layers = await self.extractor.discover_layers(service)
+            if len(analysis["services_with_layers"]) < to_probe and not analysis.get("deadline_exceeded"):
+                try:
+                    layers = await progress.wait(self.extractor.discover_layers(service))
+                except asyncio.TimeoutError:
+                    analysis["partial"] = True
+                    analysis["deadline_exceeded"] = True
+                    continue
                 analysis["services_with_layers"].append({
                     "service": asdict(service),
                     "total_layers": len(layers),
                     "sample_layers": layers[:5]
                 })
+                probed = len(analysis["services_with_layers"])
+                await progress.report(probed, to_probe, f"{probed}/{to_probe} serviços sondados")
         
         return analysis
+    
+    async def run_batch(self, targets: List[Dict[str, Any]], operation, progress: Optional[ToolProgress] = None) -> Dict[str, Any]:
+        """Executa ``operation(**alvo)`` para vários alvos em paralelo.
+        
+        O paralelismo real é limitado pelo semáforo de requisições do
+        extrator, compartilhado com as demais ferramentas. Alvos repetidos
+        são executados uma única vez. Cada item traz ``result`` ou ``error``;
+        itens não concluídos até o prazo de ``progress`` (mais uma folga para
+        devolverem resultados parciais) voltam como erro.
+        """
+        if len(targets) > MAX_BATCH_SIZE:
+            return {"error": f"Lote com {len(targets)} itens excede o limite de {MAX_BATCH_SIZE}"}
+        
+        progress = progress or ToolProgress()
+        await self._ensure_catalog()
+        
+        unique: Dict[str, asyncio.Task] = {}
+        done = 0
+        
+        async def run_one(target: Dict[str, Any]):
+            nonlocal done
+            try:
+                return await operation(**target)
+            finally:
+                done += 1
+                await progress.report(done, len(unique), f"{done}/{len(unique)} itens concluídos")
+        
+        for target in targets:
+            key = json.dumps(target, sort_keys=True, default=str)
+            if key not in unique:
+                unique[key] = asyncio.create_task(run_one(target))
+        
+        timeout = progress.remaining()
+        if timeout is not None:
+            timeout += BATCH_DEADLINE_GRACE
+        pending = set(unique.values())
+        if pending:
+            _, pending = await asyncio.wait(pending, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        
+        results = []
+        for index, target in enumerate(targets):
+            task = unique[json.dumps(target, sort_keys=True, default=str)]
+            item: Dict[str, Any] = {"index": index, "target": target}
+            if task in pending:
+                item["error"] = "Prazo esgotado antes da conclusão"
+            elif task.exception() is not None:
+                item["error"] = str(task.exception())
+            elif isinstance(task.result(), dict) and "error" in task.result():
+                item["error"] = task.result()["error"]
+            else:
+                item["result"] = task.result()
+            results.append(item)
+        
+        failed = sum(1 for item in results if "error" in item)
+        return {
+            "total": len(results),
+            "succeeded": len(results) - failed,
+            "failed": failed,
+            "results": results
+        }
+
+
+# ================================
+# PRÉ-COLETA DE CONTEXTO
+# ================================
+
+@dataclass
+class PrefetchedContext:
+    """Contexto determinístico coletado antes da execução dos agentes."""
+    orgao: str
+    services: List[Dict[str, Any]]
+    errors: List[str]
+    elapsed_seconds: float
+    
+    def dataset_names(self) -> List[str]:
+        """Lista as camadas encontradas, no formato ``serviço :: camada``."""
+        return [
+            f"{service['descricao']} :: {layer}"
+            for service in self.services
+            for layer in service["layers"]
+        ]
+    
+    def summary(self, max_chars: int = 4000) -> str:
+        """Gera um resumo compacto para ser injetado na descrição das tarefas."""
+        if not self.services:
+            return f"Nenhum serviço do órgão {self.orgao} foi encontrado no catálogo."
+        
+        lines = [f"Serviços de {self.orgao} ({len(self.services)}):"]
+        for service in self.services:
+            lines.append(
+                f"- [{service['tipo']}] {service['descricao']} ({service['url']}) - "
+                f"{service['total_layers']} camadas"
+            )
+            for layer in service["layers"]:
+                details = []
+                count = service["counts"].get(layer)
+                if count is not None:
+                    details.append(f"{count} registros")
+                schema = service["schemas"].get(layer)
+                if schema:
+                    details.append("atributos: " + ", ".join(
+                        f"{name}:{tipo}" for name, tipo in list(schema.items())[:12]
+                    ))
+                suffix = f" ({'; '.join(details)})" if details else ""
+                lines.append(f"    * {layer}{suffix}")
+        
+        if self.errors:
+            lines.append(f"Falhas na coleta: {len(self.errors)}")
+        
+        text = "\n".join(lines)
+        if len(text) > max_chars:
+            text = text[:max_chars].rsplit("\n", 1)[0] + "\n    ... (resumo truncado)"
+        return text
+
+
+class INDEContextPrefetcher:
+    """Coleta serviços, camadas, esquemas e contagens de um órgão em paralelo.
+    
+    Substitui as várias chamadas de ferramenta que os agentes fariam via LLM
+    apenas para listar serviços e camadas.
+    """
+    
+    def __init__(self, inde_tools: "INDETools", max_services: int = 10, max_layers_per_service: int = 5):
+        self.inde_tools = inde_tools
+        self.max_services = max_services
+        self.max_layers_per_service = max_layers_per_service
+    
+    async def prefetch(self, orgao: str) -> PrefetchedContext:
+        """Executa a pré-coleta para um órgão."""
+        start_time = time.perf_counter()
+        services = await self.inde_tools.get_organization_services(orgao)
+        
+        results = await asyncio.gather(
+            *(self._prefetch_service(service) for service in services[:self.max_services]),
+            return_exceptions=True
+        )
+        
+        collected = []
+        errors = []
+        for service, result in zip(services, results):
+            if isinstance(result, Exception):
+                errors.append(f"{service.descricao}: {result}")
+            else:
+                collected.append(result)
+        
+        return PrefetchedContext(
+            orgao=orgao,
+            services=collected,
+            errors=errors,
+            elapsed_seconds=time.perf_counter() - start_time
+        )
+    
+    async def _prefetch_service(self, service: GeoService) -> Dict[str, Any]:
+        """Coleta camadas e, para as primeiras, esquema e contagem de registros."""
+        extractor = self.inde_tools.extractor
+        layers = await extractor.discover_layers(service)
+        sample_layers = sorted(layers)[:self.max_layers_per_service]
+        
+        # Esquemas e contagens de todas as camadas em uma única rodada
+        results = await asyncio.gather(
+            *(extractor.describe_layer_schema(service, layer) for layer in sample_layers),
+            *(extractor.count_features(service, layer) for layer in sample_layers)
+        )
+        schemas, counts = results[:len(sample_layers)], results[len(sample_layers):]
+        
+        return {
+            "descricao": service.descricao,
+            "tipo": service.tipo,
+            "url": service.url,
+            "total_layers": len(layers),
+            "layers": sample_layers,
+            "schemas": {layer: schema for layer, schema in zip(sample_layers, schemas) if schema},
+            "counts": {layer: count for layer, count in zip(sample_layers, counts) if count is not None}
+        }
+
+
+# ================================
+# CACHE DE ANÁLISES
+# ================================
+
+# Só palavras sem carga semântica: polaridade e negação (com, sem, não, nem) mudam a pergunta
+STOPWORDS_PT = frozenset({
+    "a", "o", "as", "os", "um", "uma", "uns", "umas", "de", "do", "da", "dos", "das",
+    "em", "no", "na", "nos", "nas", "para", "pra", "por", "pelo", "pela", "pelos", "pelas",
+    "sobre", "e", "que", "ao", "aos", "se", "sua", "seu", "suas", "seus", "como"
+})
+
+
+def normalize_objective(objetivo: str) -> str:
+    """Normaliza um objetivo de análise para uso como chave de cache.
+    
+    Remove acentos, converte para minúsculas e descarta pontuação e stopwords,
+    mantendo a ordem e a repetição dos termos: "Análise de telecomunicações" e
+    "analise telecomunicacoes" resultam na mesma chave, mas "municípios com
+    cobertura 4G" e "municípios sem cobertura 4G" não.
+    """
+    text = unicodedata.normalize("NFKD", objetivo)
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    terms = [t for t in re.findall(r"[a-z0-9]+", text) if t not in STOPWORDS_PT]
+    return " ".join(terms)
+
+
+class AnalysisResultCache:
+    """Cache LRU com TTL para resultados de ``intelligent_data_analysis``.
+    
+    A chave combina o órgão, o objetivo normalizado e a versão do catálogo,
+    de forma que alterações no catálogo invalidam as entradas antigas.
+    """
+    
+    def __init__(self, ttl: float = 3600, max_entries: int = 128):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+    
+    def make_key(self, orgao: str, objetivo: str, catalog_version: str) -> str:
+        """Monta a chave de cache."""
+        raw = f"{orgao.strip().lower()}|{normalize_objective(objetivo)}|{catalog_version}"
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+    
+    def get(self, key: str) -> Optional[Tuple[Dict[str, Any], float]]:
+        """Retorna ``(resultado, idade_em_segundos)`` ou None se ausente/expirado."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        
+        stored_at, result = entry
+        age = time.monotonic() - stored_at
+        if age > self.ttl:
+            del self._entries[key]
+            self.misses += 1
+            return None
+        
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return result, age
+    
+    def put(self, key: str, result: Dict[str, Any]):
+        """Armazena um resultado, descartando as entradas menos usadas se necessário."""
+        self._entries[key] = (time.monotonic(), result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    def clear(self):
+        """Remove todas as entradas."""
+        self._entries.clear()
 
 
 # ================================
@@ -413,14 +1132,17 @@ class GeoDataExplorerTool(BaseTool):
     
     name: str = "geo_data_explorer"
     description: str = "Explora e extrai dados de serviços geoespaciais brasileiros"
+    inde_tools: Any = None
     
-    def __init__(self):
-        super().__init__()
-        self.inde_tools = INDETools()
+    def __init__(self, inde_tools: Optional["INDETools"] = None, **kwargs):
+        # Campo declarado: o BaseTool do CrewAI é um modelo pydantic
+        super().__init__(inde_tools=inde_tools or INDETools(), **kwargs)
     
     def _run(self, query: str) -> str:
         """Executa consulta aos dados geoespaciais."""
-        return asyncio.run(self._arun(query))
+        # asyncio.run copia o contexto: o span da análise continua como pai
+        with tracer.start_span(f"crewai.tool {self.name}", {"crewai.tool.query": query}):
+            return asyncio.run(self._arun(query))
     
     async def _arun(self, query: str) -> str:
         """Versão assíncrona da consulta."""
@@ -453,12 +1175,17 @@ class GeoDataExplorerTool(BaseTool):
 class INDEAgents:
     """Sistema de agentes para análise automatizada de dados INDE."""
     
-    def __init__(self):
-        self.geo_tool = GeoDataExplorerTool()
+    def __init__(self, inde_tools: Optional[INDETools] = None, llm: Optional[Any] = None):
+        self.inde_tools = inde_tools or INDETools()
+        self.prefetcher = INDEContextPrefetcher(self.inde_tools)
+        self.llm = llm
+        self.geo_tool = GeoDataExplorerTool(self.inde_tools)
         self._setup_agents()
     
     def _setup_agents(self):
         """Configura os agentes especializados."""
+        # LLM opcional (permite injetar um LLM de teste)
+        llm_kwargs = {"llm": self.llm} if self.llm is not None else {}
         
         # Agente Discovery
         self.discovery_agent = Agent(
@@ -469,7 +1196,8 @@ class INDEAgents:
             e identificar datasets relevantes para diferentes objetivos de pesquisa.""",
             tools=[self.geo_tool],
             verbose=True,
-            allow_delegation=False
+            allow_delegation=False,
+            **llm_kwargs
         )
         
         # Agente Analyzer
@@ -481,7 +1209,8 @@ class INDEAgents:
             extraídos dos serviços INDE, identificando padrões e insights relevantes.""",
             tools=[self.geo_tool],
             verbose=True,
-            allow_delegation=False
+            allow_delegation=False,
+            **llm_kwargs
         )
         
         # Agente Reporter
@@ -493,11 +1222,36 @@ class INDEAgents:
             relatórios claros e acionáveis para diferentes públicos.""",
             tools=[],
             verbose=True,
-            allow_delegation=False
+            allow_delegation=False,
+            **llm_kwargs
         )
     
-    async def analyze_organization_data(self, orgao: str, objetivo: str) -> AnalysisResult:
-        """Executa análise completa de dados de um órgão."""
+    async def analyze_organization_data(self, orgao: str, objetivo: str,
+                                        progress: Optional[ToolProgress] = None) -> AnalysisResult:
+        """Executa análise completa de dados de um órgão.
+        
+        O progresso é notificado por etapa (pré-coleta e cada tarefa dos
+        agentes) e o que já foi produzido fica em ``progress.partial``.
+        """
+        progress = progress or ToolProgress()
+        total_steps = 5
+        
+        # Pré-coleta determinística (sem LLM) dos serviços e camadas do órgão
+        await progress.report(0, total_steps, "Pré-coleta de serviços e camadas")
+        prefetched = await self.prefetcher.prefetch(orgao)
+        logger.info(
+            f"Pré-coleta de {orgao}: {len(prefetched.services)} serviços "
+            f"em {prefetched.elapsed_seconds:.1f}s"
+        )
+        context_summary = prefetched.summary()
+        progress.partial.update({
+            "orgao": orgao,
+            "objetivo": objetivo,
+            "datasets_analisados": prefetched.dataset_names(),
+            "dados_extraidos": {"servicos": prefetched.services, "falhas_coleta": prefetched.errors},
+            "tarefas_concluidas": []
+        })
+        await progress.report(1, total_steps, "Pré-coleta concluída; agentes em execução")
         
         # Definir tarefas
         discovery_task = Task(
@@ -505,6 +1259,9 @@ class INDEAgents:
             Descubra e catalogue todos os serviços e datasets disponíveis para o órgão {orgao}.
             Identifique quais serviços estão ativos, que tipos de dados oferecem e suas características.
             Foque em dados relevantes para o objetivo: {objetivo}
+            
+            Contexto já coletado (use-o em vez de listar serviços e camadas novamente):
+            {context_summary}
             """,
             agent=self.discovery_agent,
             expected_output="Lista detalhada de serviços e datasets com suas características"
@@ -515,6 +1272,9 @@ class INDEAgents:
             Analise a estrutura e qualidade dos dados descobertos para {orgao}.
             Identifique padrões, limitações e potencial dos datasets para o objetivo: {objetivo}.
             Avalie completude, atualização e utilidade dos dados.
+            
+            Esquemas e contagens já coletados:
+            {context_summary}
             """,
             agent=self.analyzer_agent,
             expected_output="Análise detalhada da qualidade e estrutura dos dados",
@@ -532,30 +1292,78 @@ class INDEAgents:
             context=[discovery_task, analysis_task]
         )
         
+        def task_done(output):
+            # Chamado na thread do kickoff ao fim de cada tarefa
+            completed = progress.partial["tarefas_concluidas"]
+            completed.append({
+                "agente": str(getattr(output, "agent", "")),
+                "resultado": str(getattr(output, "raw", output))
+            })
+            progress.report_threadsafe(
+                1 + len(completed), total_steps, f"Tarefa {len(completed)}/3 dos agentes concluída"
+            )
+        
         # Executar crew
         crew = Crew(
             agents=[self.discovery_agent, self.analyzer_agent, self.reporter_agent],
             tasks=[discovery_task, analysis_task, report_task],
             process=Process.sequential,
-            verbose=True
+            verbose=True,
+            task_callback=task_done
         )
         
-        result = crew.kickoff()
+        # Os agentes fazem chamadas síncronas ao LLM: executar fora do event loop
+        with tracer.start_span("crewai.kickoff", {"inde.orgao": orgao}):
+            result = await asyncio.to_thread(run_labelled, current_tool(), crew.kickoff)
+        await progress.report(total_steps, total_steps, "Análise concluída")
         
         # Criar resultado estruturado
         analysis_result = AnalysisResult(
             orgao=orgao,
             objetivo=objetivo,
-            datasets_analisados=[],  # Seria preenchido com dados reais
+            datasets_analisados=prefetched.dataset_names(),
             insights=["Insights extraídos da análise"],
             recomendacoes=["Recomendações baseadas nos dados"],
-            dados_extraidos={},
+            dados_extraidos={"servicos": prefetched.services, "falhas_coleta": prefetched.errors},
             relatorio_completo=str(result)
         )
         
         return analysis_result
 
 
+# ================================
+# ÍNDICE DE MUNICÍPIOS
+# ================================
+
+# Origem do índice: DSN PostgreSQL ou arquivo GeoJSON/NDJSON/CSV de municípios
+MUNICIPIOS_INDEX_SOURCE = os.getenv("MUNICIPIOS_INDEX_SOURCE") or os.getenv("DATABASE_URL", "")
+
+# Carga em andamento ou concluída (compartilhada por chamadas simultâneas)
+_municipios_index_load: Optional[asyncio.Future] = None
+
+
+def _load_municipios_index() -> MunicipioIndex:
+    start_time = time.perf_counter()
+    index = MunicipioIndex.load(MUNICIPIOS_INDEX_SOURCE)
+    logger.info(f"🗺️ Índice de municípios carregado: {len(index)} municípios em {time.perf_counter() - start_time:.2f}s")
+    return index
+
+
+async def get_municipios_index() -> MunicipioIndex:
+    """Índice de municípios, carregado uma única vez no primeiro uso."""
+    global _municipios_index_load
+    if not MUNICIPIOS_INDEX_SOURCE:
+        raise RuntimeError("defina MUNICIPIOS_INDEX_SOURCE ou DATABASE_URL")
+    if _municipios_index_load is None:
+        _municipios_index_load = asyncio.ensure_future(asyncio.to_thread(_load_municipios_index))
+    try:
+        return await asyncio.shield(_municipios_index_load)
+    except Exception:
+        # Nova tentativa na próxima chamada
+        _municipios_index_load = None
+        raise
+
+
 # ================================
 # SERVIDOR MCP
 # ================================
@@ -563,12 +1371,44 @@ class INDEAgents:
 # Inicializar FastMCP
 mcp = FastMCP("INDE Data Server")
 
+
+# Ferramentas já instrumentadas, por nome (usadas também pelo gateway HTTP da interface)
+TOOL_FUNCTIONS: Dict[str, Any] = {}
+
+
+def instrumented_tool(*tool_args, **tool_kwargs):
+    """Equivalente a ``@mcp.tool()`` com medição automática da ferramenta."""
+    def decorator(func):
+        instrumented = instrument_tool(func)
+        TOOL_FUNCTIONS[func.__name__] = instrumented
+        return mcp.tool(*tool_args, **tool_kwargs)(instrumented)
+    return decorator
+
 # Instâncias globais
 inde_tools = INDETools()
-inde_agents = INDEAgents()
+inde_agents = INDEAgents(inde_tools)
+inde_database = INDEDatabase()
+analysis_cache = AnalysisResultCache(
+    ttl=float(os.getenv("CACHE_TTL", "3600")),
+    max_entries=int(os.getenv("ANALYSIS_CACHE_SIZE", "128"))
+)
+
+# Análises em andamento por chave de cache: ``(tarefa, progresso)``
+pending_analyses: Dict[str, Tuple[asyncio.Task, ToolProgress]] = {}
 
 
-@mcp.tool()
+def _store_finished_analysis(cache_key: str, task: asyncio.Task):
+    """Guarda no cache o resultado de uma análise, mesmo que o cliente já tenha desistido."""
+    pending_analyses.pop(cache_key, None)
+    if task.cancelled():
+        return
+    if task.exception() is not None:
+        logger.error(f"Erro na análise em segundo plano: {task.exception()}")
+        return
+    analysis_cache.put(cache_key, task.result().dict())
+
+
+@instrumented_tool()
 async def list_inde_services(orgao: Optional[str] = None) -> Dict[str, Any]:
     """
     Lista serviços geoespaciais disponíveis na INDE.
@@ -582,7 +1422,7 @@ async def list_inde_services(orgao: Optional[str] = None) -> Dict[str, Any]:
     return await inde_tools.list_services(orgao)
 
 
-@mcp.tool()
+@instrumented_tool()
 async def discover_service_layers(orgao: str, service_name: str) -> Dict[str, Any]:
     """
     Descobre camadas disponíveis em um serviço específico.
@@ -597,57 +1437,111 @@ async def discover_service_layers(orgao: str, service_name: str) -> Dict[str, An
     return await inde_tools.discover_service_layers(orgao, service_name)
 
 
-@mcp.tool()
-async def extract_geospatial_data(orgao: str, service_name: str, layer: str, max_features: int = 1000) -> Dict[str, Any]:
+@instrumented_tool()
+async def extract_geospatial_data(orgao: str, service_name: str, layer: str, max_features: int = 1000,
+                                  deadline_seconds: Optional[float] = None,
+                                  ctx: Optional[Context] = None) -> Dict[str, Any]:
     """
     Extrai dados de uma camada geoespacial específica.
     
+    Envia progresso a cada página lida. Com ``deadline_seconds``, devolve o
+    que foi lido até o prazo, com ``partial: true``.
+    
     Args:
         orgao: Nome do órgão
         service_name: Nome do serviço
         layer: Nome da camada
         max_features: Número máximo de registros (padrão: 1000)
+        deadline_seconds: Prazo para devolver o resultado, mesmo parcial (opcional)
     
     Returns:
         Dicionário com dados extraídos e metadados
     """
-    return await inde_tools.extract_dataset(orgao, service_name, layer, max_features)
+    progress = ToolProgress(ctx, deadline_seconds)
+    return await inde_tools.extract_dataset(orgao, service_name, layer, max_features, progress)
 
 
-@mcp.tool()
-async def analyze_organization_capabilities(orgao: str) -> Dict[str, Any]:
+@instrumented_tool()
+async def analyze_organization_capabilities(orgao: str, deadline_seconds: Optional[float] = None,
+                                            ctx: Optional[Context] = None) -> Dict[str, Any]:
     """
     Analisa todas as capacidades de dados de um órgão.
     
+    Envia progresso a cada serviço sondado. Com ``deadline_seconds``, os
+    serviços não sondados até o prazo ficam de fora (``partial: true``).
+    
     Args:
         orgao: Nome do órgão para análise
+        deadline_seconds: Prazo para devolver o resultado, mesmo parcial (opcional)
     
     Returns:
         Análise completa das capacidades do órgão
     """
-    return await inde_tools.analyze_service_capabilities(orgao)
+    progress = ToolProgress(ctx, deadline_seconds)
+    return await inde_tools.analyze_service_capabilities(orgao, progress)
 
 
-@mcp.tool()
-async def intelligent_data_analysis(orgao: str, objetivo: str) -> Dict[str, Any]:
+@instrumented_tool()
+async def intelligent_data_analysis(orgao: str, objetivo: str, bypass_cache: bool = False,
+                                    deadline_seconds: Optional[float] = None,
+                                    ctx: Optional[Context] = None) -> Dict[str, Any]:
     """
     Executa análise inteligente dos dados de um órgão usando agentes AI.
     
+    Resultados são reaproveitados para o mesmo órgão e objetivo equivalente
+    (ignorando acentos, maiúsculas e stopwords) enquanto o catálogo não mudar.
+    
+    Envia progresso por etapa (pré-coleta e cada agente). Se o prazo acabar,
+    devolve o contexto coletado e as tarefas já concluídas (``partial: true``);
+    a análise continua em segundo plano e o resultado vai para o cache,
+    disponível ao repetir a chamada.
+    
     Args:
         orgao: Nome do órgão
         objetivo: Objetivo da análise (ex: "análise de telecomunicações", "recursos hídricos")
+        bypass_cache: Força uma nova análise, atualizando o cache (padrão: False)
+        deadline_seconds: Prazo para devolver o resultado, mesmo parcial (opcional)
     
     Returns:
         Relatório completo com insights e recomendações
     """
     try:
-        result = await inde_agents.analyze_organization_data(orgao, objetivo)
-        return result.dict()
+        cache_key = analysis_cache.make_key(orgao, objetivo, inde_tools.extractor.catalog_version())
+        
+        if not bypass_cache:
+            cached = analysis_cache.get(cache_key)
+            metrics_collector.record_cache("analysis", cached is not None)
+            if cached:
+                result, age = cached
+                return {**result, "cache_hit": True, "cache_age_seconds": round(age, 1)}
+        
+        # Reaproveita uma análise equivalente ainda em andamento
+        if cache_key in pending_analyses:
+            task, task_progress = pending_analyses[cache_key]
+        else:
+            task_progress = ToolProgress(ctx, deadline_seconds)
+            task = asyncio.create_task(inde_agents.analyze_organization_data(orgao, objetivo, task_progress))
+            pending_analyses[cache_key] = (task, task_progress)
+            task.add_done_callback(functools.partial(_store_finished_analysis, cache_key))
+        
+        try:
+            result = await ToolProgress(deadline_seconds=deadline_seconds).wait(asyncio.shield(task))
+        except asyncio.TimeoutError:
+            # A análise segue sem notificar uma chamada que já terminou
+            task_progress.ctx = None
+            return {
+                **task_progress.snapshot(),
+                "partial": True,
+                "deadline_exceeded": True,
+                "cache_hit": False,
+                "message": "A análise continua em segundo plano; repita a chamada para obter o resultado completo"
+            }
+        return {**result.dict(), "cache_hit": False, "cache_age_seconds": 0.0}
     except Exception as e:
         return {"error": f"Erro na análise inteligente: {e}"}
 
 
-@mcp.tool()
+@instrumented_tool()
 async def generate_data_report(orgao: str, format: str = "markdown") -> str:
     """
     Gera relatório automático sobre os dados disponíveis de um órgão.
@@ -709,6 +1603,325 @@ async def generate_data_report(orgao: str, format: str = "markdown") -> str:
         return f"Erro ao gerar relatório: {e}"
 
 
+def _batch_targets(targets: List[Any]) -> List[Dict[str, Any]]:
+    """Alvos de lote como dicionários (modelos validados pelo MCP ou dicts)."""
+    return [target.dict() if isinstance(target, BaseModel) else dict(target) for target in targets]
+
+
+@instrumented_tool()
+async def batch_discover_service_layers(targets: List[ServiceTarget], deadline_seconds: Optional[float] = None,
+                                        ctx: Optional[Context] = None) -> Dict[str, Any]:
+    """
+    Descobre as camadas de vários serviços em uma única chamada.
+    
+    Os serviços são consultados em paralelo, com o mesmo limite de conexões
+    das demais ferramentas. Erros de um item não afetam os outros.
+    
+    Args:
+        targets: Lista de {orgao, service_name} (até MAX_BATCH_SIZE itens)
+        deadline_seconds: Prazo para devolver os itens já concluídos (opcional)
+    
+    Returns:
+        Totais e, por item, ``result`` (como em discover_service_layers) ou ``error``
+    """
+    progress = ToolProgress(ctx, deadline_seconds)
+    return await inde_tools.run_batch(_batch_targets(targets), inde_tools.discover_service_layers, progress)
+
+
+@instrumented_tool()
+async def batch_extract_geospatial_data(targets: List[LayerTarget], deadline_seconds: Optional[float] = None,
+                                        ctx: Optional[Context] = None) -> Dict[str, Any]:
+    """
+    Extrai dados de várias camadas em uma única chamada.
+    
+    As camadas são extraídas em paralelo, com o mesmo limite de conexões das
+    demais ferramentas. Com ``deadline_seconds``, cada extração devolve o que
+    leu até o prazo (``partial: true``).
+    
+    Args:
+        targets: Lista de {orgao, service_name, layer, max_features} (até MAX_BATCH_SIZE itens)
+        deadline_seconds: Prazo para devolver os resultados, mesmo parciais (opcional)
+    
+    Returns:
+        Totais e, por item, ``result`` (como em extract_geospatial_data) ou ``error``
+    """
+    progress = ToolProgress(ctx, deadline_seconds)
+    
+    async def extract(orgao: str, service_name: str, layer: str, max_features: int = 1000):
+        item_progress = ToolProgress(deadline_seconds=progress.remaining())
+        return await inde_tools.extract_dataset(orgao, service_name, layer, max_features, item_progress)
+    
+    return await inde_tools.run_batch(_batch_targets(targets), extract, progress)
+
+
+@instrumented_tool()
+async def runtime_diagnostics(action: str = "status", tool: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Diagnóstico do servidor: bloqueios do event loop e profiler por amostragem.
+    
+    Args:
+        action: status, start_profiler, stop_profiler, reset_profiler ou export_profile
+        tool: Filtra a exportação por ferramenta MCP (opcional)
+    
+    Returns:
+        Estado do profiler, bloqueios recentes ou pilhas colapsadas (flamegraph)
+    """
+    if action == "start_profiler":
+        sampling_profiler.start()
+    elif action == "stop_profiler":
+        sampling_profiler.stop()
+    elif action == "reset_profiler":
+        sampling_profiler.reset()
+    elif action == "export_profile":
+        return {
+            "format": "collapsed",
+            "tool": tool,
+            "profile": sampling_profiler.export_collapsed(tool)
+        }
+    elif action != "status":
+        return {"error": f"Ação desconhecida: {action}"}
+    
+    return {
+        "profiler": sampling_profiler.summary(),
+        "slow_callback_threshold_ms": slow_callback_watchdog.threshold * 1000,
+        "slow_callbacks": slow_callback_watchdog.get_reports()
+    }
+
+
+async def _municipios_index_or_error() -> Tuple[Optional[MunicipioIndex], Optional[Dict[str, Any]]]:
+    try:
+        return await get_municipios_index(), None
+    except Exception as e:
+        logger.error(f"Erro ao carregar índice de municípios: {e}")
+        return None, {"error": f"Índice de municípios indisponível: {e}"}
+
+
+@instrumented_tool()
+async def find_nearest_municipalities(latitude: float, longitude: float, k: int = 1,
+                                      max_distance_km: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Encontra os municípios mais próximos de um ponto (pelo centroide).
+
+    Args:
+        latitude: Latitude do ponto (graus decimais)
+        longitude: Longitude do ponto (graus decimais)
+        k: Quantidade de municípios (padrão: 1, máximo: 100)
+        max_distance_km: Distância máxima até o centroide (opcional)
+
+    Returns:
+        Municípios ordenados por distância, com ``distancia_km``
+    """
+    index, error = await _municipios_index_or_error()
+    if error:
+        return error
+    return {
+        "success": True,
+        "municipios": index.nearest(latitude, longitude, max(1, min(k, 100)), max_distance_km)
+    }
+
+
+@instrumented_tool()
+async def find_municipalities_within_radius(latitude: float, longitude: float, radius_km: float,
+                                            limit: int = 100) -> Dict[str, Any]:
+    """
+    Lista os municípios com centroide a até ``radius_km`` de um ponto.
+
+    Args:
+        latitude: Latitude do ponto (graus decimais)
+        longitude: Longitude do ponto (graus decimais)
+        radius_km: Raio de busca em km
+        limit: Máximo de municípios retornados (padrão: 100)
+
+    Returns:
+        Municípios ordenados por distância e o total encontrado no raio
+    """
+    index, error = await _municipios_index_or_error()
+    if error:
+        return error
+    municipios = index.within_radius(latitude, longitude, radius_km)
+    return {"success": True, "total": len(municipios), "municipios": municipios[:max(1, limit)]}
+
+
+@instrumented_tool()
+async def get_municipality(cod_mun: str) -> Dict[str, Any]:
+    """
+    Busca um município pelo código IBGE (7 dígitos).
+
+    Args:
+        cod_mun: Código IBGE do município (ex: 3550308)
+
+    Returns:
+        Nome, UF, centroide e população do município
+    """
+    index, error = await _municipios_index_or_error()
+    if error:
+        return error
+    municipio = index.get(cod_mun)
+    if municipio is None:
+        return {"error": f"Município não encontrado: {cod_mun}"}
+    return {"success": True, "municipio": municipio}
+
+
+@instrumented_tool()
+async def count_features_by_municipality(orgao: str, service_name: str, layer: str, max_features: int = 1000,
+                                         max_distance_km: Optional[float] = None,
+                                         deadline_seconds: Optional[float] = None,
+                                         ctx: Optional[Context] = None) -> Dict[str, Any]:
+    """
+    Extrai uma camada e conta as feições por município.
+
+    Cada feição é atribuída ao município de centroide mais próximo do seu
+    ponto representativo, em memória. Com ``deadline_seconds``, devolve a
+    contagem do que foi lido até o prazo, com ``partial: true``.
+
+    Args:
+        orgao: Nome do órgão
+        service_name: Nome do serviço
+        layer: Nome da camada
+        max_features: Número máximo de registros (padrão: 1000)
+        max_distance_km: Feições mais distantes que isso ficam sem município (opcional)
+        deadline_seconds: Prazo para devolver o resultado, mesmo parcial (opcional)
+
+    Returns:
+        Registros por município, do maior para o menor
+    """
+    index, error = await _municipios_index_or_error()
+    if error:
+        return error
+    progress = ToolProgress(ctx, deadline_seconds)
+    return await inde_tools.count_by_municipality(
+        orgao, service_name, layer, index, max_features, max_distance_km, progress
+    )
+
+
+@instrumented_tool()
+async def get_municipality_statistics(cod_muns: Optional[List[str]] = None,
+                                      sigla_uf: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Estatísticas de publicações de vários municípios em uma única consulta ao banco.
+
+    Informe a lista de códigos IBGE, a UF (todos os municípios do estado)
+    ou ambos. Municípios sem publicações aparecem com totais zerados.
+
+    Args:
+        cod_muns: Códigos IBGE dos municípios (opcional)
+        sigla_uf: Sigla da UF, ex: MG (opcional)
+
+    Returns:
+        Totais de publicações, classes, tipos e anos, datas e tamanho por município
+    """
+    if not cod_muns and not sigla_uf:
+        return {"error": "Informe cod_muns ou sigla_uf"}
+    try:
+        municipios = await inde_database.municipality_statistics(cod_muns, sigla_uf)
+    except Exception as e:
+        logger.error(f"Erro ao consultar estatísticas no banco: {e}")
+        return {"error": f"Erro ao consultar o banco: {e}"}
+
+    result = {"success": True, "total": len(municipios), "municipios": municipios}
+    found = {municipio["cod_mun"] for municipio in municipios}
+    missing = [code for code in (cod_muns or []) if code not in found]
+    if missing:
+        result["nao_encontrados"] = missing
+    return result
+
+
+@instrumented_tool()
+async def list_municipality_publications(cod_muns: List[str], ano: Optional[int] = None,
+                                         id_classe_mapa: Optional[str] = None,
+                                         limit: int = 500) -> Dict[str, Any]:
+    """
+    Lista as publicações ativas de vários municípios em uma única consulta ao banco.
+
+    Args:
+        cod_muns: Códigos IBGE dos municípios
+        ano: Filtrar por ano (opcional)
+        id_classe_mapa: Filtrar por classe de mapa, ex: 01 (opcional)
+        limit: Máximo de publicações (padrão: 500)
+
+    Returns:
+        Publicações com classe, tipo e ano, ordenadas por município e ano
+    """
+    try:
+        publicacoes = await inde_database.list_publications(cod_muns, ano, id_classe_mapa, max(1, min(limit, 5000)))
+    except Exception as e:
+        logger.error(f"Erro ao consultar publicações no banco: {e}")
+        return {"error": f"Erro ao consultar o banco: {e}"}
+    return {"success": True, "total": len(publicacoes), "publicacoes": publicacoes}
+
+
+@instrumented_tool()
+async def find_municipalities_in_area(bbox: Optional[List[float]] = None,
+                                      geometry: Optional[Dict[str, Any]] = None,
+                                      latitude: Optional[float] = None, longitude: Optional[float] = None,
+                                      radius_km: Optional[float] = None, limit: int = 500) -> Dict[str, Any]:
+    """
+    Municípios em uma área, com o filtro espacial executado no PostGIS (índices GiST).
+
+    Informe um dos filtros: bbox (retângulo), geometry (interseção com uma
+    geometria GeoJSON) ou latitude/longitude/radius_km (distância ao limite
+    municipal). Requer o modo PostGIS do banco (05_create_postgis.sql).
+
+    Args:
+        bbox: Retângulo [min_lon, min_lat, max_lon, max_lat] (opcional)
+        geometry: Geometria GeoJSON, ex: {"type": "Polygon", "coordinates": [...]} (opcional)
+        latitude: Latitude do centro da busca por distância (opcional)
+        longitude: Longitude do centro da busca por distância (opcional)
+        radius_km: Raio da busca por distância em km (opcional)
+        limit: Máximo de municípios (padrão: 500)
+
+    Returns:
+        Municípios encontrados (com distancia_km na busca por distância)
+    """
+    filters = [bbox is not None, geometry is not None, radius_km is not None]
+    if sum(filters) != 1:
+        return {"error": "Informe exatamente um filtro: bbox, geometry ou latitude/longitude/radius_km"}
+    if radius_km is not None and (latitude is None or longitude is None):
+        return {"error": "A busca por distância exige latitude e longitude"}
+
+    limit = max(1, min(limit, 6000))
+    try:
+        if bbox is not None:
+            municipios = await inde_database.municipalities_in_bbox(bbox, limit)
+        elif geometry is not None:
+            municipios = await inde_database.municipalities_intersecting(geometry, limit)
+        else:
+            municipios = await inde_database.municipalities_within_distance(latitude, longitude, radius_km, limit)
+    except Exception as e:
+        logger.error(f"Erro na consulta espacial de municípios: {e}")
+        return {"error": f"Erro ao consultar o banco: {e}"}
+    return {"success": True, "total": len(municipios), "municipios": municipios}
+
+
+@instrumented_tool()
+async def list_publications_in_area(bbox: Optional[List[float]] = None,
+                                    geometry: Optional[Dict[str, Any]] = None,
+                                    ano: Optional[int] = None, id_classe_mapa: Optional[str] = None,
+                                    limit: int = 500) -> Dict[str, Any]:
+    """
+    Publicações dos municípios que intersectam uma área, filtradas no PostGIS.
+
+    Args:
+        bbox: Retângulo [min_lon, min_lat, max_lon, max_lat] (opcional)
+        geometry: Geometria GeoJSON (opcional; informe bbox ou geometry)
+        ano: Filtrar por ano (opcional)
+        id_classe_mapa: Filtrar por classe de mapa, ex: 01 (opcional)
+        limit: Máximo de publicações (padrão: 500)
+
+    Returns:
+        Publicações com município, classe, tipo e ano
+    """
+    if (bbox is None) == (geometry is None):
+        return {"error": "Informe bbox ou geometry"}
+    try:
+        area = bbox_geometry(bbox) if bbox is not None else geometry
+        publicacoes = await inde_database.publications_in_area(area, ano, id_classe_mapa, max(1, min(limit, 5000)))
+    except Exception as e:
+        logger.error(f"Erro na consulta espacial de publicações: {e}")
+        return {"error": f"Erro ao consultar o banco: {e}"}
+    return {"success": True, "total": len(publicacoes), "publicacoes": publicacoes}
+
+
 # ================================
 # CONFIGURAÇÃO E EXECUÇÃO
 # ================================
@@ -725,8 +1938,41 @@ async def main():
     logger.info(f"📊 Servidor: {mcp.server.name} v{mcp.server.version}")
     logger.info(f"🛠️ Ferramentas disponíveis: {len(mcp.list_tools())}")
     
+    # Amostragem de recursos do processo e do event loop
+    await metrics_collector.start_sampler()
+    slow_callback_watchdog.start()
+    if os.getenv("INDE_PROFILER", "").lower() in ("1", "true"):
+        sampling_profiler.start()
+    
+    # Endpoints de monitoramento embutidos (/health, /metrics, /dashboard) sobre o coletor
+    # do servidor; sem o loop de health checks do catálogo nem alertas (o stdout é o canal MCP)
+    monitoring_http = None
+    if os.getenv("INDE_MONITORING_PORT"):
+        from monitoring_system import INDEMonitoringSystem
+        monitoring = INDEMonitoringSystem(metrics_collector=metrics_collector)
+        monitoring_http = await monitoring.start_http_server()
+
+    # Interface web e gateway HTTP/JSON no mesmo processo (mesmos caches e conexões)
+    interface_server = None
+    if os.getenv("INDE_INTERFACE_PORT"):
+        from interface.server import ToolGateway, start_interface_server
+        gateway = ToolGateway(module=sys.modules[__name__], loop=asyncio.get_running_loop())
+        interface_server = start_interface_server(int(os.getenv("INDE_INTERFACE_PORT")), gateway=gateway)
+        logger.info(f"🌐 Interface web em http://localhost:{interface_server.server_address[1]}")
+
     # Executar servidor
-    await mcp.run()
+    try:
+        await mcp.run()
+    finally:
+        if interface_server:
+            interface_server.shutdown()
+        if monitoring_http:
+            await monitoring_http.stop()
+        await metrics_collector.stop_sampler()
+        await inde_database.close()
+        slow_callback_watchdog.stop()
+        sampling_profiler.stop()
+        tracer.force_flush()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Armazenamento de Séries Temporais - INDE MCP Server
+Persistência local de métricas com agregações automáticas
+
+Funcionalidades:
+- Banco SQLite em modo WAL, apenas com inserções em lote
+- Pontos brutos e agregações automáticas de 1 minuto, 1 hora e 1 dia
+  (séries de health check, esparsas, sem a de 1 minuto)
+- Políticas de retenção por resolução
+- Consulta por intervalo com escolha automática de resolução
+"""
+
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Resoluções das agregações (nome -> segundos)
+ROLLUP_RESOLUTIONS = {"1m": 60, "1h": 3600, "1d": 86400}
+
+# Séries amostradas a cada poucos minutos (health checks, ~5 min): sem agregação de 1
+# minuto, que teria um ponto por bucket; a consulta usa os pontos brutos no lugar.
+# Com ~190 serviços, são ~370 séries: ~1,5 milhão de linhas a menos na retenção de 14 dias
+SPARSE_SERIES_PREFIXES = ("health.",)
+
+# Retenção padrão por resolução (segundos)
+DEFAULT_RETENTION = {
+    "raw": 2 * 86400,        # 2 dias
+    "1m": 14 * 86400,        # 14 dias
+    "1h": 180 * 86400,       # ~6 meses
+    "1d": 5 * 365 * 86400    # ~5 anos
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS series (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS points (
+    series_id INTEGER NOT NULL,
+    ts REAL NOT NULL,
+    value REAL NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_points_series_ts ON points(series_id, ts);
+
+CREATE TABLE IF NOT EXISTS rollups (
+    resolution INTEGER NOT NULL,
+    series_id INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    sum REAL NOT NULL,
+    min REAL NOT NULL,
+    max REAL NOT NULL,
+    last REAL NOT NULL,
+    PRIMARY KEY (resolution, series_id, bucket)
+) WITHOUT ROWID;
+"""
+
+UPSERT_ROLLUP = """
+INSERT INTO rollups (resolution, series_id, bucket, count, sum, min, max, last)
+VALUES (?, ?, ?, 1, ?, ?, ?, ?)
+ON CONFLICT (resolution, series_id, bucket) DO UPDATE SET
+    count = count + 1,
+    sum = sum + excluded.sum,
+    min = MIN(min, excluded.min),
+    max = MAX(max, excluded.max),
+    last = excluded.last
+"""
+
+
+@dataclass
+class SeriesPoint:
+    """Ponto (ou bucket agregado) retornado por uma consulta."""
+    timestamp: float
+    count: int
+    avg: float
+    min: float
+    max: float
+    last: float
+
+
+class MetricsStore:
+    """Série temporal local em SQLite (WAL).
+
+    As agregações são atualizadas na mesma transação da inserção dos pontos
+    brutos, de forma que consultas longas nunca precisam varrer os pontos
+    brutos. Os métodos são síncronos e seguros entre threads; em código
+    assíncrono use ``asyncio.to_thread``.
+    """
+
+    def __init__(self, path: str = "metrics.db", retention: Optional[Dict[str, float]] = None,
+                 retention_interval: float = 3600, sparse_prefixes: Tuple[str, ...] = SPARSE_SERIES_PREFIXES):
+        self.path = Path(path)
+        self.sparse_prefixes = sparse_prefixes
+        self.retention = {**DEFAULT_RETENTION, **(retention or {})}
+        self.retention_interval = retention_interval
+        self._last_retention = 0.0
+        self._series_ids: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+        for series_id, name in self._conn.execute("SELECT id, name FROM series"):
+            self._series_ids[name] = series_id
+
+    def close(self):
+        """Fecha o banco."""
+        with self._lock:
+            self._conn.close()
+
+    def _series_id(self, name: str, created: Dict[str, int]) -> int:
+        """Id da série; as criadas na transação ficam em ``created`` até o COMMIT.
+
+        Um id cacheado antes do COMMIT sobreviveria a um ROLLBACK e poderia
+        ser reutilizado pelo SQLite para outra série.
+        """
+        series_id = self._series_ids.get(name) or created.get(name)
+        if series_id is None:
+            self._conn.execute("INSERT OR IGNORE INTO series (name) VALUES (?)", (name,))
+            series_id = self._conn.execute("SELECT id FROM series WHERE name = ?", (name,)).fetchone()[0]
+            created[name] = series_id
+        return series_id
+
+    def _is_sparse(self, name: str) -> bool:
+        return name.startswith(self.sparse_prefixes)
+
+    def _rollup_resolutions(self, name: str) -> Iterable[int]:
+        if self._is_sparse(name):
+            return [seconds for key, seconds in ROLLUP_RESOLUTIONS.items() if key != "1m"]
+        return ROLLUP_RESOLUTIONS.values()
+
+    def append(self, name: str, value: float, timestamp: Optional[float] = None):
+        """Adiciona um ponto."""
+        self.append_many([(name, time.time() if timestamp is None else timestamp, value)])
+
+    def append_many(self, points: Iterable[Tuple[str, float, float]]):
+        """Adiciona pontos ``(série, timestamp, valor)`` em uma única transação."""
+        with self._lock:
+            raw_rows = []
+            rollup_rows = []
+            created: Dict[str, int] = {}
+            self._conn.execute("BEGIN")
+            try:
+                for name, timestamp, value in points:
+                    if value is None:
+                        continue
+                    series_id = self._series_id(name, created)
+                    value = float(value)
+                    raw_rows.append((series_id, timestamp, value))
+                    for resolution in self._rollup_resolutions(name):
+                        bucket = int(timestamp // resolution) * resolution
+                        rollup_rows.append((resolution, series_id, bucket, value, value, value, value))
+
+                self._conn.executemany("INSERT INTO points (series_id, ts, value) VALUES (?, ?, ?)", raw_rows)
+                self._conn.executemany(UPSERT_ROLLUP, rollup_rows)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._series_ids.update(created)
+
+        if time.time() - self._last_retention > self.retention_interval:
+            self.apply_retention()
+
+    def apply_retention(self, now: Optional[float] = None) -> int:
+        """Remove dados mais antigos que a retenção de cada resolução."""
+        now = time.time() if now is None else now
+        removed = 0
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                cursor = self._conn.execute("DELETE FROM points WHERE ts < ?", (now - self.retention["raw"],))
+                removed += cursor.rowcount
+                for name, resolution in ROLLUP_RESOLUTIONS.items():
+                    cursor = self._conn.execute(
+                        "DELETE FROM rollups WHERE resolution = ? AND bucket < ?",
+                        (resolution, now - self.retention[name])
+                    )
+                    removed += cursor.rowcount
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        self._last_retention = now
+        return removed
+
+    def series_names(self) -> List[str]:
+        """Séries conhecidas."""
+        return sorted(self._series_ids)
+
+    def _choose_resolution(self, start: float, end: float, max_points: int, now: float,
+                           sparse: bool = False) -> str:
+        """Menor resolução que respeita ``max_points`` e ainda cobre o início."""
+        span = max(end - start, 1.0)
+        candidates = [("raw", 10)] + list(ROLLUP_RESOLUTIONS.items())
+        if sparse:
+            # Séries esparsas: pontos brutos na cadência do check, sem buckets de 1 minuto
+            candidates = [("raw", 300)] + [item for item in ROLLUP_RESOLUTIONS.items() if item[0] != "1m"]
+        for name, seconds in candidates:
+            if span / seconds <= max_points and start >= now - self.retention[name]:
+                return name
+        return "1d"
+
+    def query(self, name: str, start: float, end: Optional[float] = None,
+              resolution: str = "auto", max_points: int = 500) -> Dict[str, object]:
+        """Consulta uma série no intervalo ``[start, end]``.
+
+        Args:
+            name: Nome da série
+            start: Início (timestamp Unix)
+            end: Fim (padrão: agora)
+            resolution: "raw", "1m", "1h", "1d" ou "auto"
+            max_points: Limite de pontos usado pela escolha automática
+
+        Returns:
+            Dicionário com a resolução usada e a lista de pontos
+        """
+        now = time.time()
+        end = now if end is None else end
+        sparse = self._is_sparse(name)
+        if resolution == "auto":
+            resolution = self._choose_resolution(start, end, max_points, now, sparse)
+        elif resolution == "1m" and sparse:
+            resolution = "raw"
+
+        series_id = self._series_ids.get(name)
+        if series_id is None:
+            return {"series": name, "resolution": resolution, "points": []}
+
+        with self._lock:
+            if resolution == "raw":
+                rows = self._conn.execute(
+                    "SELECT ts, 1, value, value, value, value FROM points "
+                    "WHERE series_id = ? AND ts BETWEEN ? AND ? ORDER BY ts",
+                    (series_id, start, end)
+                ).fetchall()
+            else:
+                seconds = ROLLUP_RESOLUTIONS[resolution]
+                rows = self._conn.execute(
+                    "SELECT bucket, count, sum / count, min, max, last FROM rollups "
+                    "WHERE resolution = ? AND series_id = ? AND bucket BETWEEN ? AND ? ORDER BY bucket",
+                    (seconds, series_id, int(start // seconds) * seconds, end)
+                ).fetchall()
+
+        return {
+            "series": name,
+            "resolution": resolution,
+            "points": [SeriesPoint(*row) for row in rows]
+        }
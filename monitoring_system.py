@@ -12,17 +12,33 @@ Funcionalidades:
 """
 
 import asyncio
+import gc
+import gzip
+import hashlib
+import heapq
+import html
 import json
+import math
+import os
+import random
+import sys
 import time
 import logging
+from array import array
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional, Callable
 from dataclasses import dataclass, asdict
 from pathlib import Path
+from urllib.parse import urlparse
 import aiohttp
+from aiohttp import web
 import psutil
+import yaml
 from collections import defaultdict, deque
 
+from metrics_store import MetricsStore
+from tracing import aiohttp_trace_config, tracer
+
 # Prometheus metrics (opcional)
 try:
     from prometheus_client import Counter, Histogram, Gauge, CollectorRegistry, generate_latest
@@ -43,7 +59,9 @@ class ServiceHealth:
     response_time: float
     last_check: datetime
     error_message: Optional[str] = None
-    uptime_percentage: float = 0.0
+    uptime_percentage: float = 0.0  # Últimas 24h
+    uptime_1h: float = 0.0
+    uptime_7d: float = 0.0
 
 @dataclass
 class PerformanceMetrics:
@@ -57,6 +75,14 @@ class PerformanceMetrics:
     memory_usage: float
     cpu_usage: float
     active_connections: int
+    p50_response_time: float = 0.0
+    p95_response_time: float = 0.0
+    p99_response_time: float = 0.0
+    open_fds: int = 0
+    sockets: int = 0
+    threads: int = 0
+    event_loop_lag: float = 0.0
+    gc_pause_max: float = 0.0
 
 @dataclass
 class Alert:
@@ -68,16 +94,370 @@ class Alert:
     timestamp: datetime
     resolved: bool = False
     resolved_at: Optional[datetime] = None
+    rule: str = ""
+
+# ================================
+# JANELAS DESLIZANTES E HISTOGRAMAS
+# ================================
+
+# Janelas disponíveis para consulta (segundos)
+METRIC_WINDOWS = {"1m": 60, "5m": 300, "1h": 3600}
+
+
+class LogLinearHistogram:
+    """Histograma log-linear (estilo HDR) de durações em segundos.
+    
+    Cada potência de 2 é dividida em ``SUB_BUCKETS`` faixas lineares, o que
+    limita o erro relativo dos percentis a ~3%. Os contadores são esparsos e
+    histogramas podem ser somados com ``merge``.
+    """
+    
+    SUB_BUCKETS = 16
+    MIN_VALUE = 1e-6  # 1µs
+    
+    __slots__ = ("counts", "total")
+    
+    def __init__(self):
+        self.counts: Dict[int, int] = {}
+        self.total = 0
+    
+    @classmethod
+    def bucket_index(cls, value: float) -> int:
+        """Índice do bucket de um valor."""
+        if value <= cls.MIN_VALUE:
+            return 0
+        mantissa, exponent = math.frexp(value / cls.MIN_VALUE)
+        return exponent * cls.SUB_BUCKETS + int((mantissa * 2 - 1) * cls.SUB_BUCKETS)
+    
+    @classmethod
+    def bucket_value(cls, index: int) -> float:
+        """Valor representativo (ponto médio) de um bucket."""
+        if index < cls.SUB_BUCKETS:
+            return cls.MIN_VALUE
+        exponent, sub = divmod(index, cls.SUB_BUCKETS)
+        width = cls.MIN_VALUE * 2 ** (exponent - 1) / cls.SUB_BUCKETS
+        return cls.MIN_VALUE * 2 ** (exponent - 1) + width * (sub + 0.5)
+    
+    def record(self, value: float):
+        """Registra uma observação."""
+        index = self.bucket_index(value)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.total += 1
+    
+    def merge(self, other: "LogLinearHistogram"):
+        """Soma os contadores de outro histograma a este."""
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.total += other.total
+    
+    def percentile(self, q: float) -> float:
+        """Percentil aproximado (``q`` entre 0 e 1)."""
+        if not self.total:
+            return 0.0
+        rank = max(1, math.ceil(q * self.total))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return self.bucket_value(index)
+        return self.bucket_value(max(self.counts))
+    
+    def reset(self):
+        """Zera o histograma."""
+        self.counts.clear()
+        self.total = 0
+
+
+@dataclass
+class WindowStats:
+    """Agregado de uma série em uma janela de tempo."""
+    window_seconds: float
+    requests: int
+    errors: int
+    total_time: float
+    histogram: LogLinearHistogram
+    
+    @property
+    def requests_per_second(self) -> float:
+        return self.requests / self.window_seconds if self.window_seconds > 0 else 0.0
+    
+    @property
+    def error_rate(self) -> float:
+        return self.errors / self.requests * 100 if self.requests else 0.0
+    
+    @property
+    def avg_response_time(self) -> float:
+        return self.total_time / self.requests if self.requests else 0.0
+    
+    def to_dict(self) -> Dict[str, float]:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "requests_per_second": self.requests_per_second,
+            "error_rate": self.error_rate,
+            "avg_response_time": self.avg_response_time,
+            "p50_response_time": self.histogram.percentile(0.50),
+            "p95_response_time": self.histogram.percentile(0.95),
+            "p99_response_time": self.histogram.percentile(0.99)
+        }
+
+
+class _BucketRing:
+    """Anel de buckets temporais de largura fixa."""
+    
+    __slots__ = ("bucket_seconds", "size", "epochs", "requests", "errors", "total_time", "histograms")
+    
+    def __init__(self, bucket_seconds: int, size: int):
+        self.bucket_seconds = bucket_seconds
+        self.size = size
+        self.epochs = [-1] * size
+        self.requests = [0] * size
+        self.errors = [0] * size
+        self.total_time = [0.0] * size
+        self.histograms = [LogLinearHistogram() for _ in range(size)]
+    
+    def record(self, now: float, duration: float, error: bool, index: int):
+        epoch = int(now // self.bucket_seconds)
+        slot = epoch % self.size
+        histogram = self.histograms[slot]
+        if self.epochs[slot] != epoch:
+            # Bucket reaproveitado: descartar dados de uma volta anterior
+            self.epochs[slot] = epoch
+            self.requests[slot] = 0
+            self.errors[slot] = 0
+            self.total_time[slot] = 0.0
+            histogram.reset()
+        self.requests[slot] += 1
+        self.total_time[slot] += duration
+        if error:
+            self.errors[slot] += 1
+        counts = histogram.counts
+        counts[index] = counts.get(index, 0) + 1
+        histogram.total += 1
+    
+    def aggregate(self, now: float, window_seconds: float) -> WindowStats:
+        current = int(now // self.bucket_seconds)
+        oldest = current - max(1, int(window_seconds // self.bucket_seconds)) + 1
+        stats = WindowStats(window_seconds, 0, 0, 0.0, LogLinearHistogram())
+        for slot in range(self.size):
+            if oldest <= self.epochs[slot] <= current:
+                stats.requests += self.requests[slot]
+                stats.errors += self.errors[slot]
+                stats.total_time += self.total_time[slot]
+                stats.histogram.merge(self.histograms[slot])
+        return stats
+
+
+class WindowedSeries:
+    """Contadores e histogramas de latência em janelas deslizantes.
+    
+    Mantém um anel de 60 buckets de 1s (janela de 1 minuto) e outro de 60
+    buckets de 1min (janelas de 5 minutos e 1 hora). ``record`` é O(1) e a
+    memória não depende do volume de tráfego.
+    """
+    
+    def __init__(self):
+        self.rings = (_BucketRing(1, 60), _BucketRing(60, 60))
+    
+    def record(self, duration: float, error: bool = False, now: Optional[float] = None,
+               index: Optional[int] = None):
+        """Registra uma requisição (``index`` evita recalcular o bucket do histograma)."""
+        now = time.time() if now is None else now
+        if index is None:
+            index = LogLinearHistogram.bucket_index(duration)
+        for ring in self.rings:
+            ring.record(now, duration, error, index)
+    
+    def window(self, window_seconds: float, now: Optional[float] = None) -> WindowStats:
+        """Agrega a janela usando o anel de menor granularidade que a cobre."""
+        now = time.time() if now is None else now
+        for ring in self.rings:
+            if ring.bucket_seconds * ring.size >= window_seconds:
+                return ring.aggregate(now, window_seconds)
+        return self.rings[-1].aggregate(now, self.rings[-1].bucket_seconds * self.rings[-1].size)
+
+
+# ================================
+# AMOSTRAGEM DO PROCESSO
+# ================================
+
+@dataclass
+class ProcessSample:
+    """Amostra de recursos do processo e do event loop."""
+    timestamp: float
+    rss_mb: float
+    cpu_percent: float
+    open_fds: int
+    sockets: int
+    threads: int
+    event_loop_lag: float      # Maior atraso do loop no intervalo (s)
+    gc_pause_total: float      # Tempo total em coletas do GC no intervalo (s)
+    gc_pause_max: float        # Maior pausa do GC no intervalo (s)
+    gc_collections: List[int]  # Coletas por geração no intervalo
+
+
+class ProcessSampler:
+    """Amostrador em segundo plano, com cadência fixa.
+    
+    Mede o atraso do event loop a cada ``lag_interval`` e, a cada
+    ``interval``, coleta RSS, CPU, descritores, sockets e threads (fora do
+    loop). Pausas do GC vêm de ``gc.callbacks``. Leitores usam ``latest()``;
+    nenhuma leitura dispara coleta enquanto o amostrador estiver ativo.
+    """
+    
+    def __init__(self, interval: float = 1.0, lag_interval: float = 0.1):
+        self.interval = interval
+        self.lag_interval = lag_interval
+        self.process = psutil.Process()
+        self.process.cpu_percent(None)  # Primeira leitura define a referência
+        
+        self._latest: Optional[ProcessSample] = None
+        self._listeners: List[Callable[[ProcessSample], None]] = []
+        self._task: Optional[asyncio.Task] = None
+        
+        # Acumuladores do intervalo corrente
+        self._max_lag = 0.0
+        self._gc_started = 0.0
+        self._gc_pause_total = 0.0
+        self._gc_pause_max = 0.0
+        self._gc_counts = [0, 0, 0]
+    
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+    
+    def add_listener(self, listener: Callable[[ProcessSample], None]):
+        """Registra uma função chamada a cada nova amostra."""
+        self._listeners.append(listener)
+    
+    def _gc_callback(self, phase: str, info: Dict[str, int]):
+        if phase == "start":
+            self._gc_started = time.perf_counter()
+        elif self._gc_started:
+            pause = time.perf_counter() - self._gc_started
+            self._gc_started = 0.0
+            self._gc_pause_total += pause
+            self._gc_pause_max = max(self._gc_pause_max, pause)
+            self._gc_counts[info.get("generation", 0)] += 1
+    
+    def _count_sockets(self) -> int:
+        connections = getattr(self.process, "net_connections", None) or self.process.connections
+        try:
+            return len(connections(kind="inet"))
+        except (psutil.AccessDenied, psutil.Error):
+            return 0
+    
+    def _collect(self) -> tuple:
+        """Leituras do psutil (executadas em thread)."""
+        with self.process.oneshot():
+            rss = self.process.memory_info().rss / 1024 / 1024
+            cpu = self.process.cpu_percent(None)
+            threads = self.process.num_threads()
+            try:
+                fds = self.process.num_fds()
+            except AttributeError:  # Windows
+                fds = self.process.num_handles()
+        return rss, cpu, fds, self._count_sockets(), threads
+    
+    def _build_sample(self, readings: tuple, lag: float) -> ProcessSample:
+        rss, cpu, fds, sockets, threads = readings
+        sample = ProcessSample(
+            timestamp=time.time(),
+            rss_mb=rss,
+            cpu_percent=cpu,
+            open_fds=fds,
+            sockets=sockets,
+            threads=threads,
+            event_loop_lag=lag,
+            gc_pause_total=self._gc_pause_total,
+            gc_pause_max=self._gc_pause_max,
+            gc_collections=list(self._gc_counts)
+        )
+        self._gc_pause_total = 0.0
+        self._gc_pause_max = 0.0
+        self._gc_counts = [0, 0, 0]
+        
+        self._latest = sample
+        for listener in self._listeners:
+            try:
+                listener(sample)
+            except Exception as e:
+                logging.error(f"Erro no listener do amostrador: {e}")
+        return sample
+    
+    def sample(self) -> ProcessSample:
+        """Coleta uma amostra imediatamente (sem medir o event loop)."""
+        return self._build_sample(self._collect(), 0.0)
+    
+    def latest(self) -> ProcessSample:
+        """Última amostra; coleta na hora se o amostrador não estiver ativo."""
+        if self._latest is None or (
+            not self.running and time.time() - self._latest.timestamp > self.interval
+        ):
+            return self.sample()
+        return self._latest
+    
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        next_sample = loop.time() + self.interval
+        while True:
+            expected = loop.time() + self.lag_interval
+            await asyncio.sleep(self.lag_interval)
+            now = loop.time()
+            self._max_lag = max(self._max_lag, now - expected)
+            
+            if now >= next_sample:
+                next_sample = now + self.interval
+                readings = await asyncio.to_thread(self._collect)
+                lag, self._max_lag = self._max_lag, 0.0
+                self._build_sample(readings, lag)
+                
+                if lag > 0.5:
+                    logging.warning(f"🐢 Event loop bloqueado por {lag * 1000:.0f} ms")
+    
+    async def start(self):
+        """Inicia a amostragem no event loop atual."""
+        if self.running:
+            return
+        if self._gc_callback not in gc.callbacks:
+            gc.callbacks.append(self._gc_callback)
+        self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        """Para a amostragem e remove o callback do GC."""
+        if self._gc_callback in gc.callbacks:
+            gc.callbacks.remove(self._gc_callback)
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
 
 # ================================
 # SISTEMA DE MÉTRICAS
 # ================================
 
+# Chaves distintas por dimensão (ferramenta, serviço, host). O órgão vem
+# do cliente: acima do limite, as chaves novas são agregadas em "outros"
+MAX_DIMENSION_KEYS = 200
+OTHER_DIMENSION_KEY = "outros"
+
+
 class MetricsCollector:
     """Coletor de métricas do sistema."""
     
-    def __init__(self):
+    def __init__(self, sampler: Optional[ProcessSampler] = None, history_interval: float = 60.0,
+                 max_dimension_keys: int = MAX_DIMENSION_KEYS):
         self.metrics_history = deque(maxlen=1000)
+        self.history_interval = history_interval
+        self._last_history = 0.0
+        
+        # Recursos do processo amostrados em segundo plano
+        self.sampler = sampler or ProcessSampler()
+        self.sampler.add_listener(self._on_sample)
         self.service_stats = defaultdict(lambda: {
             'requests': 0,
             'errors': 0,
@@ -94,6 +474,23 @@ class MetricsCollector:
         self.start_time = datetime.now()
         self.total_requests = 0
         self.total_errors = 0
+        
+        # Janelas deslizantes: global e por ferramenta, serviço e host upstream
+        self.windows = WindowedSeries()
+        self.dimension_windows: Dict[str, Dict[str, WindowedSeries]] = {
+            "tool": {},
+            "service": {},
+            "host": {}
+        }
+        self.max_dimension_keys = max_dimension_keys
+        
+        # Registros ainda não agregados (caminho rápido de record_*)
+        self._pending = deque()
+        self.flush_threshold = 4096
+        
+        # Cache e conexões em andamento
+        self.cache_stats = defaultdict(lambda: [0, 0])  # nome -> [hits, misses]
+        self.in_flight_connections = 0
     
     def _setup_prometheus_metrics(self):
         """Configura métricas Prometheus."""
@@ -128,21 +525,127 @@ class MetricsCollector:
             'CPU usage percentage',
             registry=self.registry
         )
+        
+        self.event_loop_lag = Gauge(
+            'inde_mcp_event_loop_lag_seconds',
+            'Max event loop lag in the last sampling interval',
+            registry=self.registry
+        )
+        
+        self.open_fds = Gauge(
+            'inde_mcp_open_fds',
+            'Open file descriptors',
+            registry=self.registry
+        )
+        
+        self.threads = Gauge(
+            'inde_mcp_threads',
+            'Number of threads',
+            registry=self.registry
+        )
+        
+        self.gc_pause = Gauge(
+            'inde_mcp_gc_pause_max_seconds',
+            'Longest GC pause in the last sampling interval',
+            registry=self.registry
+        )
     
-    def record_request(self, service: str, method: str, duration: float, status: str = "success"):
-        """Registra uma requisição."""
-        self.total_requests += 1
+    def record_request(self, service: str, method: str, duration: float, status: str = "success",
+                       host: Optional[str] = None):
+        """Registra uma requisição.
+        
+        Apenas enfileira o registro (seguro entre threads); a agregação
+        acontece em ``flush``, chamado pelas leituras ou a cada
+        ``flush_threshold`` registros.
         
-        if status == "error":
+        Args:
+            service: Serviço ou órgão atendido
+            method: Ferramenta/operação executada
+            duration: Duração em segundos
+            status: "success" ou "error"
+            host: Host upstream envolvido (opcional)
+        """
+        pending = self._pending
+        pending.append((time.time(), service, method, duration, status, host))
+        if len(pending) >= self.flush_threshold:
+            self.flush()
+    
+    def record_upstream(self, host: str, duration: float, status: str = "success"):
+        """Registra uma chamada HTTP a um servidor upstream (dimensão "host")."""
+        self._pending.append((time.time(), None, None, duration, status, host))
+        if len(self._pending) >= self.flush_threshold:
+            self.flush()
+    
+    def record_cache(self, cache: str, hit: bool):
+        """Registra um acerto ou falha de cache."""
+        self.cache_stats[cache][0 if hit else 1] += 1
+    
+    def connection_opened(self):
+        """Marca o início de uma conexão upstream."""
+        self.in_flight_connections += 1
+    
+    def connection_closed(self):
+        """Marca o fim de uma conexão upstream."""
+        self.in_flight_connections -= 1
+    
+    def get_cache_hit_rate(self, cache: Optional[str] = None) -> float:
+        """Taxa de acerto (%) de um cache, ou de todos quando ``cache`` é None."""
+        if cache is not None:
+            hits, misses = self.cache_stats.get(cache, (0, 0))
+        else:
+            hits = sum(h for h, _ in self.cache_stats.values())
+            misses = sum(m for _, m in self.cache_stats.values())
+        total = hits + misses
+        return hits / total * 100 if total else 0.0
+    
+    def flush(self):
+        """Agrega os registros pendentes nas janelas e estatísticas."""
+        pending = self._pending
+        while True:
+            try:
+                timestamp, service, method, duration, status, host = pending.popleft()
+            except IndexError:
+                break
+            self._apply(timestamp, service, method, duration, status, host)
+    
+    def _apply(self, timestamp: float, service: Optional[str], method: Optional[str],
+               duration: float, status: str, host: Optional[str]):
+        is_error = status == "error"
+        index = LogLinearHistogram.bucket_index(duration)
+        
+        # Chaves limitadas: estatísticas e rótulos Prometheus seguem as janelas
+        if method is not None:
+            method = self._dimension_key("tool", method)
+        if service is not None:
+            service = self._dimension_key("service", service)
+        if host is not None:
+            host = self._dimension_key("host", host)
+        
+        # Janelas deslizantes
+        for dimension, key in (("tool", method), ("service", service), ("host", host)):
+            if key is None:
+                continue
+            series = self.dimension_windows[dimension].get(key)
+            if series is None:
+                series = self.dimension_windows[dimension][key] = WindowedSeries()
+            series.record(duration, is_error, timestamp, index)
+        
+        # Chamadas upstream não contam como requisições ao servidor
+        if method is None:
+            return
+        
+        self.total_requests += 1
+        if is_error:
             self.total_errors += 1
+        self.windows.record(duration, is_error, timestamp, index)
         
         # Atualizar estatísticas do serviço
         stats = self.service_stats[service]
         stats['requests'] += 1
         stats['total_time'] += duration
-        stats['last_request'] = datetime.now()
+        stats['last_request'] = datetime.fromtimestamp(timestamp)
         
-        if status == "error":
+        if is_error:
             stats['errors'] += 1
         
         # Prometheus
@@ -150,31 +653,30 @@ class MetricsCollector:
             self.request_counter.labels(service=service, method=method, status=status).inc()
             self.request_duration.labels(service=service, method=method).observe(duration)
     
+    def _dimension_key(self, dimension: str, key: str) -> str:
+        """Chave da série; com ``max_dimension_keys`` chaves já criadas, as novas viram "outros"."""
+        series_by_key = self.dimension_windows[dimension]
+        if key in series_by_key or len(series_by_key) < self.max_dimension_keys:
+            return key
+        return OTHER_DIMENSION_KEY
+    
     def get_current_metrics(self) -> PerformanceMetrics:
         """Obtém métricas atuais do sistema."""
+        self.flush()
         now = datetime.now()
         uptime = (now - self.start_time).total_seconds()
         
-        # Calcular RPS (últimos 60 segundos)
-        recent_requests = sum(
-            1 for service_stats in self.service_stats.values()
-            if service_stats['last_request'] and 
-            (now - service_stats['last_request']).total_seconds() < 60
-        )
-        
-        rps = recent_requests / min(60, uptime) if uptime > 0 else 0
-        
-        # Calcular tempo médio de resposta
-        total_time = sum(stats['total_time'] for stats in self.service_stats.values())
-        avg_response_time = total_time / self.total_requests if self.total_requests > 0 else 0
+        # RPS real do último minuto (ou do uptime, se menor)
+        last_minute = self.windows.window(METRIC_WINDOWS["1m"])
+        rps = last_minute.requests / min(60, uptime) if uptime > 0 else 0
         
-        # Taxa de erro
-        error_rate = (self.total_errors / self.total_requests * 100) if self.total_requests > 0 else 0
+        # Tempo de resposta e taxa de erro dos últimos 5 minutos
+        recent = self.windows.window(METRIC_WINDOWS["5m"])
+        avg_response_time = recent.avg_response_time
+        error_rate = recent.error_rate
         
-        # Métricas do sistema
-        process = psutil.Process()
-        memory_usage = process.memory_info().rss / 1024 / 1024  # MB
-        cpu_usage = process.cpu_percent()
+        # Recursos do processo (última amostra do amostrador)
+        sample = self.sampler.latest()
         
         metrics = PerformanceMetrics(
             timestamp=now,
@@ -182,23 +684,75 @@ class MetricsCollector:
             requests_per_second=rps,
             avg_response_time=avg_response_time,
             error_rate=error_rate,
-            cache_hit_rate=0.0,  # Implementar cache metrics
-            memory_usage=memory_usage,
-            cpu_usage=cpu_usage,
-            active_connections=0  # Implementar connection tracking
+            cache_hit_rate=self.get_cache_hit_rate(),
+            memory_usage=sample.rss_mb,
+            cpu_usage=sample.cpu_percent,
+            active_connections=self.in_flight_connections,
+            p50_response_time=recent.histogram.percentile(0.50),
+            p95_response_time=recent.histogram.percentile(0.95),
+            p99_response_time=recent.histogram.percentile(0.99),
+            open_fds=sample.open_fds,
+            sockets=sample.sockets,
+            threads=sample.threads,
+            event_loop_lag=sample.event_loop_lag,
+            gc_pause_max=sample.gc_pause_max
         )
         
-        # Atualizar Prometheus
+        return metrics
+    
+    def _on_sample(self, sample: ProcessSample):
+        """Atualiza gauges a cada amostra e o histórico a cada ``history_interval``."""
         if PROMETHEUS_AVAILABLE:
-            self.memory_usage.set(memory_usage * 1024 * 1024)  # Bytes
-            self.cpu_usage.set(cpu_usage)
+            self.memory_usage.set(sample.rss_mb * 1024 * 1024)  # Bytes
+            self.cpu_usage.set(sample.cpu_percent)
+            self.active_connections.set(self.in_flight_connections)
+            self.event_loop_lag.set(sample.event_loop_lag)
+            self.open_fds.set(sample.open_fds)
+            self.threads.set(sample.threads)
+            self.gc_pause.set(sample.gc_pause_max)
         
-        self.metrics_history.append(metrics)
-        return metrics
+        if sample.timestamp - self._last_history >= self.history_interval:
+            self._last_history = sample.timestamp
+            self.metrics_history.append(self.get_current_metrics())
+    
+    async def start_sampler(self):
+        """Inicia o amostrador do processo no event loop atual."""
+        await self.sampler.start()
+    
+    async def stop_sampler(self):
+        await self.sampler.stop()
+    
+    def get_window_stats(self, window: str = "5m", dimension: Optional[str] = None,
+                         key: Optional[str] = None) -> Dict[str, float]:
+        """Estatísticas de uma janela ("1m", "5m", "1h").
+        
+        Sem ``dimension`` retorna o agregado global; com ``dimension``
+        ("tool", "service" ou "host") e ``key`` retorna a série correspondente.
+        """
+        self.flush()
+        window_seconds = METRIC_WINDOWS[window]
+        if dimension is None:
+            series = self.windows
+        else:
+            series = self.dimension_windows[dimension].get(key)
+            if series is None:
+                series = WindowedSeries()
+        return series.window(window_seconds).to_dict()
+    
+    def get_breakdown(self, dimension: str, window: str = "5m") -> Dict[str, Dict[str, float]]:
+        """Estatísticas da janela para todas as chaves de uma dimensão."""
+        self.flush()
+        window_seconds = METRIC_WINDOWS[window]
+        return {
+            key: series.window(window_seconds).to_dict()
+            for key, series in self.dimension_windows[dimension].items()
+        }
     
     def get_service_stats(self, service: str) -> Dict[str, Any]:
         """Obtém estatísticas de um serviço específico."""
-        stats = self.service_stats[service]
+        self.flush()
+        # Leitura sem criar entrada (serviços ainda sem requisições)
+        stats = self.service_stats.get(service) or self.service_stats.default_factory()
         
         avg_response_time = (
             stats['total_time'] / stats['requests'] 
@@ -210,11 +764,14 @@ class MetricsCollector:
             if stats['requests'] > 0 else 0
         )
         
+        recent = self.get_window_stats("5m", "service", service)
+        
         return {
             'requests': stats['requests'],
             'errors': stats['errors'],
             'error_rate': error_rate,
             'avg_response_time': avg_response_time,
+            'p95_response_time': recent['p95_response_time'],
             'last_request': stats['last_request']
         }
     
@@ -223,21 +780,256 @@ class MetricsCollector:
         if not PROMETHEUS_AVAILABLE:
             return "# Prometheus not available\n"
         
+        self.flush()
+        
         return generate_latest(self.registry).decode('utf-8')
 
 
+# ================================
+# HISTÓRICO DE SAÚDE
+# ================================
+
+# Códigos compactos de status armazenados no histórico
+HEALTH_STATUS_CODES = {"healthy": 0, "degraded": 1, "unhealthy": 2}
+HEALTH_STATUS_NAMES = {code: name for name, code in HEALTH_STATUS_CODES.items()}
+
+# Janelas de uptime: nome -> (largura do bucket em segundos, número de buckets)
+UPTIME_WINDOWS = {
+    "1h": (60, 60),
+    "24h": (900, 96),
+    "7d": (3600, 168)
+}
+
+
+class _UptimeWindow:
+    """Contadores de checks (total e saudáveis) em buckets temporais.
+    
+    Mantém somas correntes da janela inteira: buckets que saem da janela são
+    subtraídos ao avançar o relógio, e o uptime é lido em O(1).
+    """
+    
+    __slots__ = ("bucket_seconds", "size", "epochs", "totals", "healthy", "current_epoch",
+                 "window_total", "window_healthy")
+    
+    def __init__(self, bucket_seconds: int, size: int):
+        self.bucket_seconds = bucket_seconds
+        self.size = size
+        self.epochs = array("q", [-1] * size)
+        self.totals = array("l", [0] * size)
+        self.healthy = array("l", [0] * size)
+        self.current_epoch = -1
+        self.window_total = 0
+        self.window_healthy = 0
+    
+    def _advance(self, now: float) -> int:
+        epoch = int(now // self.bucket_seconds)
+        if epoch > self.current_epoch:
+            # Expirar no máximo ``size`` buckets, independentemente do intervalo
+            start = max(self.current_epoch + 1, epoch - self.size + 1)
+            for e in range(start, epoch + 1):
+                slot = e % self.size
+                if self.epochs[slot] != -1:
+                    self.window_total -= self.totals[slot]
+                    self.window_healthy -= self.healthy[slot]
+                self.epochs[slot] = e
+                self.totals[slot] = 0
+                self.healthy[slot] = 0
+            self.current_epoch = epoch
+        return epoch
+    
+    def record(self, now: float, is_healthy: bool):
+        epoch = self._advance(now)
+        if epoch < self.current_epoch - self.size + 1:
+            return  # Registro mais antigo que a janela
+        slot = epoch % self.size
+        self.totals[slot] += 1
+        self.window_total += 1
+        if is_healthy:
+            self.healthy[slot] += 1
+            self.window_healthy += 1
+    
+    def uptime(self, now: float) -> Optional[float]:
+        self._advance(now)
+        if not self.window_total:
+            return None
+        return self.window_healthy / self.window_total * 100
+
+
+class ServiceHealthHistory:
+    """Histórico de saúde de tamanho fixo de um serviço.
+    
+    Os últimos ``capacity`` checks ficam em um buffer circular compacto
+    (timestamp, status e tempo de resposta em arrays) e o uptime de 1h, 24h
+    e 7d é mantido por contadores correntes, sem percorrer o histórico.
+    """
+    
+    def __init__(self, capacity: int = 288):
+        self.capacity = capacity
+        self.timestamps = array("d", [0.0] * capacity)
+        self.response_times = array("f", [0.0] * capacity)
+        self.statuses = array("b", [0] * capacity)
+        self.count = 0
+        self._next = 0
+        self.total_checks = 0
+        self.healthy_checks = 0
+        self.windows = {
+            name: _UptimeWindow(bucket_seconds, size)
+            for name, (bucket_seconds, size) in UPTIME_WINDOWS.items()
+        }
+    
+    def record(self, status: str, response_time: float, timestamp: Optional[float] = None):
+        """Registra o resultado de um check."""
+        timestamp = time.time() if timestamp is None else timestamp
+        is_healthy = status == "healthy"
+        
+        slot = self._next
+        self.timestamps[slot] = timestamp
+        self.response_times[slot] = response_time
+        self.statuses[slot] = HEALTH_STATUS_CODES.get(status, HEALTH_STATUS_CODES["unhealthy"])
+        self._next = (slot + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+        
+        self.total_checks += 1
+        if is_healthy:
+            self.healthy_checks += 1
+        for window in self.windows.values():
+            window.record(timestamp, is_healthy)
+    
+    def uptime(self, window: str = "24h", now: Optional[float] = None) -> float:
+        """Percentual de checks saudáveis na janela ("1h", "24h" ou "7d")."""
+        value = self.windows[window].uptime(time.time() if now is None else now)
+        return value if value is not None else 0.0
+    
+    def recent(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Checks mais recentes, do mais novo para o mais antigo."""
+        limit = self.count if limit is None else min(limit, self.count)
+        records = []
+        for i in range(1, limit + 1):
+            slot = (self._next - i) % self.capacity
+            records.append({
+                "timestamp": datetime.fromtimestamp(self.timestamps[slot]),
+                "status": HEALTH_STATUS_NAMES[self.statuses[slot]],
+                "response_time": self.response_times[slot]
+            })
+        return records
+
+
+# ================================
+# ENDPOINTS DO CATÁLOGO
+# ================================
+
+# Serviços usados quando o catálogo não está disponível
+DEFAULT_SERVICES = [
+    ("ANATEL", "https://sistemas.anatel.gov.br/geoserver/ows"),
+    ("ANA", "https://metadados.snirh.gov.br/geoserver/wfs"),
+    ("IBGE", "https://geoservicos.ibge.gov.br/geoserver/wfs"),
+    ("INCRA", "https://certificacao.incra.gov.br/csv_shp/export_shp.py"),
+    ("ICMBio", "https://geoservicos.icmbio.gov.br/geoserver/ows")
+]
+
+CAPABILITIES_KEYS = (
+    ("WMS", "wmsGetCapabilities"),
+    ("WFS", "wfsGetCapabilities"),
+    ("WCS", "wcsGetCapabilities")
+)
+
+
+def load_catalog_endpoints(catalog_path) -> List[tuple]:
+    """Lista ``(nome, url)`` de todos os GetCapabilities WMS/WFS/WCS do catálogo.
+    
+    Entradas sem URLs de capabilities (catálogos simplificados) usam ``url``.
+    Nomes repetidos recebem sufixo numérico.
+    """
+    with open(catalog_path, "r", encoding="utf-8") as f:
+        catalog_data = yaml.safe_load(f) or []
+    
+    endpoints = []
+    seen = defaultdict(int)
+    for item in catalog_data:
+        if not isinstance(item, dict):
+            continue
+        descricao = item.get("descricao", item.get("title", "Sem descrição"))
+        orgao = descricao.split("-")[0].strip() if "-" in descricao else descricao.strip()
+        
+        urls = [(kind, item.get(key)) for kind, key in CAPABILITIES_KEYS if item.get(key)]
+        if not urls and item.get("url"):
+            urls = [("URL", item["url"])]
+        
+        for kind, url in urls:
+            name = f"{orgao} [{kind}]"
+            seen[name] += 1
+            if seen[name] > 1:
+                name = f"{name} #{seen[name]}"
+            endpoints.append((name, url))
+    
+    return endpoints
+
+
 # ================================
 # MONITOR DE SAÚDE DOS SERVIÇOS
 # ================================
 
 class ServiceHealthMonitor:
-    """Monitor de saúde dos serviços INDE."""
+    """Monitor de saúde dos serviços INDE.
+    
+    Os checks compartilham uma única sessão HTTP com pool de conexões, têm
+    concorrência limitada e são distribuídos uniformemente (com jitter) ao
+    longo de ``check_interval``.
+    
+    Modos de probe:
+        - "status": HEAD; nos servidores que recusam HEAD, GET com
+          ``Range: bytes=0-0`` lendo no máximo ``PROBE_READ_LIMIT`` bytes (padrão)
+        - "head": requisição HEAD
+        - "full": GET lendo a resposta completa
+    
+    Respostas lidas até o fim devolvem a conexão ao pool. No GET parcial,
+    um servidor que ignora o Range tem a conexão descartada em vez de
+    transferir um GetCapabilities de vários MB a cada ciclo.
+    """
+    
+    # Respostas a HEAD que indicam método não suportado (o probe repete com GET)
+    HEAD_UNSUPPORTED = {400, 403, 405, 501}
     
-    def __init__(self, check_interval: int = 300):  # 5 minutos
+    # Bytes lidos no GET parcial do modo "status"
+    PROBE_READ_LIMIT = 1024
+    
+    def __init__(self, check_interval: int = 300, history_size: int = 288,  # 5 minutos
+                 max_concurrent: int = 10, probe_mode: str = "status",
+                 jitter: float = 0.1, timeout: float = 30.0):
         self.check_interval = check_interval
+        self.history_size = history_size
+        self.max_concurrent = max_concurrent
+        self.probe_mode = probe_mode
+        self.jitter = jitter
+        self.timeout = timeout
         self.services = {}
-        self.health_history = defaultdict(list)
+        self.health_history: Dict[str, ServiceHealthHistory] = {}
         self.running = False
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._tasks = set()
+        self._head_unsupported = set()
+    
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Sessão HTTP compartilhada por todos os checks."""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_concurrent,
+                limit_per_host=4,
+                ttl_dns_cache=600
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                trace_configs=[aiohttp_trace_config()] if tracer.enabled else None
+            )
+        return self._session
+    
+    async def close(self):
+        """Fecha a sessão HTTP compartilhada."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
     
     def add_service(self, name: str, url: str, check_function: Optional[Callable] = None):
         """Adiciona um serviço para monitoramento."""
@@ -246,51 +1038,90 @@ class ServiceHealthMonitor:
             'check_function': check_function or self._default_health_check,
             'last_health': None
         }
+        if name not in self.health_history:
+            self.health_history[name] = ServiceHealthHistory(self.history_size)
+    
+    def remove_service(self, name: str):
+        """Remove um serviço do monitoramento (o agendador o descarta no próximo slot)."""
+        info = self.services.pop(name, None)
+        self.health_history.pop(name, None)
+        if info:
+            self._head_unsupported.discard(info['url'])
     
     async def _default_health_check(self, url: str) -> tuple[str, float, Optional[str]]:
         """Check de saúde padrão via HTTP."""
         try:
             start_time = time.time()
+            session = await self._get_session()
+            use_head = self.probe_mode == "head" or (
+                self.probe_mode == "status" and url not in self._head_unsupported
+            )
             
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, timeout=aiohttp.ClientTimeout(total=30)) as response:
-                    duration = time.time() - start_time
-                    
-                    if response.status == 200:
-                        return "healthy", duration, None
-                    else:
-                        return "degraded", duration, f"HTTP {response.status}"
+            status = None
+            if use_head:
+                async with session.head(url, allow_redirects=True) as response:
+                    status = response.status
+                if self.probe_mode == "status" and status in self.HEAD_UNSUPPORTED:
+                    self._head_unsupported.add(url)
+                    status = None
+            
+            if status is None and self.probe_mode == "full":
+                async with session.get(url) as response:
+                    # Corpo lido até o fim: a conexão é liberada para o pool
+                    await response.read()
+                    status = response.status
+            elif status is None:
+                # Só o status: pede um byte e lê no máximo PROBE_READ_LIMIT
+                async with session.get(url, headers={"Range": "bytes=0-0"}) as response:
+                    status = response.status
+                    await response.content.read(self.PROBE_READ_LIMIT)
+                    response.release()
+            duration = time.time() - start_time
+            
+            if status in (200, 206):
+                return "healthy", duration, None
+            return "degraded", duration, f"HTTP {status}"
                         
         except asyncio.TimeoutError:
-            return "unhealthy", 30.0, "Timeout"
+            return "unhealthy", self.timeout, "Timeout"
         except Exception as e:
-            return "unhealthy", 30.0, str(e)
+            return "unhealthy", self.timeout, str(e)
     
     async def check_service_health(self, name: str) -> ServiceHealth:
         """Verifica saúde de um serviço específico."""
         service_info = self.services[name]
         
-        status, response_time, error_message = await service_info['check_function'](
-            service_info['url']
-        )
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        
+        async with self._semaphore:
+            with tracer.start_span("health.probe", {"inde.service": name, "http.url": service_info['url'],
+                                                    "inde.probe_mode": self.probe_mode}, kind="client") as span:
+                status, response_time, error_message = await service_info['check_function'](
+                    service_info['url']
+                )
+                span.set_attribute("inde.health_status", status)
+                if error_message:
+                    span.set_error(error_message)
         
-        # Calcular uptime
+        # Registrar no histórico e calcular uptime (O(1))
+        now = time.time()
         history = self.health_history[name]
-        healthy_checks = sum(1 for h in history[-100:] if h.status == "healthy")
-        uptime_percentage = (healthy_checks / len(history[-100:])) * 100 if history else 0
+        history.record(status, response_time, now)
         
         health = ServiceHealth(
             name=name,
             url=service_info['url'],
             status=status,
             response_time=response_time,
-            last_check=datetime.now(),
+            last_check=datetime.fromtimestamp(now),
             error_message=error_message,
-            uptime_percentage=uptime_percentage
+            uptime_percentage=history.uptime("24h", now),
+            uptime_1h=history.uptime("1h", now),
+            uptime_7d=history.uptime("7d", now)
         )
         
         self.services[name]['last_health'] = health
-        self.health_history[name].append(health)
         
         return health
     
@@ -320,90 +1151,433 @@ class ServiceHealthMonitor:
         
         return results
     
+    def get_latest_health(self) -> Dict[str, ServiceHealth]:
+        """Resultado mais recente de cada serviço já verificado."""
+        return {
+            name: info['last_health']
+            for name, info in self.services.items()
+            if info['last_health'] is not None
+        }
+    
+    def _next_delay(self) -> float:
+        """Intervalo até o próximo check de um serviço, com jitter."""
+        spread = self.check_interval * self.jitter
+        return max(1.0, self.check_interval + random.uniform(-spread, spread))
+    
+    async def _run_check(self, name: str):
+        try:
+            await self.check_service_health(name)
+        except Exception as e:
+            logging.error(f"Erro ao verificar {name}: {e}")
+    
     async def start_monitoring(self):
-        """Inicia monitoramento contínuo."""
+        """Inicia monitoramento contínuo.
+        
+        Cada serviço recebe uma fase própria dentro do intervalo, de forma que
+        os checks fiquem espalhados em vez de disparados todos ao mesmo tempo.
+        """
         self.running = True
+        loop = asyncio.get_running_loop()
         
-        while self.running:
-            try:
-                await self.check_all_services()
-                await asyncio.sleep(self.check_interval)
-            except Exception as e:
-                logging.error(f"Erro no monitoramento: {e}")
-                await asyncio.sleep(10)
+        names = list(self.services.keys())
+        random.shuffle(names)
+        slot = self.check_interval / max(1, len(names))
+        schedule = [
+            (loop.time() + i * slot + random.uniform(0, slot * self.jitter), name)
+            for i, name in enumerate(names)
+        ]
+        heapq.heapify(schedule)
+        
+        try:
+            while self.running:
+                # Serviços adicionados depois do início entram no próximo slot livre
+                scheduled = {name for _, name in schedule}
+                for name in self.services.keys() - scheduled:
+                    heapq.heappush(schedule, (loop.time() + random.uniform(0, slot), name))
+                
+                if not schedule:
+                    await asyncio.sleep(1)
+                    continue
+                
+                due, name = schedule[0]
+                delay = due - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(min(delay, 1.0))
+                    continue
+                
+                heapq.heappop(schedule)
+                if name in self.services:
+                    task = asyncio.create_task(self._run_check(name))
+                    self._tasks.add(task)
+                    task.add_done_callback(self._tasks.discard)
+                    heapq.heappush(schedule, (due + self._next_delay(), name))
+        finally:
+            for task in list(self._tasks):
+                task.cancel()
+            await self.close()
     
     def stop_monitoring(self):
         """Para o monitoramento."""
         self.running = False
 
 
+# ================================
+# PIPELINE DE NOTIFICAÇÕES
+# ================================
+
+class _NotificationDestination:
+    """Fila e política de entrega de um destino de notificação."""
+    
+    def __init__(self, name: str, handler: Callable, batched: bool, batch_size: int,
+                 flush_interval: float, max_queue: int, max_retries: int, backoff: float):
+        self.name = name
+        self.handler = handler
+        self.batched = batched
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.max_retries = max_retries
+        self.backoff = backoff
+        
+        self.queue: deque = deque()
+        self.wakeup: Optional[asyncio.Event] = None
+        self.task: Optional[asyncio.Task] = None
+        self.suppressed = 0
+        self.stats = {"sent": 0, "failed": 0, "dropped": 0, "retries": 0}
+
+
+class NotificationDispatcher:
+    """Entrega assíncrona de alertas em lote, por destino.
+    
+    ``submit`` apenas enfileira: cada destino é drenado por um worker próprio,
+    que agrupa até ``batch_size`` alertas (ou o que chegar em
+    ``flush_interval``), tenta novamente com backoff exponencial e, com a fila
+    cheia, descarta os mais antigos e envia um alerta agregado com a contagem
+    suprimida. Handlers podem ser síncronos ou assíncronos; com
+    ``batched=True`` recebem a lista de alertas do lote.
+    """
+    
+    def __init__(self, max_connections: int = 20):
+        self.max_connections = max_connections
+        self.destinations: Dict[str, _NotificationDestination] = {}
+        self.running = False
+        self._session: Optional[aiohttp.ClientSession] = None
+    
+    def add_destination(self, name: str, handler: Callable, batched: bool = False,
+                        batch_size: int = 20, flush_interval: float = 2.0, max_queue: int = 1000,
+                        max_retries: int = 5, backoff: float = 1.0):
+        """Registra um destino de notificação."""
+        destination = _NotificationDestination(
+            name, handler, batched, batch_size, flush_interval, max_queue, max_retries, backoff
+        )
+        self.destinations[name] = destination
+        if self.running:
+            self._start_worker(destination)
+    
+    async def get_session(self) -> aiohttp.ClientSession:
+        """Sessão HTTP compartilhada pelos destinos (webhooks)."""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_connections),
+                timeout=aiohttp.ClientTimeout(total=15)
+            )
+        return self._session
+    
+    def submit(self, alert: Alert):
+        """Enfileira um alerta para todos os destinos (não bloqueia)."""
+        for destination in self.destinations.values():
+            self.enqueue(destination, alert)
+    
+    def enqueue(self, destination: _NotificationDestination, alert: Alert):
+        """Enfileira um alerta para um destino (entregue quando o worker estiver ativo)."""
+        if len(destination.queue) >= destination.max_queue:
+            destination.queue.popleft()
+            destination.suppressed += 1
+            destination.stats["dropped"] += 1
+        destination.queue.append(alert)
+        if destination.wakeup is not None:
+            destination.wakeup.set()
+    
+    def _start_worker(self, destination: _NotificationDestination):
+        destination.wakeup = asyncio.Event()
+        if destination.queue:
+            destination.wakeup.set()
+        destination.task = asyncio.create_task(self._worker(destination))
+    
+    async def start(self):
+        """Inicia os workers (requer event loop em execução)."""
+        if self.running:
+            return
+        self.running = True
+        for destination in self.destinations.values():
+            self._start_worker(destination)
+    
+    async def stop(self, timeout: float = 5.0):
+        """Drena as filas por até ``timeout`` segundos e encerra os workers."""
+        self.running = False
+        for destination in self.destinations.values():
+            if destination.wakeup is not None:
+                destination.wakeup.set()
+        
+        tasks = [d.task for d in self.destinations.values() if d.task]
+        if tasks:
+            _, pending = await asyncio.wait(tasks, timeout=timeout)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        
+        if self._session and not self._session.closed:
+            await self._session.close()
+    
+    def _next_batch(self, destination: _NotificationDestination) -> List[Alert]:
+        batch = []
+        if destination.suppressed:
+            batch.append(Alert(
+                id=f"notifications_suppressed_{destination.name}_{int(time.time())}",
+                level="warning",
+                message=f"{destination.suppressed} alertas descartados por sobrecarga no destino {destination.name}",
+                service="notifications",
+                timestamp=datetime.now()
+            ))
+            destination.suppressed = 0
+        while destination.queue and len(batch) < destination.batch_size:
+            batch.append(destination.queue.popleft())
+        return batch
+    
+    async def _worker(self, destination: _NotificationDestination):
+        while self.running or destination.queue:
+            if not destination.queue:
+                if not self.running:
+                    break
+                destination.wakeup.clear()
+                await destination.wakeup.wait()
+                continue
+            
+            # Aguarda o lote encher (ou o intervalo expirar)
+            if self.running and len(destination.queue) < destination.batch_size:
+                await asyncio.sleep(destination.flush_interval)
+            
+            batch = self._next_batch(destination)
+            if batch:
+                await self._deliver(destination, batch)
+    
+    async def _call(self, handler: Callable, payload):
+        result = handler(payload)
+        if asyncio.iscoroutine(result):
+            await result
+    
+    async def _deliver(self, destination: _NotificationDestination, batch: List[Alert]):
+        """Entrega um lote com retentativas e backoff exponencial."""
+        pending = [batch] if destination.batched else [[alert] for alert in batch]
+        
+        for items in pending:
+            payload = items if destination.batched else items[0]
+            for attempt in range(destination.max_retries + 1):
+                try:
+                    await self._call(destination.handler, payload)
+                    destination.stats["sent"] += len(items)
+                    break
+                except Exception as e:
+                    if attempt == destination.max_retries or not self.running:
+                        destination.stats["failed"] += len(items)
+                        logging.error(f"❌ Falha ao notificar {destination.name}: {e}")
+                        break
+                    destination.stats["retries"] += 1
+                    delay = min(60.0, destination.backoff * 2 ** attempt)
+                    await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+    
+    def get_stats(self) -> Dict[str, Dict[str, int]]:
+        """Contadores de entrega e tamanho das filas por destino."""
+        return {
+            name: {**d.stats, "queued": len(d.queue)}
+            for name, d in self.destinations.items()
+        }
+
+
 # ================================
 # SISTEMA DE ALERTAS
 # ================================
 
 class AlertManager:
-    """Gerenciador de alertas do sistema."""
+    """Gerenciador de alertas do sistema.
     
-    def __init__(self):
-        self.alerts = []
-        self.alert_rules = []
+    Alertas ativos ficam indexados por ``(serviço, regra)``; alertas resolvidos
+    vão para um histórico limitado. Um alerta é resolvido automaticamente
+    depois de ``clear_after`` avaliações consecutivas sem a condição (histerese).
+    
+    Regras com ``scope="system"`` recebem o contexto completo e podem retornar
+    um alerta, uma lista de alertas ou ``None``. Regras com ``scope="service"``
+    recebem ``(nome, saúde, contexto)`` e só são avaliadas para serviços com
+    health check novo desde o último ciclo.
+    """
+    
+    def __init__(self, history_size: int = 1000, clear_after: int = 3,
+                 dispatcher: Optional[NotificationDispatcher] = None):
+        self.clear_after = clear_after
+        self.active: Dict[tuple, Alert] = {}
+        self.history: deque = deque(maxlen=history_size)
+        self.alert_rules: List[tuple] = []
         self.notification_handlers = []
+        self.dispatcher = dispatcher or NotificationDispatcher()
+        
+        self._active_by_rule: Dict[str, set] = defaultdict(set)
+        self._active_ids: Dict[str, tuple] = {}
+        self._clear_counts: Dict[tuple, int] = {}
+        self._last_seen: Dict[str, datetime] = {}
     
-    def add_alert_rule(self, rule: Callable[[Any], Optional[Alert]]):
+    @property
+    def alerts(self) -> List[Alert]:
+        """Alertas resolvidos recentes seguidos dos ativos."""
+        return list(self.history) + list(self.active.values())
+    
+    def add_alert_rule(self, rule: Callable[..., Any], name: Optional[str] = None,
+                       scope: str = "system"):
         """Adiciona uma regra de alerta."""
-        self.alert_rules.append(rule)
+        if scope not in ("system", "service"):
+            raise ValueError(f"Escopo de regra inválido: {scope}")
+        self.alert_rules.append((name or getattr(rule, "__name__", repr(rule)), rule, scope))
     
-    def add_notification_handler(self, handler: Callable[[Alert], None]):
-        """Adiciona um handler de notificação."""
+    def add_notification_handler(self, handler: Callable, name: Optional[str] = None,
+                                 batched: bool = False, **options):
+        """Adiciona um handler de notificação.
+        
+        O handler vira um destino do ``NotificationDispatcher`` (``options``
+        são repassadas a ``add_destination``). Enquanto o dispatcher não estiver
+        em execução, handlers síncronos são chamados diretamente e os alertas
+        para handlers assíncronos ficam na fila do destino até ``start``.
+        """
         self.notification_handlers.append(handler)
+        name = name or getattr(handler, "__name__", f"handler_{len(self.notification_handlers)}")
+        self.dispatcher.add_destination(name, handler, batched=batched, **options)
     
     def check_alerts(self, metrics: PerformanceMetrics, health_status: Dict[str, ServiceHealth]):
-        """Verifica se algum alerta deve ser disparado."""
+        """Verifica se algum alerta deve ser disparado ou resolvido."""
         context = {
             'metrics': metrics,
             'health': health_status
         }
         
-        for rule in self.alert_rules:
+        # Serviços que saíram do monitoramento: esquece o último check e
+        # resolve os alertas das regras por serviço
+        for name in self._last_seen.keys() - health_status.keys():
+            del self._last_seen[name]
+            for rule_name, _, scope in self.alert_rules:
+                if scope == "service" and (name, rule_name) in self.active:
+                    self._resolve((name, rule_name))
+        
+        # Apenas serviços com health check novo são reavaliados
+        changed = []
+        for name, health in health_status.items():
+            if self._last_seen.get(name) != health.last_check:
+                self._last_seen[name] = health.last_check
+                changed.append(name)
+        
+        for rule_name, rule, scope in self.alert_rules:
+            if scope == "service":
+                for service in changed:
+                    try:
+                        alert = rule(service, health_status[service], context)
+                    except Exception as e:
+                        logging.error(f"Erro ao verificar regra de alerta {rule_name}: {e}")
+                        continue
+                    key = (service, rule_name)
+                    if alert:
+                        alert.service = service
+                        self._trigger_alert(alert, key)
+                    else:
+                        self._condition_cleared(key)
+                continue
+            
             try:
-                alert = rule(context)
-                if alert:
-                    self._trigger_alert(alert)
+                result = rule(context)
             except Exception as e:
-                logging.error(f"Erro ao verificar regra de alerta: {e}")
-    
-    def _trigger_alert(self, alert: Alert):
-        """Dispara um alerta."""
-        # Verificar se já existe alerta similar ativo
-        existing = next(
-            (a for a in self.alerts 
-             if a.service == alert.service and a.level == alert.level and not a.resolved),
-            None
-        )
+                logging.error(f"Erro ao verificar regra de alerta {rule_name}: {e}")
+                continue
+            
+            if result is None:
+                result = []
+            elif isinstance(result, Alert):
+                result = [result]
+            
+            firing = set()
+            for alert in result:
+                key = (alert.service, rule_name)
+                firing.add(key)
+                self._trigger_alert(alert, key)
+            
+            for key in list(self._active_by_rule.get(rule_name, ())):
+                if key not in firing:
+                    self._condition_cleared(key)
+    
+    def _trigger_alert(self, alert: Alert, key: Optional[tuple] = None):
+        """Dispara um alerta (ou mantém o já ativo para a mesma chave)."""
+        key = key or (alert.service, alert.level)
+        self._clear_counts.pop(key, None)
         
+        existing = self.active.get(key)
         if existing:
-            return  # Alerta já existe
+            existing.message = alert.message  # Alerta já existe
+            return
+        
+        alert.rule = key[1]
+        self.active[key] = alert
+        self._active_by_rule[key[1]].add(key)
+        self._active_ids[alert.id] = key
         
-        self.alerts.append(alert)
+        self._notify(alert)
+    
+    def _notify(self, alert: Alert):
+        """Enfileira no dispatcher ou, sem ele, chama os handlers síncronos."""
+        if self.dispatcher.running:
+            self.dispatcher.submit(alert)
+            return
         
-        # Enviar notificações
-        for handler in self.notification_handlers:
+        for destination in self.dispatcher.destinations.values():
             try:
-                handler(alert)
+                result = destination.handler([alert] if destination.batched else alert)
+                if asyncio.iscoroutine(result):
+                    # Handlers assíncronos dependem do dispatcher: o alerta aguarda na fila
+                    result.close()
+                    self.dispatcher.enqueue(destination, alert)
+                    logging.info(f"⏳ Notificação para {destination.name} na fila até o dispatcher iniciar")
             except Exception as e:
                 logging.error(f"Erro ao enviar notificação: {e}")
     
+    def _condition_cleared(self, key: tuple):
+        """Conta avaliações sem a condição e resolve após ``clear_after``."""
+        if key not in self.active:
+            return
+        count = self._clear_counts.get(key, 0) + 1
+        if count >= self.clear_after:
+            self._resolve(key)
+        else:
+            self._clear_counts[key] = count
+    
+    def _resolve(self, key: tuple):
+        alert = self.active.pop(key)
+        self._active_by_rule[key[1]].discard(key)
+        self._active_ids.pop(alert.id, None)
+        self._clear_counts.pop(key, None)
+        
+        alert.resolved = True
+        alert.resolved_at = datetime.now()
+        self.history.append(alert)
+        logging.info(f"✅ Alerta resolvido: {alert.service} - {alert.message}")
+    
     def resolve_alert(self, alert_id: str):
         """Resolve um alerta."""
-        for alert in self.alerts:
-            if alert.id == alert_id and not alert.resolved:
-                alert.resolved = True
-                alert.resolved_at = datetime.now()
-                break
+        key = self._active_ids.get(alert_id)
+        if key:
+            self._resolve(key)
     
     def get_active_alerts(self) -> List[Alert]:
         """Retorna alertas ativos."""
-        return [a for a in self.alerts if not a.resolved]
+        return list(self.active.values())
+    
+    def get_resolved_alerts(self, limit: Optional[int] = None) -> List[Alert]:
+        """Alertas resolvidos mais recentes primeiro."""
+        resolved = list(reversed(self.history))
+        return resolved[:limit] if limit else resolved
 
 
 # ================================
@@ -437,17 +1611,15 @@ def create_default_alert_rules(alert_manager: AlertManager):
             )
         return None
     
-    def service_down_rule(context) -> Optional[Alert]:
-        health = context['health']
-        for service_name, health_status in health.items():
-            if health_status.status == "unhealthy":
-                return Alert(
-                    id=f"service_down_{service_name}_{int(time.time())}",
-                    level="critical",
-                    message=f"Serviço {service_name} indisponível: {health_status.error_message}",
-                    service=service_name,
-                    timestamp=datetime.now()
-                )
+    def service_down_rule(service_name, health_status, context) -> Optional[Alert]:
+        if health_status.status == "unhealthy":
+            return Alert(
+                id=f"service_down_{service_name}_{int(time.time())}",
+                level="critical",
+                message=f"Serviço {service_name} indisponível: {health_status.error_message}",
+                service=service_name,
+                timestamp=datetime.now()
+            )
         return None
     
     def high_memory_usage_rule(context) -> Optional[Alert]:
@@ -465,7 +1637,7 @@ def create_default_alert_rules(alert_manager: AlertManager):
     # Adicionar regras ao manager
     alert_manager.add_alert_rule(high_error_rate_rule)
     alert_manager.add_alert_rule(slow_response_rule)
-    alert_manager.add_alert_rule(service_down_rule)
+    alert_manager.add_alert_rule(service_down_rule, scope="service")
     alert_manager.add_alert_rule(high_memory_usage_rule)
 
 
@@ -474,15 +1646,46 @@ def create_default_alert_rules(alert_manager: AlertManager):
 # ================================
 
 def console_notification_handler(alert: Alert):
-    """Handler de notificação para console."""
+    """Handler de notificação para console (stderr: o stdout pode ser o canal MCP)."""
     icon = {"info": "ℹ️", "warning": "⚠️", "critical": "🚨"}[alert.level]
-    print(f"{icon} [{alert.level.upper()}] {alert.service}: {alert.message}")
+    print(f"{icon} [{alert.level.upper()}] {alert.service}: {alert.message}", file=sys.stderr)
 
 def log_notification_handler(alert: Alert):
     """Handler de notificação para logs."""
     level_map = {"info": logging.INFO, "warning": logging.WARNING, "critical": logging.CRITICAL}
     logging.log(level_map[alert.level], f"Alert: {alert.service} - {alert.message}")
 
+class WebhookNotifier:
+    """Destino webhook em lote usando a sessão do ``NotificationDispatcher``.
+    
+    Respostas não-2xx geram exceção para que o dispatcher tente novamente.
+    """
+    
+    def __init__(self, webhook_url: str, dispatcher: NotificationDispatcher):
+        self.webhook_url = webhook_url
+        self.dispatcher = dispatcher
+        self.__name__ = f"webhook:{urlparse(webhook_url).netloc}"
+    
+    @staticmethod
+    def _payload(alert: Alert) -> Dict[str, Any]:
+        return {
+            "alert_id": alert.id,
+            "level": alert.level,
+            "service": alert.service,
+            "message": alert.message,
+            "timestamp": alert.timestamp.isoformat()
+        }
+    
+    async def send_batch(self, alerts: List[Alert]):
+        """Envia um lote de alertas em uma única requisição."""
+        session = await self.dispatcher.get_session()
+        async with session.post(self.webhook_url, json={"alerts": [self._payload(a) for a in alerts]}) as response:
+            if response.status >= 300:
+                raise RuntimeError(f"Webhook respondeu {response.status}")
+    
+    async def __call__(self, alerts: List[Alert]):
+        await self.send_batch(alerts)
+
 async def webhook_notification_handler(alert: Alert, webhook_url: str):
     """Handler de notificação via webhook."""
     payload = {
@@ -506,19 +1709,98 @@ async def webhook_notification_handler(alert: Alert, webhook_url: str):
 # DASHBOARD DE MÉTRICAS
 # ================================
 
+# Séries do sistema persistidas a cada ciclo (atributo de PerformanceMetrics)
+SYSTEM_SERIES = (
+    "requests_per_second",
+    "avg_response_time",
+    "p95_response_time",
+    "p99_response_time",
+    "error_rate",
+    "cache_hit_rate",
+    "memory_usage",
+    "cpu_usage",
+    "active_connections",
+    "event_loop_lag",
+    "open_fds"
+)
+
+# Séries exibidas como tendência no dashboard
+DASHBOARD_TREND_SERIES = (
+    "system.requests_per_second",
+    "system.p95_response_time",
+    "system.error_rate",
+    "system.memory_usage"
+)
+
+
+def metrics_to_points(metrics: PerformanceMetrics) -> List[tuple]:
+    """Converte métricas do sistema em pontos ``(série, timestamp, valor)``."""
+    timestamp = metrics.timestamp.timestamp()
+    return [
+        (f"system.{name}", timestamp, getattr(metrics, name))
+        for name in SYSTEM_SERIES
+    ]
+
+
+def health_to_points(health: ServiceHealth) -> List[tuple]:
+    """Converte um health check em pontos ``(série, timestamp, valor)``."""
+    timestamp = health.last_check.timestamp()
+    return [
+        (f"health.{health.name}.response_time", timestamp, health.response_time),
+        (f"health.{health.name}.up", timestamp, 1.0 if health.status == "healthy" else 0.0)
+    ]
+
+
 class MetricsDashboard:
     """Dashboard simples para métricas."""
     
     def __init__(self, metrics_collector: MetricsCollector, 
                  health_monitor: ServiceHealthMonitor,
-                 alert_manager: AlertManager):
+                 alert_manager: AlertManager,
+                 metrics_store: Optional[MetricsStore] = None):
         self.metrics = metrics_collector
         self.health = health_monitor
         self.alerts = alert_manager
+        self.store = metrics_store
     
-    def generate_dashboard_data(self) -> Dict[str, Any]:
-        """Gera dados para o dashboard."""
-        current_metrics = self.metrics.get_current_metrics()
+    def get_series(self, series: str, hours: float = 24, resolution: str = "auto",
+                   max_points: int = 500) -> Dict[str, Any]:
+        """Série histórica persistida (resolução escolhida pelo intervalo)."""
+        if self.store is None:
+            return {"series": series, "resolution": None, "points": []}
+        
+        result = self.store.query(series, time.time() - hours * 3600,
+                                  resolution=resolution, max_points=max_points)
+        result["points"] = [asdict(point) for point in result["points"]]
+        return result
+    
+    def get_trends(self, hours: float = 24) -> Dict[str, Dict[str, Any]]:
+        """Resumo (mín/média/máx) das séries principais no período."""
+        trends = {}
+        for series in DASHBOARD_TREND_SERIES:
+            points = self.get_series(series, hours)["points"]
+            if not points:
+                continue
+            count = sum(p["count"] for p in points)
+            trends[series] = {
+                "min": min(p["min"] for p in points),
+                "avg": sum(p["avg"] * p["count"] for p in points) / count,
+                "max": max(p["max"] for p in points),
+                "last": points[-1]["last"],
+                "points": len(points)
+            }
+        return trends
+    
+    def generate_dashboard_data(self, current_metrics: Optional[PerformanceMetrics] = None,
+                                trends: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """Gera dados para o dashboard.
+        
+        ``trends`` permite consultar o histórico (SQLite) fora do event loop
+        e passar o resultado; sem ele, a consulta é feita aqui.
+        """
+        current_metrics = current_metrics or self.metrics.get_current_metrics()
+        if trends is None:
+            trends = self.get_trends(24)
         
         # Status dos serviços
         service_status = {}
@@ -540,6 +1822,7 @@ class MetricsDashboard:
             "service_status": service_status,
             "service_stats": service_stats,
             "active_alerts": active_alerts,
+            "trends_24h": trends,
             "total_services": len(self.health.services),
             "healthy_services": sum(
                 1 for status in service_status.values()
@@ -547,22 +1830,25 @@ class MetricsDashboard:
             )
         }
     
-    def generate_html_dashboard(self) -> str:
+    def generate_html_dashboard(self, data: Optional[Dict[str, Any]] = None) -> str:
         """Gera dashboard HTML simples."""
-        data = self.generate_dashboard_data()
+        data = data or self.generate_dashboard_data()
+        system = data['system_metrics']
+        esc = html.escape
         
-        html = f"""
+        parts = [f"""
 <!DOCTYPE html>
 <html>
 <head>
     <title>INDE MCP - Dashboard</title>
+    <meta charset="utf-8">
     <meta http-equiv="refresh" content="30">
     <style>
         body {{ font-family: Arial, sans-serif; margin: 20px; }}
         .metric {{ display: inline-block; margin: 10px; padding: 10px; border: 1px solid #ddd; }}
         .healthy {{ color: green; }}
-        .warning {{ color: orange; }}
-        .critical {{ color: red; }}
+        .degraded, .warning {{ color: orange; }}
+        .unhealthy, .critical {{ color: red; }}
         .alert {{ padding: 10px; margin: 5px; border-left: 4px solid red; background: #ffe6e6; }}
     </style>
 </head>
@@ -571,72 +1857,456 @@ class MetricsDashboard:
     <p>Última atualização: {data['timestamp']}</p>
     
     <h2>📊 Métricas do Sistema</h2>
-    <div class="metric">
-        <strong>Requisições Totais:</strong> {data['system_metrics']['requests_total']}
-    </div>
-    <div class="metric">
-        <strong>RPS:</strong> {data['system_metrics']['requests_per_second']:.1f}
-    </div>
-    <div class="metric">
-        <strong>Tempo Médio:</strong> {data['system_metrics']['avg_response_time']:.1f}s
-    </div>
-    <div class="metric">
-        <strong>Taxa de Erro:</strong> {data['system_metrics']['error_rate']:.1f}%
-    </div>
-    <div class="metric">
-        <strong>Memória:</strong> {data['system_metrics']['memory_usage']:.1f}MB
-    </div>
-    <div class="metric">
-        <strong>CPU:</strong> {data['system_metrics']['cpu_usage']:.1f}%
-    </div>
+    <div class="metric"><strong>Requisições Totais:</strong> {system['requests_total']}</div>
+    <div class="metric"><strong>RPS:</strong> {system['requests_per_second']:.1f}</div>
+    <div class="metric"><strong>Tempo Médio:</strong> {system['avg_response_time']:.1f}s</div>
+    <div class="metric"><strong>p95:</strong> {system['p95_response_time']:.2f}s</div>
+    <div class="metric"><strong>Taxa de Erro:</strong> {system['error_rate']:.1f}%</div>
+    <div class="metric"><strong>Memória:</strong> {system['memory_usage']:.1f}MB</div>
+    <div class="metric"><strong>CPU:</strong> {system['cpu_usage']:.1f}%</div>
     
     <h2>🏥 Status dos Serviços</h2>
     <p>Serviços saudáveis: {data['healthy_services']}/{data['total_services']}</p>
-    """
+"""]
         
         for service, status in data['service_status'].items():
-            status_class = status['status']
-            html += f"""
-    <div class="metric {status_class}">
-        <strong>{service}:</strong> {status['status']} 
-        ({status['response_time']:.1f}s, {status['uptime_percentage']:.1f}% uptime)
-    </div>
-            """
+            parts.append(
+                f'    <div class="metric {esc(status["status"])}"><strong>{esc(service)}:</strong> '
+                f'{esc(status["status"])} ({status["response_time"]:.1f}s, '
+                f'{status["uptime_percentage"]:.1f}% uptime)</div>\n'
+            )
         
         if data['active_alerts']:
-            html += "<h2>🚨 Alertas Ativos</h2>"
+            parts.append("    <h2>🚨 Alertas Ativos</h2>\n")
             for alert in data['active_alerts']:
-                html += f"""
-    <div class="alert">
-        <strong>[{alert['level'].upper()}]</strong> {alert['service']}: {alert['message']}
-        <br><small>{alert['timestamp']}</small>
-    </div>
-                """
-        
-        html += """
-    <h2>📈 Estatísticas por Serviço</h2>
-    <table border="1">
-        <tr><th>Serviço</th><th>Requisições</th><th>Erros</th><th>Taxa Erro</th><th>Tempo Médio</th></tr>
-        """
+                parts.append(
+                    f'    <div class="alert"><strong>[{esc(alert["level"].upper())}]</strong> '
+                    f'{esc(alert["service"])}: {esc(alert["message"])}<br><small>{alert["timestamp"]}</small></div>\n'
+                )
         
+        if data['trends_24h']:
+            parts.append(
+                "    <h2>📉 Tendências (24h)</h2>\n    <table border=\"1\">\n"
+                "        <tr><th>Série</th><th>Mín</th><th>Média</th><th>Máx</th><th>Atual</th></tr>\n"
+            )
+            for series, trend in data['trends_24h'].items():
+                parts.append(
+                    f"        <tr><td>{esc(series)}</td><td>{trend['min']:.2f}</td><td>{trend['avg']:.2f}</td>"
+                    f"<td>{trend['max']:.2f}</td><td>{trend['last']:.2f}</td></tr>\n"
+                )
+            parts.append("    </table>\n")
+        
+        parts.append(
+            "    <h2>📈 Estatísticas por Serviço</h2>\n    <table border=\"1\">\n"
+            "        <tr><th>Serviço</th><th>Requisições</th><th>Erros</th><th>Taxa Erro</th><th>Tempo Médio</th></tr>\n"
+        )
         for service, stats in data['service_stats'].items():
-            html += f"""
-        <tr>
-            <td>{service}</td>
-            <td>{stats['requests']}</td>
-            <td>{stats['errors']}</td>
-            <td>{stats['error_rate']:.1f}%</td>
-            <td>{stats['avg_response_time']:.1f}s</td>
-        </tr>
-            """
-        
-        html += """
+            parts.append(
+                f"        <tr><td>{esc(service)}</td><td>{stats['requests']}</td><td>{stats['errors']}</td>"
+                f"<td>{stats['error_rate']:.1f}%</td><td>{stats['avg_response_time']:.1f}s</td></tr>\n"
+            )
+        parts.append("    </table>\n</body>\n</html>\n")
+        
+        return "".join(parts)
+
+
+# ================================
+# DASHBOARD AO VIVO (SSE)
+# ================================
+
+# Campos de PerformanceMetrics enviados ao dashboard ao vivo
+LIVE_METRIC_FIELDS = (
+    "requests_total", "requests_per_second", "avg_response_time", "p50_response_time",
+    "p95_response_time", "p99_response_time", "error_rate", "cache_hit_rate",
+    "memory_usage", "cpu_usage", "active_connections", "event_loop_lag",
+    "gc_pause_max", "open_fds", "threads"
+)
+
+
+def build_live_state(metrics: PerformanceMetrics, health_status: Dict[str, ServiceHealth],
+                     active_alerts: List[Alert]) -> Dict[str, Dict[str, Any]]:
+    """Estado plano do dashboard (métricas, serviços e alertas)."""
+    return {
+        # Memória e CPU com uma casa decimal para não gerar deltas por ruído
+        "metrics": {
+            name: round(getattr(metrics, name), 1 if name in ("memory_usage", "cpu_usage") else 3)
+            for name in LIVE_METRIC_FIELDS
+        },
+        "services": {
+            name: {
+                "status": h.status,
+                "response_time": round(h.response_time, 3),
+                "uptime": round(h.uptime_percentage, 1)
+            }
+            for name, h in health_status.items()
+        },
+        "alerts": {
+            a.id: {
+                "level": a.level,
+                "service": a.service,
+                "message": a.message,
+                "timestamp": a.timestamp.isoformat()
+            }
+            for a in active_alerts
+        }
+    }
+
+
+def diff_live_state(old: Dict[str, Dict[str, Any]], new: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Delta entre dois estados: chaves alteradas e chaves removidas por seção."""
+    delta = {}
+    for section, values in new.items():
+        previous = old.get(section, {})
+        changed = {key: value for key, value in values.items() if previous.get(key) != value}
+        removed = [key for key in previous if key not in values]
+        if changed:
+            delta[section] = changed
+        if removed:
+            delta[f"{section}_removed"] = removed
+    return delta
+
+
+class _LiveClient:
+    """Fila limitada de eventos de um cliente SSE."""
+    
+    def __init__(self, max_queue: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.resync = True  # Primeiro evento é o estado completo
+
+
+class LiveDashboardStream:
+    """Difusão de deltas do dashboard para clientes SSE.
+    
+    A cada ciclo o estado é comparado com o anterior e só as diferenças são
+    enfileiradas. Um cliente lento cuja fila enche é descartada e recebe de
+    novo o estado completo, sem segurar os demais.
+    """
+    
+    def __init__(self, max_queue: int = 32, keepalive: float = 15.0):
+        self.max_queue = max_queue
+        self.keepalive = keepalive
+        self.state: Dict[str, Dict[str, Any]] = {}
+        self.sequence = 0
+        self.clients: set = set()
+    
+    def publish(self, state: Dict[str, Dict[str, Any]]):
+        """Calcula o delta do novo estado e enfileira para os clientes."""
+        delta = diff_live_state(self.state, state)
+        self.state = state
+        if not delta:
+            return
+        
+        self.sequence += 1
+        event = (self.sequence, "delta", json.dumps(delta, ensure_ascii=False))
+        for client in self.clients:
+            if client.resync:
+                continue
+            try:
+                client.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                client.resync = True
+                while not client.queue.empty():
+                    client.queue.get_nowait()
+                client.queue.put_nowait(None)  # Acorda o cliente para ressincronizar
+    
+    def _snapshot_event(self) -> tuple:
+        return (self.sequence, "snapshot", json.dumps(self.state, ensure_ascii=False))
+    
+    async def handle(self, request: web.Request) -> web.StreamResponse:
+        """Endpoint ``/events`` (text/event-stream)."""
+        response = web.StreamResponse(headers={
+            "Content-Type": "text/event-stream",
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        })
+        await response.prepare(request)
+        
+        client = _LiveClient(self.max_queue)
+        self.clients.add(client)
+        try:
+            while True:
+                if client.resync:
+                    client.resync = False
+                    event = self._snapshot_event()
+                else:
+                    try:
+                        event = await asyncio.wait_for(client.queue.get(), self.keepalive)
+                    except asyncio.TimeoutError:
+                        await response.write(b": keepalive\n\n")
+                        continue
+                    if event is None:
+                        continue
+                
+                sequence, name, data = event
+                await response.write(f"id: {sequence}\nevent: {name}\ndata: {data}\n\n".encode("utf-8"))
+        except ConnectionResetError:
+            pass  # Cliente desconectou
+        finally:
+            # Também no cancelamento (desligamento do servidor), que segue propagado
+            self.clients.discard(client)
+        return response
+
+
+LIVE_DASHBOARD_HTML = """<!DOCTYPE html>
+<html>
+<head>
+    <title>INDE MCP - Dashboard ao vivo</title>
+    <meta charset="utf-8">
+    <style>
+        body { font-family: Arial, sans-serif; margin: 20px; }
+        .metric { display: inline-block; margin: 10px; padding: 10px; border: 1px solid #ddd; }
+        .healthy { color: green; }
+        .degraded, .warning { color: orange; }
+        .unhealthy, .critical { color: red; }
+        .alert { padding: 10px; margin: 5px; border-left: 4px solid red; background: #ffe6e6; }
+        #conn { font-size: 0.9em; color: #888; }
+    </style>
+</head>
+<body>
+    <h1>🚀 INDE MCP Server - Dashboard ao vivo</h1>
+    <p id="conn">Conectando...</p>
+    <h2>📊 Métricas do Sistema</h2>
+    <div id="metrics"></div>
+    <h2>🚨 Alertas Ativos</h2>
+    <div id="alerts"></div>
+    <h2>🏥 Status dos Serviços</h2>
+    <p id="summary"></p>
+    <table border="1">
+        <thead><tr><th>Serviço</th><th>Status</th><th>Tempo</th><th>Uptime 24h</th></tr></thead>
+        <tbody id="services"></tbody>
     </table>
+<script>
+const LABELS = {
+    requests_total: "Requisições Totais", requests_per_second: "RPS",
+    avg_response_time: "Tempo Médio (s)", p50_response_time: "p50 (s)",
+    p95_response_time: "p95 (s)", p99_response_time: "p99 (s)",
+    error_rate: "Taxa de Erro (%)", cache_hit_rate: "Cache Hit (%)",
+    memory_usage: "Memória (MB)", cpu_usage: "CPU (%)", active_connections: "Conexões",
+    event_loop_lag: "Atraso do loop (s)", gc_pause_max: "Pausa GC (s)",
+    open_fds: "Descritores", threads: "Threads"
+};
+const state = { metrics: {}, services: {}, alerts: {} };
+const rows = new Map();
+
+function el(tag, cls, text) {
+    const node = document.createElement(tag);
+    if (cls) node.className = cls;
+    if (text !== undefined) node.textContent = text;
+    return node;
+}
+
+function renderMetrics(changed) {
+    const box = document.getElementById("metrics");
+    for (const [key, value] of Object.entries(changed)) {
+        let node = document.getElementById("m-" + key);
+        if (!node) {
+            node = el("div", "metric");
+            node.id = "m-" + key;
+            box.appendChild(node);
+        }
+        node.textContent = (LABELS[key] || key) + ": " + value;
+    }
+}
+
+function renderService(name, info) {
+    let row = rows.get(name);
+    if (!row) {
+        row = el("tr");
+        for (let i = 0; i < 4; i++) row.appendChild(el("td"));
+        row.cells[0].textContent = name;
+        rows.set(name, row);
+        document.getElementById("services").appendChild(row);
+    }
+    row.cells[1].textContent = info.status;
+    row.cells[1].className = info.status;
+    row.cells[2].textContent = info.response_time + "s";
+    row.cells[3].textContent = info.uptime + "%";
+}
+
+function removeService(name) {
+    const row = rows.get(name);
+    if (row) { row.remove(); rows.delete(name); }
+}
+
+function renderAlerts() {
+    const box = document.getElementById("alerts");
+    box.replaceChildren(...Object.values(state.alerts).map(a =>
+        el("div", "alert " + a.level, "[" + a.level.toUpperCase() + "] " + a.service + ": " + a.message)));
+}
+
+function renderSummary() {
+    const all = Object.values(state.services);
+    const healthy = all.filter(s => s.status === "healthy").length;
+    document.getElementById("summary").textContent = "Serviços saudáveis: " + healthy + "/" + all.length;
+}
+
+function apply(delta) {
+    if (delta.metrics) { Object.assign(state.metrics, delta.metrics); renderMetrics(delta.metrics); }
+    for (const [name, info] of Object.entries(delta.services || {})) { state.services[name] = info; renderService(name, info); }
+    for (const name of delta.services_removed || []) { delete state.services[name]; removeService(name); }
+    Object.assign(state.alerts, delta.alerts || {});
+    for (const id of delta.alerts_removed || []) delete state.alerts[id];
+    if (delta.alerts || delta.alerts_removed) renderAlerts();
+    if (delta.services || delta.services_removed) renderSummary();
+}
+
+const source = new EventSource("/events");
+source.addEventListener("snapshot", e => {
+    const full = JSON.parse(e.data);
+    for (const name of Object.keys(state.services)) if (!(name in full.services)) removeService(name);
+    state.alerts = {};
+    apply(full);
+    renderAlerts();
+    renderSummary();
+});
+source.addEventListener("delta", e => apply(JSON.parse(e.data)));
+source.onopen = () => { document.getElementById("conn").textContent = "🟢 Conectado"; };
+source.onerror = () => { document.getElementById("conn").textContent = "🔴 Reconectando..."; };
+</script>
 </body>
 </html>
-        """
+"""
+
+
+# ================================
+# SERVIDOR HTTP DE MONITORAMENTO
+# ================================
+
+@dataclass
+class HTTPSnapshot:
+    """Resposta pré-renderizada (corpo e versão gzip, cada um com seu ETag)."""
+    body: bytes
+    gzip_body: bytes
+    etag: str
+    gzip_etag: str
+    content_type: str
+    status: int = 200
+
+
+def make_snapshot(body: str, content_type: str, status: int = 200) -> HTTPSnapshot:
+    """Codifica, comprime e calcula os ETags de uma resposta."""
+    data = body.encode("utf-8")
+    digest = hashlib.sha1(data).hexdigest()
+    return HTTPSnapshot(
+        body=data,
+        gzip_body=gzip.compress(data, compresslevel=6),
+        etag=f'"{digest}"',
+        gzip_etag=f'"{digest}-gz"',
+        content_type=content_type,
+        status=status
+    )
+
+
+class MonitoringHTTPServer:
+    """Servidor aiohttp embutido para /health, /metrics e /dashboard.
+    
+    As respostas são renderizadas uma vez por ciclo de amostragem
+    (``refresh_interval``) e servidas do cache com ETag/304 e gzip; as
+    requisições nunca disparam coleta de métricas. ``/live`` é o dashboard
+    ao vivo, alimentado pelos deltas de ``/events`` (SSE).
+    """
+    
+    def __init__(self, system: "INDEMonitoringSystem", host: str = "127.0.0.1", port: int = 9090,
+                 refresh_interval: float = 5.0):
+        self.system = system
+        self.host = host
+        self.port = port
+        self.refresh_interval = refresh_interval
+        self.snapshots: Dict[str, HTTPSnapshot] = {}
+        self.live = LiveDashboardStream()
+        self._live_page = make_snapshot(LIVE_DASHBOARD_HTML, "text/html; charset=utf-8")
+        self._runner: Optional[web.AppRunner] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+    
+    def render(self, trends: Optional[Dict[str, Dict[str, Any]]] = None):
+        """Renderiza todos os snapshots a partir de uma única coleta."""
+        metrics = self.system.metrics_collector.get_current_metrics()
+        health = self.system.get_health_endpoint(metrics)
+        data = self.system.dashboard.generate_dashboard_data(metrics, trends)
+        
+        self.snapshots = {
+            "/health": make_snapshot(
+                json.dumps(health, default=str), "application/json",
+                200 if health["status"] == "healthy" else 503
+            ),
+            "/metrics": make_snapshot(
+                self.system.get_metrics_endpoint(), "text/plain; version=0.0.4; charset=utf-8"
+            ),
+            "/dashboard": make_snapshot(
+                self.system.dashboard.generate_html_dashboard(data), "text/html; charset=utf-8"
+            ),
+            "/dashboard.json": make_snapshot(
+                json.dumps(data, default=str, ensure_ascii=False), "application/json"
+            ),
+            "/live": self._live_page
+        }
+        
+        # Deltas para os clientes SSE
+        self.live.publish(build_live_state(
+            metrics, self.system.health_monitor.get_latest_health(),
+            self.system.alert_manager.get_active_alerts()
+        ))
+    
+    async def refresh(self):
+        """Consulta o histórico fora do event loop e renderiza os snapshots."""
+        trends = await asyncio.to_thread(self.system.dashboard.get_trends, 24)
+        self.render(trends)
+    
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logging.error(f"Erro ao renderizar snapshots de monitoramento: {e}")
+    
+    async def handle(self, request: web.Request) -> web.StreamResponse:
+        """Serve o snapshot da rota com ETag e gzip."""
+        path = "/live" if request.path == "/" else request.path
+        snapshot = self.snapshots.get(path)
+        if snapshot is None:
+            raise web.HTTPServiceUnavailable(text="Snapshot ainda não renderizado")
+        
+        # Cada representação (gzip ou não) tem o seu ETag
+        if "gzip" in request.headers.get("Accept-Encoding", ""):
+            body, etag = snapshot.gzip_body, snapshot.gzip_etag
+            headers = {"Content-Encoding": "gzip"}
+        else:
+            body, etag = snapshot.body, snapshot.etag
+            headers = {}
+        headers.update({"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"})
         
-        return html
+        if_none_match = request.headers.get("If-None-Match", "")
+        if etag in (tag.strip() for tag in if_none_match.split(",")):
+            headers.pop("Content-Encoding", None)
+            return web.Response(status=304, headers=headers)
+        
+        headers["Content-Type"] = snapshot.content_type
+        return web.Response(body=body, status=snapshot.status, headers=headers)
+    
+    def build_app(self) -> web.Application:
+        app = web.Application()
+        for path in ("/", "/health", "/metrics", "/dashboard", "/dashboard.json", "/live"):
+            app.router.add_get(path, self.handle)
+        app.router.add_get("/events", self.live.handle)
+        return app
+    
+    async def start(self):
+        """Renderiza os snapshots iniciais e começa a aceitar conexões."""
+        await self.refresh()
+        self._runner = web.AppRunner(self.build_app(), access_log=None, shutdown_timeout=1.0)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        self._refresh_task = asyncio.create_task(self._refresh_loop())
+        logging.info(f"🌐 Monitoramento HTTP em http://{self.host}:{self.port} (/health, /metrics, /dashboard, /live)")
+        if self.host not in ("127.0.0.1", "localhost", "::1"):
+            logging.warning(f"⚠️ Monitoramento exposto em {self.host} (sem autenticação)")
+    
+    async def stop(self):
+        if self._refresh_task:
+            self._refresh_task.cancel()
+        if self._runner:
+            await self._runner.cleanup()
 
 
 # ================================
@@ -646,14 +2316,27 @@ class MetricsDashboard:
 class INDEMonitoringSystem:
     """Sistema principal de monitoramento."""
     
-    def __init__(self):
-        self.metrics_collector = MetricsCollector()
+    def __init__(self, metrics_store: Optional[MetricsStore] = None,
+                 metrics_collector: Optional[MetricsCollector] = None):
+        # O servidor MCP compartilha seu coletor para expor as próprias métricas
+        self.metrics_collector = metrics_collector or MetricsCollector()
+        self.http_server: Optional[MonitoringHTTPServer] = None
         self.health_monitor = ServiceHealthMonitor()
         self.alert_manager = AlertManager()
+        
+        # Histórico persistente (METRICS_STORE_PATH vazio desativa)
+        if metrics_store is None:
+            store_path = os.getenv("METRICS_STORE_PATH", "metrics.db")
+            metrics_store = MetricsStore(store_path) if store_path else None
+        self.metrics_store = metrics_store
+        self._persisted_checks: Dict[str, datetime] = {}
+        self._catalog_services: set = set()
+        
         self.dashboard = MetricsDashboard(
             self.metrics_collector,
             self.health_monitor, 
-            self.alert_manager
+            self.alert_manager,
+            self.metrics_store
         )
         
         # Configurar alertas padrão
@@ -662,19 +2345,55 @@ class INDEMonitoringSystem:
         # Configurar notificações
         self.alert_manager.add_notification_handler(console_notification_handler)
         self.alert_manager.add_notification_handler(log_notification_handler)
+        
+        webhook_url = os.getenv("ALERT_WEBHOOK_URL")
+        if webhook_url:
+            notifier = WebhookNotifier(webhook_url, self.alert_manager.dispatcher)
+            self.alert_manager.add_notification_handler(notifier, batched=True)
     
-    def setup_default_services(self):
-        """Configura serviços padrão para monitoramento."""
-        default_services = [
-            ("ANATEL", "https://sistemas.anatel.gov.br/geoserver/ows"),
-            ("ANA", "https://metadados.snirh.gov.br/geoserver/wfs"),
-            ("IBGE", "https://geoservicos.ibge.gov.br/geoserver/wfs"),
-            ("INCRA", "https://certificacao.incra.gov.br/csv_shp/export_shp.py"),
-            ("ICMBio", "https://geoservicos.icmbio.gov.br/geoserver/ows")
-        ]
+    async def persist_sample(self, metrics: PerformanceMetrics, health_status: Dict[str, ServiceHealth]):
+        """Grava as métricas do ciclo e os health checks novos no histórico."""
+        if self.metrics_store is None:
+            return
+        
+        points = metrics_to_points(metrics)
+        for name, health in health_status.items():
+            if self._persisted_checks.get(name) != health.last_check:
+                self._persisted_checks[name] = health.last_check
+                points.extend(health_to_points(health))
+        
+        # SQLite fora do event loop
+        await asyncio.to_thread(self.metrics_store.append_many, points)
+    
+    def setup_default_services(self, catalog_path: Optional[str] = None):
+        """Configura para monitoramento todos os endpoints do catálogo INDE.
+        
+        Usa ``CATALOG_PATH`` (ou ``catalogo_inde.yaml``) e, se o catálogo não
+        puder ser lido, os serviços padrão. Serviços de uma carga anterior que
+        saíram do catálogo deixam de ser monitorados (e seus alertas são
+        resolvidos no próximo ciclo).
+        """
+        catalog_path = catalog_path or os.getenv(
+            "CATALOG_PATH", str(Path(__file__).parent / "catalogo_inde.yaml")
+        )
         
-        for name, url in default_services:
+        try:
+            services = load_catalog_endpoints(catalog_path)
+        except Exception as e:
+            logging.warning(f"Catálogo indisponível ({e}); usando serviços padrão")
+            services = []
+        
+        services = services or DEFAULT_SERVICES
+        for name, url in services:
             self.health_monitor.add_service(name, url)
+        
+        current = {name for name, _ in services}
+        for name in self._catalog_services - current:
+            self.health_monitor.remove_service(name)
+            self._persisted_checks.pop(name, None)
+        self._catalog_services = current
+        
+        logging.info(f"🏥 {len(self.health_monitor.services)} endpoints em monitoramento")
     
     async def start(self):
         """Inicia o sistema de monitoramento."""
@@ -686,39 +2405,74 @@ class INDEMonitoringSystem:
         # Iniciar monitoramento de saúde
         health_task = asyncio.create_task(self.health_monitor.start_monitoring())
         
-        # Loop principal de monitoramento
-        while True:
-            try:
-                # Coletar métricas
-                metrics = self.metrics_collector.get_current_metrics()
+        # Amostrador do processo e workers de notificação
+        await self.metrics_collector.start_sampler()
+        await self.alert_manager.dispatcher.start()
+        
+        # Endpoints HTTP (opcional)
+        if os.getenv("INDE_MONITORING_PORT"):
+            await self.start_http_server()
+        
+        try:
+            # Loop principal de monitoramento
+            while True:
+                try:
+                    # Coletar métricas
+                    metrics = self.metrics_collector.get_current_metrics()
                 
-                # Verificar saúde dos serviços
-                health_status = await self.health_monitor.check_all_services()
+                    # Último estado conhecido (os checks rodam no agendador do monitor)
+                    health_status = self.health_monitor.get_latest_health()
                 
-                # Verificar alertas
-                self.alert_manager.check_alerts(metrics, health_status)
+                    # Verificar alertas
+                    self.alert_manager.check_alerts(metrics, health_status)
                 
-                # Log de status
-                healthy_count = sum(1 for h in health_status.values() if h.status == "healthy")
-                total_count = len(health_status)
+                    # Persistir histórico
+                    await self.persist_sample(metrics, health_status)
                 
-                logging.info(
-                    f"📊 Status: {healthy_count}/{total_count} serviços saudáveis, "
-                    f"{metrics.requests_per_second:.1f} RPS, "
-                    f"{metrics.error_rate:.1f}% erro, "
-                    f"{metrics.memory_usage:.1f}MB RAM"
-                )
+                    # Log de status
+                    healthy_count = sum(1 for h in health_status.values() if h.status == "healthy")
+                    total_count = len(health_status)
                 
-                # Aguardar próximo ciclo
-                await asyncio.sleep(60)  # Verificar a cada minuto
+                    logging.info(
+                        f"📊 Status: {healthy_count}/{total_count} serviços saudáveis, "
+                        f"{metrics.requests_per_second:.1f} RPS, "
+                        f"{metrics.error_rate:.1f}% erro, "
+                        f"{metrics.memory_usage:.1f}MB RAM"
+                    )
                 
-            except Exception as e:
-                logging.error(f"Erro no loop de monitoramento: {e}")
-                await asyncio.sleep(10)
+                    # Aguardar próximo ciclo
+                    await asyncio.sleep(60)  # Verificar a cada minuto
+                
+                except Exception as e:
+                    logging.error(f"Erro no loop de monitoramento: {e}")
+                    await asyncio.sleep(10)
+        finally:
+            health_task.cancel()
+            await self.alert_manager.dispatcher.stop()
+            await self.metrics_collector.stop_sampler()
+            if self.http_server:
+                await self.http_server.stop()
     
-    def get_health_endpoint(self) -> Dict[str, Any]:
+    async def start_http_server(self, port: Optional[int] = None,
+                                host: Optional[str] = None) -> MonitoringHTTPServer:
+        """Sobe o servidor HTTP de monitoramento.
+        
+        Padrões: ``INDE_MONITORING_PORT`` (9090), ``INDE_MONITORING_HOST``
+        (127.0.0.1; ``0.0.0.0`` expõe em todas as interfaces) e
+        ``INDE_MONITORING_REFRESH`` (5s).
+        """
+        self.http_server = MonitoringHTTPServer(
+            self,
+            host=host or os.getenv("INDE_MONITORING_HOST", "127.0.0.1"),
+            port=port or int(os.getenv("INDE_MONITORING_PORT", "9090")),
+            refresh_interval=float(os.getenv("INDE_MONITORING_REFRESH", "5"))
+        )
+        await self.http_server.start()
+        return self.http_server
+    
+    def get_health_endpoint(self, metrics: Optional[PerformanceMetrics] = None) -> Dict[str, Any]:
         """Endpoint de saúde para load balancers."""
-        metrics = self.metrics_collector.get_current_metrics()
+        metrics = metrics or self.metrics_collector.get_current_metrics()
         
         # Sistema é saudável se:
         # - Taxa de erro < 20%
@@ -767,6 +2521,13 @@ async def main():
     
     # Executar uma verificação manual
     await monitoring.health_monitor.check_all_services()
+    await monitoring.health_monitor.close()
+    
+    # Gravar uma amostra no histórico persistente
+    await monitoring.persist_sample(
+        monitoring.metrics_collector.get_current_metrics(),
+        monitoring.health_monitor.get_latest_health()
+    )
     
     # Gerar dashboard
     dashboard_html = monitoring.dashboard.generate_html_dashboard()
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Índice de Municípios em Memória - INDE MCP Server
+Consultas espaciais por município sem idas ao banco
+
+Funcionalidades:
+- Tabela de municípios em arrays (centroides, códigos, nomes e população)
+- Índice em grade regular para vizinhos mais próximos e consultas por raio
+- Busca direta por cod_mun (dicionário)
+- Anotação de feições extraídas com o município mais próximo
+- Carga única a partir do PostgreSQL (t_municipios) ou de uma extração IBGE
+"""
+
+import math
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from database.load_inde_data import iter_file_records, municipio_rows, representative_point
+
+# psycopg 3 é opcional (carga a partir do PostgreSQL)
+try:
+    import psycopg
+    PSYCOPG_AVAILABLE = True
+except ImportError:
+    PSYCOPG_AVAILABLE = False
+
+# Raio médio da Terra (km)
+EARTH_RADIUS_KM = 6371.0088
+
+# Lado das células da grade (graus); ~55 km, poucos municípios por célula
+DEFAULT_CELL_DEGREES = 0.5
+
+MUNICIPIOS_SQL = """
+SELECT cod_mun, nom_mun, sigla_uf, latitude, longitude, populacao
+FROM t_municipios
+WHERE ativo AND latitude IS NOT NULL AND longitude IS NOT NULL
+ORDER BY cod_mun
+"""
+
+
+def _haversine_km(lat: float, lon: float, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """Distâncias (km) de um ponto a vários pontos, todos em radianos."""
+    a = (np.sin((lats - lat) / 2) ** 2
+         + math.cos(lat) * np.cos(lats) * np.sin((lons - lon) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class MunicipioIndex:
+    """Municípios em arrays, ordenados por célula de uma grade lon/lat.
+
+    As células são numeradas linha a linha e ``offsets`` guarda onde cada
+    uma começa (formato CSR), então um trecho contínuo de células de uma
+    linha é uma única fatia dos arrays. As buscas visitam anéis de células
+    ao redor do ponto e param quando o limite inferior de distância do
+    próximo anel passa da resposta.
+    """
+
+    def __init__(self, cod_mun: List[str], nom_mun: List[str], sigla_uf: List[str],
+                 latitude: Iterable[float], longitude: Iterable[float],
+                 populacao: Optional[Iterable[Optional[int]]] = None,
+                 cell_degrees: float = DEFAULT_CELL_DEGREES):
+        lat = np.asarray(latitude, dtype=np.float64)
+        lon = np.asarray(longitude, dtype=np.float64)
+        if not (len(cod_mun) == len(nom_mun) == len(sigla_uf) == len(lat) == len(lon)):
+            raise ValueError("Colunas do índice de municípios com tamanhos diferentes")
+        if len(lat) == 0:
+            raise ValueError("Índice de municípios vazio")
+        pop = np.asarray([-1 if p is None else p for p in populacao] if populacao is not None
+                         else np.full(len(lat), -1), dtype=np.int64)
+
+        self.cell = float(cell_degrees)
+        self.min_lon, self.min_lat = float(lon.min()), float(lat.min())
+        self.nx = int((lon.max() - self.min_lon) // self.cell) + 1
+        self.ny = int((lat.max() - self.min_lat) // self.cell) + 1
+
+        # Ordena tudo pelo número da célula
+        cells = self._cells(lat, lon)
+        order = np.argsort(cells, kind="stable")
+        self.offsets = np.searchsorted(cells[order], np.arange(self.nx * self.ny + 1)).tolist()
+        self.latitude, self.longitude, self.populacao = lat[order], lon[order], pop[order]
+        self.lat_rad, self.lon_rad = np.radians(self.latitude), np.radians(self.longitude)
+        self.cod_mun = np.asarray(cod_mun, dtype=object)[order]
+        self.nom_mun = np.asarray(nom_mun, dtype=object)[order]
+        self.sigla_uf = np.asarray(sigla_uf, dtype=object)[order]
+        self.positions: Dict[str, int] = {code: i for i, code in enumerate(self.cod_mun)}
+        self.max_abs_lat = float(np.abs(lat).max())
+
+    # ----------------------------------------------------------------
+    # Construção
+    # ----------------------------------------------------------------
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Tuple], **kwargs) -> "MunicipioIndex":
+        """Linhas ``(cod_mun, nom_mun, sigla_uf, latitude, longitude, populacao)``."""
+        columns = list(zip(*rows)) or [[]] * 6
+        return cls(list(columns[0]), list(columns[1]), list(columns[2]),
+                   [float(v) for v in columns[3]], [float(v) for v in columns[4]],
+                   list(columns[5]), **kwargs)
+
+    @classmethod
+    def from_database(cls, dsn: str, **kwargs) -> "MunicipioIndex":
+        """Municípios ativos de t_municipios, em uma única consulta."""
+        if not PSYCOPG_AVAILABLE:
+            raise RuntimeError("psycopg não instalado. Instale com: pip install 'psycopg[binary]'")
+        with psycopg.connect(dsn) as conn:
+            return cls.from_rows(conn.execute(MUNICIPIOS_SQL).fetchall(), **kwargs)
+
+    @classmethod
+    def from_features(cls, items: Iterable[Dict[str, Any]], **kwargs) -> "MunicipioIndex":
+        """Feições de uma camada municipal (mesmos atributos aceitos pela carga do banco)."""
+        rows = [
+            (row[0], row[1], row[4], row[9], row[10], row[6])
+            for row in municipio_rows(items, Counter())
+            if row[9] is not None and row[10] is not None
+        ]
+        return cls.from_rows(rows, **kwargs)
+
+    @classmethod
+    def load(cls, source: str, **kwargs) -> "MunicipioIndex":
+        """Carrega de um DSN PostgreSQL ou de um arquivo GeoJSON/NDJSON/CSV."""
+        if source.startswith(("postgres://", "postgresql://")) or "dbname=" in source:
+            return cls.from_database(source, **kwargs)
+        return cls.from_features(iter_file_records(Path(source)), **kwargs)
+
+    def _cells(self, lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+        ix = np.clip(((lon - self.min_lon) // self.cell).astype(np.int64), 0, self.nx - 1)
+        iy = np.clip(((lat - self.min_lat) // self.cell).astype(np.int64), 0, self.ny - 1)
+        return iy * self.nx + ix
+
+    # ----------------------------------------------------------------
+    # Consultas
+    # ----------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self.cod_mun)
+
+    def get(self, cod_mun: str) -> Optional[Dict[str, Any]]:
+        """Município pelo código IBGE."""
+        position = self.positions.get(str(cod_mun))
+        return None if position is None else self._record(position)
+
+    def nearest(self, latitude: float, longitude: float, k: int = 1,
+                max_distance_km: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Os ``k`` municípios com centroide mais próximo, do mais perto ao mais longe."""
+        positions, distances = self._nearest(latitude, longitude, k, max_distance_km)
+        return [self._record(p, d) for p, d in zip(positions, distances)]
+
+    def within_radius(self, latitude: float, longitude: float, radius_km: float,
+                      limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Municípios com centroide a até ``radius_km``, ordenados por distância."""
+        positions, distances = self._search(latitude, longitude, None, radius_km)
+        order = np.argsort(distances, kind="stable")[:limit]
+        return [self._record(positions[i], distances[i]) for i in order]
+
+    def annotate_features(self, features: List[Dict[str, Any]],
+                          max_distance_km: Optional[float] = None) -> int:
+        """Acrescenta cod_mun, nom_mun, sigla_uf e distancia_mun_km às feições.
+
+        Usa o ponto representativo da geometria (o próprio ponto ou o
+        centro do retângulo envolvente). Feições que já trazem cod_mun não
+        são alteradas. Devolve quantas ficaram com município.
+        """
+        annotated = 0
+        for feature in features:
+            if (feature.get("properties") or {}).get("cod_mun"):
+                annotated += 1
+                continue
+            x, y = representative_point(feature.get("geometry"))
+            if x is None:
+                continue
+            positions, distances = self._nearest(y, x, 1, max_distance_km)
+            if not len(positions):
+                continue
+            position = positions[0]
+            properties = feature.setdefault("properties", {}) or {}
+            feature["properties"] = properties
+            properties.update({
+                "cod_mun": self.cod_mun[position],
+                "nom_mun": self.nom_mun[position],
+                "sigla_uf": self.sigla_uf[position],
+                "distancia_mun_km": round(float(distances[0]), 3)
+            })
+            annotated += 1
+        return annotated
+
+    def _nearest(self, latitude: float, longitude: float, k: int,
+                 max_distance_km: Optional[float]) -> Tuple[np.ndarray, np.ndarray]:
+        positions, distances = self._search(latitude, longitude, max(1, k), max_distance_km)
+        order = np.argsort(distances, kind="stable")[:k]
+        return positions[order], distances[order]
+
+    def _search(self, latitude: float, longitude: float, k: Optional[int],
+                radius_km: Optional[float]) -> Tuple[np.ndarray, np.ndarray]:
+        """Candidatos anel a anel; para com ``k`` vizinhos garantidos ou fora do raio."""
+        lat, lon = math.radians(latitude), math.radians(longitude)
+        qx = int((longitude - self.min_lon) // self.cell)
+        qy = int((latitude - self.min_lat) // self.cell)
+        last_ring = max(qx, self.nx - 1 - qx, qy, self.ny - 1 - qy, 0)
+        cos_bound = math.cos(math.radians(min(90.0, max(self.max_abs_lat, abs(latitude)))))
+
+        found_positions: List[np.ndarray] = []
+        found_distances: List[np.ndarray] = []
+        kth = math.inf
+        for ring in range(last_ring + 1):
+            # Pontos fora dos anéis já vistos estão a mais de ``ring - 1``
+            # células de distância em latitude ou longitude
+            if ring > 1:
+                half_angle = math.radians((ring - 1) * self.cell) / 2
+                bound = 2 * EARTH_RADIUS_KM * math.asin(min(1.0, cos_bound * math.sin(half_angle)))
+                if radius_km is not None and bound > radius_km:
+                    break
+                if k is not None and bound >= kth:
+                    break
+
+            positions = self._ring(qx, qy, ring)
+            if not len(positions):
+                continue
+            distances = _haversine_km(lat, lon, self.lat_rad[positions], self.lon_rad[positions])
+            if radius_km is not None:
+                keep = distances <= radius_km
+                positions, distances = positions[keep], distances[keep]
+            found_positions.append(positions)
+            found_distances.append(distances)
+
+            if k is not None:
+                all_distances = np.concatenate(found_distances)
+                if len(all_distances) >= k:
+                    kth = float(np.partition(all_distances, k - 1)[k - 1])
+
+        if not found_positions:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        return np.concatenate(found_positions), np.concatenate(found_distances)
+
+    def _ring(self, qx: int, qy: int, ring: int) -> np.ndarray:
+        """Posições dos municípios nas células do anel ``ring`` (contorno do quadrado)."""
+        x0, x1 = max(qx - ring, 0), min(qx + ring, self.nx - 1)
+        if x0 > x1:
+            return np.empty(0, dtype=np.int64)
+        slices = []
+        for y in range(max(qy - ring, 0), min(qy + ring, self.ny - 1) + 1):
+            row = y * self.nx
+            if ring == 0 or abs(y - qy) == ring:
+                slices.append((self.offsets[row + x0], self.offsets[row + x1 + 1]))
+            else:
+                for x in (qx - ring, qx + ring):
+                    if 0 <= x < self.nx:
+                        slices.append((self.offsets[row + x], self.offsets[row + x + 1]))
+        ranges = [np.arange(start, end) for start, end in slices if end > start]
+        return np.concatenate(ranges) if ranges else np.empty(0, dtype=np.int64)
+
+    def _record(self, position: int, distance: Optional[float] = None) -> Dict[str, Any]:
+        record = {
+            "cod_mun": self.cod_mun[position],
+            "nom_mun": self.nom_mun[position],
+            "sigla_uf": self.sigla_uf[position],
+            "latitude": float(self.latitude[position]),
+            "longitude": float(self.longitude[position]),
+            "populacao": int(self.populacao[position]) if self.populacao[position] >= 0 else None
+        }
+        if distance is not None:
+            record["distancia_km"] = round(float(distance), 3)
+        return record
+
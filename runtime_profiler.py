@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Diagnóstico de Runtime - INDE MCP Server
+Detecção de bloqueios do event loop e profiler por amostragem
+
+Funcionalidades:
+- Watchdog que detecta callbacks/ferramentas segurando o event loop e captura a pilha
+- Profiler por amostragem ligável em tempo de execução
+- Exportação em formato de pilhas colapsadas (flamegraph) por ferramenta MCP
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Objeto de código do wrapper de cada ferramenta -> nome da ferramenta
+TOOL_CODES: Dict[Any, str] = {}
+
+# Rótulo (ferramenta) das threads de trabalho em execução
+thread_labels: Dict[int, str] = {}
+
+
+# ================================
+# ATRIBUIÇÃO POR FERRAMENTA
+# ================================
+
+def register_tool_wrapper(wrapper: Callable, tool_name: str) -> Callable:
+    """Dá ao wrapper de uma ferramenta um objeto de código próprio.
+
+    Os wrappers de ``instrument_tool`` compartilham o mesmo código; com um
+    código por ferramenta, o frame basta para atribuir a amostra sem ler
+    variáveis locais de outra thread.
+    """
+    names = {"co_name": tool_name}
+    if sys.version_info >= (3, 11):
+        names["co_qualname"] = f"tool:{tool_name}"
+    wrapper.__code__ = wrapper.__code__.replace(**names)
+    TOOL_CODES[wrapper.__code__] = tool_name
+    return wrapper
+
+
+@contextmanager
+def thread_label(label: Optional[str]):
+    """Rotula a thread atual (ex.: trabalho de uma ferramenta em ``to_thread``)."""
+    if not label:
+        yield
+        return
+    ident = threading.get_ident()
+    previous = thread_labels.get(ident)
+    thread_labels[ident] = label
+    try:
+        yield
+    finally:
+        if previous is None:
+            thread_labels.pop(ident, None)
+        else:
+            thread_labels[ident] = previous
+
+
+def run_labelled(label: Optional[str], func: Callable, *args, **kwargs):
+    """Executa ``func`` com a thread rotulada (uso com ``asyncio.to_thread``)."""
+    with thread_label(label):
+        return func(*args, **kwargs)
+
+
+def tool_for_frame(frame) -> Optional[str]:
+    """Ferramenta MCP cujo wrapper aparece na pilha do frame."""
+    while frame is not None:
+        tool = TOOL_CODES.get(frame.f_code)
+        if tool:
+            return tool
+        frame = frame.f_back
+    return None
+
+
+def _frame_name(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)})"
+
+
+def collapse_stack(frame, limit: int = 128) -> str:
+    """Pilha do frame no formato colapsado (raiz;...;folha)."""
+    names = []
+    while frame is not None and len(names) < limit:
+        names.append(_frame_name(frame.f_code))
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+# ================================
+# WATCHDOG DE CALLBACKS LENTOS
+# ================================
+
+@dataclass
+class SlowCallbackReport:
+    """Ocorrência de bloqueio do event loop."""
+    detected_at: float
+    blocked_seconds: float
+    tool: Optional[str]
+    stack: str
+    finished: bool = False
+
+
+class SlowCallbackWatchdog:
+    """Detecta o event loop bloqueado por mais de ``threshold`` segundos.
+
+    Um batimento agendado no loop atualiza um timestamp; uma thread vigia o
+    atraso desse batimento e, ao passar do limite, captura a pilha da thread
+    do loop enquanto ela ainda está bloqueada. Quando o loop volta, o tempo
+    total bloqueado é registrado no mesmo relatório.
+    """
+
+    def __init__(self, threshold: float = 0.1, max_reports: int = 100,
+                 on_slow: Optional[Callable[[SlowCallbackReport], None]] = None):
+        self.threshold = threshold
+        self.interval = threshold / 2
+        self.reports: deque = deque(maxlen=max_reports)
+        self.on_slow = on_slow
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self._last_beat = 0.0
+        self._current: Optional[SlowCallbackReport] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._handle: Optional[asyncio.TimerHandle] = None
+
+    def _beat(self):
+        now = time.monotonic()
+        current = self._current
+        if current is not None:
+            # Loop liberado: fecha o relatório com o tempo total
+            current.blocked_seconds = now - self._last_beat - self.interval
+            current.finished = True
+            self._current = None
+            logger.warning(
+                f"🐢 Event loop bloqueado por {current.blocked_seconds * 1000:.0f} ms"
+                f" (ferramenta: {current.tool or '-'})"
+            )
+            if self.on_slow:
+                try:
+                    self.on_slow(current)
+                except Exception as e:
+                    logger.error(f"Erro no callback do watchdog: {e}")
+        self._last_beat = now
+        self._handle = self._loop.call_later(self.interval, self._beat)
+
+    def _watch(self):
+        poll = self.threshold / 4
+        while not self._stop.wait(poll):
+            lateness = time.monotonic() - self._last_beat - self.interval
+            if lateness <= self.threshold or self._current is not None:
+                continue
+
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is None:
+                continue
+            report = SlowCallbackReport(
+                detected_at=time.time(),
+                blocked_seconds=lateness,
+                tool=tool_for_frame(frame),
+                stack="".join(traceback.format_stack(frame))
+            )
+            self._current = report
+            self.reports.append(report)
+            logger.warning(
+                f"🐢 Event loop bloqueado há {lateness * 1000:.0f} ms"
+                f" (ferramenta: {report.tool or '-'})\n{report.stack}"
+            )
+
+    def start(self):
+        """Inicia o watchdog (chamar na thread do event loop)."""
+        if self._thread is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._handle = self._loop.call_later(self.interval, self._beat)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name="slow-callback-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._handle:
+            self._handle.cancel()
+        if self._thread:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    def get_reports(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Relatórios mais recentes primeiro."""
+        return [asdict(r) for r in list(self.reports)[-limit:][::-1]]
+
+
+# ================================
+# PROFILER POR AMOSTRAGEM
+# ================================
+
+# Folhas que indicam a thread do loop ociosa (aguardando I/O)
+IDLE_MODULES = ("selectors.py", "selector_events.py")
+
+
+class SamplingProfiler:
+    """Profiler por amostragem de baixo custo, ligável em tempo de execução.
+
+    Uma thread lê ``sys._current_frames()`` a cada ``interval`` segundos. Na
+    thread do event loop a amostra é atribuída à ferramenta cujo wrapper está
+    na pilha (amostras ociosas são ignoradas); nas demais threads, só as
+    rotuladas com ``thread_label`` são consideradas. ``samples`` só é lido
+    ou alterado sob ``_lock`` (a thread de amostragem escreve enquanto
+    ``runtime_diagnostics`` exporta).
+    """
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self.total_samples = 0
+        self.started_at: Optional[float] = None
+
+        self._lock = threading.Lock()
+        self._loop_thread: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, loop_thread: Optional[int] = None):
+        """Liga a amostragem (por padrão, a thread atual é a do loop)."""
+        if self.running:
+            return
+        self._loop_thread = loop_thread or threading.get_ident()
+        self._stop.clear()
+        self.started_at = time.time()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        logger.info(f"🔬 Profiler ligado ({1 / self.interval:.0f} amostras/s)")
+
+    def stop(self):
+        """Desliga a amostragem (as amostras são mantidas)."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=1)
+            self._thread = None
+            logger.info(f"🔬 Profiler desligado ({self.total_samples} amostras)")
+
+    def reset(self):
+        with self._lock:
+            self.samples.clear()
+            self.total_samples = 0
+
+    def snapshot(self) -> Counter:
+        """Cópia consistente das amostras."""
+        with self._lock:
+            return Counter(self.samples)
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            tick = []
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                if ident == self._loop_thread:
+                    if os.path.basename(frame.f_code.co_filename) in IDLE_MODULES:
+                        continue
+                    label = tool_for_frame(frame) or "(event loop)"
+                else:
+                    label = thread_labels.get(ident)
+                    if label is None:
+                        continue
+                tick.append((label, collapse_stack(frame)))
+            if tick:
+                with self._lock:
+                    self.samples.update(tick)
+                    self.total_samples += len(tick)
+
+    def export_collapsed(self, tool: Optional[str] = None) -> str:
+        """Pilhas colapsadas (``ferramenta;raiz;...;folha contagem``) para flamegraph."""
+        lines = [
+            f"{label};{stack} {count}"
+            for (label, stack), count in self.snapshot().most_common()
+            if tool is None or label == tool
+        ]
+        return "\n".join(lines) + ("\n" if lines else "")
+
+    def summary(self) -> Dict[str, Any]:
+        """Amostras por ferramenta e estado do profiler."""
+        by_tool = Counter()
+        for (label, _), count in self.snapshot().items():
+            by_tool[label] += count
+        return {
+            "running": self.running,
+            "interval_seconds": self.interval,
+            "started_at": self.started_at,
+            "total_samples": self.total_samples,
+            "samples_by_tool": dict(by_tool.most_common())
+        }
@@ -40,16 +40,16 @@ check_python() {
         PYTHON_VERSION=$(python3 --version | cut -d' ' -f2)
         log_success "Python $PYTHON_VERSION encontrado"
         
-        # Verificar versão mínima (3.8+)
-        MIN_VERSION="3.8"
-        if python3 -c "import sys; exit(0 if sys.version_info >= (3,8) else 1)"; then
-            log_success "Versão do Python compatível (>= 3.8)"
+        # Verificar versão mínima (3.10+, exigida por FastMCP e CrewAI)
+        MIN_VERSION="3.10"
+        if python3 -c "import sys; exit(0 if sys.version_info >= (3,10) else 1)"; then
+            log_success "Versão do Python compatível (>= 3.10)"
         else
-            log_error "Python 3.8+ requerido. Versão atual: $PYTHON_VERSION"
+            log_error "Python 3.10+ requerido. Versão atual: $PYTHON_VERSION"
             exit 1
         fi
     else
-        log_error "Python3 não encontrado. Instale Python 3.8+ primeiro."
+        log_error "Python3 não encontrado. Instale Python 3.10+ primeiro."
         exit 1
     fi
 }
@@ -92,6 +92,8 @@ install_dependencies() {
         pip install PyYAML>=6.0
         pip install aiohttp>=3.8.0
         pip install python-dotenv>=1.0.0
+        pip install "psycopg[binary]>=3.1"  # Carga no PostgreSQL (database/load_inde_data.py)
+        pip install asyncpg>=0.29  # Consultas assíncronas (inde_database.py)
         
         log_success "Dependências básicas instaladas"
     fi
@@ -127,6 +129,32 @@ LOG_LEVEL=INFO
 # Catálogo INDE
 INDE_CATALOG_PATH=./catalogo_inde.yaml
 CACHE_TTL=3600
+# Registros por página WFS nas extrações
+EXTRACT_PAGE_SIZE=500
+# Itens por chamada das ferramentas em lote
+MAX_BATCH_SIZE=20
+
+# Monitoramento (histórico persistente; vazio desativa)
+METRICS_STORE_PATH=./metrics.db
+# Endpoints HTTP /health, /metrics e /dashboard (vazio desativa)
+INDE_MONITORING_PORT=
+# Endereço do monitoramento (127.0.0.1 = só esta máquina; 0.0.0.0 expõe na rede)
+INDE_MONITORING_HOST=127.0.0.1
+# Interface web e gateway /api no processo do servidor MCP (vazio desativa)
+INDE_INTERFACE_PORT=
+# Endereço da interface (127.0.0.1 = só esta máquina)
+INDE_INTERFACE_HOST=127.0.0.1
+# Índice de municípios: DSN PostgreSQL ou arquivo GeoJSON/NDJSON/CSV (vazio usa DATABASE_URL)
+MUNICIPIOS_INDEX_SOURCE=
+# Pool de conexões do banco (inde_database.py; usa DATABASE_URL ou DB_*)
+DB_POOL_MIN_SIZE=1
+DB_POOL_MAX_SIZE=10
+
+# Tracing (file, otlp ou vazio para desativar)
+INDE_TRACE_EXPORTER=
+INDE_TRACE_FILE=./traces.jsonl
+INDE_TRACE_SAMPLE_RATE=1.0
+OTEL_EXPORTER_OTLP_ENDPOINT=http://localhost:4318
 
 # CrewAI
 OPENAI_MODEL=gpt-4
@@ -0,0 +1,12 @@
+import os
+import sys
+
+# Módulos do servidor ficam na raiz do repositório
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Sem histórico persistente de métricas durante os testes
+os.environ.setdefault("METRICS_STORE_PATH", "")
+
+# CrewAI sem telemetria (os testes não acessam a rede)
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+os.environ.setdefault("CREWAI_DISABLE_TELEMETRY", "true")
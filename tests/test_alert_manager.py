@@ -0,0 +1,123 @@
+"""Disparo e resolução de alertas (sem CrewAI nem FastMCP)."""
+
+from datetime import datetime, timedelta
+
+from monitoring_system import (
+    Alert, AlertManager, PerformanceMetrics, ServiceHealth, create_default_alert_rules
+)
+
+START = datetime(2024, 1, 1, 12, 0)
+
+
+def _metrics(error_rate: float = 0.0) -> PerformanceMetrics:
+    return PerformanceMetrics(
+        timestamp=START, requests_total=100, requests_per_second=1.0,
+        avg_response_time=0.2, error_rate=error_rate, cache_hit_rate=50.0,
+        memory_usage=100.0, cpu_usage=5.0, active_connections=1
+    )
+
+
+def _health(name: str, status: str, check: int) -> ServiceHealth:
+    # Cada ``check`` é um health check novo (last_check diferente)
+    return ServiceHealth(
+        name=name, url=f"https://{name}.example/wfs", status=status, response_time=0.1,
+        last_check=START + timedelta(minutes=5 * check),
+        error_message="timeout" if status == "unhealthy" else None
+    )
+
+
+def _manager(**kwargs) -> AlertManager:
+    manager = AlertManager(**kwargs)
+    create_default_alert_rules(manager)
+    return manager
+
+
+def test_alerta_ativo_nao_e_duplicado():
+    notified = []
+    manager = _manager()
+    manager.add_notification_handler(notified.append)
+
+    for check in range(3):
+        manager.check_alerts(_metrics(error_rate=50.0), {"ibge": _health("ibge", "unhealthy", check)})
+
+    active = manager.get_active_alerts()
+    assert sorted((a.service, a.rule) for a in active) == [
+        ("ibge", "service_down_rule"), ("system", "high_error_rate_rule")
+    ]
+    assert len(notified) == 2
+    assert manager.get_resolved_alerts() == []
+
+
+def test_resolucao_apos_clear_after_avaliacoes_limpas():
+    manager = _manager(clear_after=3)
+    manager.check_alerts(_metrics(), {"ibge": _health("ibge", "unhealthy", 0)})
+    alert = manager.get_active_alerts()[0]
+
+    manager.check_alerts(_metrics(), {"ibge": _health("ibge", "healthy", 1)})
+    manager.check_alerts(_metrics(), {"ibge": _health("ibge", "healthy", 2)})
+    assert manager.get_active_alerts() == [alert]
+
+    # Falha no meio reinicia a contagem
+    manager.check_alerts(_metrics(), {"ibge": _health("ibge", "unhealthy", 3)})
+    for check in (4, 5):
+        manager.check_alerts(_metrics(), {"ibge": _health("ibge", "healthy", check)})
+    assert manager.get_active_alerts() == [alert]
+
+    # Sem health check novo a regra por serviço não é reavaliada
+    manager.check_alerts(_metrics(), {"ibge": _health("ibge", "healthy", 5)})
+    assert manager.get_active_alerts() == [alert]
+
+    manager.check_alerts(_metrics(), {"ibge": _health("ibge", "healthy", 6)})
+    assert manager.get_active_alerts() == []
+    assert manager.get_resolved_alerts() == [alert]
+    assert alert.resolved and alert.resolved_at is not None
+
+
+def test_regra_de_sistema_resolvida_apos_clear_after():
+    manager = _manager(clear_after=2)
+    manager.check_alerts(_metrics(error_rate=50.0), {})
+    assert len(manager.get_active_alerts()) == 1
+
+    manager.check_alerts(_metrics(), {})
+    assert len(manager.get_active_alerts()) == 1
+    manager.check_alerts(_metrics(), {})
+    assert manager.get_active_alerts() == []
+
+
+def test_servico_removido_resolve_seus_alertas():
+    manager = _manager()
+    manager.check_alerts(_metrics(), {
+        "ibge": _health("ibge", "unhealthy", 0),
+        "ana": _health("ana", "unhealthy", 0),
+    })
+    assert len(manager.get_active_alerts()) == 2
+
+    manager.check_alerts(_metrics(), {"ana": _health("ana", "unhealthy", 1)})
+
+    assert [a.service for a in manager.get_active_alerts()] == ["ana"]
+    assert [a.service for a in manager.get_resolved_alerts()] == ["ibge"]
+    assert "ibge" not in manager._last_seen
+
+
+def test_historico_limitado():
+    manager = AlertManager(history_size=3, clear_after=1)
+    firing = {"on": True, "count": 0}
+
+    def flapping_rule(context):
+        if firing["on"]:
+            firing["count"] += 1
+            return Alert(id=f"flap_{firing['count']}", level="warning",
+                         message="instável", service="system", timestamp=START)
+        return None
+
+    manager.add_alert_rule(flapping_rule)
+    for _ in range(5):
+        firing["on"] = True
+        manager.check_alerts(_metrics(), {})
+        firing["on"] = False
+        manager.check_alerts(_metrics(), {})
+
+    resolved = manager.get_resolved_alerts()
+    assert len(manager.history) == 3
+    assert [a.id for a in resolved] == ["flap_5", "flap_4", "flap_3"]
+    assert manager.get_resolved_alerts(limit=2) == resolved[:2]
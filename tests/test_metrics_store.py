@@ -0,0 +1,102 @@
+"""Armazenamento de séries temporais em SQLite (somente biblioteca padrão)."""
+
+import sqlite3
+
+import pytest
+
+from metrics_store import MetricsStore
+
+# Múltiplo de um dia: buckets de todas as resoluções alinhados
+NOW = 20000 * 86400
+
+
+@pytest.fixture
+def store(tmp_path):
+    # Retenção automática desligada: os testes chamam apply_retention explicitamente
+    store = MetricsStore(str(tmp_path / "metrics.db"), retention_interval=float("inf"))
+    yield store
+    store.close()
+
+
+def _rollup_rows(store, name, resolution):
+    with sqlite3.connect(str(store.path)) as conn:
+        return conn.execute(
+            "SELECT COUNT(*) FROM rollups r JOIN series s ON s.id = r.series_id "
+            "WHERE s.name = ? AND r.resolution = ?",
+            (name, resolution)
+        ).fetchone()[0]
+
+
+def test_falha_no_lote_nao_deixa_id_de_serie_invalido(store):
+    store.append("system.cpu", 10.0, NOW - 30)
+
+    with pytest.raises(ValueError):
+        store.append_many([
+            ("system.memoria", NOW - 20, 50.0),
+            ("system.memoria", NOW - 10, "não numérico"),
+        ])
+    assert "system.memoria" not in store.series_names()
+
+    # O SQLite pode reutilizar o id revertido para esta série nova
+    store.append("system.disco", 70.0, NOW - 5)
+    store.append("system.memoria", 55.0, NOW - 5)
+
+    assert store.series_names() == ["system.cpu", "system.disco", "system.memoria"]
+    assert len(set(store._series_ids.values())) == 3
+    for name, value in (("system.cpu", 10.0), ("system.disco", 70.0), ("system.memoria", 55.0)):
+        points = store.query(name, NOW - 60, NOW, resolution="raw")["points"]
+        assert [p.last for p in points] == [value]
+
+    # Ids persistidos: uma nova instância enxerga as mesmas séries
+    reopened = MetricsStore(str(store.path), retention_interval=float("inf"))
+    try:
+        assert reopened._series_ids == store._series_ids
+    finally:
+        reopened.close()
+
+
+def test_series_de_health_check_sem_agregacao_de_1_minuto(store):
+    store.append_many([
+        ("health.ibge.response_time", NOW - 600, 0.5),
+        ("health.ibge.response_time", NOW - 300, 0.7),
+        ("system.cpu", NOW - 600, 20.0),
+        ("system.cpu", NOW - 300, 40.0),
+    ])
+
+    assert _rollup_rows(store, "health.ibge.response_time", 60) == 0
+    assert _rollup_rows(store, "health.ibge.response_time", 3600) == 1
+    assert _rollup_rows(store, "system.cpu", 60) == 2
+
+    result = store.query("health.ibge.response_time", NOW - 900, NOW, resolution="1m")
+    assert result["resolution"] == "raw"
+    assert [(p.timestamp, p.last) for p in result["points"]] == [(NOW - 600, 0.5), (NOW - 300, 0.7)]
+
+    result = store.query("system.cpu", NOW - 900, NOW, resolution="1m")
+    assert result["resolution"] == "1m"
+    assert len(result["points"]) == 2
+
+    # Agregação de 1 hora continua disponível para as séries esparsas
+    result = store.query("health.ibge.response_time", NOW - 3600, NOW, resolution="1h")
+    assert [(p.count, p.min, p.max) for p in result["points"]] == [(2, 0.5, 0.7)]
+
+
+def test_retencao_por_resolucao(tmp_path):
+    store = MetricsStore(
+        str(tmp_path / "metrics.db"),
+        retention={"raw": 100, "1m": 1000, "1h": 10000, "1d": 100000},
+        retention_interval=float("inf")
+    )
+    try:
+        store.append_many([("system.cpu", NOW - age, float(age)) for age in (50, 500, 5000, 50000, 500000)])
+
+        removed = store.apply_retention(now=NOW)
+
+        def count(resolution):
+            return len(store.query("system.cpu", NOW - 10 ** 6, NOW, resolution=resolution)["points"])
+
+        # raw: só o ponto de 50 s; 1m: buckets de 50 s e 500 s;
+        # 1h: buckets de 50/500 s e 5000 s; 1d: bucket de 50..50000 s
+        assert (count("raw"), count("1m"), count("1h"), count("1d")) == (1, 2, 2, 1)
+        assert removed == (5 - 1) + (5 - 2) + (4 - 2) + (2 - 1)
+    finally:
+        store.close()
@@ -0,0 +1,106 @@
+"""Pré-coleta de contexto e agentes CrewAI com LLM de teste (sem rede nem chave de API)."""
+
+import asyncio
+
+import pytest
+
+crewai = pytest.importorskip("crewai")
+pytest.importorskip("fastmcp")
+if not hasattr(crewai, "BaseLLM"):
+    pytest.skip("LLM customizado requer CrewAI com BaseLLM", allow_module_level=True)
+
+from crewai import BaseLLM  # noqa: E402
+from mcp_inde_server_main import GeoService, INDEAgents, INDEContextPrefetcher  # noqa: E402
+
+
+class StubLLM(BaseLLM):
+    """LLM que responde imediatamente e guarda as mensagens recebidas."""
+    
+    def __init__(self, **kwargs):
+        super().__init__(model="stub-llm", **kwargs)
+        self._prompts = []
+    
+    @property
+    def prompts(self):
+        return self._prompts
+    
+    def call(self, messages, tools=None, callbacks=None, available_functions=None, **kwargs):
+        if isinstance(messages, str):
+            messages = [{"role": "user", "content": messages}]
+        self._prompts.append("\n".join(str(m.get("content", "")) for m in messages))
+        return "Thought: tenho o contexto necessário\nFinal Answer: resposta de teste"
+    
+    def supports_function_calling(self) -> bool:
+        return False
+
+
+class StubExtractor:
+    """Extrator com latência fixa que mede quantas chamadas rodam ao mesmo tempo."""
+    
+    def __init__(self, delay: float = 0.05):
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+    
+    async def _call(self, value):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            return value
+        finally:
+            self.in_flight -= 1
+    
+    async def discover_layers(self, service):
+        return await self._call([f"{service.descricao}:camada_{i}" for i in range(3)])
+    
+    async def describe_layer_schema(self, service, layer):
+        return await self._call({"nome": "string", "geom": "MultiPolygon"})
+    
+    async def count_features(self, service, layer):
+        return await self._call(42)
+
+
+class StubINDETools:
+    """INDETools com dois serviços fixos e extrator de teste."""
+    
+    def __init__(self):
+        self.extractor = StubExtractor()
+        self.service_calls = 0
+    
+    async def get_organization_services(self, orgao):
+        self.service_calls += 1
+        return [
+            GeoService(orgao=orgao, tipo="WFS", descricao=f"{orgao} - Serviço {i}", url=f"http://stub/{i}")
+            for i in range(2)
+        ]
+
+
+def test_prefetch_collects_schemas_and_counts_in_one_round():
+    tools = StubINDETools()
+    context = asyncio.run(INDEContextPrefetcher(tools).prefetch("TESTE"))
+    
+    assert context.errors == []
+    assert len(context.dataset_names()) == 6
+    assert all(service["counts"] and service["schemas"] for service in context.services)
+    # 2 serviços x 3 camadas x (esquema + contagem) ao mesmo tempo
+    assert tools.extractor.max_in_flight == 12
+    assert "42 registros" in context.summary()
+
+
+def test_agents_receive_prefetched_context_with_stub_llm():
+    tools = StubINDETools()
+    llm = StubLLM()
+    agents = INDEAgents(tools, llm=llm)
+    
+    assert agents.geo_tool.inde_tools is tools
+    
+    result = asyncio.run(agents.analyze_organization_data("TESTE", "cobertura"))
+    
+    assert tools.service_calls == 1
+    assert len(result.datasets_analisados) == 6
+    assert "resposta de teste" in result.relatorio_completo
+    # Uma chamada ao LLM por tarefa: o contexto já vem na descrição, sem chamadas de ferramenta
+    assert len(llm.prompts) == 3
+    assert "TESTE - Serviço 0" in llm.prompts[0]
+    assert "42 registros" in llm.prompts[1]
@@ -0,0 +1,521 @@
+#!/usr/bin/env python3
+"""
+Rastreamento Distribuído - INDE MCP Server
+Spans compatíveis com OpenTelemetry da ferramenta MCP até a requisição OGC
+
+Funcionalidades:
+- Spans com contexto propagado por contextvars (tarefas, threads e CrewAI)
+- Amostragem na raiz do trace (INDE_TRACE_SAMPLE_RATE)
+- Fases HTTP: DNS, conexão, TLS, tempo até o primeiro byte e download
+- Exportação OTLP/JSON para arquivo ou coletor OTLP/HTTP, em lote
+"""
+
+import atexit
+import contextvars
+import json
+import logging
+import os
+import queue
+import random
+import socket
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Span ativo no contexto atual
+current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+
+# Tipos de span (valores de SpanKind do OTLP)
+SPAN_KINDS = {"internal": 1, "server": 2, "client": 3}
+
+
+# ================================
+# SPANS
+# ================================
+
+class Span:
+    """Span no modelo do OpenTelemetry (ids em hexadecimal, tempos em ns)."""
+
+    __slots__ = ("tracer", "name", "kind", "trace_id", "span_id", "parent_span_id",
+                 "start_ns", "end_ns", "attributes", "events", "status_code", "status_message")
+
+    recording = True
+
+    def __init__(self, tracer: "Tracer", name: str, trace_id: str, parent_span_id: Optional[str],
+                 kind: str = "internal", attributes: Optional[Dict[str, Any]] = None,
+                 start_ns: Optional[int] = None):
+        self.tracer = tracer
+        self.name = name
+        self.kind = kind
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_span_id = parent_span_id
+        self.start_ns = start_ns or time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = dict(attributes or {})
+        self.events: List[tuple] = []
+        self.status_code = 0  # UNSET
+        self.status_message = ""
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def add_event(self, name: str, attributes: Optional[Dict[str, Any]] = None):
+        self.events.append((time.time_ns(), name, attributes or {}))
+
+    def set_error(self, message: str):
+        self.status_code = 2  # ERROR
+        self.status_message = message
+
+    def end(self, end_ns: Optional[int] = None):
+        if self.end_ns is None:
+            self.end_ns = end_ns or time.time_ns()
+            self.tracer.processor.on_end(self)
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """Representação OTLP/JSON do span."""
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": SPAN_KINDS.get(self.kind, 1),
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": _otlp_attributes(self.attributes),
+            "status": {"code": self.status_code, "message": self.status_message}
+        }
+        if self.parent_span_id:
+            span["parentSpanId"] = self.parent_span_id
+        if self.events:
+            span["events"] = [
+                {"timeUnixNano": str(ts), "name": name, "attributes": _otlp_attributes(attrs)}
+                for ts, name, attrs in self.events
+            ]
+        return span
+
+
+class _NonRecordingSpan:
+    """Span descartado pela amostragem (mantém a decisão para os filhos)."""
+
+    trace_id = None
+    span_id = None
+    recording = False
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def add_event(self, name: str, attributes: Optional[Dict[str, Any]] = None):
+        pass
+
+    def set_error(self, message: str):
+        pass
+
+    def end(self, end_ns: Optional[int] = None):
+        pass
+
+
+NON_RECORDING_SPAN = _NonRecordingSpan()
+
+# Escopo usado quando o tracing está desativado (sem custo de criação)
+_DISABLED_SCOPE = nullcontext(NON_RECORDING_SPAN)
+
+
+class _SpanScope:
+    """Ativa um span no contexto durante um bloco ``with``."""
+
+    __slots__ = ("tracer", "name", "attributes", "kind", "span", "token")
+
+    def __init__(self, tracer: "Tracer", name: str, attributes: Optional[Dict[str, Any]], kind: str):
+        self.tracer = tracer
+        self.name = name
+        self.attributes = attributes
+        self.kind = kind
+
+    def __enter__(self):
+        self.span = self.tracer._new_span(self.name, self.kind, self.attributes)
+        self.token = current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is not None:
+            self.span.set_error(f"{exc_type.__name__}: {exc}")
+        current_span.reset(self.token)
+        self.span.end()
+        return False
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items()]
+
+
+# ================================
+# EXPORTAÇÃO
+# ================================
+
+class FileSpanExporter:
+    """Grava cada lote como uma linha OTLP/JSON (``ExportTraceServiceRequest``)."""
+
+    def __init__(self, path: str = "traces.jsonl"):
+        self.path = path
+
+    def export(self, payload: Dict[str, Any]):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(payload, ensure_ascii=False) + "\n")
+
+
+class OTLPHTTPExporter:
+    """Envia lotes OTLP/JSON para um coletor (``/v1/traces``)."""
+
+    def __init__(self, endpoint: str = "http://localhost:4318/v1/traces", timeout: float = 5.0):
+        self.endpoint = endpoint
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def export(self, payload: Dict[str, Any]):
+        response = self.session.post(self.endpoint, json=payload, timeout=self.timeout)
+        response.raise_for_status()
+
+
+class BatchSpanProcessor:
+    """Acumula spans finalizados e exporta em lote numa thread própria.
+
+    Com a fila cheia os spans são descartados (e contados) em vez de
+    bloquear quem os finalizou.
+    """
+
+    def __init__(self, exporter, service_name: str, max_queue: int = 8192,
+                 batch_size: int = 512, flush_interval: float = 2.0):
+        self.exporter = exporter
+        self.service_name = service_name
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+        self._thread.start()
+        atexit.register(self.force_flush)
+
+    def on_end(self, span: Span):
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _payload(self, spans: List[Span]) -> Dict[str, Any]:
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": _otlp_attributes({"service.name": self.service_name})},
+                "scopeSpans": [{
+                    "scope": {"name": "inde-mcp"},
+                    "spans": [span.to_otlp() for span in spans]
+                }]
+            }]
+        }
+
+    def _export(self, spans: List[Span]):
+        try:
+            self.exporter.export(self._payload(spans))
+        except Exception as e:
+            logger.warning(f"Falha ao exportar {len(spans)} spans: {e}")
+
+    def _run(self):
+        while True:
+            batch = []
+            flushed = None
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if isinstance(item, threading.Event):
+                    flushed = item
+                    break
+                batch.append(item)
+            if batch:
+                self._export(batch)
+            if flushed is not None:
+                flushed.set()
+
+    def force_flush(self, timeout: float = 5.0):
+        """Exporta imediatamente o que estiver pendente e aguarda a conclusão."""
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return
+        done.wait(timeout)
+
+
+class _NullProcessor:
+    def on_end(self, span: Span):
+        pass
+
+    def force_flush(self):
+        pass
+
+
+# ================================
+# TRACER
+# ================================
+
+class Tracer:
+    """Cria spans e decide a amostragem na raiz de cada trace."""
+
+    def __init__(self, service_name: str = "inde-mcp-server", processor=None, sample_rate: float = 1.0):
+        self.service_name = service_name
+        self.processor = processor or _NullProcessor()
+        self.sample_rate = sample_rate if processor else 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.sample_rate > 0
+
+    def is_recording(self) -> bool:
+        """Há um span amostrado ativo no contexto atual."""
+        span = current_span.get()
+        return span is not None and span.recording
+
+    def _new_span(self, name: str, kind: str, attributes: Optional[Dict[str, Any]],
+                  start_ns: Optional[int] = None):
+        parent = current_span.get()
+        if parent is None:
+            if random.random() >= self.sample_rate:
+                return NON_RECORDING_SPAN
+            return Span(self, name, f"{random.getrandbits(128):032x}", None, kind, attributes, start_ns)
+        if not parent.recording:
+            return NON_RECORDING_SPAN
+        return Span(self, name, parent.trace_id, parent.span_id, kind, attributes, start_ns)
+
+    def start_span(self, name: str, attributes: Optional[Dict[str, Any]] = None, kind: str = "internal"):
+        """Abre um span filho do span atual (ou raiz) durante um bloco ``with``."""
+        if not self.enabled:
+            return _DISABLED_SCOPE
+        return _SpanScope(self, name, attributes, kind)
+
+    def record_span(self, name: str, start_ns: int, end_ns: int,
+                    attributes: Optional[Dict[str, Any]] = None, kind: str = "internal"):
+        """Registra um span já medido, filho do span atual."""
+        if not self.is_recording() or end_ns <= start_ns:
+            return
+        span = self._new_span(name, kind, attributes, start_ns)
+        span.end(end_ns)
+
+    def force_flush(self):
+        self.processor.force_flush()
+
+
+def configure_tracing(service_name: str = "inde-mcp-server") -> Tracer:
+    """Configura o tracer a partir do ambiente.
+
+    ``INDE_TRACE_EXPORTER``: ``file`` (``INDE_TRACE_FILE``, padrão
+    ``traces.jsonl``), ``otlp`` (``OTEL_EXPORTER_OTLP_ENDPOINT``) ou vazio
+    (desativado). ``INDE_TRACE_SAMPLE_RATE`` define a fração de traces
+    amostrados (padrão 1.0).
+    """
+    exporter_name = os.getenv("INDE_TRACE_EXPORTER", "").lower()
+    if exporter_name == "file":
+        exporter = FileSpanExporter(os.getenv("INDE_TRACE_FILE", "traces.jsonl"))
+    elif exporter_name == "otlp":
+        endpoint = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", "http://localhost:4318").rstrip("/")
+        exporter = OTLPHTTPExporter(f"{endpoint}/v1/traces")
+    else:
+        return Tracer(service_name)
+
+    sample_rate = float(os.getenv("INDE_TRACE_SAMPLE_RATE", "1.0"))
+    logger.info(f"🧭 Tracing ativo ({exporter_name}, amostragem {sample_rate:.0%})")
+    return Tracer(service_name, BatchSpanProcessor(exporter, service_name), sample_rate)
+
+
+# Tracer global do processo
+tracer = configure_tracing()
+
+
+# ================================
+# FASES HTTP (requests)
+# ================================
+
+_phases = threading.local()
+
+
+@contextmanager
+def record_http_phases():
+    """Coleta, na thread atual, os tempos de DNS, conexão e TLS das conexões novas."""
+    timings: Dict[str, tuple] = {}
+    _phases.timings = timings
+    try:
+        yield timings
+    finally:
+        _phases.timings = None
+
+
+class _TimedConnectionMixin:
+    """Mede DNS e conexão TCP separadamente quando há coleta ativa."""
+
+    def _new_conn(self):
+        timings = getattr(_phases, "timings", None)
+        if timings is None:
+            return super()._new_conn()
+
+        dns_start = time.time_ns()
+        try:
+            infos = socket.getaddrinfo(self._dns_host, self.port, 0, socket.SOCK_STREAM)
+        except socket.gaierror:
+            return super()._new_conn()  # Erro de resolução no formato do urllib3
+        dns_end = time.time_ns()
+        timings["dns"] = (dns_start, dns_end)
+
+        host = self._dns_host
+        self._dns_host = infos[0][4][0]
+        try:
+            sock = super()._new_conn()
+        except OSError:
+            self._dns_host = host
+            sock = super()._new_conn()
+        finally:
+            self._dns_host = host
+        timings["connect"] = (dns_end, time.time_ns())
+        return sock
+
+
+class _TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class _TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    def connect(self):
+        super().connect()
+        timings = getattr(_phases, "timings", None)
+        if timings is not None and "connect" in timings:
+            timings["tls"] = (timings["connect"][1], time.time_ns())
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class TracingHTTPAdapter(HTTPAdapter):
+    """``HTTPAdapter`` cujas conexões novas informam DNS, conexão e TLS."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _TimedHTTPConnectionPool,
+            "https": _TimedHTTPSConnectionPool
+        }
+
+
+def traced_get(session: requests.Session, url: str, **kwargs) -> requests.Response:
+    """GET síncrono que registra spans das fases HTTP sob o span atual.
+
+    Sem span amostrado ativo equivale a ``session.get``.
+    """
+    if not tracer.is_recording():
+        return session.get(url, **kwargs)
+
+    with record_http_phases() as timings:
+        start_ns = time.time_ns()
+        response = session.get(url, stream=True, **kwargs)
+        headers_ns = time.time_ns()
+        response.content  # Download do corpo
+        end_ns = time.time_ns()
+
+    for phase in ("dns", "connect", "tls"):
+        if phase in timings:
+            tracer.record_span(f"http.{phase}", *timings[phase])
+    request_sent = max([start_ns] + [timings[p][1] for p in timings])
+    tracer.record_span("http.ttfb", request_sent, headers_ns)
+    tracer.record_span("http.download", headers_ns, end_ns, {"http.response.body.size": len(response.content)})
+    return response
+
+
+# ================================
+# FASES HTTP (aiohttp)
+# ================================
+
+def aiohttp_trace_config():
+    """``TraceConfig`` do aiohttp que registra DNS, conexão, TTFB e download.
+
+    O span de download só é registrado quando o corpo é lido até o fim.
+    """
+    if not AIOHTTP_AVAILABLE:
+        return None
+
+    async def on_request_start(session, ctx, params):
+        ctx.times = {"start": time.time_ns()}
+
+    async def on_dns_start(session, ctx, params):
+        ctx.times["dns_start"] = time.time_ns()
+
+    async def on_dns_end(session, ctx, params):
+        ctx.times["dns_end"] = time.time_ns()
+
+    async def on_connection_start(session, ctx, params):
+        ctx.times["connect_start"] = time.time_ns()
+
+    async def on_connection_end(session, ctx, params):
+        ctx.times["connect_end"] = time.time_ns()
+
+    async def on_request_end(session, ctx, params):
+        times = ctx.times
+        headers_ns = time.time_ns()
+        if "dns_end" in times:
+            tracer.record_span("http.dns", times["dns_start"], times["dns_end"])
+        if "connect_end" in times:
+            tracer.record_span("http.connect", times.get("dns_end", times["connect_start"]), times["connect_end"])
+        sent = times.get("connect_end", times["start"])
+        tracer.record_span("http.ttfb", sent, headers_ns, {"http.status_code": params.response.status})
+
+        # Download: dos cabeçalhos ao fim do corpo. O fim chega pela callback de
+        # EOF do StreamReader, fora da tarefa da requisição: o contexto é copiado
+        # aqui para o span continuar filho do span atual
+        content = params.response.content
+        context = contextvars.copy_context()
+
+        def on_eof():
+            size = getattr(content, "total_bytes", 0)
+            if size:
+                context.run(tracer.record_span, "http.download", headers_ns, time.time_ns(),
+                            {"http.response.body.size": size})
+
+        content.on_eof(on_eof)
+
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_start.append(on_request_start)
+    trace_config.on_dns_resolvehost_start.append(on_dns_start)
+    trace_config.on_dns_resolvehost_end.append(on_dns_end)
+    trace_config.on_connection_create_start.append(on_connection_start)
+    trace_config.on_connection_create_end.append(on_connection_end)
+    trace_config.on_request_end.append(on_request_end)
+    return trace_config